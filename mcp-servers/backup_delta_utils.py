@@ -0,0 +1,219 @@
+"""
+Backup Delta Utilities
+
+Line-level deltas between consecutive backup versions of a planning entity
+(see planning_state_utils.create_backup).
+
+A delta rebuilds a new version from its base version: it is a list of ops,
+each either a copy of a base line range or literal inserted lines. Copied
+ranges are strictly increasing, so a delta is also an alignment of the two
+versions - get_backup_diff takes its opcodes from (composed) deltas instead
+of diffing, and only needs the older version's lines from storage.
+
+Encoded form (compact JSON, compressed by the blob store):
+    {"v": 1, "base": <base line count>, "ops": [[i1, i2], ["line\\n", ...], ...]}
+
+This module contains:
+- Constants (chain length, encoding)
+- Delta computation / application / composition
+- Opcodes from deltas
+"""
+
+from typing import List, Tuple, Iterator, Union, Dict, Any
+import json
+import os
+
+from diff_utils import Opcode, diff_opcodes
+
+
+# Constants
+
+# Maximum deltas applied to rebuild a backup: every version deeper than this
+# in its chain is stored as a full snapshot instead (0 = snapshots only)
+BACKUP_CHAIN_LENGTH = max(0, int(os.environ.get("MCP_BACKUP_CHAIN_LENGTH", "16")))
+
+DELTA_FORMAT_VERSION = 1
+
+# Copy of base lines [i1, i2) or literal lines
+DeltaOp = Union[Tuple[int, int], List[str]]
+
+
+class Delta:
+    """Delta from a base version (base_lines lines) to a new version."""
+
+    __slots__ = ("base_lines", "ops")
+
+    def __init__(self, base_lines: int, ops: List[DeltaOp]):
+        self.base_lines = base_lines
+        self.ops = ops
+
+    @property
+    def new_lines(self) -> int:
+        """Line count of the version the delta produces."""
+        return sum(_op_length(op) for op in self.ops)
+
+    def encode(self) -> bytes:
+        """Compact JSON bytes (stored as a blob)."""
+        ops = [list(op) for op in self.ops]
+        return json.dumps(
+            {"v": DELTA_FORMAT_VERSION, "base": self.base_lines, "ops": ops},
+            ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    @classmethod
+    def decode(cls, data: bytes) -> "Delta":
+        """Parse an encoded delta.
+
+        Raises:
+            ValueError: If the data is not a supported delta
+        """
+        try:
+            payload = json.loads(data)
+            if payload.get("v") != DELTA_FORMAT_VERSION:
+                raise ValueError(f"Unsupported delta format: {payload.get('v')}")
+            ops: List[DeltaOp] = [
+                (op[0], op[1]) if op and isinstance(op[0], int) else list(op)
+                for op in payload["ops"]
+            ]
+            return cls(int(payload["base"]), ops)
+        except (TypeError, KeyError, AttributeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Invalid delta: {e}") from e
+
+
+def _op_length(op: DeltaOp) -> int:
+    return op[1] - op[0] if isinstance(op, tuple) else len(op)
+
+
+def split_lines(text: str) -> List[str]:
+    """Split text into lines keeping line endings (''.join restores it)."""
+    return text.splitlines(keepends=True)
+
+
+# Delta Computation
+
+def compute_delta(base: List[str], new: List[str]) -> Delta:
+    """Compute the delta rebuilding new from base (Myers line diff).
+
+    Args:
+        base: Base version lines (with line endings)
+        new: New version lines
+
+    Returns:
+        Delta
+    """
+    ops: List[DeltaOp] = []
+    for tag, i1, i2, j1, j2 in diff_opcodes(base, new):
+        if tag == "equal":
+            ops.append((i1, i2))
+        elif j2 > j1:
+            ops.append(new[j1:j2])
+    return Delta(len(base), ops)
+
+
+def apply_delta(base: List[str], delta: Delta) -> List[str]:
+    """Rebuild the new version's lines from its base.
+
+    Raises:
+        ValueError: If the delta was computed against a different base
+    """
+    if len(base) != delta.base_lines:
+        raise ValueError(f"Delta expects {delta.base_lines} base lines, got {len(base)}")
+    lines: List[str] = []
+    for op in delta.ops:
+        if isinstance(op, tuple):
+            lines.extend(base[op[0]:op[1]])
+        else:
+            lines.extend(op)
+    return lines
+
+
+def compose_deltas(first: Delta, second: Delta) -> Delta:
+    """Compose base→mid and mid→new into base→new (no line content needed).
+
+    Raises:
+        ValueError: If second was not computed against first's result
+    """
+    if first.new_lines != second.base_lines:
+        raise ValueError("Deltas do not chain")
+
+    # Segments of the middle version: (start, end, op of first)
+    segments = []
+    position = 0
+    for op in first.ops:
+        length = _op_length(op)
+        segments.append((position, position + length, op))
+        position += length
+
+    ops: List[DeltaOp] = []
+    index = 0
+    for op in second.ops:
+        if not isinstance(op, tuple):
+            _append_op(ops, op)
+            continue
+        start, end = op
+        while index > 0 and segments[index][0] > start:
+            index -= 1
+        while start < end:
+            while segments[index][1] <= start:
+                index += 1
+            seg_start, seg_end, seg_op = segments[index]
+            take_end = min(end, seg_end)
+            offset = start - seg_start
+            if isinstance(seg_op, tuple):
+                _append_op(ops, (seg_op[0] + offset, seg_op[0] + offset + take_end - start))
+            else:
+                _append_op(ops, seg_op[offset:offset + take_end - start])
+            start = take_end
+    return Delta(first.base_lines, ops)
+
+
+def _append_op(ops: List[DeltaOp], op: DeltaOp) -> None:
+    """Append an op, merging it with an adjacent op of the same kind."""
+    if _op_length(op) == 0:
+        return
+    if ops:
+        last = ops[-1]
+        if isinstance(op, tuple) and isinstance(last, tuple) and last[1] == op[0]:
+            ops[-1] = (last[0], op[1])
+            return
+        if not isinstance(op, tuple) and not isinstance(last, tuple):
+            ops[-1] = last + op
+            return
+    ops.append(op)
+
+
+# Opcodes
+
+def delta_opcodes(delta: Delta) -> Iterator[Opcode]:
+    """Alignment of base and new version as difflib-style opcodes.
+
+    Raises:
+        ValueError: If copied ranges are not increasing (not an alignment)
+    """
+    i = j = 0
+    pending = 0  # literal lines since the last copy
+
+    def flush(upto: int) -> Iterator[Opcode]:
+        nonlocal i, j, pending
+        if upto < i:
+            raise ValueError("Delta copies are not monotonic")
+        if upto > i or pending:
+            tag = "replace" if upto > i and pending else ("delete" if upto > i else "insert")
+            yield (tag, i, upto, j, j + pending)
+            i, j, pending = upto, j + pending, 0
+
+    for op in delta.ops:
+        if isinstance(op, tuple):
+            yield from flush(op[0])
+            yield ("equal", op[0], op[1], j, j + op[1] - op[0])
+            i, j = op[1], j + op[1] - op[0]
+        else:
+            pending += len(op)
+    yield from flush(delta.base_lines)
+
+
+def delta_stats(delta: Delta) -> Dict[str, Any]:
+    """Counts of copied, inserted and deleted lines."""
+    copied = sum(op[1] - op[0] for op in delta.ops if isinstance(op, tuple))
+    inserted = sum(len(op) for op in delta.ops if not isinstance(op, tuple))
+    return {"copied": copied, "inserted": inserted, "deleted": delta.base_lines - copied}
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark: backup disk usage and restore latency over many revisions
+
+Backs up N synthetic revisions of one blueprint (a few paragraphs rewritten
+per regeneration) and reports, per BACKUP_CHAIN_LENGTH:
+
+- bytes on disk (blob store objects) versus legacy full copies in backups/
+- create_backup latency
+- restore latency (rebuild of a random revision, p50 / max)
+- get_backup_diff latency between consecutive revisions
+
+Chain length 0 stores every revision as a compressed full snapshot.
+
+Run with:
+    python benchmarks/bench_backup_chains.py --revisions 500 --chain-lengths 0 8 16 32
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import planning_state_utils
+from planning_state_utils import (
+    create_backup,
+    get_backup_diff,
+    update_entity_state,
+    close_db_connections,
+)
+
+
+def _revisions(count: int, paragraphs: int, seed: int = 1):
+    rng = random.Random(seed)
+    words = "Алекса смотрит на экран станции и думает о том что случилось вчера в доке".split()
+    text = [" ".join(rng.choice(words) for _ in range(60)) + "\n\n" for _ in range(paragraphs)]
+    for _ in range(count):
+        for _ in range(rng.randint(1, 3)):
+            text[rng.randrange(paragraphs)] = " ".join(rng.choice(words) for _ in range(60)) + "\n\n"
+        yield "# Blueprint\n\n" + "".join(text)
+
+
+def _disk_usage(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) if path.exists() else 0
+
+
+def _run(chain_length: int, revisions, samples: int) -> None:
+    root = Path(tempfile.mkdtemp())
+    try:
+        workspace = root / "workspace"
+        workspace.mkdir()
+        planning_state_utils.WORKSPACE_PATH = workspace
+        planning_state_utils.PLANNING_STATE_DB_PATH = workspace / "planning-state.db"
+        planning_state_utils.BACKUP_CHAIN_LENGTH = chain_length
+
+        blueprint = root / "scene-0001-blueprint.md"
+        blueprint.write_text(revisions[0], encoding='utf-8')
+        update_entity_state('scene', 'scene-0001', 'draft', 'x' * 64, str(blueprint))
+
+        ids, create_times = [], []
+        for text in revisions:
+            blueprint.write_text(text, encoding='utf-8')
+            start = time.perf_counter()
+            result = create_backup('scene', 'scene-0001', str(blueprint), reason='regeneration')
+            create_times.append(time.perf_counter() - start)
+            ids.append(result['backup_id'])
+
+        conn = planning_state_utils._get_db_connection()
+        rng = random.Random(2)
+        restore_times = []
+        for backup_id in rng.sample(ids, min(samples, len(ids))):
+            start = time.perf_counter()
+            planning_state_utils._read_backup_content(conn, backup_id)
+            restore_times.append(time.perf_counter() - start)
+
+        diff_times = []
+        for n in rng.sample(range(1, len(ids)), min(samples, len(ids) - 1)):
+            start = time.perf_counter()
+            get_backup_diff(ids[n - 1], ids[n])
+            diff_times.append(time.perf_counter() - start)
+
+        stored = _disk_usage(workspace / "blobs" / "objects")
+        legacy = sum(len(text.encode('utf-8')) for text in revisions)
+        print(
+            f"{chain_length:>6} {stored / 1024:10.0f} KB {legacy / stored:7.1f}x "
+            f"{statistics.median(create_times) * 1000:9.2f} ms "
+            f"{statistics.median(restore_times) * 1000:9.2f} ms {max(restore_times) * 1000:9.2f} ms "
+            f"{statistics.median(diff_times) * 1000:9.2f} ms"
+        )
+    finally:
+        close_db_connections()
+        shutil.rmtree(root)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--revisions", type=int, default=500)
+    parser.add_argument("--paragraphs", type=int, default=40)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--chain-lengths", type=int, nargs="+", default=[0, 8, 16, 32])
+    args = parser.parse_args()
+
+    revisions = list(_revisions(args.revisions, args.paragraphs))
+    legacy = sum(len(text.encode('utf-8')) for text in revisions)
+    print(f"{args.revisions} revisions of ~{len(revisions[-1].encode('utf-8')) // 1024} KB, "
+          f"legacy backups/ copies: {legacy / 1024:.0f} KB")
+    print()
+    print(f"{'chain':>6} {'on disk':>13} {'saving':>8} {'create p50':>12} "
+          f"{'restore p50':>12} {'restore max':>12} {'diff p50':>12}")
+    for chain_length in args.chain_lengths:
+        _run(chain_length, revisions, args.samples)
+
+
+if __name__ == "__main__":
+    main()
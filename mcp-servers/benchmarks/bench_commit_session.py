@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: committing a session's files into the global tree
+
+Builds a session with N CoW files plus run artifacts and measures:
+
+- legacy serial commit (shutil.copy2 per file, copytree per run directory)
+- commit engine (journaled plan, staged copies, rename into place)
+- commit engine when every file is already identical in global (skip)
+
+Run with:
+    python benchmarks/bench_commit_session.py --files 2000 --size 65536
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import session_commit_utils
+from session_commit_utils import run_commit
+
+
+def _build(root: Path, files: int, size: int):
+    session = root / "workspace" / "sessions" / "bench"
+    cow_files = []
+    payload = os.urandom(size)
+    for n in range(files):
+        rel = f"acts/act-1/chapters/chapter-{n // 100:02d}/scene-{n:05d}.md"
+        path = session / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(payload[:size - 8] + n.to_bytes(8, "little"))
+        cow_files.append({"path": rel, "type": "modified"})
+        if n % 10 == 0:
+            artifact = session / "generation-runs" / f"run-{n:05d}" / "output.md"
+            artifact.parent.mkdir(parents=True, exist_ok=True)
+            artifact.write_bytes(payload)
+    return session, cow_files
+
+
+def _legacy(root: Path, session: Path, cow_files) -> None:
+    for cow_file in cow_files:
+        target = root / cow_file["path"]
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(session / cow_file["path"], target)
+    runs = session / "generation-runs"
+    for run_dir in runs.iterdir():
+        shutil.copytree(run_dir, root / "workspace" / "generation-runs" / run_dir.name, dirs_exist_ok=True)
+
+
+def _engine(root: Path, session: Path, cow_files) -> None:
+    result = run_commit(
+        session, cow_files, root / "workspace", root / "archive",
+        cleanup=lambda: None, global_root=root
+    )
+    if result.failed:
+        raise RuntimeError(result.failed[:3])
+
+
+def _measure(label: str, files: int, size: int, run, prefill: bool = False) -> None:
+    root = Path(tempfile.mkdtemp())
+    try:
+        session, cow_files = _build(root, files, size)
+        if prefill:
+            _legacy(root, session, cow_files)
+        start = time.perf_counter()
+        run(root, session, cow_files)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(root)
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    print(f"{args.files} files of {args.size} bytes, {session_commit_utils.COMMIT_WORKERS} workers")
+    print()
+    _measure("legacy serial copy2", args.files, args.size, _legacy)
+    _measure("engine (copy + rename)", args.files, args.size, _engine)
+    _measure("engine (all identical, skipped)", args.files, args.size, _engine, prefill=True)
+
+
+if __name__ == "__main__":
+    main()
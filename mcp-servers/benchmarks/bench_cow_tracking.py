@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: session CoW tracking cost as a session grows
+
+Tracks N distinct files in one session and reports total and per-call time for:
+
+- legacy _add_cow_file (linear scans, full stats recompute, session.json rewrite per call)
+- keyed CoW index with batched flushes (default batch size)
+- keyed CoW index flushing on every call (MCP_SESSION_FLUSH_EVERY=1)
+
+Run with:
+    python benchmarks/bench_cow_tracking.py --files 2000
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import session_utils
+
+
+def _legacy_add_cow_file(session_name, file_path, change_type):
+    """Previous _add_cow_file: list scans + full rewrite on every call."""
+    session_data = session_utils._load_session_data(session_name)
+    for cow_file in session_data["cow_files"]:
+        if cow_file["path"] == file_path:
+            return
+    session_data["cow_files"].append({
+        "path": file_path,
+        "type": change_type,
+        "copied_at": datetime.now(timezone.utc).isoformat(),
+        "size_bytes": 0
+    })
+    if file_path not in session_data["changes"][change_type]:
+        session_data["changes"][change_type].append(file_path)
+    session_data["stats"]["total_files_changed"] = len(session_data["cow_files"])
+    session_data["stats"]["session_size_bytes"] = sum(f["size_bytes"] for f in session_data["cow_files"])
+    session_utils._save_session_data(session_name, session_data)
+
+
+def _measure(label, files, add_fn, flush_every=None):
+    temp_dir = Path(tempfile.mkdtemp())
+    original_sessions = session_utils.SESSIONS_PATH
+    original_flush = session_utils.COW_FLUSH_MAX_PENDING
+    try:
+        session_utils.SESSIONS_PATH = temp_dir / "sessions"
+        session_utils._cow_indexes.clear()
+        if flush_every:
+            session_utils.COW_FLUSH_MAX_PENDING = flush_every
+        session_dir = session_utils.SESSIONS_PATH / "bench"
+        session_dir.mkdir(parents=True)
+        (session_dir / "session.json").write_text(json.dumps({
+            "name": "bench",
+            "cow_files": [],
+            "changes": {"modified": [], "created": [], "deleted": []},
+            "human_retries": [],
+            "stats": {"total_files_changed": 0, "session_size_bytes": 0}
+        }))
+
+        start = time.perf_counter()
+        for n in range(files):
+            add_fn("bench", f"acts/act-1/chapters/chapter-{n // 100:02d}/scene-{n:05d}.md", "modified")
+        session_utils._flush_cow_index("bench")
+        elapsed = time.perf_counter() - start
+
+        tracked = session_utils._load_session_data("bench")["stats"]["total_files_changed"]
+        if tracked != files:
+            raise RuntimeError(f"{label}: tracked {tracked} of {files} files")
+    finally:
+        session_utils.SESSIONS_PATH = original_sessions
+        session_utils.COW_FLUSH_MAX_PENDING = original_flush
+        session_utils._cow_indexes.clear()
+        shutil.rmtree(temp_dir)
+
+    print(f"{label:<36} total {elapsed * 1000:9.1f} ms   per call {elapsed / files * 1e6:8.1f} µs")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--files", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{args.files} tracked files per configuration")
+    print()
+    _measure("legacy (rewrite per call)", args.files, _legacy_add_cow_file)
+    _measure("index, flush every call", args.files, session_utils._add_cow_file, flush_every=1)
+    _measure(f"index, batched ({session_utils.COW_FLUSH_MAX_PENDING})", args.files, session_utils._add_cow_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hashing a book's planning files with and without the hash cache
+
+Creates a synthetic book (acts / chapters / scene blueprints) and reports:
+
+- uncached hashing of every file (read + SHA-256 each time)
+- HashCache.hash_tree, cold (empty cache) and warm (no file changed)
+- warm hash_tree after a few files changed
+
+Run with:
+    python benchmarks/bench_hash_tree.py --scenes 2000 --size-kb 16
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from hash_cache_utils import HashCache, hash_file
+
+
+def _book(root: Path, scenes: int, size_kb: int) -> list:
+    rng = random.Random(1)
+    words = "Алекса смотрит на экран станции и думает о том что случилось вчера в доке".split()
+    paths = []
+    for n in range(scenes):
+        path = root / "acts" / f"act-{n // 500 + 1}" / "chapters" / f"chapter-{n // 10:03d}" / f"scene-{n:04d}-blueprint.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        text = ""
+        while len(text.encode('utf-8')) < size_kb * 1024:
+            text += " ".join(rng.choice(words) for _ in range(40)) + "\n"
+        path.write_text(text, encoding='utf-8')
+        past = time.time() - 60
+        os.utime(path, (past, past))
+        paths.append(path)
+    return paths
+
+
+def _timed(label: str, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    print(f"{label:<32} {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scenes", type=int, default=2000)
+    parser.add_argument("--size-kb", type=int, default=16)
+    parser.add_argument("--changed", type=int, default=10)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp())
+    try:
+        paths = _book(root / "book", args.scenes, args.size_kb)
+        cache = HashCache(root / "hash-cache.db")
+        acts = root / "book" / "acts"
+        print(f"{args.scenes} files of {args.size_kb} KB")
+        print()
+
+        _timed("uncached (read every file)", lambda: [hash_file(p) for p in paths])
+        _timed("hash_tree cold", lambda: cache.hash_tree(acts))
+        _timed("hash_tree warm", lambda: cache.hash_tree(acts))
+
+        for path in random.Random(2).sample(paths, min(args.changed, len(paths))):
+            path.write_text(path.read_text(encoding='utf-8') + "правка\n", encoding='utf-8')
+            past = time.time() - 30
+            os.utime(path, (past, past))
+        _timed(f"hash_tree warm, {args.changed} changed", lambda: cache.hash_tree(acts))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hierarchy tree loading (FEAT-0003)
+
+Compares the legacy N+1 approach (one get_entity_state call per chapter and
+scene, each running a second children query) with the single recursive-CTE
+get_hierarchy_tree() on a synthetic act.
+
+Reports SQL statement count and wall-clock latency for each approach.
+
+Run with:
+    python benchmarks/bench_hierarchy_tree.py --chapters 100 --scenes-per-chapter 100
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import planning_state_utils as psu
+
+
+def _populate(conn, chapters: int, scenes_per_chapter: int) -> None:
+    """Insert one act with chapters × scenes synthetic entities."""
+    now = datetime.now(timezone.utc).isoformat()
+    fake_hash = "0" * 64
+    rows = [("act", "act-1", "approved", fake_hash, "acts/act-1/strategic-plan.md", None, now, now)]
+
+    for c in range(1, chapters + 1):
+        chapter_id = f"chapter-{c:02d}"
+        rows.append(("chapter", chapter_id, "approved", fake_hash,
+                     f"acts/act-1/chapters/{chapter_id}/plan.md", "act-1", now, now))
+        for n in range(1, scenes_per_chapter + 1):
+            scene_id = f"scene-{c:02d}{n:02d}"
+            status = "approved" if n % 3 else "draft"
+            rows.append(("scene", scene_id, status, fake_hash,
+                         f"acts/act-1/chapters/{chapter_id}/scenes/{scene_id}-blueprint.md",
+                         chapter_id, now, now))
+
+    conn.executemany("""
+        INSERT OR REPLACE INTO planning_entities (
+            entity_type, entity_id, status, version_hash, file_path,
+            parent_id, created_at, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+
+
+def _legacy_tree(act_id: str) -> int:
+    """Reproduce the previous N+1 traversal; returns number of nodes visited."""
+    act = psu.get_entity_state('act', act_id)
+    visited = 1
+    for chapter_id in act.get('children', []):
+        chapter = psu.get_entity_state('chapter', chapter_id)
+        visited += 1
+        for scene_id in chapter.get('children', []):
+            psu.get_entity_state('scene', scene_id)
+            visited += 1
+    return visited
+
+
+def _measure(conn, label: str, fn) -> None:
+    """Run fn with a statement-counting trace callback and print results."""
+    statements = 0
+
+    def _trace(_sql):
+        nonlocal statements
+        statements += 1
+
+    conn.set_trace_callback(_trace)
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    conn.set_trace_callback(None)
+
+    print(f"{label:<28} {statements:>8} queries  {elapsed * 1000:>10.1f} ms  ({result} nodes)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--chapters", type=int, default=100)
+    parser.add_argument("--scenes-per-chapter", type=int, default=100)
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="Skip the slow N+1 baseline")
+    args = parser.parse_args()
+
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        psu.WORKSPACE_PATH = temp_dir / "workspace"
+        psu.PLANNING_STATE_DB_PATH = psu.WORKSPACE_PATH / "planning-state.db"
+        psu.PLANNING_STATE_JSON_DIR = psu.WORKSPACE_PATH / "planning-state"
+
+        conn = psu._init_database()
+        _populate(conn, args.chapters, args.scenes_per_chapter)
+
+        total = 1 + args.chapters * (1 + args.scenes_per_chapter)
+        print(f"Synthetic hierarchy: 1 act, {args.chapters} chapters, "
+              f"{args.chapters * args.scenes_per_chapter} scenes ({total} entities)")
+        print()
+
+        if not args.skip_legacy:
+            _measure(conn, "legacy N+1 traversal", lambda: _legacy_tree("act-1"))
+
+        def _single_pass():
+            tree = psu.get_hierarchy_tree("act-1")
+            tree.render_lines()
+            tree.status_counts()
+            return sum(1 for _ in tree.iter_nodes())
+
+        _measure(conn, "single-query tree + render", _single_pass)
+    finally:
+        psu.close_db_connections()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
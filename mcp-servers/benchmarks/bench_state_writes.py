@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: generation state step-transition latency
+
+Drives start_step/complete_step through every workflow step for a number of
+scenes and reports per-transition latency for:
+
+- legacy in-place write (truncate + json.dump indent=2, full rewrite per transition)
+- journaled writes (event append + periodic atomic snapshot) at each durability
+  level (none / file / dir), pretty and compact snapshots
+
+Run with:
+    python benchmarks/bench_state_writes.py --scenes 50
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import durable_io_utils
+import generation_state_mcp as gsm
+
+
+def _legacy_save_state_file(scene_id, state, event=None, step=None):
+    """Previous _save_state_file: rewrite the file in place, pretty-printed."""
+    state_path = gsm._get_state_file_path(scene_id)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    gsm._state_cache.put(scene_id, state_path, gsm._state_signature(state_path), state)
+
+
+async def _run_scenes(scenes: int) -> list:
+    """Run full step workflows; return per-transition latencies in seconds."""
+    latencies = []
+    for n in range(scenes):
+        scene_id = f"{n + 1:04d}"
+        await gsm.start_generation(gsm.StartGenerationInput(
+            scene_id=scene_id,
+            blueprint_path=f"acts/act-1/chapters/chapter-01/scenes/scene-{scene_id}-blueprint.md",
+            initiated_by="benchmark"
+        ))
+        for step_name in gsm.VALID_STEP_NAMES:
+            start = time.perf_counter()
+            await gsm.start_step(gsm.StartStepInput(scene_id=scene_id, step_name=step_name))
+            latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await gsm.complete_step(gsm.CompleteStepInput(
+                scene_id=scene_id,
+                step_name=step_name,
+                duration_seconds=1.0,
+                artifacts={"output": f"workspace/artifacts/{scene_id}/{step_name}.md"}
+            ))
+            latencies.append(time.perf_counter() - start)
+
+        # Tools report errors as text; make sure every transition really happened
+        state = gsm._load_state_file(scene_id)
+        completed = [s for s in state['steps'].values() if s.get('status') == 'COMPLETED']
+        if len(completed) != len(gsm.VALID_STEP_NAMES):
+            raise RuntimeError(f"Scene {scene_id}: only {len(completed)} steps completed")
+    return latencies
+
+
+def _measure(label: str, scenes: int, save_fn=None, durability=None, compact=False) -> None:
+    """Run one configuration in a fresh workspace and print latency stats."""
+    temp_dir = Path(tempfile.mkdtemp())
+    original_save = gsm._save_state_file
+    original_durability = durable_io_utils.DEFAULT_DURABILITY
+    original_compact = gsm.COMPACT_STATE_JSON
+    try:
+        gsm.WORKSPACE_PATH = temp_dir / "workspace"
+        gsm.SESSIONS_PATH = gsm.WORKSPACE_PATH / "sessions"
+        gsm.SESSION_LOCK_FILE = gsm.WORKSPACE_PATH / "session.lock"
+        gsm._state_cache.clear()
+        gsm.COMPACT_STATE_JSON = compact
+        if durability:
+            durable_io_utils.DEFAULT_DURABILITY = durability
+        if save_fn:
+            gsm._save_state_file = save_fn
+
+        latencies = asyncio.run(_run_scenes(scenes))
+    finally:
+        gsm._save_state_file = original_save
+        durable_io_utils.DEFAULT_DURABILITY = original_durability
+        gsm.COMPACT_STATE_JSON = original_compact
+        shutil.rmtree(temp_dir)
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<32} mean {statistics.mean(latencies) * 1000:7.3f} ms   "
+          f"p50 {statistics.median(latencies) * 1000:7.3f} ms   p99 {p99 * 1000:7.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scenes", type=int, default=50)
+    args = parser.parse_args()
+
+    transitions = args.scenes * len(gsm.VALID_STEP_NAMES) * 2
+    print(f"{args.scenes} scenes, {transitions} step transitions per configuration")
+    print()
+
+    _measure("legacy in-place (indent=2)", args.scenes, save_fn=_legacy_save_state_file)
+    for durability in durable_io_utils.DURABILITY_LEVELS:
+        for compact in (False, True):
+            label = f"journal {durability} ({'compact' if compact else 'indent=2'})"
+            _measure(label, args.scenes, durability=durability, compact=compact)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark: get_generation_status latency while a large commit_session runs
+
+Both servers' tools are driven on one event loop (as FastMCP does). A probe
+calls get_generation_status every --interval ms (latency is measured from
+the scheduled time, so a stalled loop counts against every delayed probe)
+and reports p50 / p99 / max:
+
+- idle (no other work)
+- during commit_session of --files CoW files, tools offloaded to the I/O pool
+- during the same commit with tool bodies run inline on the loop
+  (how the servers behaved before io_executor_utils)
+
+Run with:
+    python benchmarks/bench_tool_latency.py --files 5000 --size 65536
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import generation_state_mcp as gsm
+import session_management_mcp as sm
+import session_utils
+
+
+def _build(root: Path, files: int, size: int) -> None:
+    session = root / "workspace" / "sessions" / "bench"
+    cow_files = []
+    payload = os.urandom(size)
+    for n in range(files):
+        rel = f"acts/act-1/chapters/chapter-{n // 100:02d}/scene-{n:05d}.md"
+        path = session / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(payload[:size - 8] + n.to_bytes(8, "little"))
+        cow_files.append({"path": rel, "type": "modified"})
+    (session / "session.json").write_text(json.dumps({
+        "name": "bench",
+        "cow_files": cow_files,
+        "changes": {"modified": [c["path"] for c in cow_files], "created": [], "deleted": []},
+        "human_retries": [],
+        "stats": {"total_files_changed": files, "session_size_bytes": files * size}
+    }), encoding='utf-8')
+    (root / "workspace" / "session.lock").write_text(json.dumps({"active": "bench"}), encoding='utf-8')
+
+
+async def _probe(call, interval: float, done: asyncio.Event) -> list:
+    latencies = []
+    scheduled = time.perf_counter()
+    while not done.is_set():
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        await call()
+        latencies.append(time.perf_counter() - scheduled)
+        scheduled += interval
+    return latencies
+
+
+async def _run(label: str, status_call, work, interval: float) -> None:
+    done = asyncio.Event()
+    probe = asyncio.create_task(_probe(status_call, interval, done))
+    await asyncio.sleep(interval * 20)
+    start = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - start
+    done.set()
+    latencies = sorted(await probe)
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"{label:<28} {elapsed * 1000:9.0f} ms {len(latencies):7d} "
+          f"{pct(0.50):9.2f} {pct(0.99):9.2f} {latencies[-1] * 1000:9.2f}")
+
+
+async def _scenario(root: Path, args, mode: str) -> None:
+    os.chdir(root)
+    gsm._state_cache.clear()
+    session_utils._cow_indexes.clear()
+    await gsm.start_generation(gsm.StartGenerationInput(
+        scene_id="0101", blueprint_path="acts/act-1/scenes/scene-0101-blueprint.md", initiated_by="bench"
+    ))
+    status_params = gsm.GetGenerationStatusInput(scene_id="0101")
+    commit_params = sm.CommitSessionInput(name="bench", force=True)
+    interval = args.interval / 1000
+
+    if mode == "idle":
+        async def idle():
+            await asyncio.sleep(1.0)
+        await _run("idle", lambda: gsm.get_generation_status(status_params), idle, interval)
+        return
+
+    _build(root, args.files, args.size)
+    if mode == "offloaded":
+        async def commit():
+            output = await sm.commit_session(commit_params)
+            assert "SESSION COMMITTED" in output, output[:200]
+        await _run("commit_session (offloaded)", lambda: gsm.get_generation_status(status_params),
+                   commit, interval)
+    else:
+        # Pre-executor behaviour: blocking bodies executed on the loop itself
+        async def status_inline():
+            gsm.get_generation_status.__wrapped__(params=status_params)
+
+        async def commit_inline():
+            data = sm._load_session_data("bench")
+            sm.run_commit(
+                sm._get_session_path("bench"), data["cow_files"], sm.WORKSPACE_PATH,
+                sm.WORKSPACE_PATH / "deleted-archive" / "bench" / "inline",
+                lambda: sm._cleanup_committed_session("bench", sm._get_session_path("bench")),
+                Path("."), sm.COMMIT_WORKERS, None, sm.get_blob_store(sm.WORKSPACE_PATH)
+            )
+        await _run("commit_session (inline)", status_inline, commit_inline, interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=65536)
+    parser.add_argument("--interval", type=float, default=2.0, help="probe interval (ms)")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    print(f"{args.files} files of {args.size} bytes, probe every {args.interval} ms")
+    print()
+    print(f"{'':<28} {'work':>12} {'probes':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for mode in ("idle", "offloaded", "inline"):
+        root = Path(tempfile.mkdtemp())
+        try:
+            (root / "workspace").mkdir()
+            asyncio.run(_scenario(root, args, mode))
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
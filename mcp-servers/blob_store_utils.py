@@ -0,0 +1,434 @@
+"""
+Blob Store Utilities
+
+Content-addressed store for planning backups and session archives
+(workspace/blobs/).
+
+Each distinct content is stored once, keyed by its SHA-256 (the same hash as
+planning_state_utils.calculate_version_hash), optionally compressed with zlib
+or zstd. Backups and archive entries are named references to blobs kept in a
+small SQLite index; a blob's reference count is the number of references
+pointing to it, and gc() deletes blobs that have none.
+
+Layout:
+    workspace/blobs/objects/ab/abcdef...       (stored as is)
+    workspace/blobs/objects/ab/abcdef....z     (zlib)
+    workspace/blobs/objects/ab/abcdef....zst   (zstd)
+    workspace/blobs/index.db                   (blobs + refs)
+    workspace/blobs/gc.lock                    (dedup vs gc lock)
+
+A blob is written atomically before a reference to it is added, so a crash
+leaves at most an unreferenced blob. gc() only removes unreferenced blobs
+older than a grace period. put() of an existing blob restarts that period
+under gc.lock, and gc() re-checks the age and references of each blob under
+the same lock right before deleting it, so it never races a put() followed
+by add_ref().
+
+This module contains:
+- Constants (compression, layout)
+- Compression codecs
+- BlobStore (put / get / references / gc)
+- blob: URIs for path columns that now hold blob references
+"""
+
+from typing import Optional, Dict, List, Any, Tuple
+from pathlib import Path
+from datetime import datetime, timezone
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from durable_io_utils import atomic_write_bytes
+from file_lock_utils import file_lock
+from metrics_utils import instrument_connection
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+# Constants
+
+BLOB_STORE_DIR_NAME = "blobs"
+OBJECTS_DIR_NAME = "objects"
+INDEX_FILE_NAME = "index.db"
+GC_LOCK_FILE_NAME = "gc.lock"
+
+COMPRESSION_NONE = "none"
+COMPRESSION_ZLIB = "zlib"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSIONS = [COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_ZSTD]
+
+# Object file suffix per compression
+_SUFFIXES = {COMPRESSION_NONE: "", COMPRESSION_ZLIB: ".z", COMPRESSION_ZSTD: ".zst"}
+
+DEFAULT_BLOB_COMPRESSION = os.environ.get("MCP_BLOB_COMPRESSION", COMPRESSION_ZLIB)
+if DEFAULT_BLOB_COMPRESSION not in COMPRESSIONS:
+    DEFAULT_BLOB_COMPRESSION = COMPRESSION_ZLIB
+if DEFAULT_BLOB_COMPRESSION == COMPRESSION_ZSTD and not ZSTD_AVAILABLE:
+    logger.warning("MCP_BLOB_COMPRESSION=zstd but zstandard is not installed; using zlib")
+    DEFAULT_BLOB_COMPRESSION = COMPRESSION_ZLIB
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+# Unreferenced blobs younger than this (seconds) survive gc
+BLOB_GC_GRACE_SECONDS = 3600
+
+BLOB_URI_PREFIX = "blob:sha256:"
+
+INDEX_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS blobs (
+        hash TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        stored_size INTEGER NOT NULL,
+        compression TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS blob_refs (
+        ref TEXT PRIMARY KEY,
+        hash TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_blob_refs_hash ON blob_refs(hash);
+"""
+
+# Thread-local connections: {index path: connection}
+_pool = threading.local()
+
+
+# Compression Codecs
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    if compression == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return data
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    if compression == COMPRESSION_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of content (blob key)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+# Blob Store
+
+class BlobStore:
+    """Content-addressed blob store with named references."""
+
+    def __init__(self, root: Path, compression: str = DEFAULT_BLOB_COMPRESSION):
+        """Open (lazily create) a store.
+
+        Args:
+            root: Store directory (workspace/blobs)
+            compression: One of COMPRESSIONS, used for new blobs
+
+        Raises:
+            ValueError: If compression is unknown or zstd is unavailable
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Invalid compression '{compression}'. Must be one of: {COMPRESSIONS}")
+        if compression == COMPRESSION_ZSTD and not ZSTD_AVAILABLE:
+            raise ValueError("zstd compression requires the zstandard package")
+        self.root = root
+        self.objects_dir = root / OBJECTS_DIR_NAME
+        self.index_path = root / INDEX_FILE_NAME
+        self.lock_path = root / GC_LOCK_FILE_NAME
+        self.compression = compression
+
+    # Index
+
+    def _connect(self) -> sqlite3.Connection:
+        connections = getattr(_pool, "connections", None)
+        if connections is None:
+            connections = _pool.connections = {}
+
+        key = str(self.index_path)
+        conn = connections.get(key)
+        if conn is not None and self.index_path.exists():
+            return conn
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = instrument_connection(sqlite3.connect(key, check_same_thread=False), "blob_index")
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.executescript(INDEX_SCHEMA)
+        connections[key] = conn
+        return conn
+
+    # Objects
+
+    def _object_path(self, blob_hash: str, compression: str) -> Path:
+        return self.objects_dir / blob_hash[:2] / (blob_hash + _SUFFIXES[compression])
+
+    def locate(self, blob_hash: str) -> Optional[Tuple[Path, str]]:
+        """Find the object file of a blob.
+
+        Returns:
+            Tuple of (path, compression) or None if the blob is not stored
+        """
+        for compression in COMPRESSIONS:
+            path = self._object_path(blob_hash, compression)
+            if path.exists():
+                return path, compression
+        return None
+
+    def has(self, blob_hash: str) -> bool:
+        """Check whether a blob is stored."""
+        return self.locate(blob_hash) is not None
+
+    def put_bytes(self, data: bytes, blob_hash: Optional[str] = None) -> str:
+        """Store content (no-op if the same content is already stored).
+
+        Args:
+            data: Content
+            blob_hash: SHA-256 of data if already computed
+
+        Returns:
+            Blob hash
+        """
+        blob_hash = blob_hash or content_hash(data)
+        if self.locate(blob_hash) is not None:
+            with file_lock(self.lock_path):
+                # gc may have deleted the blob since; if so, store it again
+                located = self.locate(blob_hash)
+                if located is not None:
+                    # Restart the gc grace period: a reference is usually added next
+                    try:
+                        os.utime(located[0])
+                    except OSError:
+                        pass
+                    return blob_hash
+
+        compression = self.compression
+        stored = _compress(data, compression)
+        if compression != COMPRESSION_NONE and len(stored) >= len(data):
+            compression, stored = COMPRESSION_NONE, data
+
+        path = self._object_path(blob_hash, compression)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(path, stored)
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO blobs (hash, size, stored_size, compression, created_at) VALUES (?, ?, ?, ?, ?)",
+                (blob_hash, len(data), len(stored), compression, _now())
+            )
+        return blob_hash
+
+    def put_file(self, path: Path) -> str:
+        """Store a file's content. Returns the blob hash."""
+        with open(path, 'rb') as f:
+            return self.put_bytes(f.read())
+
+    def get_bytes(self, blob_hash: str) -> bytes:
+        """Read a blob's content.
+
+        Raises:
+            FileNotFoundError: If the blob is not stored
+            ValueError: If the stored content does not match its hash
+        """
+        located = self.locate(blob_hash)
+        if located is None:
+            raise FileNotFoundError(f"Blob not found: {blob_hash}")
+        path, compression = located
+        with open(path, 'rb') as f:
+            data = _decompress(f.read(), compression)
+        if content_hash(data) != blob_hash:
+            raise ValueError(f"Blob {blob_hash} is corrupted")
+        return data
+
+    def get_text(self, blob_hash: str) -> str:
+        """Read a blob as UTF-8 text."""
+        return self.get_bytes(blob_hash).decode('utf-8')
+
+    def materialize(self, blob_hash: str, destination: Path) -> None:
+        """Atomically write a blob's content to a file."""
+        atomic_write_bytes(destination, self.get_bytes(blob_hash))
+
+    # References
+
+    def add_ref(self, ref: str, blob_hash: str) -> None:
+        """Point a named reference at a blob (replaces an existing reference)."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO blob_refs (ref, hash, created_at) VALUES (?, ?, ?)",
+                (ref, blob_hash, _now())
+            )
+
+    def remove_ref(self, ref: str) -> bool:
+        """Drop a reference. Returns True if it existed."""
+        conn = self._connect()
+        with conn:
+            return conn.execute("DELETE FROM blob_refs WHERE ref = ?", (ref,)).rowcount > 0
+
+    def resolve_ref(self, ref: str) -> Optional[str]:
+        """Blob hash a reference points at (None if unknown)."""
+        row = self._connect().execute("SELECT hash FROM blob_refs WHERE ref = ?", (ref,)).fetchone()
+        return row["hash"] if row else None
+
+    def list_refs(self, prefix: str = "") -> List[Dict[str, Any]]:
+        """List references whose name starts with prefix, sorted by name."""
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        rows = self._connect().execute(
+            "SELECT ref, hash, created_at FROM blob_refs WHERE ref LIKE ? ESCAPE '\\' ORDER BY ref",
+            (escaped + "%",)
+        )
+        return [dict(row) for row in rows]
+
+    def refcount(self, blob_hash: str) -> int:
+        """Number of references pointing at a blob."""
+        row = self._connect().execute("SELECT COUNT(*) FROM blob_refs WHERE hash = ?", (blob_hash,)).fetchone()
+        return row[0]
+
+    # Maintenance
+
+    def stats(self) -> Dict[str, Any]:
+        """Blob/reference counts and logical vs stored size."""
+        conn = self._connect()
+        blobs = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+        ).fetchone()
+        refs = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(b.size), 0) FROM blob_refs r LEFT JOIN blobs b ON b.hash = r.hash"
+        ).fetchone()
+        return {
+            "blobs": blobs[0],
+            "stored_bytes": blobs[2],
+            "unique_bytes": blobs[1],
+            "refs": refs[0],
+            "referenced_bytes": refs[1],
+            "compression": self.compression
+        }
+
+    def gc(self, dry_run: bool = False, grace_seconds: float = BLOB_GC_GRACE_SECONDS) -> Dict[str, Any]:
+        """Delete blobs without references.
+
+        Args:
+            dry_run: Only report what would be deleted
+            grace_seconds: Keep unreferenced blobs younger than this
+
+        Each candidate is re-checked under the lock put_bytes() holds while it
+        deduplicates, so a blob re-stored or referenced after the scan started
+        is kept.
+
+        Returns:
+            Dict with scanned, removed, bytes_freed, kept_recent, dry_run
+        """
+        conn = self._connect()
+        referenced = {row[0] for row in conn.execute("SELECT DISTINCT hash FROM blob_refs")}
+        cutoff = time.time() - grace_seconds
+
+        scanned = kept_recent = 0
+        removed: List[str] = []
+        bytes_freed = 0
+        if self.objects_dir.exists():
+            for fan_out in sorted(self.objects_dir.iterdir()):
+                for entry in os.scandir(fan_out):
+                    st = entry.stat()
+                    if entry.name.startswith("."):
+                        # Temp file of an interrupted write
+                        if st.st_mtime < cutoff and not dry_run:
+                            os.unlink(entry.path)
+                        continue
+                    scanned += 1
+                    blob_hash = entry.name.split(".", 1)[0]
+                    if blob_hash in referenced:
+                        continue
+                    if st.st_mtime >= cutoff:
+                        kept_recent += 1
+                        continue
+                    if not dry_run and not self._remove_if_unused(conn, entry.path, blob_hash, cutoff):
+                        continue
+                    removed.append(blob_hash)
+                    bytes_freed += st.st_size
+
+        return {
+            "scanned": scanned,
+            "referenced": len(referenced),
+            "removed": len(removed),
+            "bytes_freed": bytes_freed,
+            "kept_recent": kept_recent,
+            "dry_run": dry_run
+        }
+
+    def _remove_if_unused(self, conn: sqlite3.Connection, path: str, blob_hash: str, cutoff: float) -> bool:
+        """Delete a gc candidate unless it was re-stored or referenced since the scan."""
+        with file_lock(self.lock_path):
+            try:
+                if os.stat(path).st_mtime >= cutoff:
+                    return False
+            except FileNotFoundError:
+                return False
+            if conn.execute("SELECT 1 FROM blob_refs WHERE hash = ?", (blob_hash,)).fetchone():
+                return False
+            os.unlink(path)
+            with conn:
+                conn.execute("DELETE FROM blobs WHERE hash = ?", (blob_hash,))
+        return True
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# {absolute root: store}
+_stores: Dict[str, BlobStore] = {}
+
+
+def get_blob_store(workspace_path: Path) -> BlobStore:
+    """Get the workspace's blob store (workspace/blobs, default compression)."""
+    root = workspace_path / BLOB_STORE_DIR_NAME
+    key = os.path.abspath(root)
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = BlobStore(root)
+    return store
+
+
+def close_blob_store_connections() -> None:
+    """Close all index connections held by the current thread."""
+    connections = getattr(_pool, "connections", None) or {}
+    for conn in connections.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    connections.clear()
+
+
+# blob: URIs
+
+def blob_uri(blob_hash: str) -> str:
+    """Reference stored in a path column (e.g. backup_file_path)."""
+    return BLOB_URI_PREFIX + blob_hash
+
+
+def parse_blob_uri(value: str) -> Optional[str]:
+    """Blob hash of a blob: URI, or None if value is a plain path."""
+    if value.startswith(BLOB_URI_PREFIX):
+        return value[len(BLOB_URI_PREFIX):]
+    return None
@@ -0,0 +1,446 @@
+"""
+Diff Utilities
+
+Text diff engine used by get_backup_diff and the backup delta chains.
+
+- Myers' O(ND) algorithm in its linear-space form (middle snake divide and
+  conquer): time grows with the number of differences, memory stays linear,
+  unlike difflib's worst-case quadratic matching
+- Patience diff: aligns lines that are unique on both sides first (keeps
+  rewritten paragraphs from being matched on blank lines), Myers in between
+- Word-level mode for prose: changed lines are re-diffed word by word and
+  shown inline as [-removed-]{+added+}
+- Hunks are grouped from opcodes and rendered lazily, so callers can page
+  through a large diff without building the whole text
+
+This module contains:
+- Constants (algorithms, modes)
+- Myers and patience matching
+- Opcodes, hunk grouping and stats
+- TextDiff (lazy hunk rendering, unified output)
+"""
+
+from typing import List, Tuple, Iterator, Sequence, Dict, Any, Optional, Hashable
+from bisect import bisect_left
+from dataclasses import dataclass
+import re
+
+
+# Constants
+
+ALGORITHM_MYERS = "myers"
+ALGORITHM_PATIENCE = "patience"
+DIFF_ALGORITHMS = [ALGORITHM_MYERS, ALGORITHM_PATIENCE]
+
+MODE_LINE = "line"
+MODE_WORD = "word"
+DIFF_MODES = [MODE_LINE, MODE_WORD]
+
+DEFAULT_CONTEXT_LINES = 3
+
+# Words (any script), runs of whitespace, single punctuation characters
+_WORD_TOKEN = re.compile(r"\w+|\s+|[^\w\s]")
+
+# (tag, i1, i2, j1, j2) with difflib tags: equal / replace / delete / insert
+Opcode = Tuple[str, int, int, int, int]
+
+# Matching block: (i, j, size) - a[i:i+size] == b[j:j+size]
+Block = Tuple[int, int, int]
+
+
+# Myers (linear space)
+
+def _middle_snake(a: Sequence[Hashable], alo: int, ahi: int,
+                  b: Sequence[Hashable], blo: int, bhi: int) -> Tuple[int, int, int, int]:
+    """Find the middle snake of a[alo:ahi] vs b[blo:bhi] (both non-empty).
+
+    Returns:
+        (x1, y1, x2, y2): absolute start and end of the snake
+    """
+    n, m = ahi - alo, bhi - blo
+    delta = n - m
+    odd = delta & 1
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    forward = [0] * (2 * max_d + 3)
+    backward = [0] * (2 * max_d + 3)
+
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and -(d - 1) <= delta - k <= d - 1 and x + backward[offset + delta - k] >= n:
+                return alo + x0, blo + y0, alo + x, blo + y
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+                return ahi - x, bhi - y, ahi - x0, bhi - y0
+
+    raise AssertionError("middle snake not found")  # unreachable for valid input
+
+
+def _trim(a, alo, ahi, b, blo, bhi) -> Tuple[int, int, int, int, int, int]:
+    """Strip the common prefix and suffix; returns (prefix, suffix, alo, ahi, blo, bhi)."""
+    start_a = alo
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        alo += 1
+        blo += 1
+    prefix = alo - start_a
+    end_a = ahi
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+    return prefix, end_a - ahi, alo, ahi, blo, bhi
+
+
+def _myers_blocks(a, alo, ahi, b, blo, bhi, blocks: List[Block]) -> None:
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        prefix, suffix, alo, ahi, blo, bhi = _trim(a, alo, ahi, b, blo, bhi)
+        if prefix:
+            blocks.append((alo - prefix, blo - prefix, prefix))
+        if suffix:
+            blocks.append((ahi, bhi, suffix))
+        if alo == ahi or blo == bhi:
+            continue
+        x1, y1, x2, y2 = _middle_snake(a, alo, ahi, b, blo, bhi)
+        if x2 > x1:
+            blocks.append((x1, y1, x2 - x1))
+        stack.append((alo, x1, blo, y1))
+        stack.append((x2, ahi, y2, bhi))
+
+
+def myers_matching_blocks(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Block]:
+    """Matching blocks of a shortest edit script (sorted, adjacent blocks merged)."""
+    blocks: List[Block] = []
+    _myers_blocks(a, 0, len(a), b, 0, len(b), blocks)
+    return _merge_blocks(blocks)
+
+
+# Patience
+
+def _unique_common(a, alo, ahi, b, blo, bhi) -> List[Tuple[int, int]]:
+    """(i, j) pairs of elements occurring exactly once in both ranges, in a order."""
+    counts: Dict[Hashable, List[int]] = {}
+    for i in range(alo, ahi):
+        entry = counts.setdefault(a[i], [0, i, 0, -1])
+        entry[0] += 1
+    for j in range(blo, bhi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[2] += 1
+            entry[3] = j
+    return sorted((e[1], e[3]) for e in counts.values() if e[0] == 1 and e[2] == 1)
+
+
+def _longest_increasing(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Longest subsequence of pairs increasing in j (patience sorting)."""
+    tails: List[int] = []        # smallest tail j of each pile
+    tail_index: List[int] = []   # pair index of each pile's tail
+    previous: List[int] = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile > 0:
+            previous[index] = tail_index[pile - 1]
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pile] = j
+            tail_index[pile] = index
+
+    result = []
+    index = tail_index[-1] if tail_index else -1
+    while index >= 0:
+        result.append(pairs[index])
+        index = previous[index]
+    result.reverse()
+    return result
+
+
+def patience_matching_blocks(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Block]:
+    """Matching blocks anchored on unique common lines (Myers between anchors)."""
+    blocks: List[Block] = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        prefix, suffix, alo, ahi, blo, bhi = _trim(a, alo, ahi, b, blo, bhi)
+        if prefix:
+            blocks.append((alo - prefix, blo - prefix, prefix))
+        if suffix:
+            blocks.append((ahi, bhi, suffix))
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchors = _longest_increasing(_unique_common(a, alo, ahi, b, blo, bhi))
+        if not anchors:
+            _myers_blocks(a, alo, ahi, b, blo, bhi, blocks)
+            continue
+        i0, j0 = alo, blo
+        for i, j in anchors:
+            blocks.append((i, j, 1))
+            stack.append((i0, i, j0, j))
+            i0, j0 = i + 1, j + 1
+        stack.append((i0, ahi, j0, bhi))
+    return _merge_blocks(blocks)
+
+
+def _merge_blocks(blocks: List[Block]) -> List[Block]:
+    merged: List[Block] = []
+    for i, j, size in sorted(blocks):
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            last = merged[-1]
+            merged[-1] = (last[0], last[1], last[2] + size)
+        else:
+            merged.append((i, j, size))
+    return merged
+
+
+# Opcodes, Hunks and Stats
+
+def opcodes_from_blocks(blocks: List[Block], len_a: int, len_b: int) -> List[Opcode]:
+    """Convert matching blocks to difflib-style opcodes."""
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for bi, bj, size in blocks + [(len_a, len_b, 0)]:
+        if i < bi and j < bj:
+            opcodes.append(("replace", i, bi, j, bj))
+        elif i < bi:
+            opcodes.append(("delete", i, bi, j, bj))
+        elif j < bj:
+            opcodes.append(("insert", i, bi, j, bj))
+        if size:
+            opcodes.append(("equal", bi, bi + size, bj, bj + size))
+        i, j = bi + size, bj + size
+    return opcodes
+
+
+def diff_opcodes(a: Sequence[Hashable], b: Sequence[Hashable], algorithm: str = ALGORITHM_MYERS) -> List[Opcode]:
+    """Opcodes turning a into b.
+
+    Raises:
+        ValueError: If algorithm is unknown
+    """
+    if algorithm == ALGORITHM_MYERS:
+        blocks = myers_matching_blocks(a, b)
+    elif algorithm == ALGORITHM_PATIENCE:
+        blocks = patience_matching_blocks(a, b)
+    else:
+        raise ValueError(f"Invalid algorithm '{algorithm}'. Must be one of: {DIFF_ALGORITHMS}")
+    return opcodes_from_blocks(blocks, len(a), len(b))
+
+
+def group_opcodes(opcodes: List[Opcode], context: int = DEFAULT_CONTEXT_LINES) -> List[List[Opcode]]:
+    """Split opcodes into hunks with up to context equal lines around changes
+    (same grouping as difflib.SequenceMatcher.get_grouped_opcodes)."""
+    opcodes = list(opcodes) or [("equal", 0, 1, 0, 1)]
+    if opcodes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = opcodes[0]
+        opcodes[0] = (tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    if opcodes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = opcodes[-1]
+        opcodes[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+
+    groups: List[List[Opcode]] = []
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+    return groups
+
+
+def _format_range(start: int, stop: int) -> str:
+    """Unified diff range (as difflib renders it)."""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return str(beginning)
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _strip_eol(line: str) -> str:
+    return line.rstrip("\r\n")
+
+
+def word_diff(old: str, new: str, algorithm: str = ALGORITHM_MYERS) -> Tuple[str, int, int]:
+    """Inline word diff of two texts.
+
+    Returns:
+        Tuple of (text with [-removed-] / {+added+} markers, words removed, words added)
+    """
+    old_tokens = _WORD_TOKEN.findall(old)
+    new_tokens = _WORD_TOKEN.findall(new)
+    parts: List[str] = []
+    removed = added = 0
+    for tag, i1, i2, j1, j2 in diff_opcodes(old_tokens, new_tokens, algorithm):
+        if tag == "equal":
+            parts.append("".join(old_tokens[i1:i2]))
+            continue
+        if i2 > i1:
+            parts.append("[-" + "".join(old_tokens[i1:i2]) + "-]")
+            removed += sum(1 for t in old_tokens[i1:i2] if not t.isspace())
+        if j2 > j1:
+            parts.append("{+" + "".join(new_tokens[j1:j2]) + "+}")
+            added += sum(1 for t in new_tokens[j1:j2] if not t.isspace())
+    return "".join(parts), removed, added
+
+
+@dataclass
+class Hunk:
+    """One rendered hunk."""
+    old_start: int   # 0-based
+    old_end: int
+    new_start: int
+    new_end: int
+    lines: List[str]
+
+    @property
+    def header(self) -> str:
+        return f"@@ -{_format_range(self.old_start, self.old_end)} +{_format_range(self.new_start, self.new_end)} @@"
+
+    def render(self) -> str:
+        return "\n".join([self.header] + self.lines)
+
+
+# Text Diff
+
+class TextDiff:
+    """Diff of two line lists; hunks are rendered on demand.
+
+    Line mode renders unified diff lines (' ', '-', '+'). Word mode renders
+    replaced lines as one '~' line per new-side line with inline
+    [-removed-]{+added+} markers; pure insertions and deletions stay '+' / '-'.
+    """
+
+    def __init__(
+        self,
+        old_lines: List[str],
+        new_lines: List[str],
+        opcodes: Optional[List[Opcode]] = None,
+        algorithm: str = ALGORITHM_MYERS,
+        mode: str = MODE_LINE,
+        context: int = DEFAULT_CONTEXT_LINES,
+        fromfile: str = "",
+        tofile: str = ""
+    ):
+        """Create a diff.
+
+        Args:
+            old_lines: Old version lines (with line endings)
+            new_lines: New version lines
+            opcodes: Precomputed alignment (e.g. from backup deltas); computed if None
+            algorithm: ALGORITHM_MYERS or ALGORITHM_PATIENCE
+            mode: MODE_LINE or MODE_WORD
+            context: Context lines around changes
+            fromfile: '---' header label
+            tofile: '+++' header label
+
+        Raises:
+            ValueError: If mode or algorithm is unknown
+        """
+        if mode not in DIFF_MODES:
+            raise ValueError(f"Invalid mode '{mode}'. Must be one of: {DIFF_MODES}")
+        self.old_lines = old_lines
+        self.new_lines = new_lines
+        self.algorithm = algorithm
+        self.mode = mode
+        self.context = context
+        self.fromfile = fromfile
+        self.tofile = tofile
+        self.opcodes = opcodes if opcodes is not None else diff_opcodes(old_lines, new_lines, algorithm)
+        self.groups = group_opcodes(self.opcodes, context)
+        self._words: Optional[Tuple[int, int]] = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Diff-stat summary (word counts only in word mode)."""
+        removed = sum(i2 - i1 for tag, i1, i2, _, _ in self.opcodes if tag in ("replace", "delete"))
+        added = sum(j2 - j1 for tag, _, _, j1, j2 in self.opcodes if tag in ("replace", "insert"))
+        stats = {
+            "hunks": len(self.groups),
+            "lines_added": added,
+            "lines_removed": removed,
+            "old_lines": len(self.old_lines),
+            "new_lines": len(self.new_lines),
+        }
+        if self.mode == MODE_WORD:
+            if self._words is None:
+                self._words = self._count_words()
+            stats["words_removed"], stats["words_added"] = self._words
+        return stats
+
+    def _count_words(self) -> Tuple[int, int]:
+        removed = added = 0
+        for tag, i1, i2, j1, j2 in self.opcodes:
+            if tag == "replace":
+                _, r, a = word_diff("".join(self.old_lines[i1:i2]), "".join(self.new_lines[j1:j2]), self.algorithm)
+            elif tag == "delete":
+                r, a = _count_tokens(self.old_lines[i1:i2]), 0
+            elif tag == "insert":
+                r, a = 0, _count_tokens(self.new_lines[j1:j2])
+            else:
+                continue
+            removed += r
+            added += a
+        return removed, added
+
+    def hunk(self, index: int) -> Hunk:
+        """Render hunk number index."""
+        group = self.groups[index]
+        lines: List[str] = []
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                lines.extend(" " + _strip_eol(line) for line in self.old_lines[i1:i2])
+            elif tag == "replace" and self.mode == MODE_WORD:
+                text, _, _ = word_diff("".join(self.old_lines[i1:i2]), "".join(self.new_lines[j1:j2]), self.algorithm)
+                lines.extend("~" + line for line in text.rstrip("\r\n").split("\n"))
+            else:
+                lines.extend("-" + _strip_eol(line) for line in self.old_lines[i1:i2])
+                lines.extend("+" + _strip_eol(line) for line in self.new_lines[j1:j2])
+        first, last = group[0], group[-1]
+        return Hunk(first[1], last[2], first[3], last[4], lines)
+
+    def iter_hunks(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Hunk]:
+        """Render hunks lazily."""
+        stop = len(self.groups) if stop is None else min(stop, len(self.groups))
+        for index in range(start, stop):
+            yield self.hunk(index)
+
+    def header_lines(self) -> List[str]:
+        return [f"--- {self.fromfile}", f"+++ {self.tofile}"] if self.groups else []
+
+    def render(self) -> str:
+        """Whole diff as text (unified format in line mode)."""
+        parts = self.header_lines()
+        parts.extend(hunk.render() for hunk in self.iter_hunks())
+        return "\n".join(parts)
+
+
+def _count_tokens(lines: List[str]) -> int:
+    return sum(1 for line in lines for token in _WORD_TOKEN.findall(line) if not token.isspace())
@@ -0,0 +1,214 @@
+"""
+Durable File Write Utilities
+
+Shared atomic-write layer for the generation state, workflow orchestration
+and session management MCP servers.
+
+This module contains:
+- Durability levels (none / file / dir)
+- Atomic byte writes (temp file in same directory + os.replace)
+- Durable appends for append-only journals
+- JSON serialization (pretty or compact) and atomic JSON writes
+
+Durability levels:
+- "none": atomic rename only. A crash never leaves a torn file, but the last
+  write may be lost on power failure.
+- "file": fdatasync the temp file before the rename (default).
+- "dir":  additionally fsync the parent directory so the rename itself survives
+  power loss.
+
+The default level can be overridden with the MCP_STATE_DURABILITY environment
+variable, and compact JSON for machine-only state files with
+MCP_STATE_COMPACT_JSON=1.
+"""
+
+from typing import Any, Optional
+from pathlib import Path
+import json
+import os
+import tempfile
+
+from metrics_utils import record_state_bytes
+
+
+# Constants
+
+DURABILITY_NONE = "none"
+DURABILITY_FILE = "file"
+DURABILITY_DIR = "dir"
+DURABILITY_LEVELS = [DURABILITY_NONE, DURABILITY_FILE, DURABILITY_DIR]
+
+DEFAULT_DURABILITY = os.environ.get("MCP_STATE_DURABILITY", DURABILITY_FILE)
+if DEFAULT_DURABILITY not in DURABILITY_LEVELS:
+    DEFAULT_DURABILITY = DURABILITY_FILE
+
+# Serialize generation/workflow state without indentation
+COMPACT_STATE_JSON = os.environ.get("MCP_STATE_COMPACT_JSON", "").lower() in ("1", "true", "yes")
+
+# os.fdatasync is not available on every platform (e.g. macOS)
+_fdatasync = getattr(os, "fdatasync", os.fsync)
+
+# mkstemp creates files as 0600; written files get the usual open() mode instead
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_FILE_MODE = 0o666 & ~_UMASK
+
+
+# Durable Writes
+
+def _fsync_directory(dir_path: Path) -> None:
+    """Flush directory entry changes (renames) to disk.
+
+    Silently skipped on platforms that cannot open directories (Windows).
+    """
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(
+    path: Path,
+    data: bytes,
+    durability: Optional[str] = None
+) -> os.stat_result:
+    """Atomically replace a file with the given bytes.
+
+    The data is written to a temp file in the same directory (atomic rename
+    requires same filesystem) and moved into place with os.replace, so readers
+    see either the old or the new content, never a partial write.
+
+    Args:
+        path: Destination file
+        data: File content
+        durability: One of DURABILITY_LEVELS (default: DEFAULT_DURABILITY)
+
+    Returns:
+        os.stat_result of the written file (mtime/size match the final file)
+
+    Raises:
+        ValueError: If durability level is unknown
+        OSError: If the write or rename fails
+    """
+    durability = durability or DEFAULT_DURABILITY
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Invalid durability '{durability}'. Must be one of: {DURABILITY_LEVELS}")
+
+    path = Path(path)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if hasattr(os, "fchmod"):
+                os.fchmod(f.fileno(), _FILE_MODE)
+            f.write(data)
+            f.flush()
+            if durability != DURABILITY_NONE:
+                _fdatasync(f.fileno())
+            stat = os.fstat(f.fileno())
+
+        os.replace(temp_name, path)
+        record_state_bytes("write", len(data))
+    except BaseException:
+        # Clean up temp file if write or rename failed
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
+
+    if durability == DURABILITY_DIR:
+        _fsync_directory(path.parent)
+
+    return stat
+
+
+def durable_append_bytes(
+    path: Path,
+    data: bytes,
+    durability: Optional[str] = None
+) -> os.stat_result:
+    """Append bytes to a file, honouring the durability level.
+
+    If a previous append was torn (file does not end with a newline), a newline
+    is written first so the torn record stays isolated on its own line.
+
+    Args:
+        path: File to append to (created if missing)
+        data: Bytes to append (normally one newline-terminated record)
+        durability: One of DURABILITY_LEVELS (default: DEFAULT_DURABILITY)
+
+    Returns:
+        os.stat_result of the file after the append (st_size is the new end offset)
+
+    Raises:
+        ValueError: If durability level is unknown
+        OSError: If the append fails
+    """
+    durability = durability or DEFAULT_DURABILITY
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Invalid durability '{durability}'. Must be one of: {DURABILITY_LEVELS}")
+
+    path = Path(path)
+    created = not path.exists()
+    with open(path, 'a+b') as f:
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                data = b'\n' + data
+        f.write(data)
+        f.flush()
+        if durability != DURABILITY_NONE:
+            _fdatasync(f.fileno())
+        stat = os.fstat(f.fileno())
+    record_state_bytes("write", len(data))
+
+    if created and durability == DURABILITY_DIR:
+        _fsync_directory(path.parent)
+
+    return stat
+
+
+def dumps_json(data: Any, compact: bool = False) -> str:
+    """Serialize data as JSON.
+
+    Args:
+        data: JSON-compatible value
+        compact: Omit indentation and spaces (machine-only files)
+
+    Returns:
+        JSON text (UTF-8, non-ASCII preserved)
+    """
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+def atomic_write_json(
+    path: Path,
+    data: Any,
+    compact: bool = False,
+    durability: Optional[str] = None
+) -> os.stat_result:
+    """Atomically write data as JSON.
+
+    Args:
+        path: Destination file
+        data: JSON-compatible value
+        compact: Omit indentation and spaces (machine-only files)
+        durability: One of DURABILITY_LEVELS (default: DEFAULT_DURABILITY)
+
+    Returns:
+        os.stat_result of the written file
+
+    Raises:
+        TypeError: If data is not JSON serializable
+        ValueError: If durability level is unknown
+        OSError: If the write fails
+    """
+    return atomic_write_bytes(path, dumps_json(data, compact).encode('utf-8'), durability)
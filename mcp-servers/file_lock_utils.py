@@ -0,0 +1,115 @@
+"""
+File Lock Utilities
+
+Exclusive advisory lock on a lock file, shared by threads and processes.
+
+Generation state files are written by every generation_state_mcp process
+(one per agent) and by several pool threads of each. file_lock() excludes
+both: threads of one process wait on a per-path threading.RLock, other
+processes on fcntl.flock of the lock file. The lock is reentrant for the
+owning thread, so a function holding it can call helpers that take it
+again. Where flock is unavailable (Windows) only threads of the same
+process are excluded.
+
+This module contains:
+- Constants (timeout, poll delay)
+- FileLockTimeout
+- file_lock context manager
+"""
+
+from typing import Optional, Dict, Iterator
+from pathlib import Path
+from contextlib import contextmanager
+import os
+import threading
+import time
+
+try:
+    import fcntl
+    FLOCK_AVAILABLE = True
+except ImportError:  # Windows: lock only excludes threads within one process
+    FLOCK_AVAILABLE = False
+
+
+# Constants
+
+# Seconds to wait for another holder before giving up
+FILE_LOCK_TIMEOUT = float(os.environ.get("MCP_STATE_LOCK_TIMEOUT", "10"))
+_LOCK_RETRY_DELAY = 0.005
+
+# {absolute lock path: in-process lock}
+_path_locks: Dict[str, "threading.RLock"] = {}
+_path_locks_guard = threading.Lock()
+
+# Per thread: {absolute lock path: [depth, fd]}
+_held = threading.local()
+
+
+class FileLockTimeout(TimeoutError):
+    """Raised when a file lock is not acquired within the timeout."""
+
+
+def _path_lock(key: str) -> "threading.RLock":
+    lock = _path_locks.get(key)
+    if lock is None:
+        with _path_locks_guard:
+            lock = _path_locks.setdefault(key, threading.RLock())
+    return lock
+
+
+def _flock(path: str, deadline: float, timeout: float) -> int:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                raise FileLockTimeout(f"{os.path.basename(path)} is held by another process; "
+                                      f"gave up after {timeout:g}s")
+            time.sleep(_LOCK_RETRY_DELAY)
+        except OSError:
+            os.close(fd)
+            raise
+
+
+@contextmanager
+def file_lock(path: Path, timeout: Optional[float] = None) -> Iterator[None]:
+    """Hold the exclusive lock on a lock file (reentrant per thread).
+
+    Args:
+        path: Lock file (created if missing, never removed)
+        timeout: Seconds to wait (default FILE_LOCK_TIMEOUT)
+
+    Raises:
+        FileLockTimeout: If another thread or process holds the lock too long
+    """
+    timeout = FILE_LOCK_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    key = os.path.abspath(path)
+    lock = _path_lock(key)
+    if not lock.acquire(timeout=max(0.0, timeout)):
+        raise FileLockTimeout(f"{os.path.basename(key)} is held by another thread; gave up after {timeout:g}s")
+
+    held = getattr(_held, "locks", None)
+    if held is None:
+        held = _held.locks = {}
+    try:
+        entry = held.get(key)
+        if entry is None:
+            fd = _flock(key, deadline, timeout) if FLOCK_AVAILABLE else None
+            entry = held[key] = [0, fd]
+        entry[0] += 1
+        try:
+            yield
+        finally:
+            entry[0] -= 1
+            if entry[0] == 0:
+                del held[key]
+                if entry[1] is not None:
+                    fcntl.flock(entry[1], fcntl.LOCK_UN)
+                    os.close(entry[1])
+    finally:
+        lock.release()
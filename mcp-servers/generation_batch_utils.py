@@ -0,0 +1,329 @@
+"""
+Generation Batch Utilities
+
+Persistent priority queue of multi-scene generation batches for the
+schedule_generation_batch / dispatch_generation_batch tools of
+generation_state_mcp.
+
+A batch is a chapter (or a list of scenes) with a priority and a
+concurrency budget: the number of its scenes allowed IN_PROGRESS at once.
+Items keep plan order (scene ID order). An item is ready when the planning
+entities it depends on - its scene blueprint and the parent chapter and act -
+are neither invalid nor requires-revalidation, and, for batches with
+follow_plan_order, when the previous scene of the batch is completed.
+Dispatch hands out ready items of all batches by priority, then batch age,
+then plan order, filling each batch's free slots.
+
+Items are refreshed from the generation states of their scenes (a terminal
+workflow status finishes the item) before every dispatch and progress
+report, so the workflow tools never have to call back into the queue.
+
+The queue is one JSON file, workspace/generation-batches.json, replaced
+atomically under its lock file so several server processes share it.
+
+This module contains:
+- Item and batch statuses
+- Queue file load / save (under lock)
+- Batch creation and item refresh
+- Dispatch selection
+- Aggregate progress
+"""
+
+from typing import Optional, Dict, List, Any, Iterator, Tuple
+from pathlib import Path
+from contextlib import contextmanager
+import json
+
+from durable_io_utils import atomic_write_json
+from file_lock_utils import file_lock
+
+
+# Constants
+
+QUEUE_LOCK_SUFFIX = ".lock"
+
+# Item statuses
+ITEM_QUEUED = "queued"
+ITEM_BLOCKED = "blocked"
+ITEM_RUNNING = "running"
+ITEM_COMPLETED = "completed"
+ITEM_FAILED = "failed"
+ITEM_CANCELLED = "cancelled"
+ITEM_STATUSES = [ITEM_QUEUED, ITEM_BLOCKED, ITEM_RUNNING, ITEM_COMPLETED, ITEM_FAILED, ITEM_CANCELLED]
+FINISHED_ITEM_STATUSES = [ITEM_COMPLETED, ITEM_FAILED, ITEM_CANCELLED]
+
+# Batch statuses (derived from item statuses)
+BATCH_QUEUED = "QUEUED"
+BATCH_RUNNING = "RUNNING"
+BATCH_STALLED = "STALLED"  # nothing running, remaining items blocked
+BATCH_DONE = "DONE"
+
+# Generation workflow status -> item status for dispatched scenes
+_WORKFLOW_RESULTS = {
+    "COMPLETED": ITEM_COMPLETED,
+    "FAILED": ITEM_FAILED,
+    "CANCELLED": ITEM_CANCELLED,
+}
+
+
+# Queue File
+
+def empty_queue() -> Dict[str, Any]:
+    """Queue with no batches."""
+    return {"revision": 0, "batches": {}}
+
+
+@contextmanager
+def queue_lock(queue_path: Path) -> Iterator[None]:
+    """Hold the queue's lock file (threads and processes) for a load-modify-save."""
+    with file_lock(queue_path.with_suffix(QUEUE_LOCK_SUFFIX)):
+        yield
+
+
+def load_queue(queue_path: Path) -> Dict[str, Any]:
+    """Load the queue file (an empty queue if it does not exist).
+
+    Raises:
+        ValueError: If the queue file is corrupted
+    """
+    try:
+        with open(queue_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return empty_queue()
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Batch queue corrupted: {queue_path}. JSON error: {str(e)}")
+
+
+def save_queue(queue_path: Path, queue: Dict[str, Any]) -> None:
+    """Atomically replace the queue file (call under queue_lock)."""
+    queue['revision'] = queue.get('revision', 0) + 1
+    queue_path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(queue_path, queue)
+
+
+# Batches and Items
+
+def new_batch(
+    batch_id: str,
+    label: str,
+    scenes: List[Dict[str, Any]],
+    priority: int,
+    max_concurrent: int,
+    follow_plan_order: bool,
+    regenerate: bool,
+    initiated_by: str,
+    now: str
+) -> Dict[str, Any]:
+    """Create a batch with all items queued, in plan order.
+
+    Args:
+        batch_id: Unique batch ID
+        label: Chapter ID or 'scenes'
+        scenes: Dicts {scene_id, blueprint_path, planning: [[entity_type, entity_id], ...]}
+        priority: Higher dispatches first
+        max_concurrent: Scenes of this batch IN_PROGRESS at once
+        follow_plan_order: Each scene waits for the previous one to complete
+        regenerate: Regenerate scenes whose generation is already COMPLETED
+        initiated_by: Name of initiator
+        now: ISO timestamp
+
+    Returns:
+        Batch dict
+    """
+    items = [
+        {
+            "scene_id": scene['scene_id'],
+            "blueprint_path": scene['blueprint_path'],
+            "planning": scene['planning'],
+            "status": ITEM_QUEUED,
+            "reason": None,
+            "session_id": None,
+            "dispatched_at": None,
+            "finished_at": None,
+        }
+        for scene in sorted(scenes, key=lambda s: s['scene_id'])
+    ]
+    return {
+        "batch_id": batch_id,
+        "label": label,
+        "priority": priority,
+        "max_concurrent": max_concurrent,
+        "follow_plan_order": follow_plan_order,
+        "regenerate": regenerate,
+        "initiated_by": initiated_by,
+        "created_at": now,
+        "updated_at": now,
+        "items": items,
+    }
+
+
+def _predecessor_reason(batch: Dict[str, Any], index: int) -> Optional[str]:
+    """Why item index cannot run before its predecessor (None if it may run when ready)."""
+    if not batch['follow_plan_order'] or index == 0:
+        return None
+    previous = batch['items'][index - 1]
+    if previous['status'] in (ITEM_FAILED, ITEM_CANCELLED, ITEM_BLOCKED):
+        return f"previous scene {previous['scene_id']} is {previous['status']}"
+    return None
+
+
+def refresh_batch(
+    batch: Dict[str, Any],
+    workflows: Dict[str, Optional[Tuple[str, Optional[str]]]],
+    blockers: Dict[str, Optional[str]],
+    now: str
+) -> bool:
+    """Update item statuses from generation states and planning statuses.
+
+    Args:
+        batch: Batch dict (updated in place)
+        workflows: {scene_id: (workflow_status, session_id) or None if no state}
+        blockers: {scene_id: planning reason the scene cannot run, or None}
+        now: ISO timestamp
+
+    Returns:
+        True if any item changed
+    """
+    changed = False
+    for index, item in enumerate(batch['items']):
+        before = (item['status'], item['reason'])
+        workflow = workflows.get(item['scene_id'])
+
+        if item['status'] == ITEM_RUNNING:
+            if workflow is None:
+                # State removed while running: dispatch it again
+                item['status'], item['reason'] = ITEM_QUEUED, "generation state disappeared"
+            elif workflow[0] in _WORKFLOW_RESULTS:
+                item['status'], item['reason'] = _WORKFLOW_RESULTS[workflow[0]], None
+                item['finished_at'] = now
+
+        elif item['status'] in (ITEM_QUEUED, ITEM_BLOCKED):
+            if not batch['regenerate'] and workflow is not None and workflow[0] == "COMPLETED":
+                item['status'], item['reason'] = ITEM_COMPLETED, "already generated"
+                item['session_id'], item['finished_at'] = workflow[1], now
+            else:
+                reason = blockers.get(item['scene_id']) or _predecessor_reason(batch, index)
+                item['status'] = ITEM_BLOCKED if reason else ITEM_QUEUED
+                item['reason'] = reason
+
+        changed = changed or (item['status'], item['reason']) != before
+
+    if changed:
+        batch['updated_at'] = now
+    return changed
+
+
+def mark_dispatched(item: Dict[str, Any], session_id: str, now: str) -> None:
+    """Record that an item's generation was started (or adopted)."""
+    item['status'], item['reason'] = ITEM_RUNNING, None
+    item['session_id'] = session_id
+    item['dispatched_at'] = now
+    item['finished_at'] = None
+
+
+def cancel_batch(batch: Dict[str, Any], now: str) -> List[str]:
+    """Cancel queued and blocked items; returns scene IDs still running."""
+    for item in batch['items']:
+        if item['status'] in (ITEM_QUEUED, ITEM_BLOCKED):
+            item['status'], item['reason'] = ITEM_CANCELLED, "batch cancelled"
+            item['finished_at'] = now
+    batch['updated_at'] = now
+    return [item['scene_id'] for item in batch['items'] if item['status'] == ITEM_RUNNING]
+
+
+# Dispatch
+
+def _dispatch_order(batch: Dict[str, Any]) -> Tuple[int, str, str]:
+    return (-batch['priority'], batch['created_at'], batch['batch_id'])
+
+
+def select_ready(
+    queue: Dict[str, Any],
+    batch_id: Optional[str] = None,
+    limit: Optional[int] = None
+) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Ready items to dispatch, highest priority first, within each batch's budget.
+
+    Call after refresh_batch so statuses are current.
+
+    Args:
+        queue: Queue dict
+        batch_id: Only this batch (default: all batches)
+        limit: Maximum number of items overall
+
+    Returns:
+        List of (batch, item) pairs
+    """
+    batches = sorted(queue['batches'].values(), key=_dispatch_order)
+    selected = []
+    for batch in batches:
+        if batch_id is not None and batch['batch_id'] != batch_id:
+            continue
+        slots = batch['max_concurrent'] - sum(item['status'] == ITEM_RUNNING for item in batch['items'])
+        for index, item in enumerate(batch['items']):
+            if slots <= 0 or (limit is not None and len(selected) >= limit):
+                break
+            if item['status'] != ITEM_QUEUED:
+                continue
+            if batch['follow_plan_order'] and index > 0 and batch['items'][index - 1]['status'] != ITEM_COMPLETED:
+                continue
+            selected.append((batch, item))
+            slots -= 1
+    return selected
+
+
+# Progress
+
+def batch_status(batch: Dict[str, Any]) -> str:
+    """Derived batch status (QUEUED / RUNNING / STALLED / DONE)."""
+    statuses = [item['status'] for item in batch['items']]
+    if ITEM_RUNNING in statuses:
+        return BATCH_RUNNING
+    if all(status in FINISHED_ITEM_STATUSES for status in statuses):
+        return BATCH_DONE
+    if ITEM_QUEUED in statuses:
+        return BATCH_QUEUED
+    return BATCH_STALLED
+
+
+def batch_progress(batch: Dict[str, Any], step_progress: Dict[str, Tuple[int, int]]) -> Dict[str, Any]:
+    """Aggregate progress of a batch.
+
+    Args:
+        batch: Batch dict (refreshed)
+        step_progress: {scene_id: (completed steps, total steps)} of running items
+
+    Returns:
+        Dict {batch_id, label, status, priority, max_concurrent, counts, scenes,
+        percent, items} where percent counts finished scenes plus the completed
+        steps of running ones
+    """
+    counts = {status: 0 for status in ITEM_STATUSES}
+    done = 0.0
+    items = []
+    for item in batch['items']:
+        counts[item['status']] += 1
+        entry = {"scene_id": item['scene_id'], "status": item['status']}
+        if item['reason']:
+            entry['reason'] = item['reason']
+        if item['status'] in FINISHED_ITEM_STATUSES:
+            done += 1
+        elif item['status'] == ITEM_RUNNING and item['scene_id'] in step_progress:
+            completed, total = step_progress[item['scene_id']]
+            entry['steps'] = f"{completed}/{total}"
+            done += completed / total if total else 0
+        items.append(entry)
+
+    scenes = len(batch['items'])
+    return {
+        "batch_id": batch['batch_id'],
+        "label": batch['label'],
+        "status": batch_status(batch),
+        "priority": batch['priority'],
+        "max_concurrent": batch['max_concurrent'],
+        "counts": counts,
+        "scenes": scenes,
+        "percent": round(100 * done / scenes, 1) if scenes else 100.0,
+        "items": items,
+    }
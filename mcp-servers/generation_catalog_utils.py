@@ -0,0 +1,421 @@
+"""
+Generation Catalog Utilities
+
+SQLite index of generation workflows for list_generations and
+get_step_timing_report.
+
+One row per (location, scene_id), where location is '' for the global
+workspace and the session name for session directories. Each row stores the
+fields needed for listing (status, current_step, started_at, updated_at), a
+step timing summary (see step_analytics_utils) and the signature of the
+state files it was built from. Workflow orchestration states
+(workflow-state/*.json) are indexed the same way in workflow_catalog.
+
+The catalog is upserted on every state save. Before listing, a directory is
+reconciled lazily: rows whose files disappeared are dropped and files whose
+signature changed (or that are not indexed yet) are re-read. Listing itself
+never parses state files that are unchanged.
+
+This module contains:
+- Catalog connection management
+- Upsert / reconcile operations
+- Filtered, sorted, paginated queries with session shadowing
+- Workflow state index and timing summary queries
+"""
+
+from typing import Optional, Dict, List, Any, Callable, Tuple
+from pathlib import Path
+import json
+import re
+import sqlite3
+import threading
+
+from metrics_utils import instrument_connection
+from step_analytics_utils import summarize_generation, summarize_workflow
+
+
+# Constants
+
+CATALOG_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS generation_catalog (
+        location TEXT NOT NULL,
+        scene_id TEXT NOT NULL,
+        status TEXT,
+        current_step TEXT,
+        started_at TEXT,
+        updated_at TEXT,
+        signature TEXT NOT NULL,
+        timings TEXT,
+        PRIMARY KEY (location, scene_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_generation_catalog_status
+        ON generation_catalog(status);
+    CREATE TABLE IF NOT EXISTS workflow_catalog (
+        location TEXT NOT NULL,
+        workflow_id TEXT NOT NULL,
+        workflow_type TEXT,
+        status TEXT,
+        created_at TEXT,
+        signature TEXT NOT NULL,
+        timings TEXT,
+        PRIMARY KEY (location, workflow_id)
+    );
+"""
+
+# Columns returned by query_catalog (status is exposed as workflow_status so rows
+# can be rendered like state dicts)
+CATALOG_COLUMNS = "location, scene_id, status AS workflow_status, current_step, started_at, updated_at"
+
+SORT_ORDERS = {
+    "scene_id": "scene_id ASC",
+    "status": "workflow_status ASC, scene_id ASC",
+    "started_at": "started_at DESC, scene_id ASC",
+}
+
+_STATE_FILE_RE = re.compile(r"^generation-state-(\d{4})\.json$")
+_WORKFLOW_INDEX_FILE = "index.json"
+
+# Thread-local connections: {db_path: connection}
+_pool = threading.local()
+
+
+# Connection Management
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    """Get pooled connection for catalog database (schema created on first use)."""
+    connections = getattr(_pool, "connections", None)
+    if connections is None:
+        connections = _pool.connections = {}
+
+    key = str(db_path)
+    conn = connections.get(key)
+    if conn is not None and db_path.exists():
+        return conn
+
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = instrument_connection(sqlite3.connect(str(db_path), check_same_thread=False), "catalog")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    conn.executescript(CATALOG_SCHEMA)
+    _add_timings_column(conn)
+    connections[key] = conn
+    return conn
+
+
+def _add_timings_column(conn: sqlite3.Connection) -> None:
+    """Add generation_catalog.timings to catalogs created before it existed.
+
+    Existing rows get an empty signature so the next reconcile re-reads them.
+    """
+    columns = {row['name'] for row in conn.execute("PRAGMA table_info(generation_catalog)")}
+    if "timings" in columns:
+        return
+    try:
+        with conn:
+            conn.execute("ALTER TABLE generation_catalog ADD COLUMN timings TEXT")
+            conn.execute("UPDATE generation_catalog SET signature = ''")
+    except sqlite3.OperationalError as e:
+        if "duplicate column" not in str(e):  # added concurrently by another process
+            raise
+
+
+def close_catalog_connections() -> None:
+    """Close all catalog connections held by the current thread."""
+    connections = getattr(_pool, "connections", None) or {}
+    for conn in connections.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    connections.clear()
+
+
+# Catalog Updates
+
+def _row_values(location: str, scene_id: str, state: Dict[str, Any], signature: Any) -> Tuple:
+    current_step = state.get('current_step')
+    return (
+        location,
+        scene_id,
+        state.get('workflow_status'),
+        None if current_step is None else str(current_step),
+        state.get('started_at'),
+        state.get('updated_at'),
+        json.dumps(signature),
+        json.dumps(summarize_generation(state), separators=(',', ':'))
+    )
+
+
+_UPSERT_SQL = """
+    INSERT INTO generation_catalog (
+        location, scene_id, status, current_step, started_at, updated_at, signature, timings
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(location, scene_id) DO UPDATE SET
+        status = excluded.status,
+        current_step = excluded.current_step,
+        started_at = excluded.started_at,
+        updated_at = excluded.updated_at,
+        signature = excluded.signature,
+        timings = excluded.timings
+"""
+
+
+def upsert_entry(
+    db_path: Path,
+    location: str,
+    scene_id: str,
+    state: Dict[str, Any],
+    signature: Any
+) -> None:
+    """Insert or update the catalog row for one state file.
+
+    Args:
+        db_path: Catalog database path
+        location: '' for global workspace, session name otherwise
+        scene_id: Scene ID
+        state: Current state dict
+        signature: JSON-serializable file signature the state was read from
+    """
+    conn = _connect(db_path)
+    with conn:
+        conn.execute(_UPSERT_SQL, _row_values(location, scene_id, state, signature))
+
+
+def reconcile_directory(
+    db_path: Path,
+    location: str,
+    state_dir: Path,
+    signature_fn: Callable[[Path], Any],
+    read_fn: Callable[[Path, str], Optional[Dict[str, Any]]]
+) -> List[str]:
+    """Bring the catalog rows of one directory up to date with its files.
+
+    One directory scan plus one signature (stat) per state file; only new or
+    changed files are read.
+
+    Args:
+        db_path: Catalog database path
+        location: '' for global workspace, session name otherwise
+        state_dir: Directory holding generation-state-*.json files
+        signature_fn: Returns the current signature of a state file
+        read_fn: Reads a state file (path, scene_id) -> state dict
+
+    Returns:
+        Names of state files that could not be read (corrupted)
+    """
+    conn = _connect(db_path)
+
+    files = {}
+    if state_dir.exists():
+        for entry in state_dir.iterdir():
+            match = _STATE_FILE_RE.match(entry.name)
+            if match:
+                files[match.group(1)] = entry
+
+    indexed = {
+        row['scene_id']: row['signature']
+        for row in conn.execute(
+            "SELECT scene_id, signature FROM generation_catalog WHERE location = ?", (location,)
+        )
+    }
+
+    upserts = []
+    removed = [(location, scene_id) for scene_id in indexed if scene_id not in files]
+    corrupted = []
+    for scene_id, path in files.items():
+        signature = signature_fn(path)
+        if signature is None or indexed.get(scene_id) == json.dumps(signature):
+            continue
+        try:
+            state = read_fn(path, scene_id)
+        except ValueError:
+            corrupted.append(path.name)
+            removed.append((location, scene_id))
+            continue
+        if state is not None:
+            upserts.append(_row_values(location, scene_id, state, signature))
+
+    if upserts or removed:
+        with conn:
+            conn.executemany(_UPSERT_SQL, upserts)
+            conn.executemany(
+                "DELETE FROM generation_catalog WHERE location = ? AND scene_id = ?", removed
+            )
+
+    return corrupted
+
+
+_WORKFLOW_UPSERT_SQL = """
+    INSERT INTO workflow_catalog (
+        location, workflow_id, workflow_type, status, created_at, signature, timings
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(location, workflow_id) DO UPDATE SET
+        workflow_type = excluded.workflow_type,
+        status = excluded.status,
+        created_at = excluded.created_at,
+        signature = excluded.signature,
+        timings = excluded.timings
+"""
+
+
+def reconcile_workflow_directory(
+    db_path: Path,
+    location: str,
+    state_dir: Path,
+    signature_fn: Callable[[Path], Any]
+) -> List[str]:
+    """Bring the workflow_catalog rows of one workflow-state directory up to date.
+
+    Same scheme as reconcile_directory: one directory scan plus one stat per
+    file; only new or changed workflow states are read.
+
+    Args:
+        db_path: Catalog database path
+        location: '' for global workspace, session name otherwise
+        state_dir: workflow-state directory ({workflow_id}.json files)
+        signature_fn: Returns the current signature of a file
+
+    Returns:
+        Names of workflow state files that could not be read
+    """
+    conn = _connect(db_path)
+
+    files = {}
+    if state_dir.exists():
+        for entry in state_dir.iterdir():
+            if entry.suffix == ".json" and entry.name != _WORKFLOW_INDEX_FILE:
+                files[entry.stem] = entry
+
+    indexed = {
+        row['workflow_id']: row['signature']
+        for row in conn.execute(
+            "SELECT workflow_id, signature FROM workflow_catalog WHERE location = ?", (location,)
+        )
+    }
+
+    upserts = []
+    removed = [(location, workflow_id) for workflow_id in indexed if workflow_id not in files]
+    corrupted = []
+    for workflow_id, path in files.items():
+        signature = signature_fn(path)
+        if signature is None or indexed.get(workflow_id) == json.dumps(signature):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            corrupted.append(path.name)
+            removed.append((location, workflow_id))
+            continue
+        upserts.append((
+            location,
+            workflow_id,
+            state.get('workflow_type'),
+            state.get('status'),
+            state.get('created_at'),
+            json.dumps(signature),
+            json.dumps(summarize_workflow(state), separators=(',', ':'))
+        ))
+
+    if upserts or removed:
+        with conn:
+            conn.executemany(_WORKFLOW_UPSERT_SQL, upserts)
+            conn.executemany(
+                "DELETE FROM workflow_catalog WHERE location = ? AND workflow_id = ?", removed
+            )
+
+    return corrupted
+
+
+# Queries
+
+def _visible_rows_sql(table: str, key: str, columns: str) -> str:
+    """Rows of the session location plus global rows it does not shadow."""
+    return f"""
+        SELECT {columns}
+        FROM {table} c
+        WHERE (
+            c.location = :session
+            OR (c.location = '' AND NOT EXISTS (
+                SELECT 1 FROM {table} s
+                WHERE s.location = :session AND s.{key} = c.{key}
+            ))
+        )
+    """
+
+
+def query_catalog(
+    db_path: Path,
+    session_name: Optional[str],
+    statuses: Optional[List[str]] = None,
+    sort_by: str = "started_at",
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """List generations visible from the current context.
+
+    With an active session, a scene present in the session directory shadows
+    the global row for the same scene (each scene is listed once).
+
+    Args:
+        db_path: Catalog database path
+        session_name: Active session name or None
+        statuses: Only include these workflow statuses (None = all)
+        sort_by: 'scene_id', 'status' or 'started_at' (most recent first)
+        limit: Maximum rows to return (None = all)
+        offset: Rows to skip
+
+    Returns:
+        List of row dicts (location, scene_id, workflow_status, current_step,
+        started_at, updated_at)
+    """
+    conn = _connect(db_path)
+    session = session_name or ""
+
+    sql = _visible_rows_sql("generation_catalog", "scene_id", CATALOG_COLUMNS)
+    params: Dict[str, Any] = {"session": session}
+
+    if statuses is not None:
+        placeholders = ", ".join(f":status_{i}" for i in range(len(statuses)))
+        sql += f" AND c.status IN ({placeholders})"
+        params.update({f"status_{i}": status for i, status in enumerate(statuses)})
+
+    sql += f" ORDER BY {SORT_ORDERS.get(sort_by, SORT_ORDERS['started_at'])}"
+    if limit is not None:
+        sql += " LIMIT :limit OFFSET :offset"
+        params.update({"limit": limit, "offset": offset})
+
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def query_timings(
+    db_path: Path,
+    session_name: Optional[str],
+    since: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Timing summaries visible from the current context (session shadowing).
+
+    Args:
+        db_path: Catalog database path
+        session_name: Active session name or None
+        since: Only workflows started (created) at or after this ISO timestamp
+
+    Returns:
+        Tuple of (generation summaries, workflow summaries)
+    """
+    conn = _connect(db_path)
+    params = {"session": session_name or "", "since": since or ""}
+    filters = " AND c.timings IS NOT NULL AND COALESCE({column}, '') >= :since"
+
+    generations = conn.execute(
+        _visible_rows_sql("generation_catalog", "scene_id", "c.timings")
+        + filters.format(column="c.started_at"), params
+    )
+    generation_timings = [json.loads(row['timings']) for row in generations]
+    workflows = conn.execute(
+        _visible_rows_sql("workflow_catalog", "workflow_id", "c.timings")
+        + filters.format(column="c.created_at"), params
+    )
+    return generation_timings, [json.loads(row['timings']) for row in workflows]
@@ -10,21 +10,96 @@ Features:
 - Resume failed/interrupted workflows from saved state
 - Check real-time status and progress of running generations
 - Cancel running workflows with state preservation
-- List all generation workflows with filtering
-
-State files are stored as: workspace/generation-state-{scene_id}.json
+- List all generation workflows with filtering (indexed in workspace/generation-catalog.db)
+- In-process state cache validated by file mtime/size (see get_state_cache_stats)
+- Blocking file/SQLite work runs on a bounded I/O pool, per-scene mutations serialized
+  (see io_executor_utils)
+- Batch step transitions in one load/save (transition_steps)
+- Multi-scene batch scheduler with planning dependencies and a concurrency budget
+  (schedule_generation_batch, dispatch_generation_batch; see generation_batch_utils)
+- Step timing analytics from the catalog (get_step_timing_report: p50/p90/p99, retry rates,
+  failure reasons, approval waits)
+- Optional Prometheus metrics (MCP_METRICS_PORT / MCP_METRICS_TEXTFILE; see metrics_utils)
+
+State files are stored as: workspace/generation-state-{scene_id}.json (snapshot)
+plus workspace/generation-state-{scene_id}.events.jsonl (append-only event journal
+of every transition since the workflow started; see state_journal_utils.py).
 """
 
-from typing import Optional, List, Dict, Any, Literal
+from typing import Optional, List, Dict, Any, Literal, Tuple
+from collections import OrderedDict
 from enum import Enum
 from pathlib import Path
 from datetime import datetime, timezone
+from dataclasses import replace
 import json
+import functools
 import glob
+import os
+import random
+import sqlite3
+import threading
+import time
 
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from pydantic import BaseModel, Field, field_validator, model_validator, ConfigDict
 from mcp.server.fastmcp import FastMCP
 
+from durable_io_utils import atomic_write_json, COMPACT_STATE_JSON
+from pagination_utils import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    Page,
+    CursorError,
+    query_fingerprint,
+    paginate,
+    render_within_limit,
+    select_fields,
+    fit_json_page,
+    dumps_compact
+)
+from generation_catalog_utils import (
+    upsert_entry as _catalog_upsert,
+    reconcile_directory as _catalog_reconcile,
+    reconcile_workflow_directory as _catalog_reconcile_workflows,
+    query_catalog as _catalog_query,
+    query_timings as _catalog_query_timings
+)
+from step_analytics_utils import build_report
+from blob_store_utils import get_blob_store, BLOB_GC_GRACE_SECONDS
+from diff_utils import DEFAULT_CONTEXT_LINES
+from session_lock_utils import get_session_provider
+from session_overlay_utils import SessionOverlay, get_active_overlay
+from session_utils import _format_file_size
+from io_executor_utils import KeyedLocks, offloaded
+from file_lock_utils import file_lock
+from metrics_utils import instrument_tools, record_state_bytes, register_cache, start_metrics_exporters
+from generation_batch_utils import (
+    ITEM_QUEUED,
+    ITEM_BLOCKED,
+    ITEM_RUNNING,
+    BATCH_DONE,
+    queue_lock,
+    load_queue,
+    save_queue,
+    new_batch,
+    refresh_batch,
+    mark_dispatched,
+    cancel_batch,
+    select_ready,
+    batch_status,
+    batch_progress
+)
+from state_journal_utils import (
+    journal_path_for,
+    split_snapshot,
+    with_snapshot_marker,
+    diff_state,
+    append_event,
+    read_events,
+    replay,
+    SNAPSHOT_INTERVAL
+)
+
 # Import planning state utilities (FEAT-0003)
 try:
     from planning_state_utils import (
@@ -32,9 +107,17 @@ try:
         update_entity_state as _update_entity_state,
         get_children_status as _get_children_status,
         cascade_invalidate as _cascade_invalidate,
+        get_hierarchy_tree as _get_hierarchy_tree,
         get_all_descendants,
         calculate_version_hash,
-        sync_from_json_to_sqlite
+        sync_from_json_to_sqlite,
+        create_backup,
+        list_backups,
+        restore_backup,
+        get_backup_diff,
+        sync_backup_refs,
+        migrate_legacy_backups,
+        reconcile_planning_state
     )
     PLANNING_STATE_AVAILABLE = True
 except ImportError:
@@ -42,13 +125,27 @@ except ImportError:
 
 # Initialize the MCP server
 mcp = FastMCP("generation_state_mcp")
+instrument_tools(mcp, "generation_state")
 
 # Constants
 WORKSPACE_PATH = Path("workspace")
 SESSIONS_PATH = WORKSPACE_PATH / "sessions"
 SESSION_LOCK_FILE = WORKSPACE_PATH / "session.lock"
 STATE_FILE_PATTERN = "generation-state-*.json"
-CHARACTER_LIMIT = 25000  # Maximum response size in characters
+GENERATION_CATALOG_FILE = "generation-catalog.db"  # list_generations index (in WORKSPACE_PATH)
+WORKFLOW_STATE_DIR_NAME = "workflow-state"  # workflow orchestration states (global and per session)
+
+# Columns of list_generations JSON rows
+GENERATION_LIST_FIELDS = ['scene_id', 'workflow_status', 'current_step', 'started_at', 'updated_at', 'location']
+DIFF_HUNKS_PER_PAGE = 20  # get_backup_diff page size
+STATE_CACHE_MAX_ENTRIES = 256  # LRU capacity of the in-process state cache
+STATE_LOCK_SUFFIX = ".lock"  # generation-state-{scene_id}.lock: cross-process write lock
+STATE_CAS_RETRIES = 8  # optimistic attempts before a tool holds the state lock throughout
+MAX_TRANSITION_OPS = 50  # operations per transition_steps call
+GENERATION_BATCHES_FILE = "generation-batches.json"  # batch scheduler queue (in WORKSPACE_PATH)
+MAX_BATCH_SCENES = 100  # scenes per generation batch
+DEFAULT_BATCH_CONCURRENCY = 3  # scenes of a batch generated at once
+MAX_BATCH_CONCURRENCY = 16
 
 # Valid step names for Scene Generation Workflow v2.0
 VALID_STEP_NAMES = [
@@ -226,6 +323,24 @@ class ListGenerationsInput(BaseModel):
         default="started_at",
         description="Sort results by field: 'scene_id', 'started_at', 'status'"
     )
+    limit: int = Field(
+        default=DEFAULT_PAGE_SIZE,
+        description="Maximum generations per page",
+        ge=1,
+        le=MAX_PAGE_SIZE
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="next_cursor from the previous page (omit for first page)"
+    )
+    response_format: Literal['text', 'json'] = Field(
+        default='text',
+        description="Output format: 'text' (table) or 'json' (compact page of rows)"
+    )
+    fields: Optional[List[str]] = Field(
+        default=None,
+        description=f"JSON columns to return (default: all): {', '.join(GENERATION_LIST_FIELDS)}"
+    )
 
     @field_validator('sort_by')
     @classmethod
@@ -236,6 +351,16 @@ class ListGenerationsInput(BaseModel):
             raise ValueError(f"sort_by must be one of: {', '.join(allowed)}")
         return v
 
+    @field_validator('fields')
+    @classmethod
+    def validate_fields(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        """Validate requested JSON columns."""
+        if v is not None:
+            unknown = [f for f in v if f not in GENERATION_LIST_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(GENERATION_LIST_FIELDS)}")
+        return v
+
 
 class StartGenerationInput(BaseModel):
     """Input model for start_generation tool."""
@@ -577,6 +702,272 @@ class LogQuestionAnswerInput(BaseModel):
         return v
 
 
+class GetStateCacheStatsInput(BaseModel):
+    """Input model for get_state_cache_stats tool."""
+    model_config = COMMON_CONFIG
+
+    reset: bool = Field(
+        default=False,
+        description="Clear the cache and reset counters after reporting"
+    )
+    response_format: Literal['text', 'json'] = Field(
+        default='text',
+        description="Output format: 'text' (markdown summary) or 'json'"
+    )
+
+
+# Fields each transition_steps operation requires
+TRANSITION_OP_FIELDS = {
+    'start': ('step_name',),
+    'complete': ('step_name', 'duration_seconds'),
+    'fail': ('step_name', 'failure_reason'),
+    'retry': ('step_name',),
+    'log_question': ('question', 'answer'),
+    'set_artifacts': ('artifacts',),
+}
+
+
+class StepOperation(BaseModel):
+    """One operation of a transition_steps batch."""
+    model_config = COMMON_CONFIG
+
+    op: Literal['start', 'complete', 'fail', 'retry', 'log_question', 'set_artifacts'] = Field(
+        ...,
+        description="Operation: 'start', 'complete', 'fail', 'retry' (step ops), 'log_question', 'set_artifacts'"
+    )
+    step_name: Optional[str] = Field(
+        default=None,
+        description="Semantic step name (start / complete / fail / retry)"
+    )
+    duration_seconds: Optional[float] = Field(
+        default=None,
+        description="Step execution time in seconds (complete)",
+        ge=0
+    )
+    failure_reason: Optional[str] = Field(
+        default=None,
+        description="Reason for step failure (fail)",
+        min_length=1,
+        max_length=1000
+    )
+    question: Optional[str] = Field(
+        default=None,
+        description="Question asked to user (log_question)",
+        min_length=1,
+        max_length=2000
+    )
+    answer: Optional[str] = Field(
+        default=None,
+        description="User's answer (log_question)",
+        min_length=1,
+        max_length=5000
+    )
+    timestamp: Optional[str] = Field(
+        default=None,
+        description="ISO timestamp of the answer (log_question, default: now)"
+    )
+    artifacts: Optional[Dict[str, str]] = Field(
+        default=None,
+        description="Artifact paths (complete / set_artifacts)"
+    )
+    metadata: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Step metadata, as for the single-step tools (start / complete / fail / retry)"
+    )
+
+    @field_validator('step_name')
+    @classmethod
+    def validate_step_name(cls, v: Optional[str]) -> Optional[str]:
+        """Validate step name against VALID_STEP_NAMES."""
+        if v is not None and v not in VALID_STEP_NAMES:
+            valid_names = "\n  - ".join(VALID_STEP_NAMES)
+            raise ValueError(
+                f"Invalid step_name: '{v}'\n"
+                f"Must be one of:\n  - {valid_names}"
+            )
+        return v
+
+    @model_validator(mode='after')
+    def validate_required_fields(self) -> 'StepOperation':
+        """Check the fields the operation needs are present."""
+        missing = [name for name in TRANSITION_OP_FIELDS[self.op] if getattr(self, name) is None]
+        if missing:
+            raise ValueError(f"Operation '{self.op}' requires: {', '.join(missing)}")
+        return self
+
+
+class TransitionStepsInput(BaseModel):
+    """Input model for transition_steps tool."""
+    model_config = COMMON_CONFIG
+
+    scene_id: str = Field(
+        ...,
+        description="Scene ID (4 digits, e.g., '0204')",
+        pattern=r"^[0-9]{4}$",
+        min_length=4,
+        max_length=4
+    )
+    operations: List[StepOperation] = Field(
+        ...,
+        description="Operations applied in order, all or none "
+                    "(e.g., [{'op': 'complete', 'step_name': ..., 'duration_seconds': 42}, {'op': 'start', 'step_name': ...}])",
+        min_length=1,
+        max_length=MAX_TRANSITION_OPS
+    )
+    response_format: Literal['text', 'json'] = Field(
+        default='json',
+        description="Output format: 'json' (compact, default) or 'text' (markdown)"
+    )
+
+
+class ScheduleGenerationBatchInput(BaseModel):
+    """Input model for schedule_generation_batch tool."""
+    model_config = COMMON_CONFIG
+
+    chapter_id: Optional[str] = Field(
+        default=None,
+        description="Chapter whose scenes to generate (e.g., 'chapter-02'); or use scene_ids",
+        pattern=r"^chapter-\d+$"
+    )
+    scene_ids: Optional[List[str]] = Field(
+        default=None,
+        description="Scene IDs to generate (e.g., ['0201', '0203']); or use chapter_id",
+        min_length=1,
+        max_length=MAX_BATCH_SCENES
+    )
+    priority: int = Field(
+        default=50,
+        description="Dispatch priority, higher first (0-100)",
+        ge=0,
+        le=100
+    )
+    max_concurrent: int = Field(
+        default=DEFAULT_BATCH_CONCURRENCY,
+        description="Scenes of this batch generated at once (concurrency budget)",
+        ge=1,
+        le=MAX_BATCH_CONCURRENCY
+    )
+    follow_plan_order: bool = Field(
+        default=False,
+        description="Each scene waits until the previous scene of the batch is completed "
+                    "(for continuity with its final text)"
+    )
+    regenerate: bool = Field(
+        default=False,
+        description="Also regenerate scenes whose generation is already COMPLETED (default: skip them)"
+    )
+    initiated_by: str = Field(
+        default="generation-coordinator",
+        description="Name of agent or user scheduling the batch",
+        max_length=100
+    )
+    response_format: Literal['text', 'json'] = Field(
+        default='text',
+        description="Output format: 'text' (markdown) or 'json'"
+    )
+
+    @field_validator('scene_ids')
+    @classmethod
+    def validate_scene_ids(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        """Validate scene ID format and drop duplicates."""
+        if v is None:
+            return v
+        invalid = [scene_id for scene_id in v if not (scene_id.isdigit() and len(scene_id) == 4)]
+        if invalid:
+            raise ValueError(f"Scene IDs must be exactly 4 digits (e.g., '0204'): {', '.join(invalid)}")
+        return list(dict.fromkeys(v))
+
+    @model_validator(mode='after')
+    def validate_selection(self) -> 'ScheduleGenerationBatchInput':
+        """Require exactly one of chapter_id and scene_ids."""
+        if (self.chapter_id is None) == (self.scene_ids is None):
+            raise ValueError("Provide either chapter_id or scene_ids")
+        return self
+
+
+class DispatchGenerationBatchInput(BaseModel):
+    """Input model for dispatch_generation_batch tool."""
+    model_config = COMMON_CONFIG
+
+    batch_id: Optional[str] = Field(
+        default=None,
+        description="Dispatch only this batch (default: all batches by priority)",
+        max_length=100
+    )
+    limit: Optional[int] = Field(
+        default=None,
+        description="Maximum scenes to start in this call (default: all free slots)",
+        ge=1,
+        le=MAX_BATCH_SCENES
+    )
+    response_format: Literal['text', 'json'] = Field(
+        default='json',
+        description="Output format: 'json' (compact, default) or 'text' (markdown)"
+    )
+
+
+class GetBatchProgressInput(BaseModel):
+    """Input model for get_batch_progress tool."""
+    model_config = COMMON_CONFIG
+
+    batch_id: Optional[str] = Field(
+        default=None,
+        description="Report only this batch (default: all unfinished batches)",
+        max_length=100
+    )
+    include_done: bool = Field(
+        default=False,
+        description="Also report batches whose scenes are all finished"
+    )
+    response_format: Literal['text', 'json'] = Field(
+        default='text',
+        description="Output format: 'text' (markdown) or 'json'"
+    )
+
+
+class CancelGenerationBatchInput(BaseModel):
+    """Input model for cancel_generation_batch tool."""
+    model_config = COMMON_CONFIG
+
+    batch_id: str = Field(
+        ...,
+        description="Batch to cancel (queued scenes are dropped, running ones finish)",
+        min_length=1,
+        max_length=100
+    )
+
+
+class GetStepTimingReportInput(BaseModel):
+    """Input model for get_step_timing_report tool."""
+    model_config = COMMON_CONFIG
+
+    since: Optional[str] = Field(
+        default=None,
+        description="Only workflows started at or after this ISO date/timestamp (e.g., '2026-10-01')"
+    )
+    top_failure_reasons: int = Field(
+        default=10,
+        description="Number of most frequent failure reasons to list",
+        ge=1,
+        le=50
+    )
+    response_format: Literal['text', 'json'] = Field(
+        default='text',
+        description="Output format: 'text' (markdown tables) or 'json'"
+    )
+
+    @field_validator('since')
+    @classmethod
+    def validate_since(cls, v: Optional[str]) -> Optional[str]:
+        """Validate ISO date format."""
+        if v is not None:
+            try:
+                datetime.fromisoformat(v.replace('Z', '+00:00'))
+            except ValueError:
+                raise ValueError(f"since must be an ISO date or timestamp (e.g., '2026-10-01'), got '{v}'")
+        return v
+
+
 # =============================================================================
 # FEAT-0003: Hierarchical Planning State Input Models
 # =============================================================================
@@ -640,6 +1031,20 @@ class GetHierarchyTreeInput(BaseModel):
         default=True,
         description="Include status for each node"
     )
+    response_format: Literal['text', 'json'] = Field(
+        default='text',
+        description="Output format: 'text' (tree diagram) or 'json' (nested structure with status counts)"
+    )
+    limit: int = Field(
+        default=DEFAULT_PAGE_SIZE,
+        description="Maximum chapters per page",
+        ge=1,
+        le=MAX_PAGE_SIZE
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="next_cursor from the previous page (omit for first page)"
+    )
 
 
 class CascadeInvalidateInput(BaseEntityInput):
@@ -650,6 +1055,10 @@ class CascadeInvalidateInput(BaseEntityInput):
         min_length=1,
         max_length=500
     )
+    dry_run: bool = Field(
+        default=False,
+        description="Only report which descendants would be invalidated, without writing"
+    )
 
 
 class GetChildrenStatusInput(BaseModel):
@@ -716,36 +1125,130 @@ class GetBackupDiffInput(BaseModel):
         description="First backup ID (typically older)",
         gt=0
     )
-    backup_id2: int = Field(
-        ...,
-        description="Second backup ID (typically newer)",
+    backup_id2: Optional[int] = Field(
+        default=None,
+        description="Second backup ID (typically newer); omit to compare with the live file",
         gt=0
     )
+    mode: Literal['line', 'word'] = Field(
+        default='line',
+        description="'line' (unified diff) or 'word' (inline [-removed-]{+added+} changes, for prose)"
+    )
+    algorithm: Literal['myers', 'patience'] = Field(
+        default='myers',
+        description="Diff algorithm: 'myers' (shortest diff) or 'patience' (anchors on unique lines)"
+    )
+    context_lines: int = Field(
+        default=DEFAULT_CONTEXT_LINES,
+        description="Unchanged lines shown around each change",
+        ge=0,
+        le=20
+    )
+    stat_only: bool = Field(
+        default=False,
+        description="Only return the diff-stat summary (no hunks)"
+    )
+    limit: int = Field(
+        default=DIFF_HUNKS_PER_PAGE,
+        description="Maximum hunks per page",
+        ge=1,
+        le=MAX_PAGE_SIZE
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="next_cursor from the previous page (omit for first page)"
+    )
+
+
+class GcBlobStoreInput(BaseModel):
+    """Input model for gc_blob_store tool."""
+    model_config = ConfigDict(
+        str_strip_whitespace=True,
+        validate_assignment=True,
+        extra='forbid'
+    )
+
+    dry_run: bool = Field(
+        default=True,
+        description="Only report what would be deleted"
+    )
+    migrate_legacy: bool = Field(
+        default=False,
+        description="First move file-based backups (backups/ folders) into the blob store"
+    )
+    grace_seconds: int = Field(
+        default=BLOB_GC_GRACE_SECONDS,
+        description="Keep unreferenced blobs younger than this (seconds)",
+        ge=0
+    )
+
+
+class ReconcilePlanningStateInput(BaseModel):
+    """Input model for reconcile_planning_state tool."""
+    model_config = ConfigDict(
+        str_strip_whitespace=True,
+        validate_assignment=True,
+        extra='forbid'
+    )
+
+    acts_path: str = Field(
+        default="acts",
+        description="Book's acts/ directory holding the planning files",
+        min_length=1
+    )
+    apply: bool = Field(
+        default=False,
+        description="Invalidate drifted / missing entities and their descendants (default: report only)"
+    )
+    response_format: Literal['text', 'json'] = Field(
+        default='text',
+        description="Output format: 'text' (markdown) or 'json' (compact, machine-readable)"
+    )
+    limit: int = Field(
+        default=DEFAULT_PAGE_SIZE,
+        description="Maximum findings per page",
+        ge=1,
+        le=MAX_PAGE_SIZE
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="next_cursor from the previous page (omit for first page)"
+    )
 
 
 # Shared Utility Functions
 
+def _active_overlay() -> Optional[SessionOverlay]:
+    """Get overlay of the active session (shared session.lock provider).
+
+    When the active session changed since the last call, cached states read
+    from session directories are dropped from the state cache.
+
+    Returns:
+        SessionOverlay or None if no active session
+    """
+    overlay = get_active_overlay(WORKSPACE_PATH, SESSION_LOCK_FILE, SESSIONS_PATH)
+    _state_cache.sync_session_generation(
+        get_session_provider(SESSION_LOCK_FILE).last_generation, SESSIONS_PATH
+    )
+    return overlay
+
+
 def _get_active_session() -> Optional[str]:
-    """Get active session name from session.lock.
+    """Get active session name from session.lock (cached session overlay).
 
     Returns:
         Session name or None if no active session
     """
-    if not SESSION_LOCK_FILE.exists():
-        return None
-
-    try:
-        with open(SESSION_LOCK_FILE, 'r') as f:
-            lock_data = json.load(f)
-        return lock_data.get("active")
-    except Exception:
-        return None
+    overlay = _active_overlay()
+    return overlay.name if overlay else None
 
 
 def _get_state_file_path(scene_id: str) -> Path:
     """Get path to state file for scene ID.
 
     Checks session directory first (if active session exists), then global.
+    Resolved through the session overlay (cached lock and directory listings).
 
     Args:
         scene_id: Scene ID (4 digits)
@@ -753,75 +1256,319 @@ def _get_state_file_path(scene_id: str) -> Path:
     Returns:
         Path to state file (may not exist)
     """
-    session_name = _get_active_session()
+    file_name = f"generation-state-{scene_id}.json"
+    overlay = _active_overlay()
 
-    # If active session, prefer session directory
-    if session_name:
-        session_state_path = SESSIONS_PATH / session_name / f"generation-state-{scene_id}.json"
-        # Return session path if it exists, or if no global exists (for new states)
-        if session_state_path.exists():
-            return session_state_path
+    # No active session - use global
+    if overlay is None:
+        return WORKSPACE_PATH / file_name
+
+    # Session copy if it exists, else global for reading; if neither exists,
+    # the session path is used for writing (session-aware)
+    resolved = overlay.resolve(file_name, global_root=WORKSPACE_PATH)
+    if resolved["exists"]:
+        return Path(resolved["resolved_path"])
+    return overlay.session_path / file_name
+
+
+# State Cache
+#
+# Parsed states are cached per (scene_id, resolved path) and validated against
+# the file signature - (st_mtime_ns, st_size) of the snapshot plus the journal -
+# on every read, so edits made by other processes are still picked up.
+# Callers always receive a private copy.
+
+def _copy_state(value: Any) -> Any:
+    """Copy a JSON-compatible value (much cheaper than copy.deepcopy)."""
+    if isinstance(value, dict):
+        return {k: _copy_state(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_state(v) for v in value]
+    return value
+
+
+class StateCache:
+    """Process-level LRU cache of parsed generation state files."""
+
+    def __init__(self, max_entries: int = STATE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[tuple, Dict[str, Any], Dict[str, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._session_generation: Optional[int] = None
+
+    def get(self, scene_id: str, path: Path, signature: tuple) -> Optional[Tuple[Dict[str, Any], Dict[str, int]]]:
+        """Return (state copy, journal info) if the file signature still matches.
+
+        Both come from the same entry under one lock, so a concurrent put or
+        eviction cannot separate the state from its journal position.
+        """
+        key = (scene_id, str(path))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy_state(entry[1]), dict(entry[2])
+
+    def peek(self, scene_id: str, path: Path, signature: tuple) -> Optional[Tuple[Dict[str, Any], Dict[str, int]]]:
+        """Return (state, journal info) without copying or counting (read-only use)."""
+        with self._lock:
+            entry = self._entries.get((scene_id, str(path)))
+            if entry is None or entry[0] != signature:
+                return None
+            return entry[1], entry[2]
+
+    def put(
+        self,
+        scene_id: str,
+        path: Path,
+        signature: tuple,
+        state: Dict[str, Any],
+        journal: Optional[Dict[str, int]] = None
+    ) -> None:
+        """Store a copy of state (and its journal position) for the given signature."""
+        key = (scene_id, str(path))
+        with self._lock:
+            self._entries[key] = (signature, _copy_state(state), dict(journal or {}))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, scene_id: str, path: Path) -> None:
+        """Drop the entry for a file that no longer exists."""
+        with self._lock:
+            self._entries.pop((scene_id, str(path)), None)
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def sync_session_generation(self, generation: int, sessions_path: Path) -> None:
+        """Drop entries under sessions_path when the active session generation changed."""
+        if generation == self._session_generation:
+            return
+        prefix = str(sessions_path) + os.sep
+        with self._lock:
+            self._session_generation = generation
+            for key in [k for k in self._entries if k[1].startswith(prefix)]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters and occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries
+            }
+
+
+_state_cache = StateCache()
+register_cache("generation_state", lambda: (_state_cache.hits, _state_cache.misses))
+
+
+# State Files and Event Journal
+#
+# generation-state-{scene_id}.json is a snapshot; every transition since the
+# snapshot is an event in generation-state-{scene_id}.events.jsonl (see
+# state_journal_utils). Loading = snapshot + journal tail replay.
+#
+# Every state carries a revision counter. A save is a compare-and-swap: under
+# the scene's lock file it succeeds only if the state on disk still has the
+# revision the caller loaded, and stores revision + 1. Otherwise another
+# writer (thread or process) got there first and StateConflictError is raised
+# (see _revision_retry).
+
+class StateConflictError(Exception):
+    """Raised when a state changed on disk since it was loaded."""
+
+    def __init__(self, scene_id: str, expected: int, current: int):
+        super().__init__(
+            f"State of scene {scene_id} changed concurrently "
+            f"(loaded revision {expected}, now {current})"
+        )
+        self.scene_id = scene_id
+        self.expected = expected
+        self.current = current
 
-        # Check if global exists - if so, return global for reading
-        global_state_path = WORKSPACE_PATH / f"generation-state-{scene_id}.json"
-        if global_state_path.exists():
-            return global_state_path
 
-        # Neither exists - return session path for writing (session-aware)
-        return session_state_path
+def _state_lock_path(state_path: Path) -> Path:
+    """Lock file serializing writes of a state file (next to it)."""
+    return state_path.with_suffix(STATE_LOCK_SUFFIX)
 
-    # No active session - use global
-    return WORKSPACE_PATH / f"generation-state-{scene_id}.json"
+
+def _stat_signature(path: Path) -> Optional[Tuple[int, int]]:
+    """Return (st_mtime_ns, st_size) or None if the file does not exist."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
 
-def _load_state_file(scene_id: str) -> Optional[Dict[str, Any]]:
-    """Load state file for scene ID.
+def _state_signature(state_path: Path) -> Optional[tuple]:
+    """Return combined snapshot + journal signature, or None if no snapshot."""
+    snapshot = _stat_signature(state_path)
+    if snapshot is None:
+        return None
+    return snapshot + (_stat_signature(journal_path_for(state_path)),)
+
+
+def _read_state_path(
+    state_path: Path,
+    scene_id: Optional[str] = None,
+    signature: Optional[tuple] = None
+) -> Optional[Tuple[Dict[str, Any], Dict[str, int]]]:
+    """Read a state file: snapshot plus replay of newer journal events.
 
     Args:
-        scene_id: Scene ID (4 digits)
+        state_path: Snapshot path
+        scene_id: Scene ID (for caching; derived from file name if omitted)
+        signature: Precomputed _state_signature (optional)
 
     Returns:
-        State dict or None if file doesn't exist
+        Tuple of (state, journal info {seq, pending}) or None if missing.
+        The state is owned by the caller.
 
     Raises:
-        ValueError: If state file is corrupted or invalid JSON
+        ValueError: If the snapshot is corrupted or the journal cannot be replayed
     """
-    state_path = _get_state_file_path(scene_id)
-
-    if not state_path.exists():
+    scene_id = scene_id or state_path.stem.replace("generation-state-", "")
+    signature = signature or _state_signature(state_path)
+    if signature is None:
+        _state_cache.discard(scene_id, state_path)
         return None
 
+    cached = _state_cache.get(scene_id, state_path, signature)
+    if cached is not None:
+        return cached
+
     try:
         with open(state_path, 'r', encoding='utf-8') as f:
-            state = json.load(f)
-        return state
+            raw = json.load(f)
     except json.JSONDecodeError as e:
         raise ValueError(f"State file corrupted: {state_path}. JSON error: {str(e)}")
     except Exception as e:
         raise ValueError(f"Failed to read state file {state_path}: {str(e)}")
 
+    state, snapshot_seq, offset = split_snapshot(raw)
+    seq = snapshot_seq
+    record_state_bytes("read", signature[1])
+    if signature[2] is not None and signature[2][1] > offset:
+        seq = replay(state, read_events(journal_path_for(state_path), offset), snapshot_seq)
+        record_state_bytes("read", signature[2][1] - offset)
+
+    journal = {"seq": seq, "pending": seq - snapshot_seq}
+    _state_cache.put(scene_id, state_path, signature, state, journal)
+    return state, journal
+
+
+def _load_state_file(scene_id: str) -> Optional[Dict[str, Any]]:
+    """Load state file for scene ID.
+
+    Served from the state cache when snapshot and journal are unchanged.
+
+    Args:
+        scene_id: Scene ID (4 digits)
+
+    Returns:
+        State dict or None if file doesn't exist
+
+    Raises:
+        ValueError: If state file is corrupted or invalid JSON
+    """
+    loaded = _read_state_path(_get_state_file_path(scene_id), scene_id)
+    return loaded[0] if loaded else None
+
+
+def _save_state_file(
+    scene_id: str,
+    state: Dict[str, Any],
+    event: str = "state_saved",
+    step: Optional[str] = None
+) -> None:
+    """Save state file for scene ID as a journal event (write-through to cache).
+
+    The change since the last saved state is appended to the scene's event
+    journal (O(change), not O(history)). A full snapshot is written atomically
+    for new workflows, on 'generation_started' and every SNAPSHOT_INTERVAL
+    events.
 
-def _save_state_file(scene_id: str, state: Dict[str, Any]) -> None:
-    """Save state file for scene ID.
+    The save is a compare-and-swap on state['revision']: it is written only
+    if the state on disk still has that revision (0 = no state yet), and
+    state['revision'] is incremented. Check and write happen under the
+    scene's lock file, so concurrent writers in other processes are excluded.
 
     Args:
         scene_id: Scene ID (4 digits)
-        state: State dictionary to save
+        state: State dictionary to save (revision updated in place)
+        event: Event type recorded in the journal (e.g. 'step_completed')
+        step: Step name the event refers to (optional)
 
     Raises:
+        StateConflictError: If the state was changed since it was loaded
         ValueError: If failed to write state file
     """
     state_path = _get_state_file_path(scene_id)
+    journal_path = journal_path_for(state_path)
 
     # Ensure parent directory exists (workspace or session dir)
     state_path.parent.mkdir(parents=True, exist_ok=True)
 
     try:
-        with open(state_path, 'w', encoding='utf-8') as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
+        with file_lock(_state_lock_path(state_path)):
+            signature = _state_signature(state_path)
+            previous = None
+            if signature is not None:
+                previous = _state_cache.peek(scene_id, state_path, signature)
+                if previous is None:
+                    previous = _read_state_path(state_path, scene_id, signature)
+
+            previous_state, journal = previous or ({}, {"seq": 0, "pending": 0})
+            current_revision = previous_state.get('revision', 0)
+            expected_revision = state.get('revision', 0)
+            if expected_revision != current_revision:
+                raise StateConflictError(scene_id, expected_revision, current_revision)
+            state['revision'] = current_revision + 1
+
+            seq = journal["seq"] + 1
+            journal_stat = append_event(journal_path, seq, event, diff_state(previous_state, state), step)
+
+            if previous is None or event == "generation_started" or journal["pending"] + 1 >= SNAPSHOT_INTERVAL:
+                snapshot = with_snapshot_marker(state, seq, journal_stat.st_size)
+                snapshot_stat = atomic_write_json(state_path, snapshot, compact=COMPACT_STATE_JSON)
+                snapshot_signature = (snapshot_stat.st_mtime_ns, snapshot_stat.st_size)
+                journal = {"seq": seq, "pending": 0}
+            else:
+                snapshot_signature = signature[:2]
+                journal = {"seq": seq, "pending": journal["pending"] + 1}
+
+            signature = snapshot_signature + ((journal_stat.st_mtime_ns, journal_stat.st_size),)
+            _state_cache.put(scene_id, state_path, signature, state, journal)
+    except StateConflictError:
+        raise
     except Exception as e:
+        _state_cache.discard(scene_id, state_path)
         raise ValueError(f"Failed to write state file {state_path}: {str(e)}")
 
+    # Keep the list_generations catalog current (reconciled lazily if this fails)
+    try:
+        _catalog_upsert(_catalog_db_path(), _catalog_location(state_path), scene_id, state, signature)
+    except sqlite3.Error:
+        pass
+
 
 def _list_state_files() -> List[Path]:
     """List all state files in workspace (global and session).
@@ -849,19 +1596,145 @@ def _list_state_files() -> List[Path]:
     return state_files
 
 
-def _validate_state(state: Dict[str, Any], scene_id: str) -> List[str]:
-    """Validate state structure and content.
 
-    Args:
-        state: State dictionary to validate
-        scene_id: Expected scene ID
+# Generation Catalog (list_generations index, see generation_catalog_utils)
 
-    Returns:
-        List of validation warnings (empty if valid)
-    """
-    warnings = []
+# Workflow statuses included by each list_generations filter (None = all)
+FILTER_STATUSES = {
+    FilterType.ALL: None,
+    FilterType.ACTIVE: [
+        WorkflowStatus.IN_PROGRESS.value,
+        WorkflowStatus.WAITING_USER_APPROVAL.value,
+        WorkflowStatus.FAILED.value
+    ],
+    FilterType.FAILED: [WorkflowStatus.FAILED.value],
+    FilterType.COMPLETED: [WorkflowStatus.COMPLETED.value],
+}
 
-    # Check required fields
+
+def _catalog_db_path() -> Path:
+    """Get path to the generation catalog database."""
+    return WORKSPACE_PATH / GENERATION_CATALOG_FILE
+
+
+def _catalog_location(state_path: Path) -> str:
+    """Catalog location of a state file: '' for global, session name otherwise."""
+    return "" if state_path.parent == WORKSPACE_PATH else state_path.parent.name
+
+
+def _query_generations(
+    filter_type: FilterType,
+    sort_by: str,
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """List generations visible from the current context via the catalog.
+
+    The global directory and the active session directory are reconciled
+    first (only new or changed state files are read). A scene present in the
+    session shadows its global copy.
+
+    Args:
+        filter_type: Status filter
+        sort_by: 'scene_id', 'status' or 'started_at'
+        limit: Maximum rows (None = all)
+        offset: Rows to skip
+
+    Returns:
+        Tuple of (rows, corrupted file names)
+
+    Raises:
+        sqlite3.Error: If the catalog database is unavailable
+    """
+    session_name, corrupted = _reconcile_catalog()
+    rows = _catalog_query(_catalog_db_path(), session_name, FILTER_STATUSES[filter_type], sort_by, limit, offset)
+    return rows, corrupted
+
+
+def _reconcile_catalog(include_workflows: bool = False) -> Tuple[Optional[str], List[str]]:
+    """Re-index new or changed state files of the global and active session directories.
+
+    Args:
+        include_workflows: Also index workflow orchestration states (workflow-state/)
+
+    Returns:
+        Tuple of (active session name, corrupted file names)
+
+    Raises:
+        sqlite3.Error: If the catalog database is unavailable
+    """
+    db_path = _catalog_db_path()
+    session_name = _get_active_session()
+
+    def read_state(path: Path, scene_id: str) -> Optional[Dict[str, Any]]:
+        loaded = _read_state_path(path, scene_id)
+        return loaded[0] if loaded else None
+
+    locations = [("", WORKSPACE_PATH)]
+    if session_name:
+        locations.append((session_name, SESSIONS_PATH / session_name))
+
+    corrupted = []
+    for location, directory in locations:
+        corrupted += _catalog_reconcile(db_path, location, directory, _state_signature, read_state)
+        if include_workflows:
+            corrupted += _catalog_reconcile_workflows(
+                db_path, location, directory / WORKFLOW_STATE_DIR_NAME, _stat_signature
+            )
+    return session_name, corrupted
+
+
+def _scan_generations(filter_type: FilterType, sort_by: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """List generations by reading every state file (fallback without catalog).
+
+    Returns:
+        Tuple of (states, corrupted file names)
+    """
+    generations = {}
+    corrupted_files = []
+
+    # Session files are listed first and shadow global copies
+    for state_path in _list_state_files():
+        scene_id = state_path.stem.replace("generation-state-", "")
+        if scene_id in generations:
+            continue
+        try:
+            loaded = _read_state_path(state_path, scene_id)
+            if loaded:
+                generations[scene_id] = loaded[0]
+        except Exception:
+            corrupted_files.append(state_path.name)
+
+    statuses = FILTER_STATUSES[filter_type]
+    rows = [
+        g for g in generations.values()
+        if statuses is None or g.get('workflow_status') in statuses
+    ]
+
+    if sort_by == 'scene_id':
+        rows.sort(key=lambda g: g.get('scene_id', ''))
+    elif sort_by == 'status':
+        rows.sort(key=lambda g: (g.get('workflow_status', ''), g.get('scene_id', '')))
+    else:  # started_at
+        rows.sort(key=lambda g: g.get('scene_id', ''))
+        rows.sort(key=lambda g: g.get('started_at') or '', reverse=True)  # Most recent first
+
+    return rows, corrupted_files
+
+
+def _validate_state(state: Dict[str, Any], scene_id: str) -> List[str]:
+    """Validate state structure and content.
+
+    Args:
+        state: State dictionary to validate
+        scene_id: Expected scene ID
+
+    Returns:
+        List of validation warnings (empty if valid)
+    """
+    warnings = []
+
+    # Check required fields
     required_fields = ['scene_id', 'workflow_status', 'current_step', 'started_at']
     for field in required_fields:
         if field not in state:
@@ -951,6 +1824,7 @@ def _format_status_markdown(state: Dict[str, Any], detailed: bool = False) -> st
     # Session info
     session_id = state.get('session_id', 'unknown')
     lines.append(f"**Session ID**: {session_id}")
+    lines.append(f"**Revision**: {state.get('revision', 0)}")
 
     started_at = state.get('started_at', '')
     elapsed = _calculate_elapsed_time(started_at, state.get('updated_at'))
@@ -1037,6 +1911,9 @@ def _handle_error(e: Exception) -> str:
     Returns:
         Formatted error message
     """
+    if isinstance(e, StateConflictError):
+        # Retried by _revision_retry, never rendered
+        raise e
     if isinstance(e, ValueError):
         return f"Error: {str(e)}"
     elif isinstance(e, FileNotFoundError):
@@ -1087,6 +1964,7 @@ def _initialize_state_structure(
     return {
         "scene_id": scene_id,
         "session_id": session_id,
+        "revision": 0,  # Incremented by every save (compare-and-swap, see _save_state_file)
         "started_at": now,
         "updated_at": now,
         "current_phase": "INITIALIZED",
@@ -1157,6 +2035,259 @@ def _advance_workflow(state: Dict[str, Any], completed_step_name: str) -> None:
     state['updated_at'] = datetime.now(timezone.utc).isoformat()
 
 
+# Step Transitions
+#
+# Validation and mutation of each step operation, shared by the single-step
+# tools and transition_steps. They change state in place and raise
+# TransitionError (with the tool's user-facing message) when an operation does
+# not apply; callers save the state afterwards.
+
+class TransitionError(Exception):
+    """Raised when a step operation does not apply to the current state."""
+
+
+TERMINAL_WORKFLOW_STATUSES = [
+    WorkflowStatus.COMPLETED.value,
+    WorkflowStatus.FAILED.value,
+    WorkflowStatus.CANCELLED.value
+]
+
+
+def _apply_start_step(state: Dict[str, Any], step_name: str, metadata: Optional[Dict[str, Any]], now: str) -> None:
+    """Mark step IN_PROGRESS (start_step).
+
+    Raises:
+        TransitionError: If the workflow is terminal, the step is out of order
+            or already completed
+    """
+    workflow_status = state.get('workflow_status')
+    if workflow_status in TERMINAL_WORKFLOW_STATUSES:
+        raise TransitionError(
+            f"❌ ERROR: Cannot start step - workflow in terminal state: {workflow_status}\n\n"
+            f"💡 For new generation: Archive current state and call start_generation"
+        )
+
+    # Check step order (unless this is the first step)
+    current_step = state.get('current_step')
+    if current_step is None:
+        # First step - must be first in STEP_ORDER
+        if step_name != STEP_ORDER[0]:
+            raise TransitionError(f"❌ ERROR: First step must be {STEP_ORDER[0]}, got {step_name}")
+    else:
+        # Not first step - check order
+        expected_index = _get_step_index(current_step)
+        requested_index = _get_step_index(step_name)
+
+        if requested_index != expected_index and requested_index != expected_index + 1:
+            raise TransitionError(
+                f"❌ ERROR: Step order violation\n\n"
+                f"**Current**: {current_step}\n"
+                f"**Requested**: {step_name}\n\n"
+                f"💡 Steps must be executed in order"
+            )
+
+    # Check if step already completed
+    if step_name in state['steps'] and state['steps'][step_name].get('status') == StepStatus.COMPLETED.value:
+        raise TransitionError(
+            f"❌ ERROR: Step {step_name} already COMPLETED\n\n"
+            f"💡 Cannot restart completed step"
+        )
+
+    _update_step_status(state, step_name, StepStatus.IN_PROGRESS.value, started_at=now, **(metadata or {}))
+    state['current_step'] = step_name
+
+
+def _apply_complete_step(
+    state: Dict[str, Any],
+    step_name: str,
+    duration_seconds: float,
+    artifacts: Optional[Dict[str, str]],
+    metadata: Optional[Dict[str, Any]],
+    now: str
+) -> bool:
+    """Mark step COMPLETED and advance the workflow (complete_step).
+
+    Returns:
+        False if the step was already COMPLETED (state unchanged)
+
+    Raises:
+        TransitionError: If the step is not IN_PROGRESS
+    """
+    if step_name in state['steps'] and state['steps'][step_name].get('status') == StepStatus.COMPLETED.value:
+        return False
+
+    if step_name not in state['steps'] or state['steps'][step_name].get('status') != StepStatus.IN_PROGRESS.value:
+        raise TransitionError(
+            f"❌ ERROR: Step {step_name} not IN_PROGRESS\n\n"
+            f"💡 Call start_step first"
+        )
+
+    _update_step_status(
+        state,
+        step_name,
+        StepStatus.COMPLETED.value,
+        completed_at=now,
+        duration_seconds=duration_seconds
+    )
+
+    if artifacts:
+        if 'artifacts' not in state:
+            state['artifacts'] = {}
+        state['artifacts'].update(artifacts)
+
+    if metadata:
+        state['steps'][step_name]['metadata'] = metadata
+
+    # Final step with workflow_complete flag completes the workflow
+    if metadata and metadata.get('workflow_complete') is True:
+        state['workflow_status'] = WorkflowStatus.COMPLETED.value
+        state['completed_at'] = now
+    else:
+        _advance_workflow(state, step_name)
+
+    started_at = datetime.fromisoformat(state['started_at'].replace('Z', '+00:00'))
+    state['metadata']['total_duration_seconds'] = (datetime.now(timezone.utc) - started_at).total_seconds()
+    return True
+
+
+def _apply_fail_step(
+    state: Dict[str, Any],
+    step_name: str,
+    failure_reason: str,
+    metadata: Optional[Dict[str, Any]],
+    now: str
+) -> bool:
+    """Record a step failure (fail_step).
+
+    Returns:
+        True if the failure is terminal (metadata={'terminal': True})
+    """
+    error_entry = {
+        "step": step_name,
+        "timestamp": now,
+        "message": failure_reason,
+        **(metadata or {})
+    }
+    if 'errors' not in state:
+        state['errors'] = []
+    state['errors'].append(error_entry)
+
+    is_terminal = bool(metadata and metadata.get('terminal') is True)
+    if is_terminal:
+        state['workflow_status'] = WorkflowStatus.FAILED.value
+        state['failed_at_step'] = step_name
+        state['failure_reason'] = failure_reason
+
+    _update_step_status(
+        state,
+        step_name,
+        StepStatus.FAILED.value,
+        failed_at=now,
+        failure_reason=failure_reason,
+        **(metadata or {})
+    )
+    state['updated_at'] = now
+    return is_terminal
+
+
+def _apply_retry_step(state: Dict[str, Any], step_name: str, metadata: Optional[Dict[str, Any]], now: str) -> None:
+    """Reset a FAILED step to PENDING (retry_step).
+
+    Raises:
+        TransitionError: If the step does not exist or is not FAILED
+    """
+    if step_name not in state['steps']:
+        raise TransitionError(f"❌ ERROR: Step {step_name} not found in state")
+
+    step_status = state['steps'][step_name].get('status')
+    if step_status != StepStatus.FAILED.value:
+        raise TransitionError(
+            f"❌ ERROR: Step {step_name} not FAILED (status: {step_status})\n\n"
+            f"💡 retry_step only works on FAILED steps"
+        )
+
+    # PENDING until the next start_step
+    state['steps'][step_name]['status'] = StepStatus.PENDING.value
+    state['steps'][step_name]['retry_metadata'] = metadata or {}
+    state['updated_at'] = now
+
+
+def _apply_log_question(
+    state: Dict[str, Any],
+    question: str,
+    answer: str,
+    timestamp: Optional[str],
+    now: str
+) -> None:
+    """Append a Q&A entry (log_question_answer)."""
+    if 'user_questions' not in state:
+        state['user_questions'] = []
+    state['user_questions'].append({
+        "question": question,
+        "answer": answer,
+        "timestamp": timestamp or now
+    })
+    state['updated_at'] = now
+
+
+def _apply_set_artifacts(state: Dict[str, Any], artifacts: Dict[str, str], now: str) -> None:
+    """Merge artifact paths into the state."""
+    state.setdefault('artifacts', {}).update(artifacts)
+    state['updated_at'] = now
+
+
+# Tool Execution
+#
+# Tool bodies are blocking functions run on the I/O pool (io_executor_utils),
+# so a slow call does not stall the event loop. Mutations of one scene
+# (load-modify-save of its state file) are serialized per scene ID; planning
+# mutations share one key (a single SQLite writer anyway). Reads are not
+# locked: state files and journals are replaced atomically.
+
+_tool_locks = KeyedLocks()
+
+PLANNING_LOCK_KEY = ("planning",)
+
+
+def _scene_lock_key(params: BaseModel) -> tuple:
+    return ("scene", params.scene_id)
+
+
+def _planning_lock_key(params: BaseModel) -> tuple:
+    return PLANNING_LOCK_KEY
+
+
+def _reconcile_lock_key(params: BaseModel) -> Optional[tuple]:
+    return PLANNING_LOCK_KEY if params.apply else None
+
+
+def _revision_retry(tool):
+    """Re-run a scene-mutating tool body when its save loses a revision race.
+
+    Bodies are load → validate → mutate → save, so a re-run applies the
+    operation to the newer state: appends (Q&A, errors, artifacts) merge with
+    the concurrent change, transitions are re-validated and return their usual
+    message if they no longer apply. Nothing is overwritten blindly.
+
+    After STATE_CAS_RETRIES lost races the body runs holding the scene's lock
+    file throughout (pessimistic fallback), which always succeeds.
+    """
+    @functools.wraps(tool)
+    def run(params: BaseModel) -> str:
+        for attempt in range(STATE_CAS_RETRIES):
+            try:
+                return tool(params)
+            except StateConflictError:
+                time.sleep(random.uniform(0, 0.002 * (attempt + 1)))
+        state_path = _get_state_file_path(params.scene_id)
+        try:
+            with file_lock(_state_lock_path(state_path)):
+                return tool(params)
+        except StateConflictError as e:
+            return f"❌ ERROR: {str(e)}\n\n💡 Another writer bypassed the state lock; retry the call"
+    return run
+
+
 # Tool Definitions
 
 @mcp.tool(
@@ -1169,7 +2300,8 @@ def _advance_workflow(state: Dict[str, Any], completed_step_name: str) -> None:
         "openWorldHint": False
     }
 )
-async def resume_generation(params: ResumeGenerationInput) -> str:
+@offloaded(_tool_locks, key=_scene_lock_key)
+def resume_generation(params: ResumeGenerationInput) -> str:
     """Resume a failed or interrupted scene generation workflow from saved state.
 
     This tool loads the saved state for a scene generation workflow and determines
@@ -1340,7 +2472,8 @@ async def resume_generation(params: ResumeGenerationInput) -> str:
         "openWorldHint": False
     }
 )
-async def get_generation_status(params: GetGenerationStatusInput) -> str:
+@offloaded()
+def get_generation_status(params: GetGenerationStatusInput) -> str:
     """Get current status and progress of a scene generation workflow.
 
     This tool reads the state file for a scene generation and formats it as
@@ -1402,7 +2535,9 @@ async def get_generation_status(params: GetGenerationStatusInput) -> str:
         "openWorldHint": False
     }
 )
-async def cancel_generation(params: CancelGenerationInput) -> str:
+@offloaded(_tool_locks, key=_scene_lock_key)
+@_revision_retry
+def cancel_generation(params: CancelGenerationInput) -> str:
     """Cancel a currently running scene generation workflow.
 
     This tool updates the state file to mark the workflow as CANCELLED and
@@ -1469,7 +2604,7 @@ async def cancel_generation(params: CancelGenerationInput) -> str:
         state['cancellation_reason'] = params.reason or "User requested cancellation"
 
         # Save updated state
-        _save_state_file(scene_id, state)
+        _save_state_file(scene_id, state, event="generation_cancelled")
 
         # Build cancellation report
         lines = [
@@ -1552,16 +2687,27 @@ async def cancel_generation(params: CancelGenerationInput) -> str:
         "openWorldHint": False
     }
 )
-async def list_generations(params: ListGenerationsInput) -> str:
+@offloaded()
+def list_generations(params: ListGenerationsInput) -> str:
     """List all scene generations with their current status.
 
-    This tool scans the workspace directory for all state files and presents
-    them in a formatted table with key information about each generation.
+    Generations are read from the catalog index (workspace/generation-catalog.db),
+    which is updated on every state save and lazily reconciled with the state
+    files, so unchanged files are never re-parsed. A scene that exists in the
+    active session shadows its global copy (each scene is listed once).
+
+    Results are paginated: pass the returned next_cursor to get the following
+    page. Output always stays under CHARACTER_LIMIT (the page is shortened if
+    needed and the cursor continues after the last row shown).
 
     Args:
         params (ListGenerationsInput): Validated input parameters containing:
             - filter (FilterType): Filter by status - 'all', 'active', 'failed', 'completed' (default: 'all')
             - sort_by (str): Sort by field - 'scene_id', 'started_at', 'status' (default: 'started_at')
+            - limit (int): Page size (default: 50)
+            - cursor (Optional[str]): next_cursor from previous page
+            - response_format (str): 'text' (table) or 'json' (compact rows)
+            - fields (Optional[List[str]]): JSON columns to return
 
     Returns:
         str: Markdown-formatted table with columns:
@@ -1573,15 +2719,19 @@ async def list_generations(params: ListGenerationsInput) -> str:
             - Quick actions (links to status/resume commands)
 
         Also includes:
-            - Total count
+            - Total count and page range
+            - Next page cursor (if more results)
             - Legend for status types
             - Quick action suggestions
             - Filter information
 
+        With response_format='json':
+            {"generations": [...], "total": int, "offset": int, "count": int, "next_cursor": str|null}
+
     Error Handling:
         - Returns empty list if no state files found
         - Skips corrupted state files with warning
-        - Returns error if workspace directory doesn't exist
+        - Returns error for invalid or mismatched cursor
 
     Examples:
         - Use when: Want to see all ongoing generations
@@ -1590,176 +2740,168 @@ async def list_generations(params: ListGenerationsInput) -> str:
         - Use when: Monitoring multiple parallel generations
     """
     try:
-        # List all state files
-        state_files = _list_state_files()
+        try:
+            all_generations, corrupted_files = _query_generations(params.filter, params.sort_by)
+        except sqlite3.Error:
+            all_generations, corrupted_files = _scan_generations(params.filter, params.sort_by)
+
+        fingerprint = query_fingerprint(
+            tool="list_generations",
+            filter=params.filter.value,
+            sort_by=params.sort_by,
+            session=_get_active_session()
+        )
+        page = paginate(all_generations, lambda g: g.get('scene_id'), params.limit, params.cursor, fingerprint)
+
+        if params.response_format == 'json':
+            text, _ = fit_json_page(
+                page,
+                lambda items: select_fields(
+                    [{field: g.get(field) for field in GENERATION_LIST_FIELDS} for g in items],
+                    params.fields
+                ),
+                "generations"
+            )
+            return text
 
-        if not state_files:
+        if not all_generations and params.filter == FilterType.ALL and not corrupted_files:
             return "📋 GENERATION STATES (0 total)\n\n" \
                    "No generation states found.\n\n" \
                    "💡 Start a generation: \"Generate scene {scene_id}\""
 
-        # Load all states
-        generations = []
-        corrupted_files = []
+        text, _ = render_within_limit(
+            page, lambda p: _render_generations_page(p, params, corrupted_files)
+        )
+        return text
 
-        for state_path in state_files:
-            try:
-                with open(state_path, 'r', encoding='utf-8') as f:
-                    state = json.load(f)
-                generations.append(state)
-            except Exception as e:
-                corrupted_files.append(state_path.name)
-
-        # Filter by status
-        if params.filter == FilterType.ACTIVE:
-            generations = [
-                g for g in generations
-                if g.get('workflow_status') in [
-                    WorkflowStatus.IN_PROGRESS.value,
-                    WorkflowStatus.WAITING_USER_APPROVAL.value,
-                    WorkflowStatus.FAILED.value
-                ]
-            ]
-        elif params.filter == FilterType.FAILED:
-            generations = [
-                g for g in generations
-                if g.get('workflow_status') == WorkflowStatus.FAILED.value
-            ]
-        elif params.filter == FilterType.COMPLETED:
-            generations = [
-                g for g in generations
-                if g.get('workflow_status') == WorkflowStatus.COMPLETED.value
-            ]
+    except Exception as e:
+        return _handle_error(e)
 
-        # Sort
-        if params.sort_by == 'scene_id':
-            generations.sort(key=lambda g: g.get('scene_id', ''))
-        elif params.sort_by == 'status':
-            generations.sort(key=lambda g: g.get('workflow_status', ''))
-        else:  # started_at
-            generations.sort(
-                key=lambda g: g.get('started_at', ''),
-                reverse=True  # Most recent first
-            )
 
-        # Build table
-        lines = [
-            f"📋 GENERATION STATES ({len(generations)} total)",
-            ""
-        ]
+def _render_generations_page(page: Page, params: ListGenerationsInput, corrupted_files: List[str]) -> str:
+    """Render one page of list_generations as a markdown table."""
+    generations = page.items
 
-        if not generations:
-            lines.append(f"No generations matching filter: {params.filter}")
-            lines.append("")
-            lines.append("💡 Try different filter: 'all', 'active', 'failed', 'completed'")
-            return "\n".join(lines)
+    # Build table
+    lines = [f"📋 GENERATION STATES ({page.total} total)"]
+    if generations and len(generations) < page.total:
+        lines.append(f"Showing {page.start + 1}–{page.start + len(generations)} of {page.total}")
+    lines.append("")
 
-        # Table header
-        lines.append("┌────────┬──────────────┬─────────┬──────────────┬──────────┬──────────┐")
-        lines.append("│ Scene  │ Status       │ Step    │ Started      │ Duration │ Actions  │")
-        lines.append("├────────┼──────────────┼─────────┼──────────────┼──────────┼──────────┤")
-
-        # Table rows
-        for gen in generations:
-            scene_id = gen.get('scene_id', '????')
-            status = gen.get('workflow_status', 'UNKNOWN')
-            current_step = gen.get('current_step', 0)
-
-            # Format started time
-            started_at = gen.get('started_at', '')
-            if started_at:
-                try:
-                    start_dt = datetime.fromisoformat(started_at.replace('Z', '+00:00'))
-                    start_str = start_dt.strftime('%H:%M')
-
-                    # Calculate relative time
-                    now = datetime.now(timezone.utc)
-                    delta = (now - start_dt).total_seconds()
-
-                    if delta < 3600:  # Less than 1 hour
-                        relative = f"{int(delta // 60)}m"
-                    elif delta < 86400:  # Less than 1 day
-                        relative = f"{int(delta // 3600)}h"
-                    else:
-                        relative = "Yesterday" if delta < 172800 else f"{int(delta // 86400)}d ago"
-
-                    started_str = f"{start_str} ({relative})"
-                except Exception:
-                    started_str = "unknown"
-            else:
-                started_str = "unknown"
+    if not generations:
+        lines.append(f"No generations matching filter: {params.filter}")
+        lines.append("")
+        lines.append("💡 Try different filter: 'all', 'active', 'failed', 'completed'")
+        return "\n".join(lines)
 
-            # Calculate duration
-            duration = _calculate_elapsed_time(started_at, gen.get('updated_at'))
+    # Table header
+    lines.append("┌────────┬──────────────┬─────────┬──────────────┬──────────┬──────────┐")
+    lines.append("│ Scene  │ Status       │ Step    │ Started      │ Duration │ Actions  │")
+    lines.append("├────────┼──────────────┼─────────┼──────────────┼──────────┼──────────┤")
 
-            # Actions based on status
-            if status == WorkflowStatus.IN_PROGRESS.value:
-                actions = "[Status]"
-            elif status == WorkflowStatus.FAILED.value or status == WorkflowStatus.CANCELLED.value:
-                actions = "[Resume]"
-            elif status == WorkflowStatus.COMPLETED.value:
-                actions = "[View]"
-            else:
-                actions = "-"
+    # Table rows
+    for gen in generations:
+        scene_id = gen.get('scene_id', '????')
+        status = gen.get('workflow_status', 'UNKNOWN')
+        current_step = gen.get('current_step', 0)
 
-            # Truncate fields to fit table
-            status_short = status[:12].ljust(12)
-            started_short = started_str[:12].ljust(12)
-            duration_short = duration[:8].ljust(8)
+        # Format started time
+        started_at = gen.get('started_at', '')
+        if started_at:
+            try:
+                start_dt = datetime.fromisoformat(started_at.replace('Z', '+00:00'))
+                start_str = start_dt.strftime('%H:%M')
 
-            lines.append(
-                f"│ {scene_id}   │ {status_short} │ {current_step}/7     │ "
-                f"{started_short} │ {duration_short} │ {actions.ljust(8)} │"
-            )
+                # Calculate relative time
+                now = datetime.now(timezone.utc)
+                delta = (now - start_dt).total_seconds()
 
-        lines.append("└────────┴──────────────┴─────────┴──────────────┴──────────┴──────────┘")
-        lines.append("")
+                if delta < 3600:  # Less than 1 hour
+                    relative = f"{int(delta // 60)}m"
+                elif delta < 86400:  # Less than 1 day
+                    relative = f"{int(delta // 3600)}h"
+                else:
+                    relative = "Yesterday" if delta < 172800 else f"{int(delta // 86400)}d ago"
 
-        # Legend
-        lines.append("Legend:")
-        lines.append("  • IN_PROGRESS: Workflow currently running")
-        lines.append("  • WAITING_USER_APPROVAL: Paused at Step 3, needs approval")
-        lines.append("  • COMPLETED: Successfully finished all 7 steps")
-        lines.append("  • FAILED: Stopped due to error (can resume)")
-        lines.append("  • CANCELLED: Manually stopped by user (can resume)")
-        lines.append("")
+                started_str = f"{start_str} ({relative})"
+            except Exception:
+                started_str = "unknown"
+        else:
+            started_str = "unknown"
+
+        # Calculate duration
+        duration = _calculate_elapsed_time(started_at, gen.get('updated_at'))
+
+        # Actions based on status
+        if status == WorkflowStatus.IN_PROGRESS.value:
+            actions = "[Status]"
+        elif status == WorkflowStatus.FAILED.value or status == WorkflowStatus.CANCELLED.value:
+            actions = "[Resume]"
+        elif status == WorkflowStatus.COMPLETED.value:
+            actions = "[View]"
+        else:
+            actions = "-"
 
-        # Quick actions
-        lines.append("💡 Quick actions:")
+        # Truncate fields to fit table
+        status_short = status[:12].ljust(12)
+        started_short = started_str[:12].ljust(12)
+        duration_short = duration[:8].ljust(8)
 
-        # Suggest checking first in-progress generation
-        in_progress = [g for g in generations if g.get('workflow_status') == WorkflowStatus.IN_PROGRESS.value]
-        if in_progress:
-            first_scene = in_progress[0].get('scene_id')
-            lines.append(f"   - Check details: get_generation_status(scene_id='{first_scene}')")
-            lines.append(f"   - Cancel running: cancel_generation(scene_id='{first_scene}')")
+        lines.append(
+            f"│ {scene_id}   │ {status_short} │ {current_step}/7     │ "
+            f"{started_short} │ {duration_short} │ {actions.ljust(8)} │"
+        )
 
-        # Suggest resuming first failed generation
-        failed = [g for g in generations if g.get('workflow_status') == WorkflowStatus.FAILED.value]
-        if failed:
-            first_failed = failed[0].get('scene_id')
-            lines.append(f"   - Resume failed: resume_generation(scene_id='{first_failed}')")
+    lines.append("└────────┴──────────────┴─────────┴──────────────┴──────────┴──────────┘")
+    lines.append("")
 
+    # Next page
+    if page.next_cursor:
+        lines.append(f"➡️ Next page: list_generations(cursor='{page.next_cursor}')")
         lines.append("")
 
-        # Filters
-        lines.append("🔍 Filters:")
-        lines.append("   --active     Show only IN_PROGRESS, WAITING_USER_APPROVAL, FAILED")
-        lines.append("   --completed  Show only COMPLETED")
-        lines.append("   --failed     Show only FAILED (resumable)")
-        lines.append("")
+    # Legend
+    lines.append("Legend:")
+    lines.append("  • IN_PROGRESS: Workflow currently running")
+    lines.append("  • WAITING_USER_APPROVAL: Paused at Step 3, needs approval")
+    lines.append("  • COMPLETED: Successfully finished all 7 steps")
+    lines.append("  • FAILED: Stopped due to error (can resume)")
+    lines.append("  • CANCELLED: Manually stopped by user (can resume)")
+    lines.append("")
 
-        # Warnings for corrupted files
-        if corrupted_files:
-            lines.append("⚠️ Warnings:")
-            for filename in corrupted_files:
-                lines.append(f"   - Skipped corrupted file: {filename}")
-            lines.append("")
+    # Quick actions
+    lines.append("💡 Quick actions:")
 
-        return "\n".join(lines)
+    # Suggest checking first in-progress generation
+    in_progress = [g for g in generations if g.get('workflow_status') == WorkflowStatus.IN_PROGRESS.value]
+    if in_progress:
+        first_scene = in_progress[0].get('scene_id')
+        lines.append(f"   - Check details: get_generation_status(scene_id='{first_scene}')")
+        lines.append(f"   - Cancel running: cancel_generation(scene_id='{first_scene}')")
 
-    except Exception as e:
-        return _handle_error(e)
+    # Suggest resuming first failed generation
+    failed = [g for g in generations if g.get('workflow_status') == WorkflowStatus.FAILED.value]
+    if failed:
+        first_failed = failed[0].get('scene_id')
+        lines.append(f"   - Resume failed: resume_generation(scene_id='{first_failed}')")
+
+    lines.append("")
+
+    # Filters
+    lines.append("🔍 Filters:")
+    lines.append("   --active     Show only IN_PROGRESS, WAITING_USER_APPROVAL, FAILED")
+    lines.append("   --completed  Show only COMPLETED")
+    lines.append("   --failed     Show only FAILED (resumable)")
+    lines.append("")
+
+    # Warnings for corrupted files
+    if corrupted_files:
+        lines.append("⚠️ Warnings:")
+        for filename in corrupted_files:
+            lines.append(f"   - Skipped corrupted file: {filename}")
+        lines.append("")
+
+    return "\n".join(lines)
 
 
 @mcp.tool(
@@ -1772,7 +2914,9 @@ async def list_generations(params: ListGenerationsInput) -> str:
         "openWorldHint": False
     }
 )
-async def start_generation(params: StartGenerationInput) -> str:
+@offloaded(_tool_locks, key=_scene_lock_key)
+@_revision_retry
+def start_generation(params: StartGenerationInput) -> str:
     """Initialize a new scene generation workflow by creating state file.
 
     This tool creates a new generation state file for a scene and initializes
@@ -1813,6 +2957,7 @@ async def start_generation(params: StartGenerationInput) -> str:
 
     try:
         state_path = _get_state_file_path(scene_id)
+        existing_state = None
 
         # Idempotency check: If state file exists, return info (don't fail)
         if state_path.exists():
@@ -1847,9 +2992,12 @@ async def start_generation(params: StartGenerationInput) -> str:
             initiated_by=params.initiated_by,
             metadata=params.metadata
         )
+        # A restart replaces the previous run's state: continue its revisions
+        if existing_state:
+            state['revision'] = existing_state.get('revision', 0)
 
         # Save to file
-        _save_state_file(scene_id, state)
+        _save_state_file(scene_id, state, event="generation_started")
 
         # Build success report
         lines = [
@@ -1890,7 +3038,9 @@ async def start_generation(params: StartGenerationInput) -> str:
         "openWorldHint": False
     }
 )
-async def start_step(params: StartStepInput) -> str:
+@offloaded(_tool_locks, key=_scene_lock_key)
+@_revision_retry
+def start_step(params: StartStepInput) -> str:
     """Mark a workflow step as IN_PROGRESS and record start timestamp.
 
     Args:
@@ -1921,49 +3071,15 @@ async def start_step(params: StartStepInput) -> str:
             return f"❌ ERROR: No state found for scene {scene_id}\n\n" \
                    f"💡 Initialize first: start_generation(scene_id='{scene_id}', blueprint_path='...')"
 
-        # Check workflow status
-        workflow_status = state.get('workflow_status')
-        if workflow_status in [WorkflowStatus.COMPLETED.value, WorkflowStatus.FAILED.value, WorkflowStatus.CANCELLED.value]:
-            return f"❌ ERROR: Cannot start step - workflow in terminal state: {workflow_status}\n\n" \
-                   f"💡 For new generation: Archive current state and call start_generation"
-
-        # Check step order (unless this is the first step)
-        current_step = state.get('current_step')
-        if current_step is None:
-            # First step - must be first in STEP_ORDER
-            if step_name != STEP_ORDER[0]:
-                return f"❌ ERROR: First step must be {STEP_ORDER[0]}, got {step_name}"
-        else:
-            # Not first step - check order
-            expected_index = _get_step_index(current_step)
-            requested_index = _get_step_index(step_name)
-
-            if requested_index != expected_index and requested_index != expected_index + 1:
-                return f"❌ ERROR: Step order violation\n\n" \
-                       f"**Current**: {current_step}\n" \
-                       f"**Requested**: {step_name}\n\n" \
-                       f"💡 Steps must be executed in order"
-
-        # Check if step already completed
-        if step_name in state['steps'] and state['steps'][step_name].get('status') == StepStatus.COMPLETED.value:
-            return f"❌ ERROR: Step {step_name} already COMPLETED\n\n" \
-                   f"💡 Cannot restart completed step"
-
-        # Update step status
+        # Validate order and mark IN_PROGRESS
         now = datetime.now(timezone.utc).isoformat()
-        _update_step_status(
-            state,
-            step_name,
-            StepStatus.IN_PROGRESS.value,
-            started_at=now,
-            **(params.metadata or {})
-        )
-
-        # Update current step
-        state['current_step'] = step_name
+        try:
+            _apply_start_step(state, step_name, params.metadata, now)
+        except TransitionError as e:
+            return str(e)
 
         # Save updated state
-        _save_state_file(scene_id, state)
+        _save_state_file(scene_id, state, event="step_started", step=step_name)
 
         # Build response
         step_index = _get_step_index(step_name)
@@ -2000,7 +3116,9 @@ async def start_step(params: StartStepInput) -> str:
         "openWorldHint": False
     }
 )
-async def complete_step(params: CompleteStepInput) -> str:
+@offloaded(_tool_locks, key=_scene_lock_key)
+@_revision_retry
+def complete_step(params: CompleteStepInput) -> str:
     """Mark a workflow step as COMPLETED, record duration, and advance workflow.
 
     Args:
@@ -2027,56 +3145,27 @@ async def complete_step(params: CompleteStepInput) -> str:
         if state is None:
             return f"❌ ERROR: No state found for scene {scene_id}"
 
-        # Idempotency: Check if already completed
-        if step_name in state['steps'] and state['steps'][step_name].get('status') == StepStatus.COMPLETED.value:
+        # Mark COMPLETED, merge artifacts, advance workflow
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            changed = _apply_complete_step(
+                state, step_name, params.duration_seconds, params.artifacts, params.metadata, now
+            )
+        except TransitionError as e:
+            return str(e)
+
+        # Idempotency: already completed
+        if not changed:
             existing_duration = state['steps'][step_name].get('duration_seconds', 0)
             return f"ℹ️ INFO: Step {step_name} already COMPLETED\n\n" \
                    f"**Existing duration**: {_format_duration(existing_duration)}\n\n" \
                    f"💡 Idempotent call - no changes made"
 
-        # Check if step was started
-        if step_name not in state['steps'] or state['steps'][step_name].get('status') != StepStatus.IN_PROGRESS.value:
-            return f"❌ ERROR: Step {step_name} not IN_PROGRESS\n\n" \
-                   f"💡 Call start_step first"
-
-        # Update step status
-        now = datetime.now(timezone.utc).isoformat()
-        _update_step_status(
-            state,
-            step_name,
-            StepStatus.COMPLETED.value,
-            completed_at=now,
-            duration_seconds=params.duration_seconds
-        )
-
-        # Update artifacts if provided
-        if params.artifacts:
-            if 'artifacts' not in state:
-                state['artifacts'] = {}
-            state['artifacts'].update(params.artifacts)
-
-        # Update metadata if provided
-        if params.metadata:
-            state['steps'][step_name]['metadata'] = params.metadata
-
-        # Check if this is final step with workflow_complete flag
         is_workflow_complete = params.metadata and params.metadata.get('workflow_complete') is True
-
-        if is_workflow_complete:
-            # Mark workflow as complete
-            state['workflow_status'] = WorkflowStatus.COMPLETED.value
-            state['completed_at'] = now
-        else:
-            # Advance to next step
-            _advance_workflow(state, step_name)
-
-        # Update total duration
-        started_at = datetime.fromisoformat(state['started_at'].replace('Z', '+00:00'))
-        total_duration = (datetime.now(timezone.utc) - started_at).total_seconds()
-        state['metadata']['total_duration_seconds'] = total_duration
+        total_duration = state['metadata']['total_duration_seconds']
 
         # Save updated state
-        _save_state_file(scene_id, state)
+        _save_state_file(scene_id, state, event="step_completed", step=step_name)
 
         # Build response
         step_index = _get_step_index(step_name)
@@ -2126,7 +3215,9 @@ async def complete_step(params: CompleteStepInput) -> str:
         "openWorldHint": False
     }
 )
-async def fail_step(params: FailStepInput) -> str:
+@offloaded(_tool_locks, key=_scene_lock_key)
+@_revision_retry
+def fail_step(params: FailStepInput) -> str:
     """Record step failure with errors.
 
     NOT necessarily terminal - coordinator can call retry_step() afterwards.
@@ -2156,44 +3247,12 @@ async def fail_step(params: FailStepInput) -> str:
         if state is None:
             return f"❌ ERROR: No state found for scene {scene_id}"
 
-        # Create error entry
+        # Append error entry, mark step FAILED (workflow FAILED if terminal)
         now = datetime.now(timezone.utc).isoformat()
-        error_entry = {
-            "step": step_name,
-            "timestamp": now,
-            "message": params.failure_reason,
-            **(params.metadata or {})
-        }
-
-        # Append to errors array
-        if 'errors' not in state:
-            state['errors'] = []
-        state['errors'].append(error_entry)
-
-        # Check if terminal failure
-        is_terminal = params.metadata and params.metadata.get('terminal') is True
-
-        if is_terminal:
-            # Mark workflow as FAILED
-            state['workflow_status'] = WorkflowStatus.FAILED.value
-            state['failed_at_step'] = step_name
-            state['failure_reason'] = params.failure_reason
-
-        # Mark step as FAILED
-        _update_step_status(
-            state,
-            step_name,
-            StepStatus.FAILED.value,
-            failed_at=now,
-            failure_reason=params.failure_reason,
-            **(params.metadata or {})
-        )
-
-        # Update timestamp
-        state['updated_at'] = now
+        is_terminal = _apply_fail_step(state, step_name, params.failure_reason, params.metadata, now)
 
         # Save updated state
-        _save_state_file(scene_id, state)
+        _save_state_file(scene_id, state, event="step_failed", step=step_name)
 
         # Build response
         total_errors = len(state['errors'])
@@ -2249,7 +3308,9 @@ async def fail_step(params: FailStepInput) -> str:
         "openWorldHint": False
     }
 )
-async def retry_step(params: RetryStepInput) -> str:
+@offloaded(_tool_locks, key=_scene_lock_key)
+@_revision_retry
+def retry_step(params: RetryStepInput) -> str:
     """Indicate coordinator is retrying a failed step.
 
     Only called after fail_step(). Clears FAILED status and allows new attempt.
@@ -2272,24 +3333,14 @@ async def retry_step(params: RetryStepInput) -> str:
         if state is None:
             return f"❌ ERROR: No state found for scene {scene_id}"
 
-        # Check if step exists and is FAILED
-        if step_name not in state['steps']:
-            return f"❌ ERROR: Step {step_name} not found in state"
-
-        step_status = state['steps'][step_name].get('status')
-        if step_status != StepStatus.FAILED.value:
-            return f"❌ ERROR: Step {step_name} not FAILED (status: {step_status})\n\n" \
-                   f"💡 retry_step only works on FAILED steps"
-
-        # Reset step status to PENDING (will be set to IN_PROGRESS by next start_step)
-        state['steps'][step_name]['status'] = StepStatus.PENDING.value
-        state['steps'][step_name]['retry_metadata'] = params.metadata or {}
-
-        # Update timestamp
-        state['updated_at'] = datetime.now(timezone.utc).isoformat()
+        # Reset FAILED step to PENDING (set to IN_PROGRESS by next start_step)
+        try:
+            _apply_retry_step(state, step_name, params.metadata, datetime.now(timezone.utc).isoformat())
+        except TransitionError as e:
+            return str(e)
 
         # Save updated state
-        _save_state_file(scene_id, state)
+        _save_state_file(scene_id, state, event="step_retried", step=step_name)
 
         # Build response
         attempt_number = params.metadata.get('attempt_number', 'unknown') if params.metadata else 'unknown'
@@ -2325,7 +3376,9 @@ async def retry_step(params: RetryStepInput) -> str:
         "openWorldHint": False
     }
 )
-async def complete_generation(params: CompleteGenerationInput) -> str:
+@offloaded(_tool_locks, key=_scene_lock_key)
+@_revision_retry
+def complete_generation(params: CompleteGenerationInput) -> str:
     """Mark workflow as COMPLETED (terminal state) after successful generation.
 
     This tool finalizes the workflow by setting status=COMPLETED and recording
@@ -2413,7 +3466,7 @@ async def complete_generation(params: CompleteGenerationInput) -> str:
         state['metadata']['generation_retries'] = params.retry_count
 
         # Save updated state
-        _save_state_file(scene_id, state)
+        _save_state_file(scene_id, state, event="generation_completed")
 
         # Build success report
         lines = [
@@ -2468,7 +3521,9 @@ async def complete_generation(params: CompleteGenerationInput) -> str:
         "openWorldHint": False
     }
 )
-async def log_question_answer(params: LogQuestionAnswerInput) -> str:
+@offloaded(_tool_locks, key=_scene_lock_key)
+@_revision_retry
+def log_question_answer(params: LogQuestionAnswerInput) -> str:
     """Log QuestionTool interaction to state for audit trail and decision tracking.
 
     BONUS FEATURE: This tool records questions asked to users via QuestionTool
@@ -2513,24 +3568,13 @@ async def log_question_answer(params: LogQuestionAnswerInput) -> str:
         if state is None:
             return f"❌ ERROR: No state found for scene {scene_id}"
 
-        # Create Q&A entry
-        timestamp = params.timestamp or datetime.now(timezone.utc).isoformat()
-        qa_entry = {
-            "question": params.question,
-            "answer": params.answer,
-            "timestamp": timestamp
-        }
-
-        # Append to user_questions array
-        if 'user_questions' not in state:
-            state['user_questions'] = []
-        state['user_questions'].append(qa_entry)
-
-        # Update timestamp
-        state['updated_at'] = datetime.now(timezone.utc).isoformat()
+        # Append Q&A entry
+        now = datetime.now(timezone.utc).isoformat()
+        _apply_log_question(state, params.question, params.answer, params.timestamp, now)
+        timestamp = state['user_questions'][-1]['timestamp']
 
         # Save updated state
-        _save_state_file(scene_id, state)
+        _save_state_file(scene_id, state, event="question_logged")
 
         # Build response
         total_questions = len(state['user_questions'])
@@ -2563,53 +3607,816 @@ async def log_question_answer(params: LogQuestionAnswerInput) -> str:
         return _handle_error(e)
 
 
-# =============================================================================
-# FEAT-0003: Hierarchical Planning State Tools
-# =============================================================================
-
 @mcp.tool(
-    name="get_entity_state",
+    name="transition_steps",
     annotations={
-        "title": "Get Planning Entity State",
-        "readOnlyHint": True,
+        "title": "Apply Step Transitions (batch)",
+        "readOnlyHint": False,
         "destructiveHint": False,
-        "idempotentHint": True,
+        "idempotentHint": False,
         "openWorldHint": False
     }
 )
-async def get_entity_state_tool(params: GetEntityStateInput) -> str:
-    """
-    Get current state of a planning entity (act/chapter/scene).
+@offloaded(_tool_locks, key=_scene_lock_key)
+@_revision_retry
+def transition_steps(params: TransitionStepsInput) -> str:
+    """Apply an ordered list of step operations with one load and one save.
 
-    This tool retrieves the complete state of a planning entity from the
-    hierarchical planning state tracker, including status, version, parent
-    relationships, and children.
+    Replaces separate complete_step / start_step / log_question_answer calls:
+    e.g. complete step N and start step N+1 in one round trip. Operations are
+    validated exactly like the single-step tools and applied in order to one
+    copy of the state; the state is saved once (one journal event) only if
+    every operation applies. If one fails, nothing is saved.
 
     Args:
-        params (GetEntityStateInput): Validated input containing:
-            - entity_type (str): 'act', 'chapter', or 'scene'
-            - entity_id (str): Entity ID (e.g., 'act-1', 'chapter-02', 'scene-0204')
+        params (TransitionStepsInput): Validated input containing:
+            - scene_id (str): Scene ID (4 digits)
+            - operations (List[StepOperation]): 'start' / 'complete' / 'fail' /
+              'retry' (step_name, ...), 'log_question' (question, answer),
+              'set_artifacts' (artifacts)
+            - response_format (str): 'json' (default) or 'text'
 
     Returns:
-        str: JSON-formatted state or error message
-
-    Example:
-        >>> get_entity_state(entity_type='chapter', entity_id='chapter-02')
-        {
-          "entity_id": "chapter-02",
-          "status": "approved",
-          "version_hash": "a7f3b9d2...",
-          "parent_id": "act-1",
-          "children": ["scene-0201", "scene-0202", ...]
-        }
+        str: Compact JSON {scene_id, ok, revision, workflow_status, current_step,
+        next_step, results: [{op, step, result}]} or, on failure,
+        {ok: false, failed_op, error} with no changes made
     """
-    if not PLANNING_STATE_AVAILABLE:
-        return "❌ ERROR: Planning state module not available\n\n" \
-               "This feature requires planning_state_utils.py module."
+    scene_id = params.scene_id
 
     try:
-        state = _get_entity_state(params.entity_type, params.entity_id)
-
+        state = _load_state_file(scene_id)
+        if state is None:
+            return f"❌ ERROR: No state found for scene {scene_id}\n\n" \
+                   f"💡 Initialize first: start_generation(scene_id='{scene_id}', blueprint_path='...')"
+
+        now = datetime.now(timezone.utc).isoformat()
+        results = []
+        changed = False
+        for index, operation in enumerate(params.operations):
+            try:
+                result = _apply_step_operation(state, operation, now)
+            except TransitionError as e:
+                return _render_transition_failure(params, index, str(e))
+            changed = changed or result != "unchanged"
+            results.append({"op": operation.op, "step": operation.step_name, "result": result})
+
+        if changed:
+            steps = [operation.step_name for operation in params.operations if operation.step_name]
+            _save_state_file(scene_id, state, event="steps_transitioned", step=steps[-1] if steps else None)
+
+        return _render_transition_result(params, state, results)
+
+    except Exception as e:
+        return _handle_error(e)
+
+
+def _apply_step_operation(state: Dict[str, Any], operation: StepOperation, now: str) -> str:
+    """Apply one transition_steps operation; returns its result label."""
+    if operation.op == 'start':
+        _apply_start_step(state, operation.step_name, operation.metadata, now)
+        return "started"
+    if operation.op == 'complete':
+        changed = _apply_complete_step(
+            state, operation.step_name, operation.duration_seconds, operation.artifacts, operation.metadata, now
+        )
+        return "completed" if changed else "unchanged"
+    if operation.op == 'fail':
+        terminal = _apply_fail_step(state, operation.step_name, operation.failure_reason, operation.metadata, now)
+        return "failed_terminal" if terminal else "failed"
+    if operation.op == 'retry':
+        _apply_retry_step(state, operation.step_name, operation.metadata, now)
+        return "pending"
+    if operation.op == 'log_question':
+        _apply_log_question(state, operation.question, operation.answer, operation.timestamp, now)
+        return "logged"
+    _apply_set_artifacts(state, operation.artifacts, now)
+    return "set"
+
+
+def _next_step(state: Dict[str, Any]) -> Optional[str]:
+    """Step to start next, or None while the current one is unfinished."""
+    if state.get('workflow_status') in TERMINAL_WORKFLOW_STATUSES:
+        return None
+    current = state.get('current_step')
+    if current is None:
+        return STEP_ORDER[0]
+    # complete advances current_step to the next (not yet started) step
+    status = state['steps'].get(current, {}).get('status')
+    if status is None or status == StepStatus.PENDING.value:
+        return current
+    if status == StepStatus.COMPLETED.value:
+        index = _get_step_index(current)
+        return STEP_ORDER[index + 1] if index < len(STEP_ORDER) - 1 else None
+    return None
+
+
+def _render_transition_result(params: TransitionStepsInput, state: Dict[str, Any], results: List[Dict[str, Any]]) -> str:
+    result = {
+        "scene_id": params.scene_id,
+        "ok": True,
+        "revision": state.get('revision', 0),
+        "workflow_status": state.get('workflow_status'),
+        "current_step": state.get('current_step'),
+        "next_step": _next_step(state),
+        "results": results,
+    }
+    if params.response_format == 'json':
+        return dumps_compact(result)
+
+    lines = [f"✅ TRANSITIONS APPLIED: Scene {params.scene_id} ({len(results)} operations)", ""]
+    for item in results:
+        target = f" {item['step']}" if item['step'] else ""
+        lines.append(f"  - {item['op']}{target}: {item['result']}")
+    lines.append("")
+    lines.append(f"**Workflow**: {result['workflow_status']}, step {result['current_step']}")
+    lines.append(f"**Revision**: {result['revision']}")
+    if result['next_step']:
+        lines.append(f"**Next step**: {result['next_step']}")
+    return "\n".join(lines)
+
+
+def _render_transition_failure(params: TransitionStepsInput, index: int, message: str) -> str:
+    if params.response_format == 'json':
+        first_line = message.split("\n", 1)[0].replace("❌ ERROR: ", "")
+        return dumps_compact({
+            "scene_id": params.scene_id,
+            "ok": False,
+            "failed_op": index,
+            "op": params.operations[index].op,
+            "error": first_line,
+        })
+    return f"{message}\n\n" \
+           f"⚠️ Operation {index + 1} of {len(params.operations)} ({params.operations[index].op}) failed - " \
+           f"no operation was applied"
+
+
+# Batch Scheduling
+#
+# Multi-scene generation batches (see generation_batch_utils) are queued in
+# workspace/generation-batches.json. dispatch_generation_batch starts the
+# generation states of ready scenes within each batch's concurrency budget;
+# the coordinator runs the workflow of every dispatched scene and calls it
+# again whenever one finishes. Items are refreshed from generation states and
+# planning entities on every call, so step tools need not know about batches.
+
+BATCH_LOCK_KEY = ("batches",)
+
+# Planning statuses that keep a scene from being generated
+BLOCKING_PLANNING_STATUSES = ["requires-revalidation", "invalid"]
+
+
+def _batch_lock_key(params: BaseModel) -> tuple:
+    return BATCH_LOCK_KEY
+
+
+def _batch_queue_path() -> Path:
+    return WORKSPACE_PATH / GENERATION_BATCHES_FILE
+
+
+def _scene_id_of(entity_id: str) -> Optional[str]:
+    """Generation scene ID of a scene entity ('scene-0204' -> '0204')."""
+    suffix = entity_id[len("scene-"):]
+    return suffix if entity_id.startswith("scene-") and suffix.isdigit() and len(suffix) == 4 else None
+
+
+def _resolve_batch_scenes(params: ScheduleGenerationBatchInput) -> Tuple[str, List[Dict[str, Any]]]:
+    """Scenes of a batch with blueprint paths and planning dependencies.
+
+    Returns:
+        Tuple of (label, scenes [{scene_id, blueprint_path, planning}]) where
+        planning lists the scene, chapter and act entities the scene depends on
+
+    Raises:
+        ValueError: If the chapter or a scene is not in planning state
+    """
+    if not PLANNING_STATE_AVAILABLE:
+        raise ValueError("Planning state utilities not available - batches need planning_entities")
+
+    chains: Dict[str, List[List[str]]] = {}
+
+    def ancestors(chapter_id: Optional[str]) -> List[List[str]]:
+        if chapter_id is None:
+            return []
+        if chapter_id not in chains:
+            chapter = _get_entity_state('chapter', chapter_id)
+            chains[chapter_id] = [['chapter', chapter_id]]
+            if chapter and chapter.get('parent_id'):
+                chains[chapter_id].append(['act', chapter['parent_id']])
+        return chains[chapter_id]
+
+    if params.chapter_id:
+        if _get_entity_state('chapter', params.chapter_id) is None:
+            raise ValueError(f"Chapter {params.chapter_id} not found in planning state")
+        entities = [
+            entity for entity in get_all_descendants('chapter', params.chapter_id)
+            if entity['entity_type'] == 'scene' and _scene_id_of(entity['entity_id'])
+        ]
+        if not entities:
+            raise ValueError(f"Chapter {params.chapter_id} has no scenes in planning state")
+        label = params.chapter_id
+    else:
+        entities, missing = [], []
+        for scene_id in params.scene_ids:
+            entity = _get_entity_state('scene', f"scene-{scene_id}")
+            if entity is None:
+                missing.append(scene_id)
+            else:
+                entities.append(entity)
+        if missing:
+            raise ValueError(f"Scenes not found in planning state: {', '.join(missing)}")
+        label = "scenes"
+
+    scenes = [
+        {
+            "scene_id": _scene_id_of(entity['entity_id']),
+            "blueprint_path": entity['file_path'],
+            "planning": [['scene', entity['entity_id']]] + ancestors(entity.get('parent_id')),
+        }
+        for entity in entities
+    ]
+    return label, scenes
+
+
+def _planning_blockers(batch: Dict[str, Any], entities: Dict[Tuple[str, str], Any]) -> Dict[str, Optional[str]]:
+    """Planning reason each scene cannot be generated (entities memoized per call)."""
+    blockers = {}
+    for item in batch['items']:
+        reason = None
+        if PLANNING_STATE_AVAILABLE:
+            for entity_type, entity_id in item['planning']:
+                key = (entity_type, entity_id)
+                if key not in entities:
+                    entities[key] = _get_entity_state(entity_type, entity_id)
+                entity = entities[key]
+                if entity is None:
+                    reason = f"{entity_id} not in planning state"
+                elif entity['status'] in BLOCKING_PLANNING_STATUSES:
+                    reason = f"{entity_id} is {entity['status']}"
+                if reason:
+                    break
+        blockers[item['scene_id']] = reason
+    return blockers
+
+
+def _refresh_batches(
+    queue: Dict[str, Any],
+    batch_ids: Optional[List[str]] = None
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Refresh items of the given batches (default: all) from states and planning.
+
+    Returns:
+        {scene_id: generation state or None} of the scenes involved
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    states: Dict[str, Optional[Dict[str, Any]]] = {}
+    entities: Dict[Tuple[str, str], Any] = {}
+    for batch_id, batch in queue['batches'].items():
+        if batch_ids is not None and batch_id not in batch_ids:
+            continue
+        workflows = {}
+        for item in batch['items']:
+            if item['scene_id'] not in states:
+                states[item['scene_id']] = _load_state_file(item['scene_id'])
+            state = states[item['scene_id']]
+            if state is not None:
+                workflows[item['scene_id']] = (state.get('workflow_status'), state.get('session_id'))
+        refresh_batch(batch, workflows, _planning_blockers(batch, entities), now)
+    return states
+
+
+def _start_batch_scene(batch: Dict[str, Any], item: Dict[str, Any]) -> str:
+    """Start the generation state of a dispatched scene; returns its session ID.
+
+    A scene already IN_PROGRESS is adopted as is; a terminal state from an
+    earlier run is replaced (its revisions continue).
+    """
+    scene_id = item['scene_id']
+    with file_lock(_state_lock_path(_get_state_file_path(scene_id))):
+        existing = _load_state_file(scene_id)
+        if existing and existing.get('workflow_status') not in TERMINAL_WORKFLOW_STATUSES:
+            return existing.get('session_id')
+
+        state = _initialize_state_structure(
+            scene_id=scene_id,
+            blueprint_path=item['blueprint_path'],
+            initiated_by=batch['initiated_by'],
+            metadata={"batch_id": batch['batch_id']}
+        )
+        if existing:
+            state['revision'] = existing.get('revision', 0)
+        _save_state_file(scene_id, state, event="generation_started")
+        return state['session_id']
+
+
+def _steps_done(state: Optional[Dict[str, Any]]) -> Tuple[int, int]:
+    steps = (state or {}).get('steps', {})
+    completed = sum(1 for step in steps.values() if step.get('status') == StepStatus.COMPLETED.value)
+    return completed, len(STEP_ORDER)
+
+
+def _render_batch_items(batch: Dict[str, Any]) -> List[str]:
+    lines = []
+    for item in batch['items']:
+        line = f"  - {item['scene_id']}: {item['status']}"
+        if item['reason']:
+            line += f" - {item['reason']}"
+        lines.append(line)
+    return lines
+
+
+@mcp.tool(
+    name="schedule_generation_batch",
+    annotations={
+        "title": "Schedule Multi-Scene Generation Batch",
+        "readOnlyHint": False,
+        "destructiveHint": False,
+        "idempotentHint": False,
+        "openWorldHint": False
+    }
+)
+@offloaded(_tool_locks, key=_batch_lock_key)
+def schedule_generation_batch(params: ScheduleGenerationBatchInput) -> str:
+    """Queue generation of a chapter (or list of scenes) as one batch.
+
+    Scenes come from planning_entities: the chapter's scenes in plan order,
+    with their blueprint paths. A scene is held back (blocked) while its
+    blueprint, chapter or act is invalid or requires-revalidation; with
+    follow_plan_order it also waits for the previous scene. Nothing is
+    started here - call dispatch_generation_batch.
+
+    Args:
+        params (ScheduleGenerationBatchInput): Validated input containing:
+            - chapter_id (str) or scene_ids (List[str]): Scenes to generate
+            - priority (int): Higher dispatches first (default 50)
+            - max_concurrent (int): Concurrency budget of the batch (default 3)
+            - follow_plan_order (bool): Generate scenes one after another
+            - regenerate (bool): Also regenerate COMPLETED scenes
+            - initiated_by (str): Name of initiator
+            - response_format (str): 'text' or 'json'
+
+    Returns:
+        str: Batch ID and the initial status of every scene
+
+    Example:
+        >>> schedule_generation_batch(chapter_id='chapter-02', max_concurrent=3)
+        ✅ BATCH SCHEDULED: batch-20261017-220000-chapter-02
+        ...
+    """
+    try:
+        label, scenes = _resolve_batch_scenes(params)
+        queue_path = _batch_queue_path()
+
+        with queue_lock(queue_path):
+            queue = load_queue(queue_path)
+            now = datetime.now(timezone.utc).isoformat()
+            base_id = f"batch-{now[:10].replace('-', '')}-{now[11:19].replace(':', '')}-{label}"
+            batch_id, suffix = base_id, 2
+            while batch_id in queue['batches']:
+                batch_id, suffix = f"{base_id}-{suffix}", suffix + 1
+
+            queue['batches'][batch_id] = new_batch(
+                batch_id=batch_id,
+                label=label,
+                scenes=scenes,
+                priority=params.priority,
+                max_concurrent=params.max_concurrent,
+                follow_plan_order=params.follow_plan_order,
+                regenerate=params.regenerate,
+                initiated_by=params.initiated_by,
+                now=now
+            )
+            _refresh_batches(queue, [batch_id])
+            save_queue(queue_path, queue)
+
+        batch = queue['batches'][batch_id]
+        progress = batch_progress(batch, {})
+        if params.response_format == 'json':
+            return json.dumps(progress, indent=2)
+
+        lines = [
+            f"✅ BATCH SCHEDULED: {batch_id}",
+            "",
+            f"**Scenes**: {progress['scenes']} ({label})",
+            f"**Priority**: {batch['priority']}",
+            f"**Concurrency budget**: {batch['max_concurrent']}",
+            f"**Plan order**: {'sequential' if batch['follow_plan_order'] else 'parallel'}",
+            "",
+        ]
+        lines.extend(_render_batch_items(batch))
+        lines.extend(["", f"🚀 Next: dispatch_generation_batch(batch_id='{batch_id}')"])
+        return "\n".join(lines)
+
+    except Exception as e:
+        return _handle_error(e)
+
+
+@mcp.tool(
+    name="dispatch_generation_batch",
+    annotations={
+        "title": "Dispatch Ready Scenes of Generation Batches",
+        "readOnlyHint": False,
+        "destructiveHint": False,
+        "idempotentHint": False,
+        "openWorldHint": False
+    }
+)
+@offloaded(_tool_locks, key=_batch_lock_key)
+def dispatch_generation_batch(params: DispatchGenerationBatchInput) -> str:
+    """Start generation of the next ready scenes, up to each batch's budget.
+
+    Refreshes every batch from the generation states (finished scenes free
+    their slot), then starts the ready scenes - highest priority batch first,
+    in plan order - like start_generation. The caller runs the generation
+    workflow of each returned scene (e.g. one sub-agent per scene) and calls
+    this tool again when a scene finishes.
+
+    Args:
+        params (DispatchGenerationBatchInput): Validated input containing:
+            - batch_id (Optional[str]): Only this batch
+            - limit (Optional[int]): Maximum scenes to start now
+            - response_format (str): 'json' (default) or 'text'
+
+    Returns:
+        str: Compact JSON {dispatched: [{batch_id, scene_id, blueprint_path,
+        session_id}], running, queued, blocked}
+    """
+    try:
+        queue_path = _batch_queue_path()
+
+        with queue_lock(queue_path):
+            queue = load_queue(queue_path)
+            if params.batch_id and params.batch_id not in queue['batches']:
+                return f"❌ ERROR: Batch {params.batch_id} not found\n\n" \
+                       f"💡 List batches: get_batch_progress(include_done=True)"
+
+            _refresh_batches(queue)
+            now = datetime.now(timezone.utc).isoformat()
+            dispatched = []
+            for batch, item in select_ready(queue, params.batch_id, params.limit):
+                session_id = _start_batch_scene(batch, item)
+                mark_dispatched(item, session_id, now)
+                dispatched.append({
+                    "batch_id": batch['batch_id'],
+                    "scene_id": item['scene_id'],
+                    "blueprint_path": item['blueprint_path'],
+                    "session_id": session_id,
+                })
+            save_queue(queue_path, queue)
+
+        batches = [b for b in queue['batches'].values() if params.batch_id in (None, b['batch_id'])]
+        items = [item for batch in batches for item in batch['items']]
+        counts = {status: sum(item['status'] == status for item in items)
+                  for status in (ITEM_RUNNING, ITEM_QUEUED, ITEM_BLOCKED)}
+
+        if params.response_format == 'json':
+            return dumps_compact({"dispatched": dispatched, **counts})
+
+        if not dispatched:
+            lines = ["⏸️ NOTHING TO DISPATCH", ""]
+        else:
+            lines = [f"🚀 DISPATCHED {len(dispatched)} SCENES", ""]
+            for entry in dispatched:
+                lines.append(f"  - {entry['scene_id']} ({entry['batch_id']}): {entry['blueprint_path']}")
+            lines.append("")
+        lines.append(f"**Running**: {counts[ITEM_RUNNING]}, **queued**: {counts[ITEM_QUEUED]}, "
+                     f"**blocked**: {counts[ITEM_BLOCKED]}")
+        if dispatched:
+            lines.extend(["", "💡 Run the generation workflow of each scene, then call dispatch_generation_batch again"])
+        return "\n".join(lines)
+
+    except Exception as e:
+        return _handle_error(e)
+
+
+@mcp.tool(
+    name="get_batch_progress",
+    annotations={
+        "title": "Get Generation Batch Progress",
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": False
+    }
+)
+@offloaded()
+def get_batch_progress(params: GetBatchProgressInput) -> str:
+    """Report aggregate progress of generation batches.
+
+    Statuses are refreshed from the generation states (not saved). Percent
+    counts finished scenes plus the completed steps of running ones.
+
+    Args:
+        params (GetBatchProgressInput): Validated input containing:
+            - batch_id (Optional[str]): Only this batch
+            - include_done (bool): Include finished batches
+            - response_format (str): 'text' or 'json'
+
+    Returns:
+        str: Per batch: status, percent, scene counts by status and scene list
+    """
+    try:
+        queue = load_queue(_batch_queue_path())
+        if params.batch_id and params.batch_id not in queue['batches']:
+            return f"❌ ERROR: Batch {params.batch_id} not found"
+
+        batch_ids = [params.batch_id] if params.batch_id else list(queue['batches'])
+        states = _refresh_batches(queue, batch_ids)
+        reports = []
+        for batch_id in batch_ids:
+            batch = queue['batches'][batch_id]
+            if not params.batch_id and not params.include_done and batch_status(batch) == BATCH_DONE:
+                continue
+            running = [item['scene_id'] for item in batch['items'] if item['status'] == ITEM_RUNNING]
+            reports.append(batch_progress(batch, {scene_id: _steps_done(states.get(scene_id)) for scene_id in running}))
+
+        if params.response_format == 'json':
+            return json.dumps({"batches": reports}, indent=2)
+
+        if not reports:
+            return "📦 No generation batches in progress\n\n" \
+                   "💡 Schedule one: schedule_generation_batch(chapter_id='chapter-02')"
+
+        lines = [f"📦 GENERATION BATCHES ({len(reports)})", ""]
+        for report in reports:
+            counts = ", ".join(f"{status} {count}" for status, count in report['counts'].items() if count)
+            lines.append(f"**{report['batch_id']}** ({report['label']}) - {report['status']}, {report['percent']}%")
+            lines.append(f"  Priority {report['priority']}, budget {report['max_concurrent']} | {counts}")
+            for item in report['items']:
+                line = f"  - {item['scene_id']}: {item['status']}"
+                if 'steps' in item:
+                    line += f" (steps {item['steps']})"
+                if 'reason' in item:
+                    line += f" - {item['reason']}"
+                lines.append(line)
+            lines.append("")
+        return "\n".join(lines).rstrip()
+
+    except Exception as e:
+        return _handle_error(e)
+
+
+@mcp.tool(
+    name="cancel_generation_batch",
+    annotations={
+        "title": "Cancel Generation Batch",
+        "readOnlyHint": False,
+        "destructiveHint": True,
+        "idempotentHint": True,
+        "openWorldHint": False
+    }
+)
+@offloaded(_tool_locks, key=_batch_lock_key)
+def cancel_generation_batch(params: CancelGenerationBatchInput) -> str:
+    """Cancel the scenes of a batch that were not dispatched yet.
+
+    Running scenes are left to finish; cancel them individually with
+    cancel_generation if needed.
+
+    Args:
+        params (CancelGenerationBatchInput): Validated input containing:
+            - batch_id (str): Batch to cancel
+
+    Returns:
+        str: Number of cancelled scenes and the scenes still running
+    """
+    try:
+        queue_path = _batch_queue_path()
+        with queue_lock(queue_path):
+            queue = load_queue(queue_path)
+            batch = queue['batches'].get(params.batch_id)
+            if batch is None:
+                return f"❌ ERROR: Batch {params.batch_id} not found"
+            pending = sum(item['status'] in (ITEM_QUEUED, ITEM_BLOCKED) for item in batch['items'])
+            running = cancel_batch(batch, datetime.now(timezone.utc).isoformat())
+            save_queue(queue_path, queue)
+
+        lines = [f"✅ BATCH CANCELLED: {params.batch_id}", "", f"**Cancelled scenes**: {pending}"]
+        if running:
+            lines.append(f"**Still running**: {', '.join(running)}")
+            lines.extend(["", f"💡 Stop a scene: cancel_generation(scene_id='{running[0]}')"])
+        return "\n".join(lines)
+
+    except Exception as e:
+        return _handle_error(e)
+
+
+@mcp.tool(
+    name="get_state_cache_stats",
+    annotations={
+        "title": "Get State Cache Diagnostics",
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": False
+    }
+)
+@offloaded()
+def get_state_cache_stats(params: GetStateCacheStatsInput) -> str:
+    """
+    Report hit/miss counters of the in-process generation state cache.
+
+    State files are cached per scene and resolved path, and revalidated by
+    mtime and size on every read. This tool shows how effective the cache is.
+
+    Args:
+        params (GetStateCacheStatsInput): Validated input containing:
+            - reset (bool): Clear cache and counters after reporting
+            - response_format (str): 'text' or 'json' (default: 'text')
+
+    Returns:
+        str: Cache statistics
+
+    Example:
+        >>> get_state_cache_stats()
+        🗄️ STATE CACHE
+        **Hits**: 42
+        **Misses**: 3
+        ...
+    """
+    try:
+        stats = _state_cache.stats()
+        if params.reset:
+            _state_cache.clear()
+
+        if params.response_format == 'json':
+            return json.dumps(stats, indent=2)
+
+        lines = [
+            "🗄️ STATE CACHE",
+            "",
+            f"**Hits**: {stats['hits']}",
+            f"**Misses**: {stats['misses']}",
+            f"**Hit rate**: {stats['hit_rate'] * 100:.1f}%",
+            f"**Evictions**: {stats['evictions']}",
+            f"**Entries**: {stats['entries']}/{stats['max_entries']}"
+        ]
+        if params.reset:
+            lines.extend(["", "♻️ Cache cleared and counters reset"])
+
+        return "\n".join(lines)
+
+    except Exception as e:
+        return _handle_error(e)
+
+
+@mcp.tool(
+    name="get_step_timing_report",
+    annotations={
+        "title": "Get Step Timing Analytics",
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": False
+    }
+)
+@offloaded()
+def get_step_timing_report(params: GetStepTimingReportInput) -> str:
+    """Report where generation wall-clock time goes, across all generations.
+
+    Reads the timing summaries kept in the generation catalog (only state
+    files changed since the last call are re-read): per step p50/p90/p99
+    duration of completed runs, share of total step time, failures and retry
+    rate; workflow totals; a histogram of failure reasons; and, from
+    workflow orchestration states, step durations and the time human
+    checkpoints (step 3) waited for approval.
+
+    Args:
+        params (GetStepTimingReportInput): Validated input containing:
+            - since (Optional[str]): Only workflows started from this date
+            - top_failure_reasons (int): Histogram size (default 10)
+            - response_format (str): 'text' (tables) or 'json'
+
+    Returns:
+        str: Markdown tables or JSON {generations, workflows, steps,
+        workflow_total, failure_reasons, workflow_steps, approval_waits}
+    """
+    try:
+        session_name, corrupted = _reconcile_catalog(include_workflows=True)
+        generations, workflows = _catalog_query_timings(_catalog_db_path(), session_name, params.since)
+        report = build_report(generations, workflows, STEP_ORDER, params.top_failure_reasons)
+        if corrupted:
+            report['corrupted_files'] = corrupted
+
+        if params.response_format == 'json':
+            return json.dumps(report, indent=2, ensure_ascii=False)
+        return _render_timing_report(report, params)
+
+    except Exception as e:
+        return _handle_error(e)
+
+
+def _timing_cells(row: Dict[str, Any]) -> List[str]:
+    return [
+        _format_duration(row[key]) if row[key] is not None else "-"
+        for key in ('p50', 'p90', 'p99', 'total_seconds')
+    ]
+
+
+def _render_timing_report(report: Dict[str, Any], params: GetStepTimingReportInput) -> str:
+    scope = f" since {params.since}" if params.since else ""
+    lines = [
+        f"⏱️ STEP TIMING REPORT ({report['generations']} generations, {report['workflows']} workflows{scope})",
+        ""
+    ]
+
+    if report['steps']:
+        lines.extend([
+            "| Step | Runs | Completed | p50 | p90 | p99 | Total | Share | Failures | Retry rate |",
+            "|------|------|-----------|-----|-----|-----|-------|-------|----------|------------|",
+        ])
+        for row in report['steps']:
+            p50, p90, p99, total = _timing_cells(row)
+            lines.append(
+                f"| {row['step']} | {row['runs']} | {row['count']} | {p50} | {p90} | {p99} | {total} | "
+                f"{row['share']}% | {row['failures']} | {row['retry_rate'] * 100:.1f}% |"
+            )
+        lines.append("")
+    else:
+        lines.extend(["No generation steps recorded yet", ""])
+
+    total = report['workflow_total']
+    if total['count']:
+        p50, p90, p99, _ = _timing_cells(total)
+        lines.extend([f"**Completed workflows**: {total['count']} (p50 {p50}, p90 {p90}, p99 {p99})", ""])
+
+    if report['approval_waits']:
+        lines.extend(["**Human approval waits**:", "",
+                      "| Workflow | Step | Waits | p50 | p90 | p99 | Total |",
+                      "|----------|------|-------|-----|-----|-----|-------|"])
+        for row in report['approval_waits']:
+            p50, p90, p99, total_wait = _timing_cells(row)
+            lines.append(f"| {row['workflow_type']} | {row['step']} | {row['count']} | {p50} | {p90} | {p99} | {total_wait} |")
+        lines.append("")
+
+    if report['workflow_steps']:
+        lines.extend(["**Workflow steps** (orchestration states):", "",
+                      "| Workflow | Step | Completed | p50 | p90 | p99 | Total |",
+                      "|----------|------|-----------|-----|-----|-----|-------|"])
+        for row in report['workflow_steps']:
+            p50, p90, p99, total_step = _timing_cells(row)
+            lines.append(f"| {row['workflow_type']} | {row['step']} | {row['count']} | {p50} | {p90} | {p99} | {total_step} |")
+        lines.append("")
+
+    if report['failure_reasons']:
+        lines.append("**Top failure reasons**:")
+        for entry in report['failure_reasons']:
+            lines.append(f"  - {entry['count']}× {entry['reason']}")
+        lines.append("")
+
+    if report.get('corrupted_files'):
+        lines.append(f"⚠️ Skipped unreadable files: {', '.join(report['corrupted_files'])}")
+
+    return "\n".join(lines).rstrip()
+
+
+# =============================================================================
+# FEAT-0003: Hierarchical Planning State Tools
+# =============================================================================
+
+@mcp.tool(
+    name="get_entity_state",
+    annotations={
+        "title": "Get Planning Entity State",
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": False
+    }
+)
+@offloaded()
+def get_entity_state_tool(params: GetEntityStateInput) -> str:
+    """
+    Get current state of a planning entity (act/chapter/scene).
+
+    This tool retrieves the complete state of a planning entity from the
+    hierarchical planning state tracker, including status, version, parent
+    relationships, and children.
+
+    Args:
+        params (GetEntityStateInput): Validated input containing:
+            - entity_type (str): 'act', 'chapter', or 'scene'
+            - entity_id (str): Entity ID (e.g., 'act-1', 'chapter-02', 'scene-0204')
+
+    Returns:
+        str: JSON-formatted state or error message
+
+    Example:
+        >>> get_entity_state(entity_type='chapter', entity_id='chapter-02')
+        {
+          "entity_id": "chapter-02",
+          "status": "approved",
+          "version_hash": "a7f3b9d2...",
+          "parent_id": "act-1",
+          "children": ["scene-0201", "scene-0202", ...]
+        }
+    """
+    if not PLANNING_STATE_AVAILABLE:
+        return "❌ ERROR: Planning state module not available\n\n" \
+               "This feature requires planning_state_utils.py module."
+
+    try:
+        state = _get_entity_state(params.entity_type, params.entity_id)
+
         if state is None:
             return f"❌ ERROR: Entity not found: {params.entity_type}/{params.entity_id}\n\n" \
                    f"The entity has not been created yet or state was deleted."
@@ -2631,7 +4438,8 @@ async def get_entity_state_tool(params: GetEntityStateInput) -> str:
         "openWorldHint": False
     }
 )
-async def update_entity_state_tool(params: UpdateEntityStateInput) -> str:
+@offloaded(_tool_locks, key=_planning_lock_key)
+def update_entity_state_tool(params: UpdateEntityStateInput) -> str:
     """
     Update or create planning entity state.
 
@@ -2694,7 +4502,8 @@ async def update_entity_state_tool(params: UpdateEntityStateInput) -> str:
         "openWorldHint": False
     }
 )
-async def get_hierarchy_tree_tool(params: GetHierarchyTreeInput) -> str:
+@offloaded()
+def get_hierarchy_tree_tool(params: GetHierarchyTreeInput) -> str:
     """
     Get complete hierarchy tree for an act with all descendants.
 
@@ -2705,9 +4514,13 @@ async def get_hierarchy_tree_tool(params: GetHierarchyTreeInput) -> str:
         params (GetHierarchyTreeInput): Validated input containing:
             - act_id (str): Act ID (e.g., 'act-1')
             - include_status (bool): Include status for each node (default: True)
+            - response_format (str): 'text' or 'json' (default: 'text')
+            - limit (int): Chapters per page (default: 50)
+            - cursor (Optional[str]): next_cursor from previous page
 
     Returns:
-        str: Formatted tree structure or error message
+        str: Formatted tree structure (or JSON with status counts) or error message.
+        Large acts are paginated by chapter; status counts always cover the whole act.
 
     Example:
         >>> get_hierarchy_tree(act_id='act-1')
@@ -2723,76 +4536,75 @@ async def get_hierarchy_tree_tool(params: GetHierarchyTreeInput) -> str:
         return "❌ ERROR: Planning state module not available"
 
     try:
-        # Get act state
-        act_state = _get_entity_state('act', params.act_id)
+        # Load whole act subtree in one query
+        tree = _get_hierarchy_tree(params.act_id)
 
-        if act_state is None:
+        if tree is None:
             return f"❌ ERROR: Act not found: {params.act_id}"
 
-        # Build tree
-        lines = []
-        lines.append(f"📊 HIERARCHY TREE: {params.act_id}")
-        lines.append("")
-
-        # Add act
-        status_str = f" [{act_state['status']}]" if params.include_status else ""
-        lines.append(f"{params.act_id}{status_str}")
-
-        # Get all chapters
-        chapters = []
-        for child_id in act_state.get('children', []):
-            if child_id.startswith('chapter-'):
-                chapter_state = _get_entity_state('chapter', child_id)
-                if chapter_state:
-                    chapters.append(chapter_state)
-
-        # Sort chapters by numeric portion of ID for natural order
-        def _chapter_numeric_id(chapter):
-            # Assumes entity_id format is 'chapter-<number>'
-            try:
-                return int(chapter['entity_id'].split('-')[1])
-            except (IndexError, ValueError):
-                return 0  # fallback to 0 if format is unexpected
+        status_counts = tree.status_counts()
 
-        chapters.sort(key=_chapter_numeric_id)
+        fingerprint = query_fingerprint(tool="get_hierarchy_tree", act_id=params.act_id)
+        page = paginate(tree.children, lambda chapter: chapter.entity_id, params.limit, params.cursor, fingerprint)
 
-        for i, chapter in enumerate(chapters):
-            is_last_chapter = (i == len(chapters) - 1)
-            chapter_prefix = "└──" if is_last_chapter else "├──"
+        if params.response_format == 'json':
+            def render_json(p: Page) -> str:
+                return json.dumps({
+                    "act_id": params.act_id,
+                    "status_counts": status_counts,
+                    "tree": replace(tree, children=p.items).to_dict(include_status=params.include_status),
+                    "total_chapters": p.total,
+                    "offset": p.start,
+                    "next_cursor": p.next_cursor
+                }, separators=(',', ':'), ensure_ascii=False)
 
-            status_str = f" [{chapter['status']}]" if params.include_status else ""
-            lines.append(f"{chapter_prefix} {chapter['entity_id']}{status_str}")
+            text, _ = render_within_limit(page, render_json)
+            return text
 
-            # Get scenes for this chapter
-            scenes = []
-            for child_id in chapter.get('children', []):
-                if child_id.startswith('scene-'):
-                    scene_state = _get_entity_state('scene', child_id)
-                    if scene_state:
-                        scenes.append(scene_state)
+        text, _ = render_within_limit(page, lambda p: _render_hierarchy_page(p, tree, status_counts, params))
+        return text
 
-            # Sort scenes by ID
-            scenes.sort(key=lambda s: s['entity_id'])
+    except CursorError as e:
+        return f"❌ ERROR: {str(e)}"
+    except Exception as e:
+        return f"❌ ERROR: Failed to build hierarchy tree\n\n{str(e)}"
 
-            for j, scene in enumerate(scenes):
-                is_last_scene = (j == len(scenes) - 1)
-                scene_branch = "    " if is_last_chapter else "│   "
-                scene_prefix = "└──" if is_last_scene else "├──"
 
-                status_str = f" [{scene['status']}]" if params.include_status else ""
-                lines.append(f"{scene_branch}{scene_prefix} {scene['entity_id']}{status_str}")
+def _render_hierarchy_page(
+    page: Page,
+    tree: Any,
+    status_counts: Dict[str, Dict[str, int]],
+    params: GetHierarchyTreeInput
+) -> str:
+    """Render one page of chapters of get_hierarchy_tree as a text tree."""
+    lines = []
+    lines.append(f"📊 HIERARCHY TREE: {params.act_id}")
+    if len(page.items) < page.total:
+        lines.append(f"Chapters {page.start + 1}–{page.start + len(page.items)} of {page.total}")
+    lines.append("")
+    lines.extend(replace(tree, children=page.items).render_lines(include_status=params.include_status))
 
+    if params.include_status and len(status_counts) > 1:
         lines.append("")
-        lines.append("Legend:")
-        lines.append("  - draft: Plan created, not yet approved")
-        lines.append("  - approved: Approved for next level / generation")
-        lines.append("  - requires-revalidation: Parent changed, needs review")
-        lines.append("  - invalid: Deprecated, should not be used")
+        lines.append("Status summary:")
+        for entity_type in ('chapter', 'scene'):
+            counts = status_counts.get(entity_type)
+            if counts:
+                summary = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items()))
+                lines.append(f"  - {entity_type}s ({sum(counts.values())}): {summary}")
 
-        return "\n".join(lines)
+    lines.append("")
+    lines.append("Legend:")
+    lines.append("  - draft: Plan created, not yet approved")
+    lines.append("  - approved: Approved for next level / generation")
+    lines.append("  - requires-revalidation: Parent changed, needs review")
+    lines.append("  - invalid: Deprecated, should not be used")
 
-    except Exception as e:
-        return f"❌ ERROR: Failed to build hierarchy tree\n\n{str(e)}"
+    if page.next_cursor:
+        lines.append("")
+        lines.append(f"➡️ Next page: get_hierarchy_tree(act_id='{params.act_id}', cursor='{page.next_cursor}')")
+
+    return "\n".join(lines)
 
 
 @mcp.tool(
@@ -2805,7 +4617,8 @@ async def get_hierarchy_tree_tool(params: GetHierarchyTreeInput) -> str:
         "openWorldHint": False
     }
 )
-async def cascade_invalidate_tool(params: CascadeInvalidateInput) -> str:
+@offloaded(_tool_locks, key=_planning_lock_key)
+def cascade_invalidate_tool(params: CascadeInvalidateInput) -> str:
     """
     Mark entity and all descendants as requires-revalidation.
 
@@ -2813,13 +4626,16 @@ async def cascade_invalidate_tool(params: CascadeInvalidateInput) -> str:
     All children are marked as requires-revalidation to ensure they are reviewed
     against the new parent plan.
 
-    Transaction-based: all-or-nothing operation.
+    Transaction-based: all-or-nothing operation, executed as a single
+    set-based UPDATE over the descendant subtree. With dry_run=True the
+    blast radius is reported without writing anything.
 
     Args:
         params (CascadeInvalidateInput): Validated input containing:
             - entity_type (str): Entity type
             - entity_id (str): Entity ID
             - reason (str): Invalidation reason
+            - dry_run (bool): Preview only (default: False)
 
     Returns:
         str: Summary of invalidated entities or error message
@@ -2843,7 +4659,8 @@ async def cascade_invalidate_tool(params: CascadeInvalidateInput) -> str:
         result = _cascade_invalidate(
             entity_type=params.entity_type,
             entity_id=params.entity_id,
-            reason=params.reason
+            reason=params.reason,
+            dry_run=params.dry_run
         )
 
         if not result['success']:
@@ -2852,23 +4669,37 @@ async def cascade_invalidate_tool(params: CascadeInvalidateInput) -> str:
 
         invalidated = result['invalidated_entities']
 
-        lines = [
-            f"✅ CASCADE INVALIDATION COMPLETE",
-            "",
-            f"**Entity**: {params.entity_type}/{params.entity_id}",
-            f"**Reason**: {params.reason}",
-            f"**Invalidated**: {len(invalidated)} entities",
-            ""
-        ]
+        if params.dry_run:
+            lines = [
+                f"🔍 CASCADE INVALIDATION PREVIEW (dry run, nothing written)",
+                "",
+                f"**Entity**: {params.entity_type}/{params.entity_id}",
+                f"**Reason**: {params.reason}",
+                f"**Would invalidate**: {len(invalidated)} entities",
+                ""
+            ]
+        else:
+            lines = [
+                f"✅ CASCADE INVALIDATION COMPLETE",
+                "",
+                f"**Entity**: {params.entity_type}/{params.entity_id}",
+                f"**Reason**: {params.reason}",
+                f"**Invalidated**: {len(invalidated)} entities",
+                ""
+            ]
 
         if invalidated:
-            lines.append("📝 Invalidated entities:")
+            lines.append("📝 Would be invalidated:" if params.dry_run else "📝 Invalidated entities:")
             for entity in invalidated:
                 lines.append(
                     f"  - {entity['entity_id']}: "
                     f"{entity['previous_status']} → {entity['new_status']}"
                 )
             lines.append("")
+            if params.dry_run:
+                lines.append("💡 Re-run with dry_run=false to apply")
+                return "\n".join(lines)
+
             lines.append("💡 Next steps:")
             lines.append("  - Review each invalidated entity")
             lines.append("  - Revalidate: /revalidate-scene <scene_id>")
@@ -2892,7 +4723,8 @@ async def cascade_invalidate_tool(params: CascadeInvalidateInput) -> str:
         "openWorldHint": False
     }
 )
-async def get_children_status_tool(params: GetChildrenStatusInput) -> str:
+@offloaded()
+def get_children_status_tool(params: GetChildrenStatusInput) -> str:
     """
     Get status summary of all children for an entity.
 
@@ -2981,7 +4813,8 @@ async def get_children_status_tool(params: GetChildrenStatusInput) -> str:
         "openWorldHint": False
     }
 )
-async def approve_entity_tool(params: ApproveEntityInput) -> str:
+@offloaded(_tool_locks, key=_planning_lock_key)
+def approve_entity_tool(params: ApproveEntityInput) -> str:
     """
     Approve a planning entity (change status from draft to approved).
 
@@ -3089,12 +4922,13 @@ async def approve_entity_tool(params: ApproveEntityInput) -> str:
         "openWorldHint": False
     }
 )
-async def create_backup_tool(params: CreateBackupInput) -> str:
+@offloaded(_tool_locks, key=_planning_lock_key)
+def create_backup_tool(params: CreateBackupInput) -> str:
     """
-    Create timestamped backup of a planning file.
+    Create backup of a planning file.
 
-    This tool creates a backup in the backups/ subdirectory with timestamp.
-    Logs backup to database for version history tracking.
+    The content is stored once in the workspace blob store (identical versions
+    share one blob) and logged to the database for version history tracking.
 
     Args:
         params (CreateBackupInput): Validated input containing:
@@ -3110,7 +4944,7 @@ async def create_backup_tool(params: CreateBackupInput) -> str:
         ✅ Backup created successfully
 
         Backup ID: 42
-        File: acts/act-1/chapters/chapter-02/backups/plan-2025-11-12-15-30-45.md
+        File: blob:sha256:a1b2c3d4...
         Version: a1b2c3d4...
         Reason: manual
     """
@@ -3142,6 +4976,10 @@ async def create_backup_tool(params: CreateBackupInput) -> str:
                 f"**File**: {result['backup_path']}",
                 f"**Version**: {result.get('version_hash', 'N/A')[:8]}...",
                 f"**Reason**: {params.reason}",
+            ])
+            if result.get('deduplicated'):
+                lines.append("**Storage**: identical content already stored (no new blob)")
+            lines.extend([
                 "",
                 "💡 To restore this backup:",
                 f"  restore_backup(entity_type='{params.entity_type}', entity_id='{params.entity_id}', backup_id={result.get('backup_id', 'N/A')})"
@@ -3165,7 +5003,8 @@ async def create_backup_tool(params: CreateBackupInput) -> str:
         "openWorldHint": False
     }
 )
-async def list_backups_tool(params: ListBackupsInput) -> str:
+@offloaded()
+def list_backups_tool(params: ListBackupsInput) -> str:
     """
     List all backups for a planning entity.
 
@@ -3186,11 +5025,11 @@ async def list_backups_tool(params: ListBackupsInput) -> str:
         Found 3 backup(s):
 
         ID: 45 | 2025-11-12 16:30:00 | regeneration | ✓ exists
-          File: .../backups/plan-2025-11-12-16-30-00.md
+          File: blob:sha256:f9e8d7c6...
           Version: f9e8d7c6...
 
         ID: 42 | 2025-11-12 15:30:45 | manual | ✓ exists
-          File: .../backups/plan-2025-11-12-15-30-45.md
+          File: blob:sha256:a1b2c3d4...
           Version: a1b2c3d4...
     """
     if not PLANNING_STATE_AVAILABLE:
@@ -3248,7 +5087,8 @@ async def list_backups_tool(params: ListBackupsInput) -> str:
         "openWorldHint": False
     }
 )
-async def restore_backup_tool(params: RestoreBackupInput) -> str:
+@offloaded(_tool_locks, key=_planning_lock_key)
+def restore_backup_tool(params: RestoreBackupInput) -> str:
     """
     Restore a backup version of a planning file.
 
@@ -3325,20 +5165,29 @@ async def restore_backup_tool(params: RestoreBackupInput) -> str:
         "openWorldHint": False
     }
 )
-async def get_backup_diff_tool(params: GetBackupDiffInput) -> str:
+@offloaded()
+def get_backup_diff_tool(params: GetBackupDiffInput) -> str:
     """
-    Get unified diff between two backup versions.
+    Get diff between two backup versions, or a backup and the live file.
 
     Compares content of two backups and shows differences.
-    Useful for understanding what changed between versions.
+    Useful for understanding what changed between versions. Large diffs
+    are paginated by hunk: pass the returned next_cursor to get the
+    following hunks. Omit backup_id2 to compare with the current file.
 
     Args:
         params (GetBackupDiffInput): Validated input containing:
             - backup_id1 (int): First backup ID (typically older)
-            - backup_id2 (int): Second backup ID (typically newer)
+            - backup_id2 (Optional[int]): Second backup ID (omit = live file)
+            - mode (str): 'line' (unified diff) or 'word' (inline word changes)
+            - algorithm (str): 'myers' or 'patience'
+            - context_lines (int): Context lines around changes (default: 3)
+            - stat_only (bool): Only the diff-stat summary
+            - limit (int): Hunks per page (default: 20)
+            - cursor (Optional[str]): next_cursor from previous page
 
     Returns:
-        str: Unified diff output or error message
+        str: Diff-stat summary and one page of hunks, or error message
 
     Example:
         >>> get_backup_diff(backup_id1=42, backup_id2=45)
@@ -3354,51 +5203,328 @@ async def get_backup_diff_tool(params: GetBackupDiffInput) -> str:
           Date: 2025-11-12 16:30:00
           Version: f9e8d7c6...
 
-        [unified diff output...]
+        Diff stat: +12 −9 lines in 4 hunks
+
+        [unified diff hunks 1-4 of 4...]
     """
     if not PLANNING_STATE_AVAILABLE:
         return "❌ ERROR: Planning state module not available"
 
     try:
-        result = get_backup_diff(params.backup_id1, params.backup_id2)
+        result = get_backup_diff(
+            params.backup_id1,
+            params.backup_id2,
+            mode=params.mode,
+            algorithm=params.algorithm,
+            context_lines=params.context_lines,
+            render=False
+        )
 
         if not result['success']:
             return f"❌ ERROR: Diff generation failed\n\n{result['message']}"
 
-        b1 = result['backup1']
-        b2 = result['backup2']
+        diff = result['text_diff']
+        fingerprint = query_fingerprint(
+            tool="get_backup_diff",
+            backup1=params.backup_id1,
+            backup2=params.backup_id2,
+            version2=result['backup2']['version_hash'],
+            mode=params.mode,
+            algorithm=params.algorithm,
+            context=params.context_lines
+        )
+        page = paginate(range(len(diff.groups)), lambda index: index, params.limit, params.cursor, fingerprint)
 
-        lines = [
-            f"📊 BACKUP COMPARISON",
-            "",
-            f"**Backup #{b1['backup_id']}** (older):",
-            f"  Entity: {b1['entity_type']}/{b1['entity_id']}",
-            f"  Date: {b1['backed_up_at']}",
-            f"  Version: {b1['version_hash'][:8]}...",
-            "",
+        text, _ = render_within_limit(page, lambda p: _render_backup_diff_page(p, result, params))
+        return text
+
+    except CursorError as e:
+        return f"❌ ERROR: {str(e)}"
+    except Exception as e:
+        return f"❌ ERROR: Diff generation failed\n\n{str(e)}"
+
+
+def _render_backup_diff_page(page: Page, result: Dict[str, Any], params: GetBackupDiffInput) -> str:
+    """Render the comparison header, diff stat and one page of hunks."""
+    b1 = result['backup1']
+    b2 = result['backup2']
+    diff = result['text_diff']
+    stats = result['stats']
+
+    lines = [
+        f"📊 BACKUP COMPARISON",
+        "",
+        f"**Backup #{b1['backup_id']}** (older):",
+        f"  Entity: {b1['entity_type']}/{b1['entity_id']}",
+        f"  Date: {b1['backed_up_at']}",
+        f"  Version: {b1['version_hash'][:8]}...",
+        "",
+    ]
+    if b2.get('live'):
+        lines.extend([
+            f"**Live file** (current):",
+            f"  Entity: {b2['entity_type']}/{b2['entity_id']}",
+            f"  File: {b2['file_path']}",
+        ])
+    else:
+        lines.extend([
             f"**Backup #{b2['backup_id']}** (newer):",
             f"  Entity: {b2['entity_type']}/{b2['entity_id']}",
             f"  Date: {b2['backed_up_at']}",
-            f"  Version: {b2['version_hash'][:8]}...",
-            "",
-            "═══════════════════════════════════════════════════════════",
-            "UNIFIED DIFF",
-            "═══════════════════════════════════════════════════════════",
-            ""
-        ]
+        ])
+    lines.extend([f"  Version: {b2['version_hash'][:8]}...", ""])
+
+    summary = f"Diff stat: +{stats['lines_added']} −{stats['lines_removed']} lines in {stats['hunks']} hunks"
+    if 'words_added' in stats:
+        summary += f" (+{stats['words_added']} −{stats['words_removed']} words)"
+    lines.append(summary)
+    lines.append(f"Computed from: {result['computed_from']} ({params.algorithm}, {params.mode} mode)")
+    lines.append("")
 
-        if result['diff']:
-            lines.append(result['diff'])
-        else:
-            lines.append("No differences found - files are identical.")
+    if params.stat_only:
+        return "\n".join(lines)
+
+    lines.extend([
+        "═══════════════════════════════════════════════════════════",
+        "UNIFIED DIFF" if params.mode == 'line' else "WORD DIFF",
+        "═══════════════════════════════════════════════════════════",
+        ""
+    ])
+
+    if not diff.groups:
+        lines.append("No differences found - files are identical.")
+    else:
+        if page.items:
+            lines.append(f"Hunks {page.start + 1}-{page.start + len(page.items)} of {page.total}")
+        lines.append("```diff")
+        lines.extend(diff.header_lines())
+        lines.extend(diff.hunk(index).render() for index in page.items)
+        lines.append("```")
 
+    lines.append("")
+    lines.append("═══════════════════════════════════════════════════════════")
+
+    if page.next_cursor:
         lines.append("")
-        lines.append("═══════════════════════════════════════════════════════════")
+        lines.append(
+            f"➡️ Next page: get_backup_diff(backup_id1={params.backup_id1}, "
+            f"backup_id2={params.backup_id2}, cursor='{page.next_cursor}')"
+        )
+
+    return "\n".join(lines)
+
+
+@mcp.tool(
+    name="gc_blob_store",
+    annotations={
+        "title": "Garbage-Collect Blob Store",
+        "readOnlyHint": False,
+        "destructiveHint": True,
+        "idempotentHint": True,
+        "openWorldHint": False
+    }
+)
+@offloaded(_tool_locks, key=_planning_lock_key)
+def gc_blob_store_tool(params: GcBlobStoreInput) -> str:
+    """
+    Delete unreferenced blobs from the workspace blob store.
+
+    Backups, deleted-file archives and human-retry archives are references
+    into workspace/blobs/. Backup references are first reconciled with the
+    backups table; blobs without any reference (older than the grace period)
+    are then deleted.
+
+    Args:
+        params (GcBlobStoreInput): Validated input containing:
+            - dry_run (bool): Only report (default: True)
+            - migrate_legacy (bool): Move backups/ files into the store first
+            - grace_seconds (int): Minimum age of deleted blobs
+
+    Returns:
+        str: Store statistics and gc report or error message
+
+    Example:
+        >>> gc_blob_store(dry_run=False)
+        🧹 BLOB STORE GC
+
+        Blobs: 120 (3.1 MB stored, 9.8 MB unique content)
+        References: 412 (41.0 MB referenced)
+        Removed: 7 blob(s), 180.2 KB freed
+    """
+    try:
+        store = get_blob_store(WORKSPACE_PATH)
+        lines = ["🧹 BLOB STORE GC" + (" (dry run)" if params.dry_run else ""), ""]
+
+        if PLANNING_STATE_AVAILABLE:
+            if params.migrate_legacy and not params.dry_run:
+                migrated = migrate_legacy_backups()
+                if not migrated['success']:
+                    return f"❌ ERROR: {migrated['message']}"
+                lines.append(f"**Legacy backups migrated**: {migrated['migrated']} (missing files: {migrated['missing']})")
+            refs = sync_backup_refs()
+            if refs['success'] and (refs['added'] or refs['removed']):
+                lines.append(f"**Backup references synced**: +{refs['added']}, -{refs['removed']}")
+            elif not refs['success']:
+                lines.append(f"⚠️ Backup references not synced: {refs['message']}")
+
+        result = store.gc(dry_run=params.dry_run, grace_seconds=params.grace_seconds)
+        stats = store.stats()
+
+        lines.extend([
+            f"**Blobs**: {stats['blobs']} ({_format_file_size(stats['stored_bytes'])} stored, "
+            f"{_format_file_size(stats['unique_bytes'])} unique content, {stats['compression']})",
+            f"**References**: {stats['refs']} ({_format_file_size(stats['referenced_bytes'])} referenced)",
+            "",
+            f"**{'Would remove' if params.dry_run else 'Removed'}**: {result['removed']} blob(s), "
+            f"{_format_file_size(result['bytes_freed'])} freed",
+            f"**Kept (younger than {params.grace_seconds}s)**: {result['kept_recent']}",
+        ])
+        if params.dry_run:
+            lines.extend(["", "💡 To delete: gc_blob_store(dry_run=False)"])
 
         return "\n".join(lines)
 
     except Exception as e:
-        return f"❌ ERROR: Diff generation failed\n\n{str(e)}"
+        return f"❌ ERROR: Blob store gc failed\n\n{str(e)}"
+
+
+@mcp.tool(
+    name="reconcile_planning_state",
+    annotations={
+        "title": "Reconcile Planning State with Files",
+        "readOnlyHint": False,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": False
+    }
+)
+@offloaded(_tool_locks, key=_reconcile_lock_key)
+def reconcile_planning_state_tool(params: ReconcilePlanningStateInput) -> str:
+    """
+    Detect planning files changed, removed or added outside the tools.
+
+    Walks acts/ once (only files whose stat changed are re-hashed) and
+    compares every planning entity with its file:
+    - drifted: file content no longer matches the stored version_hash
+    - missing: the entity's file does not exist
+    - orphaned: a plan / blueprint file no entity points to
+
+    With apply=True, drifted entities take the new hash and become
+    requires-revalidation, missing ones become invalid, and all their
+    descendants are invalidated in one transaction. Findings are paginated;
+    page with apply=False (after applying, the drift is resolved).
+
+    Args:
+        params (ReconcilePlanningStateInput): Validated input containing:
+            - acts_path (str): acts/ directory (default: 'acts')
+            - apply (bool): Write invalidations (default: False)
+            - response_format (str): 'text' or 'json'
+            - limit (int): Findings per page (default: 50)
+            - cursor (Optional[str]): next_cursor from previous page
+
+    Returns:
+        str: Drift summary and one page of findings, or error message
+
+    Example:
+        >>> reconcile_planning_state()
+        🔎 PLANNING DRIFT REPORT
+
+        **Checked**: 412 entities, 415 files scanned
+        **Drifted**: 2 | **Missing**: 0 | **Orphaned**: 3
+        ...
+    """
+    if not PLANNING_STATE_AVAILABLE:
+        return "❌ ERROR: Planning state module not available"
+
+    try:
+        result = reconcile_planning_state(Path(params.acts_path), apply=params.apply)
+        if not result['success']:
+            return f"❌ ERROR: {result['message']}"
+
+        report = result['report']
+        issues = report.issues()
+        fingerprint = query_fingerprint(tool="reconcile_planning_state", acts_path=params.acts_path)
+        page = paginate(
+            issues, lambda i: (i['kind'], i['file_path']), params.limit, params.cursor, fingerprint
+        )
+
+        if params.response_format == 'json':
+            summary = {
+                **report.counts(),
+                "checked": report.checked,
+                "files_scanned": report.files_scanned,
+                "applied": result['applied'],
+                "invalidated": len(result['invalidated_entities']),
+            }
+
+            def render_json(p: Page) -> str:
+                return json.dumps({
+                    "summary": summary,
+                    "findings": p.items,
+                    "total": p.total,
+                    "offset": p.start,
+                    "next_cursor": p.next_cursor
+                }, separators=(',', ':'), ensure_ascii=False)
+
+            text, _ = render_within_limit(page, render_json)
+            return text
+
+        text, _ = render_within_limit(page, lambda p: _render_reconcile_page(p, result, params))
+        return text
+
+    except CursorError as e:
+        return f"❌ ERROR: {str(e)}"
+    except Exception as e:
+        return f"❌ ERROR: Reconciliation failed\n\n{str(e)}"
+
+
+def _render_reconcile_page(page: Page, result: Dict[str, Any], params: ReconcilePlanningStateInput) -> str:
+    """Render the drift summary and one page of findings."""
+    report = result['report']
+    counts = report.counts()
+    invalidated = result['invalidated_entities']
+
+    lines = [
+        "🔎 PLANNING DRIFT REPORT" + (" (applied)" if result['applied'] else ""),
+        "",
+        f"**Checked**: {report.checked} entities, {report.files_scanned} files scanned",
+        f"**Drifted**: {counts['drifted']} | **Missing**: {counts['missing']} | "
+        f"**Orphaned**: {counts['orphaned']}",
+        ""
+    ]
+
+    if report.clean:
+        lines.append("✅ Planning state matches the files on disk")
+        return "\n".join(lines)
+
+    icons = {"drifted": "✏️", "missing": "❌", "orphaned": "❓"}
+    if len(page.items) < page.total:
+        lines.append(f"Showing {page.start + 1}–{page.start + len(page.items)} of {page.total}")
+    for item in page.items:
+        lines.append(
+            f"  {icons[item['kind']]} {item['kind']}: {item['entity_type']}/{item['entity_id']} "
+            f"→ {item['file_path']}"
+        )
+    lines.append("")
+
+    if page.next_cursor:
+        lines.append(f"➡️ Next page: reconcile_planning_state(cursor='{page.next_cursor}')")
+        lines.append("")
+
+    if result['applied']:
+        lines.append(f"📝 Invalidated: {len(invalidated)} entities")
+        for entity in invalidated[:20]:
+            lines.append(f"  - {entity['entity_id']}: {entity['previous_status']} → {entity['new_status']}")
+        if len(invalidated) > 20:
+            lines.append(f"  ... and {len(invalidated) - 20} more")
+        lines.append("")
+        if counts['orphaned']:
+            lines.append("💡 Register orphaned files with update_entity_state")
+    else:
+        lines.append("💡 To invalidate drifted / missing entities and their descendants: "
+                     "reconcile_planning_state(apply=True)")
+
+    return "\n".join(lines)
 
 
 # Main entry point
@@ -3409,8 +5535,12 @@ if __name__ == "__main__":
             result = sync_from_json_to_sqlite()
             if result['success'] and result['entities_synced'] > 0:
                 print(f"✓ Synced {result['entities_synced']} planning entities from JSON to SQLite")
+            if result['success'] and result['conflicted'] > 0:
+                print(f"⚠️ {result['conflicted']} JSON planning states are older than SQLite (kept SQLite)")
         except Exception as e:
             print(f"⚠️ Warning: Failed to sync planning state on startup: {e}")
 
+    start_metrics_exporters()
+
     # Run server with stdio transport (default for Claude Code)
     mcp.run()
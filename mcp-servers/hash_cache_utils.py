@@ -0,0 +1,307 @@
+"""
+Hash Cache Utilities
+
+Persistent SHA-256 cache for planning files (workspace/hash-cache.db).
+
+calculate_version_hash and planning-level consistency checks hash the same
+blueprints over and over although almost none of them change. The cache
+stores each file's hash together with its stat signature
+(inode, size, mtime_ns); a file whose signature is unchanged is not read
+again. Misses are hashed in fixed-size chunks, so large files are never
+loaded into memory at once.
+
+A file modified within RACY_WINDOW_NS of being hashed is not cached: a
+second write in the same mtime tick would keep size and mtime_ns and leave a
+stale entry (the "racily clean" problem of git's index). Such files are
+simply re-hashed next time.
+
+This module contains:
+- Constants (chunk size, racy window, schema)
+- Chunked file hashing
+- HashCache (single file / bulk / directory tree hashing on a thread pool)
+"""
+
+from typing import Dict, List, Any, Iterable, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import fnmatch
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from metrics_utils import instrument_connection, register_cache
+
+
+# Constants
+
+HASH_CACHE_FILE_NAME = "hash-cache.db"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Files modified this recently (ns) are hashed but not cached
+RACY_WINDOW_NS = 2_000_000_000
+
+HASH_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS file_hashes (
+        path TEXT PRIMARY KEY,
+        inode INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        hash TEXT NOT NULL
+    );
+"""
+
+# Stat signature of a cached file
+Signature = Tuple[int, int, int]
+
+# Thread-local connections: {db path: connection}
+_pool = threading.local()
+
+# Caches by absolute database path
+_caches: Dict[str, "HashCache"] = {}
+
+register_cache("hash", lambda: (
+    sum(cache._hits for cache in list(_caches.values())),
+    sum(cache._misses for cache in list(_caches.values())),
+))
+
+
+# Hashing
+
+def hash_file(path: Path, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return digest.hexdigest()
+            digest.update(chunk)
+
+
+def _signature(stat: os.stat_result) -> Signature:
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _cache_key(path: Path) -> str:
+    return os.path.abspath(path)
+
+
+# Hash Cache
+
+class HashCache:
+    """SHA-256 of files, cached by (path, inode, size, mtime_ns)."""
+
+    def __init__(self, db_path: Path, workers: int = HASH_WORKERS):
+        """Open (lazily create) a cache.
+
+        Args:
+            db_path: SQLite file (workspace/hash-cache.db)
+            workers: Threads hashing changed files in hash_many / hash_tree
+        """
+        self.db_path = db_path
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connections = getattr(_pool, "connections", None)
+        if connections is None:
+            connections = _pool.connections = {}
+
+        key = str(self.db_path)
+        conn = connections.get(key)
+        if conn is not None and self.db_path.exists():
+            return conn
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = instrument_connection(sqlite3.connect(key, check_same_thread=False), "hash_cache")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.executescript(CACHE_SCHEMA)
+        connections[key] = conn
+        return conn
+
+    def _count(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+
+    # Lookups
+
+    def _lookup(self, keys: List[str]) -> Dict[str, Tuple[Signature, str]]:
+        conn = self._connect()
+        cached: Dict[str, Tuple[Signature, str]] = {}
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT path, inode, size, mtime_ns, hash FROM file_hashes "
+                f"WHERE path IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            for path, inode, size, mtime_ns, file_hash in rows:
+                cached[path] = ((inode, size, mtime_ns), file_hash)
+        return cached
+
+    def _store(self, entries: List[Tuple[str, Signature, str]], now_ns: int) -> None:
+        rows = [
+            (key, *signature, file_hash)
+            for key, signature, file_hash in entries
+            if now_ns - signature[2] >= RACY_WINDOW_NS
+        ]
+        if not rows:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO file_hashes (path, inode, size, mtime_ns, hash) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    # Hashing
+
+    def hash(self, path: Path) -> str:
+        """SHA-256 of a file, read only if its stat signature changed.
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+        return self.hash_many([path])[_cache_key(path)]
+
+    def hash_many(self, paths: Iterable[Path]) -> Dict[str, str]:
+        """Hash files, reading only changed ones (on a thread pool).
+
+        Args:
+            paths: Files to hash
+
+        Returns:
+            Dict {absolute path: SHA-256}
+
+        Raises:
+            FileNotFoundError: If a file does not exist
+        """
+        stats: Dict[str, Signature] = {}
+        for path in paths:
+            key = _cache_key(path)
+            stats[key] = _signature(os.stat(key))
+        return self._hash_stats(stats)
+
+    def _hash_stats(self, stats: Dict[str, Signature]) -> Dict[str, str]:
+        cached = self._lookup(list(stats))
+        hashes: Dict[str, str] = {}
+        misses: List[str] = []
+        for key, signature in stats.items():
+            entry = cached.get(key)
+            if entry is not None and entry[0] == signature:
+                hashes[key] = entry[1]
+            else:
+                misses.append(key)
+
+        now_ns = time.time_ns()
+        if len(misses) > 1 and self.workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(misses))) as executor:
+                computed = list(executor.map(hash_file, misses))
+        else:
+            computed = [hash_file(Path(key)) for key in misses]
+
+        entries = []
+        for key, file_hash in zip(misses, computed):
+            hashes[key] = file_hash
+            # A file rewritten while it was read is hashed again next time
+            try:
+                unchanged = _signature(os.stat(key)) == stats[key]
+            except OSError:
+                unchanged = False
+            if unchanged:
+                entries.append((key, stats[key], file_hash))
+        self._store(entries, now_ns)
+        self._count(len(stats) - len(misses), len(misses))
+        return hashes
+
+    def hash_tree(self, root: Path, pattern: str = "*") -> Dict[str, str]:
+        """Hash every file below a directory (e.g. an act directory).
+
+        Cache entries of files that no longer exist below root are dropped.
+
+        Args:
+            root: Directory to walk
+            pattern: Glob matched against file names (e.g. '*.md')
+
+        Returns:
+            Dict {absolute path: SHA-256}
+        """
+        root_key = _cache_key(root)
+        stats: Dict[str, Signature] = {}
+        pending = [root_key]
+        while pending:
+            try:
+                entries = list(os.scandir(pending.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file() and fnmatch.fnmatchcase(entry.name, pattern):
+                        stats[entry.path] = _signature(entry.stat())
+                except OSError:
+                    continue
+
+        hashes = self._hash_stats(stats)
+
+        conn = self._connect()
+        prefix = root_key.rstrip(os.sep) + os.sep
+        stale = [
+            (path,) for (path,) in conn.execute(
+                "SELECT path FROM file_hashes WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            )
+            if path not in stats and not os.path.exists(path)
+        ]
+        if stale:
+            with conn:
+                conn.executemany("DELETE FROM file_hashes WHERE path = ?", stale)
+        return hashes
+
+    # Diagnostics
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit / miss counters and number of cached files."""
+        entries = self._connect().execute("SELECT COUNT(*) FROM file_hashes").fetchone()[0]
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": entries}
+
+    def clear(self) -> None:
+        """Forget all cached hashes."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM file_hashes")
+        with self._lock:
+            self._hits = self._misses = 0
+
+
+def get_hash_cache(workspace_path: Path) -> HashCache:
+    """Get the workspace's hash cache (workspace/hash-cache.db)."""
+    db_path = Path(os.path.abspath(workspace_path / HASH_CACHE_FILE_NAME))
+    key = str(db_path)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = _caches[key] = HashCache(db_path)
+    return cache
+
+
+def close_hash_cache_connections() -> None:
+    """Close all cache connections held by the current thread."""
+    connections = getattr(_pool, "connections", None) or {}
+    for conn in connections.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    connections.clear()
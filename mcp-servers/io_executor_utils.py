@@ -0,0 +1,162 @@
+"""
+I/O Executor Utilities
+
+Keeps the MCP servers' event loops free of blocking work.
+
+FastMCP runs every tool on one asyncio loop, while tool bodies read and
+write state files, session trees and SQLite databases synchronously. A
+single slow call (commit_session, list_generations over a cold catalog)
+used to stall every other request on the server. Tool bodies are now plain
+functions wrapped by @offloaded: the wrapper runs them on a bounded thread
+pool (MCP_IO_WORKERS) and awaits the result.
+
+Mutations of one scene or one session must still not interleave (a
+load-modify-save of generation-state-{scene_id}.json, a session.json
+update). @offloaded takes an optional lock key; calls with the same key
+wait for each other on an asyncio.Lock before they are submitted, so they
+do not hold pool threads while waiting.
+
+This module contains:
+- Constants (pool size)
+- Bounded executor and run_io
+- KeyedLocks (per-key asyncio locks)
+- @serialized / @offloaded tool decorators
+"""
+
+from typing import Optional, Callable, Dict, Hashable, Any, AsyncIterator, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+
+
+# Constants
+
+IO_WORKERS = max(1, int(os.environ.get("MCP_IO_WORKERS", str(min(16, (os.cpu_count() or 4) + 4)))))
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+# Executor
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Get the process-wide I/O pool (created on first use)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="mcp-io")
+    return _executor
+
+
+def shutdown_io_executor(wait: bool = True) -> None:
+    """Stop the I/O pool; the next run_io starts a new one.
+
+    Worker threads own their thread-local SQLite connections, which are
+    closed when the threads exit.
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking function on the I/O pool and await its result.
+
+    Context variables are propagated like asyncio.to_thread does.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await loop.run_in_executor(get_io_executor(), call)
+
+
+# Keyed Locks
+
+class KeyedLocks:
+    """asyncio.Lock per key (scene ID, session name), dropped when unused."""
+
+    def __init__(self):
+        # {key: [lock, holders + waiters]}
+        self._locks: Dict[Hashable, list] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        """Hold the lock for key until the block exits."""
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def locked(self, key: Hashable) -> bool:
+        """Whether a call currently holds the lock for key."""
+        entry = self._locks.get(key)
+        return entry is not None and entry[0].locked()
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+# Tool Decorators
+
+def serialized(
+    locks: KeyedLocks,
+    key: Callable[..., Optional[Hashable]]
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Serialize calls of a coroutine tool that share a lock key.
+
+    Args:
+        locks: Lock registry
+        key: Called with the tool's arguments; returns the lock key, or None
+            to run without a lock
+    """
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        async def run(*args: Any, **kwargs: Any) -> Any:
+            lock_key = key(*args, **kwargs)
+            if lock_key is None:
+                return await fn(*args, **kwargs)
+            async with locks.hold(lock_key):
+                return await fn(*args, **kwargs)
+        return run
+    return decorate
+
+
+def offloaded(
+    locks: Optional[KeyedLocks] = None,
+    key: Optional[Callable[..., Optional[Hashable]]] = None
+) -> Callable[[Callable[..., T]], Callable[..., Any]]:
+    """Turn a blocking tool body into a coroutine running on the I/O pool.
+
+    The wrapper keeps the wrapped function's name, docstring and signature
+    (FastMCP builds the tool schema from them). With locks and key, calls
+    sharing a key are serialized (see serialized) before they take a thread.
+
+    Example:
+        @mcp.tool(name="start_step")
+        @offloaded(_tool_locks, key=_scene_lock_key)
+        def start_step(params: StartStepInput) -> str:
+            ...
+    """
+    def decorate(fn: Callable[..., T]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        async def run(*args: Any, **kwargs: Any) -> T:
+            return await run_io(fn, *args, **kwargs)
+        if locks is not None and key is not None:
+            return serialized(locks, key)(run)
+        return run
+    return decorate
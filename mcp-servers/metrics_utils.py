@@ -0,0 +1,332 @@
+"""
+Metrics Utilities
+
+Optional Prometheus metrics for the long-running MCP servers
+(generation state, session management, workflow orchestration).
+
+Metrics are off unless one of these environment variables is set:
+- MCP_METRICS_PORT: serve GET /metrics on MCP_METRICS_HOST (default 127.0.0.1)
+- MCP_METRICS_TEXTFILE: rewrite this file every MCP_METRICS_TEXTFILE_INTERVAL
+  seconds (default 15) for the node_exporter textfile collector
+
+Every server calls instrument_tools(mcp, server) right after creating its
+FastMCP instance: tools registered afterwards through @mcp.tool(...) are
+wrapped to count calls, errors (exceptions and '❌ ERROR' / 'Error:' / {'error': ...}
+results) and latency. The wrapper keeps the tool's signature, name and
+docstring, so the published input schemas do not change. State file bytes,
+SQLite statements and cache hit rates are recorded by the modules that own
+them. The exposition is the Prometheus text format (version 0.0.4), which
+OpenMetrics scrapers accept as well.
+
+This module contains:
+- Constants (environment configuration, metric definitions, buckets)
+- MetricsRegistry (counters, histograms, scrape-time collectors)
+- Instrumentation (tool registration, state I/O, SQLite connections, caches)
+- Exporters (HTTP endpoint, textfile)
+"""
+
+from typing import Optional, Dict, List, Any, Callable, Iterable, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import atexit
+import bisect
+import functools
+import inspect
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+# Constants
+
+METRICS_HOST = os.environ.get("MCP_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("MCP_METRICS_PORT", "0") or 0)
+METRICS_TEXTFILE = os.environ.get("MCP_METRICS_TEXTFILE", "")
+METRICS_TEXTFILE_INTERVAL = float(os.environ.get("MCP_METRICS_TEXTFILE_INTERVAL", "15"))
+METRICS_ENABLED = bool(METRICS_PORT or METRICS_TEXTFILE)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds (upper bounds, +Inf added when rendering)
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# {name: (type, help)} in exposition order
+METRICS = {
+    "mcp_tool_calls_total": ("counter", "MCP tool calls"),
+    "mcp_tool_errors_total": ("counter", "MCP tool calls that raised or returned an error"),
+    "mcp_tool_duration_seconds": ("histogram", "MCP tool call latency"),
+    "mcp_state_bytes_total": ("counter", "State file bytes read and written"),
+    "mcp_sqlite_queries_total": ("counter", "SQLite statements executed"),
+    "mcp_cache_hits_total": ("counter", "Cache lookups answered from the cache"),
+    "mcp_cache_misses_total": ("counter", "Cache lookups that had to read the source"),
+    "mcp_cache_hit_ratio": ("gauge", "Cache hits / lookups since start"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+logger = logging.getLogger(__name__)
+
+
+# Registry
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms plus collectors evaluated on scrape."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], List[Any]] = {}  # [bucket counts, sum, count]
+        self._collectors: List[Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]] = []
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1) -> None:
+        """Add value to a counter."""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        """Record one histogram observation."""
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(DURATION_BUCKETS), 0.0, 0]
+            index = bisect.bisect_left(DURATION_BUCKETS, value)
+            if index < len(DURATION_BUCKETS):
+                histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]) -> None:
+        """Add a function returning (name, labels, value) samples at scrape time."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def value(self, name: str, **labels: str) -> float:
+        """Current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0)
+
+    def render(self) -> str:
+        """Exposition in the Prometheus text format."""
+        with self._lock:
+            samples: Dict[str, List[str]] = {name: [] for name in METRICS}
+            for (name, labels), value in sorted(self._counters.items()):
+                samples[name].append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for (name, labels), (buckets, total, count) in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, bucket in zip(DURATION_BUCKETS + (float("inf"),), buckets + [count - sum(buckets)]):
+                    cumulative += bucket
+                    bucket_labels = _labels({**dict(labels), "le": _format_value(bound)})
+                    samples[name].append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                samples[name].append(f"{name}_sum{_format_labels(labels)} {_format_value(round(total, 6))}")
+                samples[name].append(f"{name}_count{_format_labels(labels)} {count}")
+            collectors = list(self._collectors)
+
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    samples[name].append(f"{name}{_format_labels(_labels(labels))} {_format_value(value)}")
+            except Exception as e:  # a broken collector must not break the scrape
+                logger.warning(f"Metrics collector failed: {e}")
+
+        lines = []
+        for name, (metric_type, help_text) in METRICS.items():
+            if samples[name]:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                lines.extend(samples[name])
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# Instrumentation
+
+def _is_error_result(result: Any) -> bool:
+    if isinstance(result, str):
+        return result.startswith(("❌ ERROR", "Error:"))
+    return isinstance(result, dict) and "error" in result
+
+
+def _record_call(server: str, tool: str, started: float, failed: bool) -> None:
+    labels = {"server": server, "tool": tool}
+    REGISTRY.inc("mcp_tool_calls_total", labels)
+    if failed:
+        REGISTRY.inc("mcp_tool_errors_total", labels)
+    REGISTRY.observe("mcp_tool_duration_seconds", labels, time.perf_counter() - started)
+
+
+def timed_tool(fn: Callable, server: str, tool: str) -> Callable:
+    """Wrap a tool function (sync or async) with call, error and latency metrics."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def run_async(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return await fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException:
+                _record_call(server, tool, started, True)
+                raise
+            _record_call(server, tool, started, _is_error_result(result))
+            return result
+        return run_async
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        if not METRICS_ENABLED:
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            _record_call(server, tool, started, True)
+            raise
+        _record_call(server, tool, started, _is_error_result(result))
+        return result
+    return run
+
+
+def instrument_tools(mcp: Any, server: str) -> None:
+    """Instrument every tool registered on a FastMCP server from now on.
+
+    Replaces mcp.tool with a wrapper that applies timed_tool before
+    registration; call it right after creating the FastMCP instance.
+
+    Args:
+        mcp: FastMCP instance
+        server: Value of the server label
+    """
+    register = mcp.tool
+
+    @functools.wraps(register)
+    def tool(name: Optional[str] = None, *args: Any, **kwargs: Any) -> Callable:
+        decorator = register(name, *args, **kwargs)
+
+        def apply(fn: Callable) -> Callable:
+            return decorator(timed_tool(fn, server, name or fn.__name__))
+        return apply
+
+    mcp.tool = tool
+
+
+def record_state_bytes(direction: str, size: int) -> None:
+    """Count state file bytes ('read' or 'write')."""
+    if METRICS_ENABLED and size:
+        REGISTRY.inc("mcp_state_bytes_total", {"direction": direction}, size)
+
+
+def instrument_connection(conn: sqlite3.Connection, db: str) -> sqlite3.Connection:
+    """Count the statements a SQLite connection executes (labelled db)."""
+    if METRICS_ENABLED:
+        labels = {"db": db}
+        conn.set_trace_callback(lambda _statement: REGISTRY.inc("mcp_sqlite_queries_total", labels))
+    return conn
+
+
+def register_cache(cache: str, counters: Callable[[], Tuple[int, int]]) -> None:
+    """Report a cache's (hits, misses) and hit ratio on every scrape."""
+    def collect() -> List[Tuple[str, Dict[str, str], float]]:
+        hits, misses = counters()
+        labels = {"cache": cache}
+        lookups = hits + misses
+        return [
+            ("mcp_cache_hits_total", labels, hits),
+            ("mcp_cache_misses_total", labels, misses),
+            ("mcp_cache_hit_ratio", labels, round(hits / lookups, 4) if lookups else 0.0),
+        ]
+    REGISTRY.register_collector(collect)
+
+
+# Exporters
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # stdout/stderr belong to the MCP stdio transport
+
+
+def start_http_exporter(port: int, host: str = METRICS_HOST) -> ThreadingHTTPServer:
+    """Serve /metrics on a daemon thread; returns the server (port 0 = any free port)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mcp-metrics-http", daemon=True).start()
+    return server
+
+
+def write_textfile(path: Path) -> None:
+    """Atomically replace path with the current exposition (textfile collector)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(REGISTRY.render())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _textfile_loop(path: Path, interval: float) -> None:
+    while True:
+        try:
+            write_textfile(path)
+        except OSError as e:
+            logger.warning(f"Failed to write metrics textfile {path}: {e}")
+        time.sleep(interval)
+
+
+def start_metrics_exporters() -> None:
+    """Start the exporters configured by the environment (no-op when metrics are off)."""
+    if METRICS_PORT:
+        try:
+            start_http_exporter(METRICS_PORT)
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on {METRICS_HOST}:{METRICS_PORT}: {e}")
+    if METRICS_TEXTFILE:
+        path = Path(METRICS_TEXTFILE)
+        threading.Thread(
+            target=_textfile_loop, args=(path, METRICS_TEXTFILE_INTERVAL), name="mcp-metrics-textfile", daemon=True
+        ).start()
+        atexit.register(lambda: write_textfile(path))
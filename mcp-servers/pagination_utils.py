@@ -0,0 +1,210 @@
+"""
+Pagination Utilities
+
+Cursor-based pagination shared by the listing tools of all MCP servers
+(list_generations, get_hierarchy_tree, list_sessions, list_workflows).
+
+Cursors are opaque URL-safe tokens holding the offset of the next item, the
+id of the last item returned and a fingerprint of the query (filters + sort).
+When items are added or removed between calls, the page continues right after
+the last item seen instead of skipping or repeating items.
+
+This module contains:
+- Constants (page sizes, response character limit)
+- Cursor encoding/decoding
+- Page slicing and fitting rendered output under CHARACTER_LIMIT
+- Compact JSON responses with column selection
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, replace
+import base64
+import hashlib
+import json
+
+
+# Constants
+
+CHARACTER_LIMIT = 25000  # Maximum response size in characters
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_CURSOR_VERSION = 1
+_TRUNCATION_NOTICE = "\n\n… (output truncated at CHARACTER_LIMIT)"
+
+
+class CursorError(ValueError):
+    """Raised when a cursor is malformed or belongs to a different query."""
+
+
+# Cursors
+
+def query_fingerprint(**params: Any) -> str:
+    """Short stable hash of the parameters that define a listing's order and filter."""
+    canonical = json.dumps(params, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+
+
+def encode_cursor(offset: int, last_id: Any, fingerprint: str) -> str:
+    """Build an opaque cursor token."""
+    payload = json.dumps(
+        {"v": _CURSOR_VERSION, "o": offset, "id": last_id, "q": fingerprint},
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip("=")
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> Tuple[int, Any]:
+    """Decode a cursor token.
+
+    Args:
+        cursor: Token from a previous page's next_cursor
+        fingerprint: Fingerprint of the current query
+
+    Returns:
+        Tuple of (offset, last_id)
+
+    Raises:
+        CursorError: If the token is invalid or was issued for other filters/sort
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset, last_id, query = int(payload["o"]), payload["id"], payload["q"]
+        if payload.get("v") != _CURSOR_VERSION or offset < 0:
+            raise ValueError("unsupported cursor")
+    except (ValueError, KeyError, TypeError) as e:
+        raise CursorError(f"Invalid cursor: {e}") from e
+
+    if query != fingerprint:
+        raise CursorError("Cursor was issued for different filters or sort order; omit cursor to restart")
+    return offset, last_id
+
+
+# Pages
+
+@dataclass
+class Page:
+    """One page of an ordered listing."""
+    items: List[Any]
+    start: int
+    total: int
+    fingerprint: str
+    id_fn: Callable[[Any], Any]
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        """Cursor for the following page, or None on the last page."""
+        end = self.start + len(self.items)
+        if not self.items or end >= self.total:
+            return None
+        return encode_cursor(end, self.id_fn(self.items[-1]), self.fingerprint)
+
+    def shrink(self, count: int) -> "Page":
+        """Return the same page limited to its first count items."""
+        return replace(self, items=self.items[:count])
+
+
+def paginate(
+    items: Sequence[Any],
+    id_fn: Callable[[Any], Any],
+    limit: int,
+    cursor: Optional[str],
+    fingerprint: str
+) -> Page:
+    """Slice one page from a fully ordered sequence.
+
+    Args:
+        items: All matching items in their stable order
+        id_fn: Returns a unique id for an item (e.g. scene_id)
+        limit: Page size
+        cursor: Cursor from the previous page (None = first page)
+        fingerprint: query_fingerprint() of the current filters/sort
+
+    Returns:
+        Page
+
+    Raises:
+        CursorError: If cursor is invalid for this query
+    """
+    start = 0
+    if cursor:
+        offset, last_id = decode_cursor(cursor, fingerprint)
+        start = min(offset, len(items))
+        # Re-anchor after the last item seen if the listing changed meanwhile
+        if not (0 < start <= len(items) and id_fn(items[start - 1]) == last_id):
+            for index, item in enumerate(items):
+                if id_fn(item) == last_id:
+                    start = index + 1
+                    break
+
+    return Page(list(items[start:start + limit]), start, len(items), fingerprint, id_fn)
+
+
+def render_within_limit(
+    page: Page,
+    render: Callable[[Page], str],
+    char_limit: int = CHARACTER_LIMIT
+) -> Tuple[str, Page]:
+    """Render a page, dropping trailing items until the output fits char_limit.
+
+    The returned page's next_cursor continues right after the last rendered
+    item, so nothing is skipped. A single oversized item is truncated.
+
+    Args:
+        page: Page to render
+        render: Renders a page to text (must include page.next_cursor)
+        char_limit: Maximum response size
+
+    Returns:
+        Tuple of (text, page actually rendered)
+    """
+    text = render(page)
+    while len(text) > char_limit and len(page.items) > 1:
+        # Estimate how many items fit, always making progress
+        keep = int(len(page.items) * char_limit / len(text) * 0.9)
+        page = page.shrink(max(1, min(keep, len(page.items) - 1)))
+        text = render(page)
+
+    if len(text) > char_limit:
+        text = text[:char_limit - len(_TRUNCATION_NOTICE)] + _TRUNCATION_NOTICE
+    return text, page
+
+
+# JSON Responses
+
+def select_fields(rows: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Keep only the requested columns of each row (all columns if fields is None)."""
+    if not fields:
+        return rows
+    return [{field: row.get(field) for field in fields} for row in rows]
+
+
+def dumps_compact(data: Any) -> str:
+    """Serialize a response as compact JSON."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def page_response(page: Page, rows: List[Dict[str, Any]], key: str) -> Dict[str, Any]:
+    """Build the standard JSON page envelope."""
+    return {
+        key: rows,
+        "total": page.total,
+        "offset": page.start,
+        "count": len(rows),
+        "next_cursor": page.next_cursor,
+    }
+
+
+def fit_json_page(
+    page: Page,
+    to_rows: Callable[[List[Any]], List[Dict[str, Any]]],
+    key: str,
+    char_limit: int = CHARACTER_LIMIT
+) -> Tuple[str, Page]:
+    """Render a page as compact JSON under char_limit (see render_within_limit)."""
+    return render_within_limit(
+        page,
+        lambda p: dumps_compact(page_response(p, to_rows(p.items), key)),
+        char_limit
+    )
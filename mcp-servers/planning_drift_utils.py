@@ -0,0 +1,172 @@
+"""
+Planning Drift Utilities
+
+Detects planning files edited, removed or added outside the tools by
+comparing the book's acts/ tree with planning_entities rows
+(see planning_state_utils.reconcile_planning_state).
+
+acts/ is walked once and hashed through the HashCache (only files whose
+stat signature changed are read, on a thread pool). Each entity is then
+classified against the scan:
+
+- drifted:  file exists, content hash != version_hash
+- missing:  file_path does not exist
+- orphaned: planning file on disk that no entity points to
+
+Planning files are recognised by the book layout:
+    acts/act-1/strategic-plan.md                                   (act)
+    acts/act-1/chapters/chapter-02/plan.md                         (chapter)
+    acts/act-1/chapters/chapter-02/scenes/scene-0204-blueprint.md  (scene)
+
+This module contains:
+- Planning file layout (path → entity)
+- Drift report model
+- Scan of acts/ and comparison with entity rows
+"""
+
+from typing import Optional, Dict, List, Any, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+import os
+import re
+
+from hash_cache_utils import HashCache
+
+
+# Constants
+
+DRIFT_DRIFTED = "drifted"
+DRIFT_MISSING = "missing"
+DRIFT_ORPHANED = "orphaned"
+DRIFT_KINDS = [DRIFT_DRIFTED, DRIFT_MISSING, DRIFT_ORPHANED]
+
+# Relative to acts/: (regex, entity_type, entity_id group, parent_id group)
+_PLANNING_FILE_PATTERNS = [
+    (re.compile(r"^(act-\d+)/strategic-plan\.md$"), "act", 1, None),
+    (re.compile(r"^(act-\d+)/chapters/(chapter-\d+)/plan\.md$"), "chapter", 2, 1),
+    (re.compile(r"^act-\d+/chapters/(chapter-\d+)/scenes/(scene-\d+)-blueprint\.md$"), "scene", 2, 1),
+]
+
+
+# Planning File Layout
+
+def classify_planning_file(rel_path: str) -> Optional[Dict[str, Any]]:
+    """Entity a file under acts/ belongs to, by its path.
+
+    Args:
+        rel_path: Path relative to acts/ ('/' or os.sep separated)
+
+    Returns:
+        Dict {entity_type, entity_id, parent_id} or None if not a planning file
+    """
+    rel_path = rel_path.replace(os.sep, "/")
+    for pattern, entity_type, id_group, parent_group in _PLANNING_FILE_PATTERNS:
+        match = pattern.match(rel_path)
+        if match:
+            return {
+                "entity_type": entity_type,
+                "entity_id": match.group(id_group),
+                "parent_id": match.group(parent_group) if parent_group else None,
+            }
+    return None
+
+
+# Drift Report
+
+@dataclass
+class DriftReport:
+    """Result of comparing planning entities with the files on disk."""
+    drifted: List[Dict[str, Any]] = field(default_factory=list)
+    missing: List[Dict[str, Any]] = field(default_factory=list)
+    orphaned: List[Dict[str, Any]] = field(default_factory=list)
+    checked: int = 0
+    files_scanned: int = 0
+
+    @property
+    def clean(self) -> bool:
+        return not (self.drifted or self.missing or self.orphaned)
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            DRIFT_DRIFTED: len(self.drifted),
+            DRIFT_MISSING: len(self.missing),
+            DRIFT_ORPHANED: len(self.orphaned),
+        }
+
+    def issues(self) -> List[Dict[str, Any]]:
+        """All findings as one list ordered by kind, then path ({kind, ...})."""
+        return [
+            {"kind": kind, **item}
+            for kind, items in ((DRIFT_DRIFTED, self.drifted), (DRIFT_MISSING, self.missing),
+                                (DRIFT_ORPHANED, self.orphaned))
+            for item in items
+        ]
+
+
+# Scan and Compare
+
+def scan_planning_files(acts_root: Path, cache: HashCache) -> Dict[str, str]:
+    """Hash every planning file under acts/ in one pass.
+
+    Returns:
+        Dict {absolute path: SHA-256} of files matching the planning layout
+    """
+    if not acts_root.is_dir():
+        return {}
+    # hash_tree returns absolute paths below root
+    prefix = len(os.path.abspath(acts_root).rstrip(os.sep)) + 1
+    return {
+        path: file_hash
+        for path, file_hash in cache.hash_tree(acts_root, "*.md").items()
+        if classify_planning_file(path[prefix:]) is not None
+    }
+
+
+def detect_drift(acts_root: Path, entities: Iterable[Dict[str, Any]], cache: HashCache) -> DriftReport:
+    """Compare entity rows with the planning files on disk.
+
+    Entities whose file lies outside acts_root are hashed individually.
+
+    Args:
+        acts_root: Book's acts/ directory
+        entities: Rows with entity_type, entity_id, status, version_hash, file_path
+        cache: Hash cache used for all hashing
+
+    Returns:
+        DriftReport (each list sorted by file path)
+    """
+    files = scan_planning_files(acts_root, cache)
+    report = DriftReport(files_scanned=len(files))
+
+    located = [(os.path.abspath(e['file_path']), e) for e in entities]
+    outside = [path for path, _ in located if path not in files and os.path.isfile(path)]
+    hashes = {**files, **cache.hash_many(outside)} if outside else files
+
+    referenced = set()
+    for path, entity in located:
+        referenced.add(path)
+        item = {
+            "entity_type": entity['entity_type'],
+            "entity_id": entity['entity_id'],
+            "status": entity.get('status'),
+            "file_path": entity['file_path'],
+        }
+        current = hashes.get(path)
+        if current is None:
+            report.missing.append(item)
+            continue
+        report.checked += 1
+        if current != entity['version_hash']:
+            report.drifted.append({**item, "version_hash": entity['version_hash'], "current_hash": current})
+
+    prefix = len(os.path.abspath(acts_root).rstrip(os.sep)) + 1
+    for path in sorted(set(files) - referenced):
+        report.orphaned.append({
+            **classify_planning_file(path[prefix:]),
+            "file_path": path,
+            "current_hash": files[path],
+        })
+
+    report.drifted.sort(key=lambda item: item['file_path'])
+    report.missing.sort(key=lambda item: item['file_path'])
+    return report
@@ -4,27 +4,50 @@ Planning State Utilities for FEAT-0003
 Hierarchical Planning Workflow (Act → Chapter → Scene)
 
 This module provides utilities for managing planning state with SQLite + JSON fallback:
-- SQLite database management (init, queries, transactions)
+- SQLite database management (pooled connections, schema migrations, transactions)
 - JSON fallback for when SQLite unavailable
-- Version hash calculation (SHA-256)
-- Recursive hierarchy queries (cascade invalidation)
-- Sync between SQLite and JSON
+- Version hash calculation (SHA-256, cached by file stat signature)
+- Recursive hierarchy queries (cascade invalidation, single-pass tree loading)
+- Drift reconciliation of planning entities against files on disk
+- Incremental sync between SQLite and JSON (unchanged files are neither read nor written)
+- Backups stored as references into the content-addressed blob store
+  (periodic full snapshots plus line deltas between consecutive versions)
 
 Design principles:
 - SQLite primary, JSON fallback
 - Graceful degradation
 - Transaction safety
-- Performance optimized
+- Performance optimized (one connection per thread, schema applied once per process)
 """
 
 import os
 import json
+import logging
 import sqlite3
-import hashlib
+import threading
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Optional, Dict, List, Any, Tuple
 from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from durable_io_utils import atomic_write_json, atomic_write_bytes, dumps_json
+from blob_store_utils import BlobStore, get_blob_store, blob_uri, parse_blob_uri, content_hash
+from backup_delta_utils import (
+    BACKUP_CHAIN_LENGTH,
+    Delta,
+    split_lines,
+    compute_delta,
+    apply_delta,
+    compose_deltas,
+    delta_opcodes,
+)
+from diff_utils import TextDiff, MODE_LINE, ALGORITHM_MYERS, DEFAULT_CONTEXT_LINES
+from hash_cache_utils import HashCache, get_hash_cache, hash_file
+from metrics_utils import instrument_connection
+from planning_drift_utils import DriftReport, detect_drift
+
+logger = logging.getLogger(__name__)
 
 # Constants
 WORKSPACE_PATH = Path("workspace")
@@ -48,37 +71,191 @@ VALID_STATUSES = [STATUS_DRAFT, STATUS_APPROVED, STATUS_REQUIRES_REVALIDATION, S
 # SQLite Database Management
 # =============================================================================
 
+def _apply_base_schema(conn: sqlite3.Connection) -> None:
+    """Migration 1: create tables, indexes and views from planning_state_schema.sql."""
+    if not SCHEMA_FILE.exists():
+        raise RuntimeError(f"Schema file not found: {SCHEMA_FILE}")
+
+    with open(SCHEMA_FILE, 'r', encoding='utf-8') as f:
+        schema_sql = f.read()
+
+    conn.executescript(schema_sql)
+
+
+def _add_backup_chain_columns(conn: sqlite3.Connection) -> None:
+    """Migration 2: delta chain columns of planning_entity_backups.
+
+    base_backup_id is the backup a delta row applies to (NULL for full
+    snapshots); chain_depth is the number of deltas above the snapshot.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(planning_entity_backups)")}
+    if "base_backup_id" not in columns:
+        conn.execute("ALTER TABLE planning_entity_backups ADD COLUMN base_backup_id INTEGER")
+    if "chain_depth" not in columns:
+        conn.execute("ALTER TABLE planning_entity_backups ADD COLUMN chain_depth INTEGER NOT NULL DEFAULT 0")
+
+
+def _add_json_sync_table(conn: sqlite3.Connection) -> None:
+    """Migration 3: planning_json_sync, the last synced version of each JSON state file.
+
+    Stores the file's stat signature (inode, size, mtime_ns), the SHA-256
+    of its content and the entity's updated_at at the last sync, so
+    incremental syncs skip unchanged files without reading them.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS planning_json_sync (
+            entity_type TEXT NOT NULL,
+            entity_id TEXT NOT NULL,
+            json_inode INTEGER NOT NULL,
+            json_size INTEGER NOT NULL,
+            json_mtime_ns INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            updated_at TEXT,
+            PRIMARY KEY (entity_type, entity_id)
+        )
+    """)
+
+
+# Ordered schema migrations: (target user_version, migration function).
+# Each migration must be idempotent - databases created before user_version
+# tracking report version 0 but already contain the base schema.
+SCHEMA_MIGRATIONS = [
+    (1, _apply_base_schema),
+    (2, _add_backup_chain_columns),
+    (3, _add_json_sync_table),
+]
+
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# Connection tuning applied once per connection
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -8000",  # ~8 MB page cache
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+]
+
+# Thread-local pool: {db_path: (connection, inode)}
+_pool = threading.local()
+# Database paths whose schema is already at SCHEMA_VERSION in this process
+_schema_ready: set = set()
+_schema_lock = threading.Lock()
+
+
+def _migrate_schema(conn: sqlite3.Connection) -> int:
+    """
+    Bring database schema up to SCHEMA_VERSION using PRAGMA user_version.
+
+    Args:
+        conn: Open database connection
+
+    Returns:
+        Schema version after migration
+    """
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    for version, migration in SCHEMA_MIGRATIONS:
+        if version <= current:
+            continue
+        migration(conn)
+        # PRAGMA does not accept bound parameters
+        conn.execute(f"PRAGMA user_version = {int(version)}")
+        conn.commit()
+        current = version
+
+    return current
+
+
+def _open_connection(db_path: Path) -> sqlite3.Connection:
+    """Open and tune a new connection, applying migrations once per process."""
+    conn = instrument_connection(sqlite3.connect(str(db_path), check_same_thread=False), "planning")
+    conn.row_factory = sqlite3.Row  # Access columns by name
+
+    try:
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+
+        key = str(db_path)
+        if key not in _schema_ready:
+            with _schema_lock:
+                if key not in _schema_ready:
+                    _migrate_schema(conn)
+                    _schema_ready.add(key)
+    except Exception:
+        conn.close()
+        raise
+
+    return conn
+
+
 def _init_database() -> sqlite3.Connection:
     """
-    Initialize SQLite database with schema.
+    Get the pooled SQLite connection for the current thread.
 
-    Creates database file if doesn't exist, runs schema script.
+    The first call per thread opens a connection (WAL, tuned pragmas); the
+    schema is migrated once per process. Later calls reuse the connection,
+    so callers must NOT close it. A transaction left open by an earlier
+    caller on this thread is rolled back (and logged) on checkout.
 
     Returns:
         sqlite3.Connection: Database connection
 
     Raises:
-        RuntimeError: If schema file missing or database init fails
+        RuntimeError: If schema file missing
+        sqlite3.Error: If database can't be opened
     """
     # Ensure workspace exists
     WORKSPACE_PATH.mkdir(parents=True, exist_ok=True)
 
-    # Check schema file exists
-    if not SCHEMA_FILE.exists():
-        raise RuntimeError(f"Schema file not found: {SCHEMA_FILE}")
+    db_path = PLANNING_STATE_DB_PATH
+    key = str(db_path)
+    connections = getattr(_pool, "connections", None)
+    if connections is None:
+        connections = _pool.connections = {}
 
-    # Connect to database (creates if doesn't exist)
-    conn = sqlite3.connect(str(PLANNING_STATE_DB_PATH))
-    conn.row_factory = sqlite3.Row  # Access columns by name
+    cached = connections.get(key)
+    if cached is not None:
+        conn, inode = cached
+        try:
+            # Reconnect if the database file was deleted or replaced
+            if os.stat(db_path).st_ino == inode:
+                if conn.in_transaction:
+                    logger.warning(f"Rolling back transaction left open on pooled connection to {db_path}")
+                    conn.rollback()
+                return conn
+        except OSError:
+            pass
+        connections.pop(key, None)
+        _schema_ready.discard(key)
+        conn.close()
 
-    # Load and execute schema
-    with open(SCHEMA_FILE, 'r', encoding='utf-8') as f:
-        schema_sql = f.read()
+    conn = _open_connection(db_path)
+    connections[key] = (conn, os.stat(db_path).st_ino)
+    return conn
 
-    conn.executescript(schema_sql)
-    conn.commit()
 
-    return conn
+def _get_db_connection() -> Optional[sqlite3.Connection]:
+    """
+    Get the pooled connection, or None if SQLite is unavailable.
+
+    Used by backup management functions which degrade gracefully.
+    """
+    try:
+        return _init_database()
+    except Exception:
+        return None
+
+
+def close_db_connections() -> None:
+    """Close all pooled connections owned by the current thread."""
+    connections = getattr(_pool, "connections", None) or {}
+    for conn, _ in connections.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    connections.clear()
 
 
 @contextmanager
@@ -91,29 +268,38 @@ def get_db_connection():
             cursor = conn.cursor()
             cursor.execute(...)
 
-    Handles connection lifecycle and cleanup.
+    Yields the pooled connection; rolls back on any exception (sqlite3
+    errors are re-raised as RuntimeError). The connection stays open for
+    reuse.
     """
-    conn = None
+    conn = _init_database()
     try:
-        conn = _init_database()
         yield conn
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
+        conn.rollback()
         raise RuntimeError(f"Database error: {e}") from e
-    finally:
-        if conn:
-            conn.close()
+    except BaseException:
+        conn.rollback()
+        raise
 
 
 # =============================================================================
 # Version Hash Calculation
 # =============================================================================
 
+def _hash_cache() -> HashCache:
+    """Hash cache of the planning workspace (workspace/hash-cache.db)."""
+    return get_hash_cache(WORKSPACE_PATH)
+
+
 def calculate_version_hash(file_path: str | Path) -> str:
     """
     Calculate SHA-256 hash of file content.
 
+    The file is only read when its (inode, size, mtime_ns) signature differs
+    from the cached one; if the cache is unavailable the file is hashed
+    directly.
+
     Args:
         file_path: Path to file
 
@@ -130,15 +316,79 @@ def calculate_version_hash(file_path: str | Path) -> str:
         raise FileNotFoundError(f"File not found: {file_path}")
 
     try:
-        with open(file_path, 'rb') as f:
-            content = f.read()
-
-        hash_obj = hashlib.sha256(content)
-        return hash_obj.hexdigest()
+        try:
+            return _hash_cache().hash(file_path)
+        except sqlite3.Error:
+            return hash_file(file_path)
     except Exception as e:
         raise RuntimeError(f"Failed to hash file {file_path}: {e}") from e
 
 
+def find_stale_entities(entity_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Find planning entities whose file no longer matches the stored version.
+
+    All files are hashed in one bulk pass through the hash cache (only
+    changed files are read, on a thread pool).
+
+    Args:
+        entity_type: Only check this entity type (None = all)
+
+    Returns:
+        Dict with:
+            success: bool
+            checked: int (entities with an existing file)
+            stale: List[Dict] (entity_type, entity_id, file_path, version_hash, current_hash)
+            missing: List[Dict] (entity_type, entity_id, file_path)
+            message: str
+    """
+    if entity_type is not None and entity_type not in ENTITY_TYPES:
+        return {"success": False, "message": f"Invalid entity_type '{entity_type}'. Must be one of: {ENTITY_TYPES}"}
+
+    conn = _get_db_connection()
+    if conn:
+        query = "SELECT entity_type, entity_id, file_path, version_hash FROM planning_entities"
+        rows = conn.execute(query + " WHERE entity_type = ?", (entity_type,)) if entity_type \
+            else conn.execute(query)
+        entities = [dict(zip(("entity_type", "entity_id", "file_path", "version_hash"), row)) for row in rows]
+    else:
+        types = (entity_type,) if entity_type else tuple(ENTITY_TYPES)
+        entities = _load_json_states(types)
+
+    present, missing = [], []
+    for entity in entities:
+        path = Path(entity['file_path'])
+        (present if path.is_file() else missing).append(entity)
+
+    try:
+        hashes = _hash_cache().hash_many(Path(e['file_path']) for e in present)
+    except sqlite3.Error:
+        hashes = {os.path.abspath(e['file_path']): hash_file(Path(e['file_path'])) for e in present}
+
+    stale = []
+    for entity in present:
+        current = hashes[os.path.abspath(entity['file_path'])]
+        if current != entity['version_hash']:
+            stale.append({
+                "entity_type": entity['entity_type'],
+                "entity_id": entity['entity_id'],
+                "file_path": entity['file_path'],
+                "version_hash": entity['version_hash'],
+                "current_hash": current
+            })
+
+    return {
+        "success": True,
+        "checked": len(present),
+        "stale": stale,
+        "missing": [
+            {"entity_type": e['entity_type'], "entity_id": e['entity_id'], "file_path": e['file_path']}
+            for e in missing
+        ],
+        "message": f"{len(stale)} stale, {len(missing)} missing of {len(entities)} entities"
+    }
+
+
 # =============================================================================
 # Entity CRUD Operations
 # =============================================================================
@@ -166,11 +416,9 @@ def get_entity_state(
     if entity_type not in ENTITY_TYPES:
         raise ValueError(f"Invalid entity_type: {entity_type}. Must be one of: {ENTITY_TYPES}")
 
-    close_conn = False
     if conn is None:
         try:
             conn = _init_database()
-            close_conn = True
         except Exception:
             # SQLite unavailable, try JSON fallback
             return _get_entity_state_json(entity_type, entity_id)
@@ -224,9 +472,6 @@ def get_entity_state(
     except sqlite3.Error as e:
         # Fallback to JSON
         return _get_entity_state_json(entity_type, entity_id)
-    finally:
-        if close_conn and conn:
-            conn.close()
 
 
 def update_entity_state(
@@ -271,11 +516,9 @@ def update_entity_state(
 
     now = datetime.now(timezone.utc).isoformat()
 
-    close_conn = False
     if conn is None:
         try:
             conn = _init_database()
-            close_conn = True
         except Exception:
             # SQLite unavailable, use JSON fallback
             return _update_entity_state_json(
@@ -363,9 +606,6 @@ def update_entity_state(
             file_path, parent_id, parent_version_hash,
             invalidation_reason, metadata
         )
-    finally:
-        if close_conn and conn:
-            conn.close()
 
 
 # =============================================================================
@@ -394,11 +634,9 @@ def get_all_descendants(
         >>> descendants = get_all_descendants('chapter', 'chapter-02')
         >>> print(len(descendants))  # 5 scenes
     """
-    close_conn = False
     if conn is None:
         try:
             conn = _init_database()
-            close_conn = True
         except Exception:
             # SQLite unavailable, JSON fallback
             return _get_all_descendants_json(entity_type, entity_id)
@@ -432,113 +670,158 @@ def get_all_descendants(
 
     except sqlite3.Error:
         return _get_all_descendants_json(entity_type, entity_id)
-    finally:
-        if close_conn and conn:
-            conn.close()
+
+
+# Statuses left untouched by cascade invalidation
+_CASCADE_SKIP_STATUSES = (STATUS_INVALID, STATUS_REQUIRES_REVALIDATION)
+
+# Descendants of (entity_type, entity_id) that cascade invalidation would touch.
+# Shared by the dry-run SELECT and the set-based UPDATE so both see the same
+# blast radius.
+_CASCADE_TARGETS_CTE = """
+    WITH RECURSIVE descendants(entity_type, entity_id) AS (
+        SELECT entity_type, entity_id
+        FROM planning_entities
+        WHERE entity_type = :entity_type AND entity_id = :entity_id
+
+        UNION
+
+        SELECT e.entity_type, e.entity_id
+        FROM planning_entities e
+        INNER JOIN descendants d ON e.parent_id = d.entity_id
+    ),
+    targets AS (
+        SELECT entity_type, entity_id FROM descendants
+        WHERE NOT (entity_type = :entity_type AND entity_id = :entity_id)
+    )
+"""
 
 
 def cascade_invalidate(
     entity_type: str,
     entity_id: str,
     reason: str,
-    conn: Optional[sqlite3.Connection] = None
+    conn: Optional[sqlite3.Connection] = None,
+    dry_run: bool = False
 ) -> Dict[str, Any]:
     """
-    Mark entity and all descendants as requires-revalidation.
+    Mark all descendants of an entity as requires-revalidation.
 
-    Transaction-based: all-or-nothing.
+    Set-based: the whole subtree is updated by a single
+    UPDATE ... WHERE (entity_type, entity_id) IN (recursive CTE) ... RETURNING
+    inside one transaction (all-or-nothing). Previous statuses are read by
+    the same CTE under the write lock, so the report is exact.
 
     Args:
         entity_type: Entity type
         entity_id: Entity ID
         reason: Invalidation reason
-        conn: Optional database connection
+        conn: Optional database connection. If it has a transaction open,
+            the update joins it and the caller commits or rolls back.
+        dry_run: If True, only report the entities that would be invalidated
 
     Returns:
         Dict with:
             - success: bool
-            - invalidated_entities: List of invalidated entities
+            - dry_run: bool
+            - invalidated_entities: List of {entity_type, entity_id,
+              previous_status, new_status} (would-be changes when dry_run)
             - error: Optional error message
 
     Example:
         >>> result = cascade_invalidate('chapter', 'chapter-02', 'parent_chapter_regenerated')
         >>> print(len(result['invalidated_entities']))  # 5 scenes
     """
-    close_conn = False
     if conn is None:
         try:
             conn = _init_database()
-            close_conn = True
         except Exception:
             # SQLite unavailable, JSON fallback
-            return _cascade_invalidate_json(entity_type, entity_id, reason)
+            return _cascade_invalidate_json(entity_type, entity_id, reason, dry_run)
 
-    try:
-        # Get all descendants
-        descendants = get_all_descendants(entity_type, entity_id, conn)
-
-        if not descendants:
-            return {
-                "success": True,
-                "invalidated_entities": []
-            }
+    params = {
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "skip_invalid": STATUS_INVALID,
+        "skip_revalidation": STATUS_REQUIRES_REVALIDATION,
+    }
+    target_filter = """
+        WHERE (entity_type, entity_id) IN (SELECT entity_type, entity_id FROM targets)
+          AND status NOT IN (:skip_invalid, :skip_revalidation)
+    """
 
-        # Start transaction
+    # A transaction the caller already has open on conn is joined, never
+    # committed or rolled back here
+    owns_transaction = False
+    try:
         cursor = conn.cursor()
-        invalidated = []
-        now = datetime.now(timezone.utc).isoformat()
 
-        for desc in descendants:
-            prev_status = desc['status']
-
-            # Skip if already invalid or requires-revalidation
-            if prev_status in [STATUS_INVALID, STATUS_REQUIRES_REVALIDATION]:
-                continue
+        # Take the write lock before reading so the blast radius cannot
+        # change between the SELECT and the UPDATE
+        owns_transaction = not dry_run and not conn.in_transaction
+        if owns_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+
+        cursor.execute(
+            _CASCADE_TARGETS_CTE
+            + "SELECT entity_type, entity_id, status FROM planning_entities"
+            + target_filter,
+            params
+        )
+        previous = {
+            (row['entity_type'], row['entity_id']): row['status']
+            for row in cursor.fetchall()
+        }
 
-            # Update status
-            cursor.execute("""
+        if dry_run or not previous:
+            if owns_transaction:
+                conn.rollback()
+            updated_keys = list(previous)
+        else:
+            now = datetime.now(timezone.utc).isoformat()
+            cursor.execute(
+                _CASCADE_TARGETS_CTE
+                + """
                 UPDATE planning_entities
                 SET
-                    status = ?,
-                    invalidation_reason = ?,
-                    invalidated_at = ?,
-                    updated_at = ?
-                WHERE entity_type = ? AND entity_id = ?
-            """, (
-                STATUS_REQUIRES_REVALIDATION,
-                reason,
-                now,
-                now,
-                desc['entity_type'],
-                desc['entity_id']
-            ))
-
-            invalidated.append({
-                "entity_type": desc['entity_type'],
-                "entity_id": desc['entity_id'],
-                "previous_status": prev_status,
-                "new_status": STATUS_REQUIRES_REVALIDATION
-            })
+                    status = :new_status,
+                    invalidation_reason = :reason,
+                    invalidated_at = :now,
+                    updated_at = :now
+                """
+                + target_filter
+                + "RETURNING entity_type, entity_id",
+                {**params, "new_status": STATUS_REQUIRES_REVALIDATION, "reason": reason, "now": now}
+            )
+            updated_keys = [(row['entity_type'], row['entity_id']) for row in cursor.fetchall()]
+            if owns_transaction:
+                conn.commit()
 
-        # Commit transaction
-        conn.commit()
+        updated_keys.sort(key=lambda key: (key[0], _natural_id_key(key[1])))
 
         return {
             "success": True,
-            "invalidated_entities": invalidated
+            "dry_run": dry_run,
+            "invalidated_entities": [
+                {
+                    "entity_type": key[0],
+                    "entity_id": key[1],
+                    "previous_status": previous[key],
+                    "new_status": STATUS_REQUIRES_REVALIDATION
+                }
+                for key in updated_keys
+            ]
         }
 
     except Exception as e:
-        if conn:
+        if owns_transaction:
             conn.rollback()
         return {
             "success": False,
+            "dry_run": dry_run,
             "invalidated_entities": [],
             "error": str(e)
         }
-    finally:
-        if close_conn and conn:
-            conn.close()
 
 
 def get_children_status(
@@ -567,11 +850,9 @@ def get_children_status(
     if entity_type not in ['act', 'chapter']:
         raise ValueError("Only acts and chapters have children")
 
-    close_conn = False
     if conn is None:
         try:
             conn = _init_database()
-            close_conn = True
         except Exception:
             return _get_children_status_json(entity_type, entity_id)
 
@@ -602,9 +883,431 @@ def get_children_status(
 
     except sqlite3.Error:
         return _get_children_status_json(entity_type, entity_id)
-    finally:
-        if close_conn and conn:
-            conn.close()
+
+
+# =============================================================================
+# Hierarchy Tree (single-pass loading)
+# =============================================================================
+
+# Expected child type for each level of the tree
+CHILD_TYPE = {"act": "chapter", "chapter": "scene"}
+
+
+def _natural_id_key(entity_id: str) -> Tuple[int, str]:
+    """Sort key for IDs like 'chapter-2' / 'chapter-10' (numeric suffix first)."""
+    try:
+        return (int(entity_id.rsplit('-', 1)[1]), entity_id)
+    except (IndexError, ValueError):
+        return (0, entity_id)
+
+
+@dataclass
+class HierarchyNode:
+    """In-memory node of an act → chapter → scene tree."""
+    entity_type: str
+    entity_id: str
+    status: str
+    parent_id: Optional[str] = None
+    file_path: Optional[str] = None
+    version_hash: Optional[str] = None
+    children: List["HierarchyNode"] = field(default_factory=list)
+
+    def iter_nodes(self):
+        """Yield this node and all descendants (pre-order)."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def status_counts(self) -> Dict[str, Dict[str, int]]:
+        """Count statuses per entity type across the whole subtree."""
+        counts: Dict[str, Dict[str, int]] = {}
+        for node in self.iter_nodes():
+            by_status = counts.setdefault(node.entity_type, {})
+            by_status[node.status] = by_status.get(node.status, 0) + 1
+        return counts
+
+    def to_dict(self, include_status: bool = True) -> Dict[str, Any]:
+        """Convert subtree to nested JSON-serializable dict."""
+        node = {
+            "entity_type": self.entity_type,
+            "entity_id": self.entity_id,
+        }
+        if include_status:
+            node["status"] = self.status
+        node["children"] = [child.to_dict(include_status) for child in self.children]
+        return node
+
+    def render_lines(self, include_status: bool = True) -> List[str]:
+        """Render subtree as box-drawing text lines."""
+        status_str = f" [{self.status}]" if include_status else ""
+        lines = [f"{self.entity_id}{status_str}"]
+        # Iterative walk: (node, prefix, is_last)
+        stack = [(child, "", i == len(self.children) - 1)
+                 for i, child in reversed(list(enumerate(self.children)))]
+        while stack:
+            node, prefix, is_last = stack.pop()
+            branch = "└──" if is_last else "├──"
+            status_str = f" [{node.status}]" if include_status else ""
+            lines.append(f"{prefix}{branch} {node.entity_id}{status_str}")
+            child_prefix = prefix + ("    " if is_last else "│   ")
+            count = len(node.children)
+            for i in reversed(range(count)):
+                stack.append((node.children[i], child_prefix, i == count - 1))
+        return lines
+
+
+def _build_hierarchy(root_type: str, root_id: str, rows: List[Dict[str, Any]]) -> Optional[HierarchyNode]:
+    """
+    Assemble HierarchyNode tree from flat rows in one pass.
+
+    Only children of the expected type are attached (chapters under acts,
+    scenes under chapters), matching the act → chapter → scene structure.
+    """
+    nodes: Dict[Tuple[str, str], HierarchyNode] = {}
+    for row in rows:
+        node = HierarchyNode(
+            entity_type=row['entity_type'],
+            entity_id=row['entity_id'],
+            status=row['status'],
+            parent_id=row.get('parent_id'),
+            file_path=row.get('file_path'),
+            version_hash=row.get('version_hash'),
+        )
+        nodes[(node.entity_type, node.entity_id)] = node
+
+    root = nodes.get((root_type, root_id))
+    if root is None:
+        return None
+
+    for node in nodes.values():
+        if node is root or node.parent_id is None:
+            continue
+        for parent_type, child_type in CHILD_TYPE.items():
+            if child_type == node.entity_type:
+                parent = nodes.get((parent_type, node.parent_id))
+                if parent is not None:
+                    parent.children.append(node)
+                break
+
+    for node in nodes.values():
+        node.children.sort(key=lambda n: _natural_id_key(n.entity_id))
+
+    return root
+
+
+def get_hierarchy_tree(
+    act_id: str,
+    conn: Optional[sqlite3.Connection] = None
+) -> Optional[HierarchyNode]:
+    """
+    Load complete act subtree with a single recursive query.
+
+    Args:
+        act_id: Act ID (e.g., 'act-1')
+        conn: Optional database connection
+
+    Returns:
+        Root HierarchyNode for the act, or None if act not found
+
+    Example:
+        >>> tree = get_hierarchy_tree('act-1')
+        >>> print("\n".join(tree.render_lines()))
+        >>> print(tree.status_counts())  # {'act': {'approved': 1}, 'chapter': {...}, ...}
+    """
+    if conn is None:
+        try:
+            conn = _init_database()
+        except Exception:
+            return _get_hierarchy_tree_json(act_id)
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            WITH RECURSIVE tree AS (
+                SELECT entity_type, entity_id, status, version_hash, parent_id, file_path
+                FROM planning_entities
+                WHERE entity_type = 'act' AND entity_id = ?
+
+                UNION
+
+                SELECT e.entity_type, e.entity_id, e.status, e.version_hash, e.parent_id, e.file_path
+                FROM planning_entities e
+                INNER JOIN tree t ON e.parent_id = t.entity_id
+                WHERE (t.entity_type = 'act' AND e.entity_type = 'chapter')
+                   OR (t.entity_type = 'chapter' AND e.entity_type = 'scene')
+            )
+            SELECT * FROM tree
+        """, (act_id,))
+
+        rows = [dict(row) for row in cursor.fetchall()]
+        return _build_hierarchy('act', act_id, rows)
+
+    except sqlite3.Error:
+        return _get_hierarchy_tree_json(act_id)
+
+
+# =============================================================================
+# Drift Reconciliation
+# =============================================================================
+
+# Book directory holding act / chapter / scene planning files
+ACTS_PATH = Path("acts")
+
+# invalidation_reason written by reconcile_planning_state(apply=True)
+DRIFT_REASON_MODIFIED = "file_modified_outside_tools"
+DRIFT_REASON_MISSING = "file_missing"
+DRIFT_REASON_ANCESTOR = "ancestor_file_drift"
+
+# Roots of a drift reconciliation (drifted and missing entities), loaded once
+# per call; descendants are found by one recursive CTE over all roots.
+_DRIFT_ROOTS_SCHEMA = """
+    CREATE TEMP TABLE IF NOT EXISTS drift_roots (
+        entity_type TEXT NOT NULL,
+        entity_id TEXT NOT NULL,
+        new_status TEXT NOT NULL,
+        current_hash TEXT,
+        reason TEXT NOT NULL,
+        PRIMARY KEY (entity_type, entity_id)
+    )
+"""
+
+_DRIFT_TARGETS_CTE = """
+    WITH RECURSIVE descendants(entity_type, entity_id) AS (
+        SELECT entity_type, entity_id FROM temp.drift_roots
+
+        UNION
+
+        SELECT e.entity_type, e.entity_id
+        FROM planning_entities e
+        INNER JOIN descendants d ON e.parent_id = d.entity_id
+    ),
+    targets AS (
+        SELECT entity_type, entity_id FROM descendants
+        EXCEPT
+        SELECT entity_type, entity_id FROM temp.drift_roots
+    )
+"""
+
+
+def _drift_roots(report: DriftReport) -> List[Tuple[str, str, str, Optional[str], str]]:
+    """(entity_type, entity_id, new_status, current_hash, reason) per drifted / missing entity."""
+    roots = [
+        (e['entity_type'], e['entity_id'],
+         STATUS_INVALID if e['status'] == STATUS_INVALID else STATUS_REQUIRES_REVALIDATION,
+         e['current_hash'], DRIFT_REASON_MODIFIED)
+        for e in report.drifted
+    ]
+    roots.extend(
+        (e['entity_type'], e['entity_id'], STATUS_INVALID, None, DRIFT_REASON_MISSING)
+        for e in report.missing
+    )
+    return roots
+
+
+def _apply_drift(conn: sqlite3.Connection, report: DriftReport) -> List[Dict[str, Any]]:
+    """Invalidate drifted / missing entities and their subtrees in one transaction.
+
+    Drifted entities take the file's current hash and become
+    requires-revalidation, missing ones become invalid; all their descendants
+    become requires-revalidation (set-based, like cascade_invalidate).
+    Inside a transaction the caller already has open, the changes are made
+    under a savepoint and committing or rolling back is left to the caller.
+
+    Returns:
+        List of {entity_type, entity_id, previous_status, new_status}
+    """
+    roots = _drift_roots(report)
+    if not roots:
+        return []
+
+    now = datetime.now(timezone.utc).isoformat()
+    skip = {"skip_invalid": STATUS_INVALID, "skip_revalidation": STATUS_REQUIRES_REVALIDATION}
+    cursor = conn.cursor()
+    owns_transaction = not conn.in_transaction
+    cursor.execute("BEGIN IMMEDIATE" if owns_transaction else "SAVEPOINT apply_drift")
+    try:
+        cursor.execute(_DRIFT_ROOTS_SCHEMA)
+        cursor.execute("DELETE FROM temp.drift_roots")
+        cursor.executemany("INSERT OR REPLACE INTO temp.drift_roots VALUES (?, ?, ?, ?, ?)", roots)
+
+        # Previous statuses, read under the write lock
+        cursor.execute("""
+            SELECT e.entity_type, e.entity_id, e.status AS previous_status, r.new_status
+            FROM planning_entities e
+            INNER JOIN temp.drift_roots r
+                ON r.entity_type = e.entity_type AND r.entity_id = e.entity_id
+            WHERE e.status != r.new_status OR r.current_hash IS NOT NULL
+        """)
+        changes = [dict(row) for row in cursor.fetchall()]
+        cursor.execute(
+            _DRIFT_TARGETS_CTE
+            + """
+            SELECT entity_type, entity_id, status AS previous_status, :new_status AS new_status
+            FROM planning_entities
+            WHERE (entity_type, entity_id) IN (SELECT entity_type, entity_id FROM targets)
+              AND status NOT IN (:skip_invalid, :skip_revalidation)
+            """,
+            {**skip, "new_status": STATUS_REQUIRES_REVALIDATION}
+        )
+        changes.extend(dict(row) for row in cursor.fetchall())
+
+        cursor.execute("""
+            UPDATE planning_entities AS e
+            SET
+                previous_version_hash = CASE WHEN r.current_hash IS NULL
+                    THEN e.previous_version_hash ELSE e.version_hash END,
+                version_hash = COALESCE(r.current_hash, e.version_hash),
+                status = r.new_status,
+                invalidation_reason = r.reason,
+                invalidated_at = :now,
+                updated_at = :now
+            FROM temp.drift_roots AS r
+            WHERE r.entity_type = e.entity_type AND r.entity_id = e.entity_id
+        """, {"now": now})
+        cursor.execute(
+            _DRIFT_TARGETS_CTE
+            + """
+            UPDATE planning_entities
+            SET
+                status = :new_status,
+                invalidation_reason = :reason,
+                invalidated_at = :now,
+                updated_at = :now
+            WHERE (entity_type, entity_id) IN (SELECT entity_type, entity_id FROM targets)
+              AND status NOT IN (:skip_invalid, :skip_revalidation)
+            """,
+            {**skip, "new_status": STATUS_REQUIRES_REVALIDATION, "reason": DRIFT_REASON_ANCESTOR, "now": now}
+        )
+        cursor.execute("DELETE FROM temp.drift_roots")
+        if owns_transaction:
+            conn.commit()
+        else:
+            cursor.execute("RELEASE apply_drift")
+    except Exception:
+        if owns_transaction:
+            conn.rollback()
+        else:
+            cursor.execute("ROLLBACK TO apply_drift")
+            cursor.execute("RELEASE apply_drift")
+        raise
+
+    changes.sort(key=lambda c: (c['entity_type'], _natural_id_key(c['entity_id'])))
+    return changes
+
+
+def _apply_drift_json(states: List[Dict[str, Any]], report: DriftReport) -> List[Dict[str, Any]]:
+    """Apply drift reconciliation to JSON state files (fallback)."""
+    by_key = {(state['entity_type'], state['entity_id']): state for state in states}
+    children_by_parent: Dict[str, List[Dict[str, Any]]] = {}
+    for state in states:
+        children_by_parent.setdefault(state.get('parent_id'), []).append(state)
+
+    now = datetime.now(timezone.utc).isoformat()
+    updates: Dict[Tuple[str, str], Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+    roots = _drift_roots(report)
+    for entity_type, entity_id, new_status, current_hash, reason in roots:
+        state = by_key.get((entity_type, entity_id))
+        if state is None:
+            continue
+        fields = {"status": new_status, "invalidation_reason": reason, "invalidated_at": now, "updated_at": now}
+        if current_hash is not None:
+            fields.update(previous_version_hash=state.get('version_hash'), version_hash=current_hash)
+        updates[(entity_type, entity_id)] = (state, fields)
+
+    root_keys = set(updates)
+    pending = [entity_id for _, entity_id, _, _, _ in roots]
+    seen = set(root_keys)
+    while pending:
+        for child in children_by_parent.get(pending.pop(), []):
+            key = (child['entity_type'], child['entity_id'])
+            if key in seen:
+                continue
+            seen.add(key)
+            pending.append(child['entity_id'])
+            if child['status'] not in _CASCADE_SKIP_STATUSES:
+                updates[key] = (child, {
+                    "status": STATUS_REQUIRES_REVALIDATION,
+                    "invalidation_reason": DRIFT_REASON_ANCESTOR,
+                    "invalidated_at": now,
+                    "updated_at": now
+                })
+
+    changes = []
+    for key in sorted(updates, key=lambda k: (k[0], _natural_id_key(k[1]))):
+        state, fields = updates[key]
+        previous_status = state['status']
+        try:
+            atomic_write_json(_get_json_file_path(*key), {**state, **fields})
+        except Exception:
+            continue
+        changes.append({
+            "entity_type": key[0],
+            "entity_id": key[1],
+            "previous_status": previous_status,
+            "new_status": fields['status']
+        })
+    return changes
+
+
+def reconcile_planning_state(
+    acts_path: Optional[Path] = None,
+    apply: bool = False
+) -> Dict[str, Any]:
+    """
+    Compare planning entities with the planning files under acts/.
+
+    acts/ is walked once and hashed through the hash cache (unchanged files
+    are not read); entities are loaded by a single query. With apply=True,
+    drifted entities take their file's current hash and become
+    requires-revalidation, entities whose file is missing become invalid,
+    and the descendants of both are invalidated in the same transaction.
+    Orphaned files (no entity) are only reported - register them with
+    update_entity_state.
+
+    Args:
+        acts_path: Book's acts/ directory (default: ACTS_PATH)
+        apply: Write the invalidations (default: report only)
+
+    Returns:
+        Dict with:
+            success: bool
+            applied: bool
+            report: DriftReport (drifted, missing, orphaned, checked, files_scanned)
+            invalidated_entities: List of {entity_type, entity_id,
+                previous_status, new_status} (empty unless applied)
+            message: str
+    """
+    acts_path = Path(acts_path) if acts_path is not None else ACTS_PATH
+    columns = ("entity_type", "entity_id", "status", "version_hash", "file_path")
+
+    conn = _get_db_connection()
+    try:
+        if conn:
+            rows = conn.execute(f"SELECT {', '.join(columns)} FROM planning_entities")
+            entities = [dict(zip(columns, row)) for row in rows]
+        else:
+            entities = [{c: state.get(c) for c in columns} for state in _load_json_states()]
+
+        report = detect_drift(acts_path, entities, _hash_cache())
+
+        changes: List[Dict[str, Any]] = []
+        if apply and not report.clean:
+            changes = _apply_drift(conn, report) if conn else _apply_drift_json(_load_json_states(), report)
+    except (sqlite3.Error, OSError, RuntimeError) as e:
+        return {"success": False, "applied": False, "message": f"Reconciliation failed: {e}"}
+
+    counts = report.counts()
+    return {
+        "success": True,
+        "applied": bool(changes),
+        "report": report,
+        "invalidated_entities": changes,
+        "message": f"{counts['drifted']} drifted, {counts['missing']} missing, "
+                   f"{counts['orphaned']} orphaned ({report.checked} entities checked, "
+                   f"{report.files_scanned} files scanned)"
+    }
 
 
 # =============================================================================
@@ -678,8 +1381,7 @@ def _update_entity_state_json(
 
     # Write to file
     try:
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
+        atomic_write_json(json_path, state)
         return True
     except Exception:
         return False
@@ -721,40 +1423,83 @@ def _get_all_descendants_json(entity_type: str, entity_id: str) -> List[Dict[str
     return descendants
 
 
-def _cascade_invalidate_json(entity_type: str, entity_id: str, reason: str) -> Dict[str, Any]:
-    """Cascade invalidate using JSON files (fallback)."""
-    descendants = _get_all_descendants_json(entity_type, entity_id)
-    invalidated = []
+def _load_json_states(entity_types: Tuple[str, ...] = tuple(ENTITY_TYPES)) -> List[Dict[str, Any]]:
+    """Load every JSON state file of the given types - one directory scan per type."""
+    states = []
+    for entity_type in entity_types:
+        json_dir = PLANNING_STATE_JSON_DIR / f"{entity_type}s"
+        if not json_dir.exists():
+            continue
 
-    for desc in descendants:
-        prev_status = desc['status']
+        for json_file in json_dir.glob("*.json"):
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    states.append(json.load(f))
+            except Exception:
+                continue
 
-        if prev_status in [STATUS_INVALID, STATUS_REQUIRES_REVALIDATION]:
-            continue
+    return states
 
-        # Update JSON file
-        success = _update_entity_state_json(
-            desc['entity_type'],
-            desc['entity_id'],
-            STATUS_REQUIRES_REVALIDATION,
-            desc['version_hash'],
-            desc['file_path'],
-            desc.get('parent_id'),
-            desc.get('parent_version_hash'),
-            reason,
-            desc.get('metadata')
-        )
 
-        if success:
-            invalidated.append({
-                "entity_type": desc['entity_type'],
-                "entity_id": desc['entity_id'],
-                "previous_status": prev_status,
-                "new_status": STATUS_REQUIRES_REVALIDATION
+def _cascade_invalidate_json(
+    entity_type: str,
+    entity_id: str,
+    reason: str,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Cascade invalidate using JSON files (fallback).
+
+    Loads chapter and scene states once, resolves the subtree in memory and
+    rewrites only the files whose status changes.
+    """
+    children_by_parent: Dict[str, List[Dict[str, Any]]] = {}
+    for state in _load_json_states(('chapter', 'scene')):
+        children_by_parent.setdefault(state.get('parent_id'), []).append(state)
+
+    targets = []
+    pending = [entity_id]
+    seen = set()
+    while pending:
+        for child in children_by_parent.get(pending.pop(), []):
+            key = (child['entity_type'], child['entity_id'])
+            if key in seen:
+                continue
+            seen.add(key)
+            pending.append(child['entity_id'])
+            if child['status'] not in _CASCADE_SKIP_STATUSES:
+                targets.append(child)
+
+    targets.sort(key=lambda state: (state['entity_type'], _natural_id_key(state['entity_id'])))
+    invalidated = []
+    now = datetime.now(timezone.utc).isoformat()
+
+    for state in targets:
+        prev_status = state['status']
+
+        if not dry_run:
+            state.update({
+                "status": STATUS_REQUIRES_REVALIDATION,
+                "previous_version_hash": state.get('version_hash'),
+                "invalidation_reason": reason,
+                "invalidated_at": now,
+                "updated_at": now
             })
+            try:
+                atomic_write_json(_get_json_file_path(state['entity_type'], state['entity_id']), state)
+            except Exception:
+                continue
+
+        invalidated.append({
+            "entity_type": state['entity_type'],
+            "entity_id": state['entity_id'],
+            "previous_status": prev_status,
+            "new_status": STATUS_REQUIRES_REVALIDATION
+        })
 
     return {
         "success": True,
+        "dry_run": dry_run,
         "invalidated_entities": invalidated
     }
 
@@ -796,20 +1541,75 @@ def _get_children_status_json(entity_type: str, entity_id: str) -> Dict[str, Any
     }
 
 
+def _get_hierarchy_tree_json(act_id: str) -> Optional[HierarchyNode]:
+    """Build hierarchy tree from JSON files (fallback) - one scan per entity type."""
+    rows = _load_json_states()
+    return _build_hierarchy('act', act_id, rows)
+
+
 # =============================================================================
 # Sync Operations
 # =============================================================================
 
+# Columns of planning_entities mirrored in JSON state files
+_ENTITY_COLUMNS = (
+    "entity_type", "entity_id", "status", "version_hash", "previous_version_hash",
+    "file_path", "parent_id", "parent_version_hash", "invalidation_reason",
+    "invalidated_at", "created_at", "updated_at", "metadata"
+)
+
+_UPSERT_ENTITY_SQL = f"""
+    INSERT OR REPLACE INTO planning_entities ({', '.join(_ENTITY_COLUMNS)})
+    VALUES ({', '.join('?' * len(_ENTITY_COLUMNS))})
+"""
+
+_UPSERT_JSON_SYNC_SQL = """
+    INSERT OR REPLACE INTO planning_json_sync (
+        entity_type, entity_id, json_inode, json_size, json_mtime_ns, content_hash, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# (inode, size, mtime_ns) of a JSON state file
+JsonSignature = Tuple[int, int, int]
+
+
+def _json_signature(stat: os.stat_result) -> JsonSignature:
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _load_json_sync(conn: sqlite3.Connection) -> Dict[Tuple[str, str], Tuple[JsonSignature, str, Optional[str]]]:
+    """Last synced (signature, content_hash, updated_at) of every JSON state file."""
+    return {
+        (row[0], row[1]): ((row[2], row[3], row[4]), row[5], row[6])
+        for row in conn.execute(
+            "SELECT entity_type, entity_id, json_inode, json_size, json_mtime_ns, content_hash, updated_at "
+            "FROM planning_json_sync"
+        )
+    }
+
+
+def _sync_row(key: Tuple[str, str], stat: os.stat_result, digest: str, updated_at: Optional[str]) -> Tuple:
+    return (*key, *_json_signature(stat), digest, updated_at)
+
+
 def sync_from_json_to_sqlite() -> Dict[str, Any]:
     """
     Sync planning state from JSON files to SQLite on startup.
 
-    Scans all JSON files and inserts/updates SQLite database.
+    Incremental: a JSON file whose stat signature (or content hash) matches
+    the last sync is skipped without parsing. Changed files are compared by
+    updated_at with the SQLite row - the newer JSON state is upserted, an
+    older one (SQLite changed since) is reported as a conflict and left
+    alone. All upserts are written with executemany in one transaction.
 
     Returns:
         Dict with:
             - success: bool
-            - entities_synced: int
+            - entities_synced: int (rows inserted or updated)
+            - skipped: int (unchanged files)
+            - updated: int (same as entities_synced)
+            - conflicted: int
+            - conflicts: List of {entity_type, entity_id, json_updated_at, db_updated_at}
             - errors: List of errors
     """
     try:
@@ -821,29 +1621,66 @@ def sync_from_json_to_sqlite() -> Dict[str, Any]:
             "errors": [f"Failed to initialize database: {e}"]
         }
 
-    entities_synced = 0
+    upserts = []
+    sync_rows = []
+    conflicts = []
+    skipped = 0
     errors = []
 
     try:
+        synced = _load_json_sync(conn)
+        db_versions = {
+            (row[0], row[1]): row[2]
+            for row in conn.execute("SELECT entity_type, entity_id, updated_at FROM planning_entities")
+        }
+
         for entity_type in ENTITY_TYPES:
             json_dir = PLANNING_STATE_JSON_DIR / f"{entity_type}s"
             if not json_dir.exists():
                 continue
 
-            for json_file in json_dir.glob("*.json"):
+            for entry in os.scandir(json_dir):
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                key = (entity_type, entry.name[:-len(".json")])
                 try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        state = json.load(f)
-
-                    # Insert or update in SQLite
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO planning_entities (
-                            entity_type, entity_id, status, version_hash, previous_version_hash,
-                            file_path, parent_id, parent_version_hash, invalidation_reason,
-                            invalidated_at, created_at, updated_at, metadata
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
+                    stat = entry.stat()
+                    last = synced.get(key)
+                    in_db = key in db_versions
+                    if last is not None and in_db and last[0] == _json_signature(stat):
+                        skipped += 1
+                        continue
+
+                    with open(entry.path, 'rb') as f:
+                        data = f.read()
+                    digest = content_hash(data)
+                    if last is not None and in_db and last[1] == digest:
+                        # Touched but not changed
+                        skipped += 1
+                        sync_rows.append(_sync_row(key, stat, digest, db_versions[key]))
+                        continue
+
+                    state = json.loads(data)
+                    key = (state['entity_type'], state['entity_id'])
+                    json_updated = state.get('updated_at')
+                    db_updated = db_versions.get(key)
+
+                    if db_updated is not None and json_updated is not None and json_updated < db_updated:
+                        conflicts.append({
+                            "entity_type": key[0],
+                            "entity_id": key[1],
+                            "json_updated_at": json_updated,
+                            "db_updated_at": db_updated
+                        })
+                        continue
+
+                    sync_rows.append(_sync_row(key, stat, digest, json_updated))
+                    if db_updated is not None and json_updated == db_updated:
+                        skipped += 1
+                        continue
+
+                    now = datetime.now(timezone.utc).isoformat()
+                    upserts.append((
                         state['entity_type'],
                         state['entity_id'],
                         state['status'],
@@ -854,21 +1691,26 @@ def sync_from_json_to_sqlite() -> Dict[str, Any]:
                         state.get('parent_version_hash'),
                         state.get('invalidation_reason'),
                         state.get('invalidated_at'),
-                        state.get('created_at', datetime.now(timezone.utc).isoformat()),
-                        state.get('updated_at', datetime.now(timezone.utc).isoformat()),
+                        state.get('created_at', now),
+                        state.get('updated_at', now),
                         json.dumps(state.get('metadata', {}))
                     ))
 
-                    entities_synced += 1
-
                 except Exception as e:
-                    errors.append(f"Failed to sync {json_file}: {e}")
+                    errors.append(f"Failed to sync {entry.path}: {e}")
 
-        conn.commit()
+        if upserts or sync_rows:
+            with conn:
+                conn.executemany(_UPSERT_ENTITY_SQL, upserts)
+                conn.executemany(_UPSERT_JSON_SYNC_SQL, sync_rows)
 
         return {
             "success": True,
-            "entities_synced": entities_synced,
+            "entities_synced": len(upserts),
+            "skipped": skipped,
+            "updated": len(upserts),
+            "conflicted": len(conflicts),
+            "conflicts": conflicts,
             "errors": errors
         }
 
@@ -876,23 +1718,29 @@ def sync_from_json_to_sqlite() -> Dict[str, Any]:
         conn.rollback()
         return {
             "success": False,
-            "entities_synced": entities_synced,
+            "entities_synced": 0,
             "errors": errors + [f"Transaction failed: {e}"]
         }
-    finally:
-        conn.close()
 
 
 def sync_from_sqlite_to_json() -> Dict[str, Any]:
     """
     Sync planning state from SQLite to JSON files.
 
-    Dumps all entities from SQLite to individual JSON files.
+    Incremental: entities whose updated_at and JSON file are unchanged since
+    the last sync are skipped outright; others are serialized and their JSON
+    file is only (atomically) rewritten when the content differs. A JSON file modified outside the sync
+    with a newer updated_at than the SQLite row is reported as a conflict
+    and left alone.
 
     Returns:
         Dict with:
             - success: bool
-            - entities_synced: int
+            - entities_synced: int (files written)
+            - skipped: int (files already up to date)
+            - updated: int (same as entities_synced)
+            - conflicted: int
+            - conflicts: List of {entity_type, entity_id, json_updated_at, db_updated_at}
             - errors: List of errors
     """
     try:
@@ -904,16 +1752,38 @@ def sync_from_sqlite_to_json() -> Dict[str, Any]:
             "errors": [f"Failed to initialize database: {e}"]
         }
 
-    entities_synced = 0
+    written = 0
+    skipped = 0
+    sync_rows = []
+    conflicts = []
     errors = []
 
     try:
+        synced = _load_json_sync(conn)
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM planning_entities")
         rows = cursor.fetchall()
 
+        json_dirs = {}
+        for entity_type in ENTITY_TYPES:
+            json_dir = PLANNING_STATE_JSON_DIR / f"{entity_type}s"
+            json_dir.mkdir(parents=True, exist_ok=True)
+            json_dirs[entity_type] = str(json_dir)
+
         for row in rows:
             state = dict(row)
+            key = (state['entity_type'], state['entity_id'])
+            json_path = os.path.join(json_dirs[state['entity_type']], f"{state['entity_id']}.json")
+
+            # Same version as last synced and file untouched: nothing to serialize
+            last = synced.get(key)
+            if last is not None and last[2] == state['updated_at']:
+                try:
+                    if _json_signature(os.stat(json_path)) == last[0]:
+                        skipped += 1
+                        continue
+                except OSError:
+                    pass
 
             # Parse metadata JSON
             if state['metadata']:
@@ -922,35 +1792,205 @@ def sync_from_sqlite_to_json() -> Dict[str, Any]:
                 except json.JSONDecodeError:
                     state['metadata'] = {}
 
-            # Write to JSON file
-            json_path = _get_json_file_path(state['entity_type'], state['entity_id'])
+            data = dumps_json(state).encode('utf-8')
+            digest = content_hash(data)
             try:
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(state, f, indent=2, ensure_ascii=False)
-                entities_synced += 1
+                try:
+                    stat = os.stat(json_path)
+                except FileNotFoundError:
+                    stat = None
+
+                if stat is not None:
+                    if last is not None and last[0] == _json_signature(stat):
+                        # File unchanged since the last sync
+                        if last[1] == digest:
+                            skipped += 1
+                            continue
+                    else:
+                        with open(json_path, 'rb') as f:
+                            existing = f.read()
+                        if existing == data:
+                            skipped += 1
+                            sync_rows.append(_sync_row(key, stat, digest, state['updated_at']))
+                            continue
+                        json_updated = json.loads(existing).get('updated_at')
+                        if json_updated is not None and json_updated > state['updated_at']:
+                            conflicts.append({
+                                "entity_type": key[0],
+                                "entity_id": key[1],
+                                "json_updated_at": json_updated,
+                                "db_updated_at": state['updated_at']
+                            })
+                            continue
+
+                stat = atomic_write_bytes(Path(json_path), data)
+                sync_rows.append(_sync_row(key, stat, digest, state['updated_at']))
+                written += 1
             except Exception as e:
                 errors.append(f"Failed to write {json_path}: {e}")
 
+        if sync_rows:
+            with conn:
+                conn.executemany(_UPSERT_JSON_SYNC_SQL, sync_rows)
+
         return {
             "success": True,
-            "entities_synced": entities_synced,
+            "entities_synced": written,
+            "skipped": skipped,
+            "updated": written,
+            "conflicted": len(conflicts),
+            "conflicts": conflicts,
             "errors": errors
         }
 
     except Exception as e:
         return {
             "success": False,
-            "entities_synced": entities_synced,
+            "entities_synced": written,
             "errors": errors + [f"Failed to read from SQLite: {e}"]
         }
-    finally:
-        conn.close()
 
 
 # =============================================================================
 # Backup Management (FEAT-0003 Phase 5)
 # =============================================================================
 
+# Blob store reference name of a backup row: planning-backup/{backup_id}
+BACKUP_REF_PREFIX = "planning-backup/"
+
+
+def _blob_store() -> BlobStore:
+    """Blob store of the planning workspace (workspace/blobs)."""
+    return get_blob_store(WORKSPACE_PATH)
+
+
+def _backup_ref(backup_id: int) -> str:
+    return f"{BACKUP_REF_PREFIX}{backup_id}"
+
+
+def _backup_exists(backup_file_path: str) -> bool:
+    """Check a backup_file_path column value (blob: URI or legacy file path)."""
+    blob_hash = parse_blob_uri(backup_file_path)
+    if blob_hash is None:
+        return Path(backup_file_path).exists()
+    return _blob_store().has(blob_hash)
+
+
+def _read_backup_bytes(backup_file_path: str) -> bytes:
+    """Read a backup's content through the blob store or from a legacy file.
+
+    Raises:
+        FileNotFoundError: If the blob / file does not exist
+        ValueError: If the stored blob is corrupted
+    """
+    blob_hash = parse_blob_uri(backup_file_path)
+    if blob_hash is None:
+        with open(backup_file_path, 'rb') as f:
+            return f.read()
+    return _blob_store().get_bytes(blob_hash)
+
+
+# Backup Delta Chains
+#
+# A backup row stores either a full snapshot (base_backup_id NULL) or a line
+# delta against the entity's previous backup (backup_file_path is then the
+# blob: URI of the encoded delta). A version is rebuilt from its snapshot by
+# applying at most BACKUP_CHAIN_LENGTH deltas.
+
+STORAGE_SNAPSHOT = "snapshot"
+STORAGE_DELTA = "delta"
+STORAGE_DEDUPLICATED = "deduplicated"  # Reference to an already stored snapshot
+
+
+def _load_backup_chain(conn: sqlite3.Connection, backup_id: int) -> List[sqlite3.Row]:
+    """Rows from the backup's snapshot down to the backup itself (one query).
+
+    Raises:
+        FileNotFoundError: If the backup or one of its bases is missing
+    """
+    rows = conn.execute("""
+        WITH RECURSIVE chain(backup_id, base_backup_id, level) AS (
+            SELECT backup_id, base_backup_id, 0
+            FROM planning_entity_backups WHERE backup_id = ?
+            UNION ALL
+            SELECT b.backup_id, b.base_backup_id, c.level + 1
+            FROM planning_entity_backups b
+            JOIN chain c ON b.backup_id = c.base_backup_id
+            WHERE b.backup_id < c.backup_id  -- bases are always older: no cycles
+        )
+        SELECT b.backup_id, b.entity_type, b.entity_id, b.version_hash, b.backup_file_path,
+               b.backed_up_at, b.base_backup_id, b.chain_depth
+        FROM chain c JOIN planning_entity_backups b ON b.backup_id = c.backup_id
+        ORDER BY c.level DESC
+    """, (backup_id,)).fetchall()
+
+    if not rows:
+        raise FileNotFoundError(f"Backup {backup_id} not found")
+    if rows[0]["base_backup_id"] is not None:
+        raise FileNotFoundError(
+            f"Base backup {rows[0]['base_backup_id']} of backup {rows[0]['backup_id']} not found"
+        )
+    return rows
+
+
+def _read_delta(row: sqlite3.Row) -> Delta:
+    return Delta.decode(_read_backup_bytes(row["backup_file_path"]))
+
+
+def _rebuild_lines(chain: List[sqlite3.Row]) -> List[str]:
+    """Apply a chain's deltas to its snapshot."""
+    lines = split_lines(_read_backup_bytes(chain[0]["backup_file_path"]).decode('utf-8'))
+    for row in chain[1:]:
+        lines = apply_delta(lines, _read_delta(row))
+    return lines
+
+
+def _read_chain_content(chain: List[sqlite3.Row]) -> bytes:
+    """Content of the last backup of a chain.
+
+    Raises:
+        FileNotFoundError: If a blob / legacy file is missing
+        ValueError: If the rebuilt content does not match its version hash
+    """
+    if len(chain) == 1:
+        return _read_backup_bytes(chain[0]["backup_file_path"])
+
+    data = "".join(_rebuild_lines(chain)).encode('utf-8')
+    if content_hash(data) != chain[-1]["version_hash"]:
+        raise ValueError(f"Backup {chain[-1]['backup_id']} could not be rebuilt from its delta chain")
+    return data
+
+
+def _read_backup_content(conn: sqlite3.Connection, backup_id: int) -> bytes:
+    """Content of a backup (snapshot, delta chain or legacy file)."""
+    return _read_chain_content(_load_backup_chain(conn, backup_id))
+
+
+def _delta_from_previous(
+    conn: sqlite3.Connection,
+    previous: Optional[sqlite3.Row],
+    data: bytes
+) -> Optional[Delta]:
+    """Delta from the entity's previous backup, or None to store a snapshot.
+
+    A snapshot is stored when there is no previous backup, the chain is at
+    BACKUP_CHAIN_LENGTH, the content is not UTF-8 text, the previous version
+    can't be rebuilt, or the delta would not be smaller than the content.
+    """
+    if previous is None or previous["chain_depth"] >= BACKUP_CHAIN_LENGTH:
+        return None
+    try:
+        new_lines = split_lines(data.decode('utf-8'))
+        base_lines = split_lines(_read_backup_content(conn, previous["backup_id"]).decode('utf-8'))
+    except (OSError, ValueError):  # UnicodeDecodeError is a ValueError
+        return None
+
+    delta = compute_delta(base_lines, new_lines)
+    if len(delta.encode()) >= len(data):
+        return None
+    return delta
+
+
 def create_backup(
     entity_type: str,
     entity_id: str,
@@ -958,7 +1998,14 @@ def create_backup(
     reason: str = "manual"
 ) -> Dict[str, Any]:
     """
-    Create timestamped backup of planning file.
+    Create backup of planning file.
+
+    With the database available the backup is stored in the blob store and
+    the backup row references it as blob:sha256:<hash>: a line delta against
+    the entity's previous backup, or a full snapshot every BACKUP_CHAIN_LENGTH
+    versions (content that is already stored is referenced, not stored
+    again). Without the database, a timestamped copy is written to a
+    backups/ folder next to the file.
 
     Args:
         entity_type: Entity type ('act', 'chapter', 'scene')
@@ -970,7 +2017,10 @@ def create_backup(
         Dict with:
             success: bool
             backup_id: int (if success)
-            backup_path: str (if success)
+            backup_path: str (if success; blob: URI when stored in the blob store)
+            storage: 'snapshot' | 'delta' | 'deduplicated'
+            chain_depth: int (deltas applied to rebuild this version)
+            deduplicated: bool (content was already stored)
             message: str
     """
     import shutil
@@ -983,8 +2033,75 @@ def create_backup(
     if not file_path.exists():
         return {"success": False, "message": f"File not found: {file_path}"}
 
+    conn = _get_db_connection()
+    if conn:
+        try:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            version_hash = content_hash(data)
+
+            store = _blob_store()
+            previous = conn.execute("""
+                SELECT backup_id, chain_depth FROM planning_entity_backups
+                WHERE entity_type = ? AND entity_id = ?
+                ORDER BY backup_id DESC LIMIT 1
+            """, (entity_type, entity_id)).fetchone()
+
+            base_backup_id, chain_depth = None, 0
+            if store.has(version_hash):
+                storage = STORAGE_DEDUPLICATED
+                stored_hash = store.put_bytes(data, version_hash)
+            else:
+                delta = _delta_from_previous(conn, previous, data)
+                if delta is not None:
+                    storage = STORAGE_DELTA
+                    stored_hash = store.put_bytes(delta.encode())
+                    base_backup_id, chain_depth = previous["backup_id"], previous["chain_depth"] + 1
+                else:
+                    storage = STORAGE_SNAPSHOT
+                    stored_hash = store.put_bytes(data, version_hash)
+            backup_path = blob_uri(stored_hash)
+
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO planning_entity_backups (
+                    entity_type, entity_id, version_hash,
+                    backup_file_path, backed_up_at, reason,
+                    base_backup_id, chain_depth
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                entity_type,
+                entity_id,
+                version_hash,
+                backup_path,
+                datetime.now(timezone.utc).isoformat(),
+                reason,
+                base_backup_id,
+                chain_depth
+            ))
+            backup_id = cursor.lastrowid
+            # Reference the blob before the row becomes visible: a committed row
+            # without its ref would let gc delete the blob. A ref whose row is
+            # rolled back is dropped by sync_backup_refs.
+            store.add_ref(_backup_ref(backup_id), stored_hash)
+            conn.commit()
+
+            return {
+                "success": True,
+                "backup_id": backup_id,
+                "backup_path": backup_path,
+                "version_hash": version_hash,
+                "storage": storage,
+                "chain_depth": chain_depth,
+                "deduplicated": storage == STORAGE_DEDUPLICATED,
+                "message": "Backup created successfully"
+            }
+        except Exception as e:
+            conn.rollback()
+            return {"success": False, "message": f"Backup creation failed: {e}"}
+
     try:
-        # Create backups directory
+        # Database unavailable: legacy file copy in backups/
         parent_dir = file_path.parent
         backups_dir = parent_dir / "backups"
         backups_dir.mkdir(exist_ok=True)
@@ -998,52 +2115,11 @@ def create_backup(
         # Copy file
         shutil.copy2(file_path, backup_path)
 
-        # Calculate version hash of backed-up file
-        version_hash = calculate_version_hash(file_path)
-
-        # Log to database
-        conn = _get_db_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO planning_entity_backups (
-                        entity_type, entity_id, version_hash,
-                        backup_file_path, backed_up_at, reason
-                    ) VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    entity_type,
-                    entity_id,
-                    version_hash,
-                    str(backup_path.resolve()),
-                    datetime.now(timezone.utc).isoformat(),
-                    reason
-                ))
-                conn.commit()
-                backup_id = cursor.lastrowid
-
-                return {
-                    "success": True,
-                    "backup_id": backup_id,
-                    "backup_path": str(backup_path),
-                    "version_hash": version_hash,
-                    "message": f"Backup created successfully"
-                }
-            except Exception as e:
-                return {
-                    "success": False,
-                    "message": f"Backup file created but database logging failed: {e}",
-                    "backup_path": str(backup_path)
-                }
-            finally:
-                conn.close()
-        else:
-            # Database unavailable, file backup succeeded
-            return {
-                "success": True,
-                "backup_path": str(backup_path),
-                "message": "Backup created (database logging unavailable)"
-            }
+        return {
+            "success": True,
+            "backup_path": str(backup_path),
+            "message": "Backup created (database logging unavailable)"
+        }
 
     except Exception as e:
         return {"success": False, "message": f"Backup creation failed: {e}"}
@@ -1081,7 +2157,7 @@ def list_backups(
         cursor = conn.cursor()
         cursor.execute("""
             SELECT backup_id, version_hash, backup_file_path,
-                   backed_up_at, reason
+                   backed_up_at, reason, base_backup_id, chain_depth
             FROM planning_entity_backups
             WHERE entity_type = ? AND entity_id = ?
             ORDER BY backed_up_at DESC
@@ -1097,7 +2173,9 @@ def list_backups(
                 "backup_file_path": row[2],
                 "backed_up_at": row[3],
                 "reason": row[4],
-                "exists": Path(row[2]).exists()
+                "base_backup_id": row[5],
+                "chain_depth": row[6],
+                "exists": _backup_exists(row[2])
             }
             backups.append(backup)
 
@@ -1114,8 +2192,6 @@ def list_backups(
             "backups": [],
             "message": f"Failed to list backups: {e}"
         }
-    finally:
-        conn.close()
 
 
 def restore_backup(
@@ -1137,11 +2213,9 @@ def restore_backup(
         Dict with:
             success: bool
             current_version_backup_id: int (backup of current before restore)
-            restored_from: str (backup path)
+            restored_from: str (backup path or blob: URI)
             message: str
     """
-    import shutil
-
     if entity_type not in ENTITY_TYPES:
         return {"success": False, "message": f"Invalid entity_type: {entity_type}"}
 
@@ -1162,10 +2236,13 @@ def restore_backup(
         if not row:
             return {"success": False, "message": f"Backup {backup_id} not found"}
 
-        backup_file_path = Path(row[0])
+        backup_file_path = row[0]
         backup_version_hash = row[1]
 
-        if not backup_file_path.exists():
+        # Rebuild before backing up the current version (fails early if missing)
+        try:
+            backup_content = _read_backup_content(conn, backup_id)
+        except FileNotFoundError:
             return {
                 "success": False,
                 "message": f"Backup file not found: {backup_file_path}"
@@ -1189,8 +2266,8 @@ def restore_backup(
                 "message": f"Failed to backup current version before restore: {backup_result['message']}"
             }
 
-        # Restore backup file
-        shutil.copy2(backup_file_path, current_file_path)
+        # Restore backup content
+        atomic_write_bytes(current_file_path, backup_content)
 
         # Update entity state with restored version hash
         update_result = update_entity_state(
@@ -1212,38 +2289,52 @@ def restore_backup(
         return {
             "success": True,
             "current_version_backup_id": backup_result.get('backup_id'),
-            "restored_from": str(backup_file_path),
+            "restored_from": backup_file_path,
             "version_hash": backup_version_hash,
             "message": f"Restored backup {backup_id} successfully"
         }
 
     except Exception as e:
         return {"success": False, "message": f"Restore failed: {e}"}
-    finally:
-        conn.close()
 
 
 def get_backup_diff(
     backup_id1: int,
-    backup_id2: int
+    backup_id2: Optional[int] = None,
+    mode: str = MODE_LINE,
+    algorithm: str = ALGORITHM_MYERS,
+    context_lines: int = DEFAULT_CONTEXT_LINES,
+    render: bool = True
 ) -> Dict[str, Any]:
     """
-    Get diff between two backup versions.
+    Get diff between two backup versions, or a backup and the live file.
+
+    When backup_id1 is an ancestor of backup_id2 in a delta chain (e.g.
+    consecutive regenerations), the Myers alignment is taken from the
+    composed stored deltas and only the first version is read from storage.
+    Otherwise both versions are rebuilt and diffed (see diff_utils).
 
     Args:
         backup_id1: First backup ID (typically older)
-        backup_id2: Second backup ID (typically newer)
+        backup_id2: Second backup ID (typically newer); None = the entity's
+            current file
+        mode: 'line' (unified diff) or 'word' (inline word changes)
+        algorithm: 'myers' or 'patience'
+        context_lines: Unchanged lines shown around changes
+        render: Render the whole diff into 'diff' (callers that page hunks
+            from 'text_diff' pass False)
 
     Returns:
         Dict with:
             success: bool
             backup1: Dict (details of first backup)
-            backup2: Dict (details of second backup)
-            diff: str (unified diff output)
+            backup2: Dict (details of second backup or live file; live: bool)
+            diff: str (unified diff output; None when render=False)
+            text_diff: TextDiff (hunks rendered on demand)
+            stats: Dict (hunks, lines/words added and removed)
+            computed_from: 'deltas' | 'content'
             message: str
     """
-    import difflib
-
     conn = _get_db_connection()
     if not conn:
         return {"success": False, "message": "Database unavailable"}
@@ -1263,75 +2354,196 @@ def get_backup_diff(
         if not row1:
             return {"success": False, "message": f"Backup {backup_id1} not found"}
 
-        # Get backup 2 details
-        cursor.execute("""
-            SELECT entity_type, entity_id, backup_file_path,
-                   version_hash, backed_up_at
-            FROM planning_entity_backups
-            WHERE backup_id = ?
-        """, (backup_id2,))
-        row2 = cursor.fetchone()
+        backup1 = {
+            "backup_id": backup_id1,
+            "entity_type": row1[0],
+            "entity_id": row1[1],
+            "file_path": row1[2],
+            "version_hash": row1[3],
+            "backed_up_at": row1[4]
+        }
+        fromfile = f"{row1[1]} (backup {backup_id1}, {row1[4]})"
 
-        if not row2:
-            return {"success": False, "message": f"Backup {backup_id2} not found"}
+        try:
+            if backup_id2 is None:
+                # Compare with the live file of the entity
+                entity_state = get_entity_state(row1[0], row1[1])
+                if not entity_state:
+                    return {"success": False, "message": f"Entity {row1[0]} '{row1[1]}' not found in state"}
+                live_path = Path(entity_state['file_path'])
+                with open(live_path, 'rb') as f:
+                    live_data = f.read()
+                backup2 = {
+                    "backup_id": None,
+                    "entity_type": row1[0],
+                    "entity_id": row1[1],
+                    "file_path": str(live_path),
+                    "version_hash": content_hash(live_data),
+                    "backed_up_at": None,
+                    "live": True
+                }
+                tofile = f"{row1[1]} (live, {live_path})"
+                content1 = split_lines(_read_backup_content(conn, backup_id1).decode('utf-8'))
+                content2 = split_lines(live_data.decode('utf-8'))
+                opcodes = None
+                computed_from = "content"
+            else:
+                chain2 = _load_backup_chain(conn, backup_id2)
+                row2 = chain2[-1]
+
+                # Validate same entity
+                if row1[0] != row2["entity_type"] or row1[1] != row2["entity_id"]:
+                    return {
+                        "success": False,
+                        "message": f"Backups are from different entities: {row1[0]} '{row1[1]}' vs "
+                                   f"{row2['entity_type']} '{row2['entity_id']}'"
+                    }
+                backup2 = {
+                    "backup_id": backup_id2,
+                    "entity_type": row2["entity_type"],
+                    "entity_id": row2["entity_id"],
+                    "file_path": row2["backup_file_path"],
+                    "version_hash": row2["version_hash"],
+                    "backed_up_at": row2["backed_up_at"],
+                    "live": False
+                }
+                tofile = f"{row2['entity_id']} (backup {backup_id2}, {row2['backed_up_at']})"
+
+                chain_ids = [row["backup_id"] for row in chain2]
+                if backup_id1 in chain_ids and backup_id1 != backup_id2:
+                    # Compose the deltas between the two versions; read only backup 1
+                    position = chain_ids.index(backup_id1)
+                    content1 = split_lines(_read_chain_content(chain2[:position + 1]).decode('utf-8'))
+                    delta = _read_delta(chain2[position + 1])
+                    for row in chain2[position + 2:]:
+                        delta = compose_deltas(delta, _read_delta(row))
+                    content2 = apply_delta(content1, delta)
+                    opcodes = list(delta_opcodes(delta)) if algorithm == ALGORITHM_MYERS else None
+                    computed_from = "deltas"
+                else:
+                    content1 = split_lines(_read_backup_content(conn, backup_id1).decode('utf-8'))
+                    content2 = split_lines(_read_chain_content(chain2).decode('utf-8'))
+                    opcodes = None
+                    computed_from = "content"
+        except FileNotFoundError as e:
+            return {"success": False, "message": f"Backup file not found: {e}"}
+
+        diff = TextDiff(
+            content1, content2, opcodes,
+            algorithm=algorithm, mode=mode, context=context_lines,
+            fromfile=fromfile, tofile=tofile
+        )
 
-        # Validate same entity
-        if row1[0] != row2[0] or row1[1] != row2[1]:
-            return {
-                "success": False,
-                "message": f"Backups are from different entities: {row1[0]} '{row1[1]}' vs {row2[0]} '{row2[1]}'"
-            }
+        return {
+            "success": True,
+            "backup1": backup1,
+            "backup2": backup2,
+            "diff": diff.render() if render else None,
+            "text_diff": diff,
+            "stats": diff.stats(),
+            "computed_from": computed_from,
+            "message": "Diff generated successfully"
+        }
 
-        backup1_path = Path(row1[2])
-        backup2_path = Path(row2[2])
+    except Exception as e:
+        return {"success": False, "message": f"Failed to generate diff: {e}"}
 
-        if not backup1_path.exists():
-            return {"success": False, "message": f"Backup file not found: {backup1_path}"}
 
-        if not backup2_path.exists():
-            return {"success": False, "message": f"Backup file not found: {backup2_path}"}
+def sync_backup_refs() -> Dict[str, Any]:
+    """Reconcile blob store references with planning_entity_backups rows.
 
-        # Read both files
-        with open(backup1_path, 'r', encoding='utf-8') as f:
-            content1 = f.readlines()
+    Adds the reference of every blob-backed row that lacks one and removes
+    references whose row was deleted or never committed (create_backup adds
+    the reference before committing the row). Run before gc().
 
-        with open(backup2_path, 'r', encoding='utf-8') as f:
-            content2 = f.readlines()
+    Returns:
+        Dict with success, added, removed, missing (rows whose blob is gone), message
+    """
+    conn = _get_db_connection()
+    if not conn:
+        return {"success": False, "message": "Database unavailable"}
 
-        # Generate unified diff
-        diff_lines = difflib.unified_diff(
-            content1,
-            content2,
-            fromfile=f"{row1[1]} (backup {backup_id1}, {row1[4]})",
-            tofile=f"{row2[1]} (backup {backup_id2}, {row2[4]})",
-            lineterm=''
-        )
+    try:
+        store = _blob_store()
+        rows = conn.execute(
+            "SELECT backup_id, backup_file_path FROM planning_entity_backups"
+        ).fetchall()
+        expected = {}
+        for backup_id, backup_file_path in rows:
+            blob_hash = parse_blob_uri(backup_file_path)
+            if blob_hash is not None:
+                expected[_backup_ref(backup_id)] = blob_hash
+
+        existing = {entry["ref"]: entry["hash"] for entry in store.list_refs(BACKUP_REF_PREFIX)}
+        added = missing = 0
+        for ref, blob_hash in expected.items():
+            if existing.get(ref) == blob_hash:
+                continue
+            if not store.has(blob_hash):
+                missing += 1
+                continue
+            store.add_ref(ref, blob_hash)
+            added += 1
 
-        diff_text = '\n'.join(diff_lines)
+        removed = 0
+        for ref in existing:
+            if ref not in expected and store.remove_ref(ref):
+                removed += 1
 
         return {
             "success": True,
-            "backup1": {
-                "backup_id": backup_id1,
-                "entity_type": row1[0],
-                "entity_id": row1[1],
-                "file_path": str(backup1_path),
-                "version_hash": row1[3],
-                "backed_up_at": row1[4]
-            },
-            "backup2": {
-                "backup_id": backup_id2,
-                "entity_type": row2[0],
-                "entity_id": row2[1],
-                "file_path": str(backup2_path),
-                "version_hash": row2[3],
-                "backed_up_at": row2[4]
-            },
-            "diff": diff_text,
-            "message": "Diff generated successfully"
+            "added": added,
+            "removed": removed,
+            "missing": missing,
+            "message": f"Backup references synced (+{added}, -{removed})"
         }
+    except Exception as e:
+        return {"success": False, "message": f"Failed to sync backup references: {e}"}
 
+
+def migrate_legacy_backups(remove_files: bool = True) -> Dict[str, Any]:
+    """Move file-based backups (backups/ folders) into the blob store.
+
+    Args:
+        remove_files: Delete each legacy file once its row points at the blob
+
+    Returns:
+        Dict with success, migrated, missing (rows whose file is gone), message
+    """
+    conn = _get_db_connection()
+    if not conn:
+        return {"success": False, "message": "Database unavailable"}
+
+    try:
+        store = _blob_store()
+        rows = conn.execute("""
+            SELECT backup_id, backup_file_path FROM planning_entity_backups
+            WHERE backup_file_path NOT LIKE 'blob:%'
+        """).fetchall()
+
+        migrated = missing = 0
+        for backup_id, backup_file_path in rows:
+            legacy_path = Path(backup_file_path)
+            try:
+                blob_hash = store.put_file(legacy_path)
+            except FileNotFoundError:
+                missing += 1
+                continue
+            store.add_ref(_backup_ref(backup_id), blob_hash)
+            with conn:
+                conn.execute(
+                    "UPDATE planning_entity_backups SET backup_file_path = ? WHERE backup_id = ?",
+                    (blob_uri(blob_hash), backup_id)
+                )
+            if remove_files:
+                legacy_path.unlink()
+            migrated += 1
+
+        return {
+            "success": True,
+            "migrated": migrated,
+            "missing": missing,
+            "message": f"Migrated {migrated} legacy backup(s) into the blob store"
+        }
     except Exception as e:
-        return {"success": False, "message": f"Failed to generate diff: {e}"}
-    finally:
-        conn.close()
+        return {"success": False, "message": f"Legacy backup migration failed: {e}"}
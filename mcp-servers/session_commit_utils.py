@@ -0,0 +1,776 @@
+"""
+Session Commit Utilities
+
+Transactional commit engine for commit_session: moves a session's changes
+into the global tree so that a crash at any point either leaves the global
+tree untouched or can be finished on the next server start.
+
+A commit runs in four steps, recorded in a write-ahead intent journal
+(workspace/commit-journal/{session}.jsonl, JSON lines):
+
+1. Plan: every file operation (CoW copies and deletions, workflow states,
+   run artifacts, human retries) is streamed into the journal, followed by a
+   "planned" marker. The journal is fsynced before anything else is touched.
+2. Stage: each file is copied into a hidden stage file next to its target
+   (.{name}.{txid}.commit-stage). Stage files are private copies, never hard
+   links: a session file written in place after staging must not change
+   what gets applied. Files whose content already matches global are
+   skipped. Global files are unchanged. A "staged" marker is appended.
+3. Apply: stage files are renamed over their targets and deleted files are
+   moved into the archive. An "applied" marker is appended.
+4. Cleanup: the session directory is removed and the journal deleted.
+
+With a blob store (blob_store_utils), deleted files and human retries are not
+copied into archive directories: their content is stored once in the store
+and the archive path becomes a named reference (relative to the workspace).
+
+Recovery (recover_commits, run at server start) is idempotent: a journal
+without "planned" is discarded, one without "staged" is rolled back (stage
+files removed, session kept), and one with "staged" is rolled forward (a
+missing stage file means that operation was already applied).
+
+Operations are streamed from the journal in batches, so commits of thousands
+of files never hold the whole plan in memory.
+
+This module contains:
+- Constants (worker count, batch size, journal markers, phases)
+- Commit operation (CommitOp) and result (CommitResult) types
+- Planning
+- File transfer primitives
+- Intent journal I/O
+- Commit execution and recovery
+"""
+
+from typing import Optional, Dict, List, Any, Callable, Iterable, Iterator, Tuple, Set
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+import durable_io_utils
+from blob_store_utils import BlobStore
+from durable_io_utils import (
+    DURABILITY_NONE,
+    DURABILITY_FILE,
+    DURABILITY_DIR,
+    durable_append_bytes,
+    _fdatasync,
+    _fsync_directory
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Constants
+
+COMMIT_WORKERS = max(1, int(os.environ.get("MCP_COMMIT_WORKERS", str(min(8, os.cpu_count() or 4)))))
+COMPARE_CHUNK_SIZE = 1024 * 1024
+JOURNAL_BATCH_SIZE = 512  # Operations read from the journal per batch
+REPORT_SAMPLE = 10        # File names kept per list for the commit summary
+
+JOURNAL_DIR_NAME = "commit-journal"
+
+OP_COPY = "copy"      # session file -> global file
+OP_DELETE = "delete"  # archive global file, then remove it
+OP_ARCHIVE = "archive"  # session file -> blob store reference (no global file)
+
+PHASE_FILES = "files"
+PHASE_WORKFLOW_STATES = "workflow_states"
+PHASE_ARTIFACTS = "artifacts"
+PHASE_RETRIES = "retries"
+
+# Session subdirectories whose run directories are merged into the workspace
+RUN_ARTIFACT_DIRS = ["generation-runs", "planning-runs"]
+
+# Journal records
+REC_BEGIN = "begin"
+REC_OP = "op"
+MARK_PLANNED = "planned"
+MARK_STAGED = "staged"
+MARK_APPLIED = "applied"
+
+# Transfer outcomes
+COPIED = "copied"
+SKIPPED = "skipped"
+DELETED = "deleted"
+ARCHIVED = "archived"
+MISSING = "missing"
+
+# Commit states
+STATE_COMMITTED = "committed"
+STATE_ABORTED = "aborted"        # Staging failed, rolled back, session kept
+STATE_INCOMPLETE = "incomplete"  # Apply failed, journal kept for recovery
+
+# Recovery outcomes
+RECOVERY_DISCARDED = "discarded"
+RECOVERY_ROLLED_BACK = "rolled_back"
+RECOVERY_COMPLETED = "completed"
+
+
+# Types
+
+@dataclass
+class CommitOp:
+    """One planned file operation."""
+    kind: str                       # OP_COPY | OP_DELETE | OP_ARCHIVE
+    phase: str                      # PHASE_* (reporting only)
+    rel_path: str                   # Path shown in reports
+    target: Path                    # Global file (archive path for OP_ARCHIVE)
+    source: Optional[Path] = None   # Session file (OP_COPY, OP_ARCHIVE)
+    archive: Optional[Path] = None  # Archive location (OP_DELETE)
+
+    def stage_path(self, txid: str) -> Path:
+        """Hidden stage file next to the target."""
+        return self.target.with_name(f".{self.target.name}.{txid}.commit-stage")
+
+    def to_record(self) -> Dict[str, Any]:
+        record = {"rec": REC_OP, "kind": self.kind, "phase": self.phase,
+                  "rel": self.rel_path, "target": str(self.target)}
+        if self.source is not None:
+            record["source"] = str(self.source)
+        if self.archive is not None:
+            record["archive"] = str(self.archive)
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "CommitOp":
+        return cls(
+            kind=record["kind"],
+            phase=record["phase"],
+            rel_path=record["rel"],
+            target=Path(record["target"]),
+            source=Path(record["source"]) if "source" in record else None,
+            archive=Path(record["archive"]) if "archive" in record else None
+        )
+
+
+@dataclass
+class CommitResult:
+    """Outcome of a commit (file lists are samples; counts are exact)."""
+    txid: str
+    state: str = STATE_COMMITTED
+    total: int = 0
+    copied: List[str] = field(default_factory=list)
+    copied_count: int = 0
+    deleted: List[str] = field(default_factory=list)
+    deleted_count: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    outcomes: Dict[str, int] = field(default_factory=dict)          # {COPIED: n, SKIPPED: n, ...}
+    phase_counts: Dict[str, int] = field(default_factory=dict)      # committed ops per PHASE_*
+    phase_failures: Dict[str, int] = field(default_factory=dict)    # failed ops per PHASE_*
+    phase_seconds: Dict[str, float] = field(default_factory=dict)   # plan/stage/apply/cleanup
+
+    def _count(self, op: CommitOp, outcome: str) -> None:
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if outcome == MISSING:
+            return
+        self.phase_counts[op.phase] = self.phase_counts.get(op.phase, 0) + 1
+        if op.phase != PHASE_FILES:
+            return
+        if outcome == DELETED:
+            self.deleted_count += 1
+            if len(self.deleted) < REPORT_SAMPLE:
+                self.deleted.append(op.rel_path)
+        else:
+            self.copied_count += 1
+            if len(self.copied) < REPORT_SAMPLE:
+                self.copied.append(op.rel_path)
+
+    def _fail(self, op: CommitOp, error: Exception) -> None:
+        self.failed.append((op.rel_path, str(error)))
+        self.phase_failures[op.phase] = self.phase_failures.get(op.phase, 0) + 1
+
+
+# Planning
+
+def iter_commit_ops(
+    session_path: Path,
+    cow_files: Iterable[Dict[str, Any]],
+    workspace_path: Path,
+    archive_dir: Path,
+    global_root: Path = Path("."),
+    archive_to_store: bool = False
+) -> Iterator[CommitOp]:
+    """Generate all file operations of a session commit.
+
+    Args:
+        session_path: Session directory
+        cow_files: session.json "cow_files" entries
+        workspace_path: Global workspace directory
+        archive_dir: Where deleted global files are archived
+        global_root: Root that CoW paths are relative to
+        archive_to_store: Archive human retries as blob references
+
+    Yields:
+        CommitOp (CoW files, workflow states, run artifacts, human retries).
+        CoW files missing from the session are skipped.
+    """
+    for cow_file in cow_files:
+        file_path = cow_file["path"]
+        target = global_root / file_path
+        if cow_file.get("type") == "deleted":
+            yield CommitOp(OP_DELETE, PHASE_FILES, file_path, target, archive=archive_dir / file_path)
+        elif (session_path / file_path).exists():
+            yield CommitOp(OP_COPY, PHASE_FILES, file_path, target, source=session_path / file_path)
+
+    # Workflow orchestration state files (index files are per-session)
+    session_workflow_dir = session_path / "workflow-state"
+    if session_workflow_dir.exists():
+        for state_file in sorted(session_workflow_dir.glob("*.json")):
+            if state_file.name == "index.json":
+                continue
+            yield CommitOp(
+                OP_COPY, PHASE_WORKFLOW_STATES, f"workflow-state/{state_file.name}",
+                workspace_path / "workflow-state" / state_file.name, source=state_file
+            )
+
+    # Run artifacts, merged file by file into existing run directories
+    for dir_name in RUN_ARTIFACT_DIRS:
+        yield from _iter_tree_copies(session_path / dir_name, workspace_path / dir_name, dir_name, PHASE_ARTIFACTS)
+
+    # Human retries are archived (kept after the session is removed)
+    yield from _iter_tree_copies(
+        session_path / "human-retries",
+        workspace_path / "retries-archive" / session_path.name,
+        "human-retries",
+        PHASE_RETRIES,
+        OP_ARCHIVE if archive_to_store else OP_COPY
+    )
+
+
+def _iter_tree_copies(
+    source_root: Path,
+    target_root: Path,
+    label: str,
+    phase: str,
+    kind: str = OP_COPY
+) -> Iterator[CommitOp]:
+    if not source_root.exists():
+        return
+    for dirpath, dirnames, filenames in os.walk(source_root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            source = Path(dirpath) / filename
+            rel = source.relative_to(source_root)
+            yield CommitOp(kind, phase, f"{label}/{rel.as_posix()}", target_root / rel, source=source)
+
+
+def plan_commit(
+    session_path: Path,
+    cow_files: Iterable[Dict[str, Any]],
+    workspace_path: Path,
+    archive_dir: Path,
+    global_root: Path = Path("."),
+    archive_to_store: bool = False
+) -> List[CommitOp]:
+    """List all file operations of a session commit (see iter_commit_ops)."""
+    return list(iter_commit_ops(session_path, cow_files, workspace_path, archive_dir, global_root, archive_to_store))
+
+
+# File Transfer
+
+def _equal_bytes(a: Path, b: Path) -> bool:
+    with open(a, 'rb') as fa, open(b, 'rb') as fb:
+        while True:
+            chunk = fa.read(COMPARE_CHUNK_SIZE)
+            if chunk != fb.read(COMPARE_CHUNK_SIZE):
+                return False
+            if not chunk:
+                return True
+
+
+def same_content(source: Path, target: Path, source_stat: Optional[os.stat_result] = None) -> bool:
+    """Check whether target already holds exactly the bytes of source."""
+    try:
+        source_stat = source_stat or os.stat(source)
+        target_stat = os.stat(target)
+    except OSError:
+        return False
+    if source_stat.st_size != target_stat.st_size:
+        return False
+    if (source_stat.st_dev, source_stat.st_ino) == (target_stat.st_dev, target_stat.st_ino):
+        return True
+    return _equal_bytes(source, target)
+
+
+class _DirectoryCache:
+    """Creates directories and remembers their device, once per directory."""
+
+    def __init__(self):
+        self.devices: Dict[str, int] = {}
+
+    def ensure(self, directory: Path) -> int:
+        key = str(directory)
+        device = self.devices.get(key)
+        if device is None:
+            directory.mkdir(parents=True, exist_ok=True)
+            device = self.devices[key] = os.stat(directory).st_dev
+        return device
+
+
+def _sync_file(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        _fdatasync(fd)
+    finally:
+        os.close(fd)
+
+
+def stage_file(source: Path, stage: Path, target: Path, dirs: _DirectoryCache, sync: bool) -> str:
+    """Copy source's content into a stage file next to target.
+
+    The stage file is a private copy (not a hard link), so writes to the
+    session file after staging cannot change the staged snapshot.
+
+    Args:
+        source: Session file
+        stage: Stage file path (replaced if it exists)
+        target: Global file (compared to skip identical content)
+        dirs: Directory cache
+        sync: fdatasync the stage file
+
+    Returns:
+        SKIPPED (content identical, no stage file) or COPIED
+
+    Raises:
+        OSError: If source is missing or staging fails
+    """
+    source_stat = os.stat(source)
+    if same_content(source, target, source_stat):
+        return SKIPPED
+
+    dirs.ensure(stage.parent)
+    shutil.copy2(source, stage)
+    if sync:
+        _sync_file(stage)
+    return COPIED
+
+
+def archive_and_remove(target: Path, archive: Path, dirs: Optional[_DirectoryCache] = None) -> str:
+    """Move a global file into the archive (idempotent).
+
+    Returns:
+        DELETED, or MISSING if the global file does not exist
+    """
+    try:
+        target_stat = os.stat(target)
+    except FileNotFoundError:
+        return MISSING
+    dirs = dirs or _DirectoryCache()
+    if target_stat.st_dev == dirs.ensure(archive.parent):
+        os.replace(target, archive)
+    else:
+        shutil.copy2(target, archive)
+        target.unlink()
+    return DELETED
+
+
+def archive_ref(store: BlobStore, archive: Path) -> str:
+    """Reference name of an archive path (relative to the store's workspace)."""
+    try:
+        return archive.relative_to(store.root.parent).as_posix()
+    except ValueError:
+        return archive.as_posix()
+
+
+def archive_to_store(target: Path, archive: Path, store: BlobStore) -> str:
+    """Store a global file's content under its archive reference, then remove it (idempotent).
+
+    Returns:
+        DELETED, or MISSING if the global file does not exist
+    """
+    try:
+        blob_hash = store.put_file(target)
+    except FileNotFoundError:
+        return MISSING
+    store.add_ref(archive_ref(store, archive), blob_hash)
+    target.unlink()
+    return DELETED
+
+
+# Intent Journal
+
+def journal_path(workspace_path: Path, session_name: str) -> Path:
+    """Get intent journal path for a session commit."""
+    return workspace_path / JOURNAL_DIR_NAME / f"{session_name}.jsonl"
+
+
+def _journal_line(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+
+
+def write_intent(journal: Path, header: Dict[str, Any], ops: Iterable[CommitOp]) -> int:
+    """Stream the commit plan into a new journal and make it durable.
+
+    The journal is complete only once the trailing "planned" marker is on
+    disk; a torn journal is discarded by recovery.
+
+    Returns:
+        Number of operations written
+    """
+    journal.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with open(journal, 'wb') as f:
+        f.write(_journal_line({"rec": REC_BEGIN, **header}))
+        for op in ops:
+            f.write(_journal_line(op.to_record()))
+            count += 1
+        f.write(_journal_line({"rec": MARK_PLANNED, "ops": count}))
+        f.flush()
+        _fdatasync(f.fileno())
+    _fsync_directory(journal.parent)
+    return count
+
+
+def _mark(journal: Path, marker: str) -> None:
+    """Append a durable marker record."""
+    at = datetime.now(timezone.utc).isoformat()
+    durable_append_bytes(journal, _journal_line({"rec": marker, "at": at}), DURABILITY_FILE)
+
+
+def _iter_records(journal: Path) -> Iterator[Dict[str, Any]]:
+    with open(journal, 'rb') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn line from a crash mid-append
+            if isinstance(record, dict) and "rec" in record:
+                yield record
+
+
+def read_journal_state(journal: Path) -> Tuple[Optional[Dict[str, Any]], Set[str]]:
+    """Scan a journal for its header and markers (operations are not kept).
+
+    Returns:
+        Tuple of (begin record or None, set of markers)
+    """
+    header = None
+    markers = set()
+    for record in _iter_records(journal):
+        if record["rec"] == REC_BEGIN:
+            header = record
+        elif record["rec"] != REC_OP:
+            markers.add(record["rec"])
+    return header, markers
+
+
+def iter_journal_ops(journal: Path) -> Iterator[CommitOp]:
+    """Stream planned operations from a journal."""
+    for record in _iter_records(journal):
+        if record["rec"] == REC_OP:
+            yield CommitOp.from_record(record)
+
+
+def _remove_journal(journal: Path) -> None:
+    try:
+        journal.unlink()
+    except FileNotFoundError:
+        return
+    _fsync_directory(journal.parent)
+
+
+# Execution
+
+class _NoPool:
+    """Stand-in for a thread pool when running with a single worker."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _pool(workers: int):
+    if workers > 1:
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="commit")
+    return _NoPool()
+
+
+def _batches(ops: Iterable[CommitOp], size: int) -> Iterator[List[CommitOp]]:
+    iterator = iter(ops)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _run_batches(
+    pool: Optional[ThreadPoolExecutor],
+    ops: Iterable[CommitOp],
+    fn: Callable[[CommitOp], str]
+) -> Iterator[Tuple[CommitOp, Optional[str], Optional[Exception]]]:
+    """Run fn over ops (in parallel batches if pool is given), yielding results."""
+    for batch in _batches(ops, JOURNAL_BATCH_SIZE):
+        if pool is None:
+            for op in batch:
+                try:
+                    yield op, fn(op), None
+                except Exception as e:
+                    yield op, None, e
+            continue
+
+        futures = {pool.submit(fn, op): op for op in batch}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+def _rollback(journal: Path, txid: str) -> None:
+    """Remove stage files of an unapplied commit and delete its journal."""
+    for op in iter_journal_ops(journal):
+        if op.kind == OP_COPY:
+            try:
+                op.stage_path(txid).unlink()
+            except FileNotFoundError:
+                pass
+    _remove_journal(journal)
+
+
+def _apply(
+    journal: Path,
+    txid: str,
+    pool: Optional[ThreadPoolExecutor],
+    on_done: Callable[[CommitOp, Optional[str], Optional[Exception]], None],
+    store: Optional[BlobStore] = None
+) -> int:
+    """Apply all staged operations (idempotent). Returns number of failures."""
+    dirs = _DirectoryCache()
+    touched: Set[Path] = set()
+    sync_dirs = durable_io_utils.DEFAULT_DURABILITY == DURABILITY_DIR
+
+    def apply_op(op: CommitOp) -> str:
+        if op.kind == OP_ARCHIVE:
+            # Content was stored while staging; put_file only re-hashes it
+            store.add_ref(archive_ref(store, op.target), store.put_file(op.source))
+            return ARCHIVED
+        if op.kind == OP_DELETE:
+            if store is not None:
+                return archive_to_store(op.target, op.archive, store)
+            return archive_and_remove(op.target, op.archive, dirs)
+        try:
+            os.replace(op.stage_path(txid), op.target)
+        except FileNotFoundError:
+            return SKIPPED  # Skipped when staging, or applied before a crash
+        return COPIED
+
+    failures = 0
+    for op, outcome, error in _run_batches(pool, iter_journal_ops(journal), apply_op):
+        if error is not None:
+            failures += 1
+        elif sync_dirs and op.kind != OP_ARCHIVE:
+            touched.add(op.target.parent)
+            if op.archive is not None and store is None:
+                touched.add(op.archive.parent)
+        on_done(op, outcome, error)
+
+    if failures:
+        return failures
+
+    for directory in touched:
+        _fsync_directory(directory)
+    _mark(journal, MARK_APPLIED)
+    return 0
+
+
+def run_commit(
+    session_path: Path,
+    cow_files: Iterable[Dict[str, Any]],
+    workspace_path: Path,
+    archive_dir: Path,
+    cleanup: Callable[[], None],
+    global_root: Path = Path("."),
+    workers: int = COMMIT_WORKERS,
+    progress: Optional[Callable[[int, int, str], None]] = None,
+    blob_store: Optional[BlobStore] = None
+) -> CommitResult:
+    """Commit a session transactionally (plan, stage, apply, cleanup).
+
+    Args:
+        session_path: Session directory (its name is the session name)
+        cow_files: session.json "cow_files" entries (may be a generator)
+        workspace_path: Global workspace directory (journal lives here)
+        archive_dir: Where deleted global files are archived
+        cleanup: Removes the session once everything is applied
+        global_root: Root that CoW paths are relative to
+        workers: Maximum concurrent file operations
+        progress: Called as progress(done, total, message) from the calling thread
+        blob_store: Archive deleted files and human retries as blob references
+            (None = move/copy them into archive directories)
+
+    Returns:
+        CommitResult. state is STATE_ABORTED if staging failed (nothing
+        changed, session kept) and STATE_INCOMPLETE if applying failed
+        (journal kept; recover_commits finishes it).
+
+    Raises:
+        ValueError: If an earlier commit of this session was interrupted
+            (run recover_commit first)
+    """
+    journal = journal_path(workspace_path, session_path.name)
+    if journal.exists():
+        raise ValueError(f"Interrupted commit of '{session_path.name}' pending recovery: {journal}")
+
+    txid = f"{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    result = CommitResult(txid=txid)
+
+    # 1. Plan (durable before any mutation)
+    started = time.perf_counter()
+    header = {"txid": txid, "session": session_path.name, "session_path": str(session_path)}
+    if blob_store is not None:
+        header["blob_store"] = str(blob_store.root)
+    result.total = write_intent(
+        journal, header,
+        iter_commit_ops(session_path, cow_files, workspace_path, archive_dir, global_root, blob_store is not None)
+    )
+    result.phase_seconds["plan"] = time.perf_counter() - started
+
+    total_steps = result.total * 2
+    done = 0
+    sync = durable_io_utils.DEFAULT_DURABILITY != DURABILITY_NONE
+    dirs = _DirectoryCache()
+
+    def stage_op(op: CommitOp) -> str:
+        if op.kind == OP_DELETE:
+            return DELETED if op.target.exists() else MISSING
+        if op.kind == OP_ARCHIVE:
+            blob_store.put_file(op.source)
+            return ARCHIVED
+        return stage_file(op.source, op.stage_path(txid), op.target, dirs, sync)
+
+    with _pool(workers) as pool:
+        # 2. Stage (global tree unchanged)
+        started = time.perf_counter()
+        for op, outcome, error in _run_batches(pool, iter_journal_ops(journal), stage_op):
+            if error is not None:
+                result._fail(op, error)
+            elif op.kind != OP_DELETE:
+                result._count(op, outcome)
+            done += 1
+            if progress:
+                progress(done, total_steps, f"stage {op.rel_path}")
+
+        if result.failed:
+            _rollback(journal, txid)
+            result.state = STATE_ABORTED
+            result.phase_seconds["stage"] = time.perf_counter() - started
+            return result
+
+        if durable_io_utils.DEFAULT_DURABILITY == DURABILITY_DIR:
+            for directory in dirs.devices:
+                _fsync_directory(Path(directory))
+        _mark(journal, MARK_STAGED)
+        result.phase_seconds["stage"] = time.perf_counter() - started
+
+        # 3. Apply
+        started = time.perf_counter()
+
+        def on_applied(op: CommitOp, outcome: Optional[str], error: Optional[Exception]) -> None:
+            nonlocal done
+            if error is not None:
+                result._fail(op, error)
+            elif op.kind == OP_DELETE:
+                result._count(op, outcome)
+            done += 1
+            if progress:
+                progress(done, total_steps, f"apply {op.rel_path}")
+
+        failures = _apply(journal, txid, pool, on_applied, blob_store)
+        result.phase_seconds["apply"] = time.perf_counter() - started
+        if failures:
+            result.state = STATE_INCOMPLETE
+            return result
+
+    # 4. Cleanup
+    started = time.perf_counter()
+    try:
+        cleanup()
+    except Exception as e:
+        # Changes are committed; recovery retries the cleanup on next start
+        logger.error(f"Failed to clean up session '{session_path.name}': {e}")
+        result.failed.append((f"session directory cleanup: {session_path}", str(e)))
+    else:
+        _remove_journal(journal)
+    result.phase_seconds["cleanup"] = time.perf_counter() - started
+    return result
+
+
+# Recovery
+
+def recover_commit(
+    journal: Path,
+    cleanup: Callable[[str, Path], None],
+    workers: int = COMMIT_WORKERS
+) -> str:
+    """Finish or roll back one interrupted commit (idempotent).
+
+    Args:
+        journal: Intent journal
+        cleanup: Removes a committed session: cleanup(session_name, session_path)
+        workers: Maximum concurrent file operations
+
+    Returns:
+        RECOVERY_DISCARDED, RECOVERY_ROLLED_BACK or RECOVERY_COMPLETED
+
+    Raises:
+        OSError: If staged operations still cannot be applied (journal kept)
+    """
+    header, markers = read_journal_state(journal)
+    if header is None or MARK_PLANNED not in markers:
+        # Crashed while planning: nothing was touched
+        _remove_journal(journal)
+        return RECOVERY_DISCARDED
+
+    txid = header["txid"]
+    if MARK_STAGED not in markers:
+        _rollback(journal, txid)
+        return RECOVERY_ROLLED_BACK
+
+    if MARK_APPLIED not in markers:
+        errors = []
+
+        def on_done(op: CommitOp, outcome: Optional[str], error: Optional[Exception]) -> None:
+            if error is not None:
+                errors.append((op.rel_path, error))
+
+        store = BlobStore(Path(header["blob_store"])) if "blob_store" in header else None
+        with _pool(workers) as pool:
+            if _apply(journal, txid, pool, on_done, store):
+                rel_path, error = errors[0]
+                raise OSError(f"{len(errors)} staged operation(s) could not be applied, first: {rel_path}: {error}")
+
+    cleanup(header["session"], Path(header["session_path"]))
+    _remove_journal(journal)
+    return RECOVERY_COMPLETED
+
+
+def recover_commits(
+    workspace_path: Path,
+    cleanup: Callable[[str, Path], None],
+    workers: int = COMMIT_WORKERS
+) -> Dict[str, str]:
+    """Recover all interrupted commits in a workspace (run at server start).
+
+    Returns:
+        {session_name: recovery outcome or "error: ..."}
+    """
+    journal_dir = workspace_path / JOURNAL_DIR_NAME
+    if not journal_dir.exists():
+        return {}
+
+    outcomes = {}
+    for journal in sorted(journal_dir.glob("*.jsonl")):
+        try:
+            outcomes[journal.stem] = recover_commit(journal, cleanup, workers)
+        except Exception as e:
+            logger.error(f"Failed to recover commit journal {journal}: {e}")
+            outcomes[journal.stem] = f"error: {e}"
+    return outcomes
@@ -0,0 +1,285 @@
+"""
+Session Lock Utilities
+
+Shared active-session provider and advisory locking for workspace/session.lock,
+used by all MCP servers.
+
+session.lock is read through ActiveSessionProvider, which caches the parsed
+lock and revalidates it with one stat (inode, mtime_ns, size) per call, or at
+most every MCP_SESSION_LOCK_POLL seconds when that is set. Every change of the
+active session increments the provider's generation counter; dependent caches
+(session overlay, generation state cache) compare it with the generation they
+were built for.
+
+Operations that switch the active session or move session files (create,
+switch, commit, cancel, commit recovery) hold an exclusive advisory lock on
+session.lock.guard, so two MCP server processes cannot interleave them.
+session.lock itself is replaced atomically and never locked: readers never
+block.
+
+This module contains:
+- Constants
+- ActiveSessionProvider (cached lock contents, generation counter)
+- Advisory session guard (sync and async context managers)
+- session.lock writes
+"""
+
+from typing import Optional, Dict, Any, Tuple, Iterator, AsyncIterator
+from pathlib import Path
+from contextlib import contextmanager, asynccontextmanager
+import asyncio
+import json
+import os
+import threading
+import time
+
+from durable_io_utils import atomic_write_json
+
+try:
+    import fcntl
+    FLOCK_AVAILABLE = True
+except ImportError:  # Windows: guard only excludes tasks within one process
+    FLOCK_AVAILABLE = False
+
+
+# Constants
+
+# Seconds between session.lock revalidations (0 = stat on every call)
+SESSION_LOCK_POLL_INTERVAL = max(0.0, float(os.environ.get("MCP_SESSION_LOCK_POLL", "0")))
+
+# Seconds to wait for another process's switch/commit before giving up
+SESSION_GUARD_TIMEOUT = float(os.environ.get("MCP_SESSION_LOCK_TIMEOUT", "30"))
+GUARD_SUFFIX = ".guard"
+_GUARD_RETRY_DELAY = 0.05
+
+_UNSET = object()
+
+
+class SessionBusyError(TimeoutError):
+    """Raised when another process holds the session guard for too long."""
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _read_lock(lock_file: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(lock_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+# Active Session Provider
+
+class ActiveSessionProvider:
+    """Cached view of one session.lock file."""
+
+    def __init__(self, lock_file: Path, poll_interval: float = SESSION_LOCK_POLL_INTERVAL):
+        """Create provider (the lock is read on first use).
+
+        Args:
+            lock_file: Path to session.lock
+            poll_interval: Minimum seconds between revalidations (0 = always)
+        """
+        self.lock_file = lock_file
+        self.poll_interval = poll_interval
+        self._signature: Any = _UNSET
+        self._data: Optional[Dict[str, Any]] = None
+        self._generation = 0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _revalidate(self) -> None:
+        now = time.monotonic()
+        if (self._signature is not _UNSET and self.poll_interval
+                and now - self._checked_at < self.poll_interval):
+            return
+
+        signature = _signature(self.lock_file)
+        with self._lock:
+            self._checked_at = now
+            if signature == self._signature:
+                return
+            data = _read_lock(self.lock_file) if signature is not None else None
+            if _active_name(data) != _active_name(self._data):
+                self._generation += 1
+            self._signature = signature
+            self._data = data
+
+    def lock_data(self) -> Optional[Dict[str, Any]]:
+        """Current session.lock contents (copy) or None if there is no lock."""
+        self._revalidate()
+        return dict(self._data) if self._data is not None else None
+
+    def snapshot(self) -> Tuple[Optional[str], int]:
+        """Return (active session name or None, generation) in one revalidation."""
+        self._revalidate()
+        return _active_name(self._data), self._generation
+
+    @property
+    def active_name(self) -> Optional[str]:
+        """Active session name or None."""
+        return self.snapshot()[0]
+
+    @property
+    def generation(self) -> int:
+        """Counter incremented whenever the active session changes."""
+        return self.snapshot()[1]
+
+    @property
+    def last_generation(self) -> int:
+        """Generation as of the last revalidation (no file system access)."""
+        return self._generation
+
+    def invalidate(self) -> None:
+        """Force a revalidation on next use (after writing session.lock)."""
+        with self._lock:
+            self._checked_at = float("-inf")
+
+
+def _active_name(data: Optional[Dict[str, Any]]) -> Optional[str]:
+    return (data or {}).get("active") or None
+
+
+# {absolute session.lock path: provider}
+_providers: Dict[str, ActiveSessionProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_session_provider(lock_file: Path) -> ActiveSessionProvider:
+    """Get the process-wide provider for a session.lock path."""
+    key = os.path.abspath(lock_file)
+    provider = _providers.get(key)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.setdefault(key, ActiveSessionProvider(lock_file))
+    return provider
+
+
+def reset_session_providers() -> None:
+    """Forget all providers (cached lock contents and generations)."""
+    with _providers_lock:
+        _providers.clear()
+
+
+# Advisory Session Guard
+
+def guard_path(lock_file: Path) -> Path:
+    """Path of the advisory lock file guarding a session.lock."""
+    return lock_file.with_name(lock_file.name + GUARD_SUFFIX)
+
+
+# Within one process (and where flock is unavailable) tasks are excluded by
+# this lock; flock excludes other processes.
+_in_process_guard = threading.Lock()
+
+
+def _acquire_guard(lock_file: Path, timeout: Optional[float]) -> Optional[int]:
+    timeout = SESSION_GUARD_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    if not _in_process_guard.acquire(timeout=max(0.0, timeout)):
+        raise SessionBusyError("Another session operation is in progress in this server")
+    if not FLOCK_AVAILABLE:
+        return None
+
+    try:
+        path = guard_path(lock_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    except OSError:
+        _in_process_guard.release()
+        raise
+
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                _in_process_guard.release()
+                raise SessionBusyError(
+                    f"Another process holds {path.name} (session switch or commit in progress); "
+                    f"gave up after {timeout:g}s"
+                )
+            time.sleep(_GUARD_RETRY_DELAY)
+        except OSError:
+            os.close(fd)
+            _in_process_guard.release()
+            raise
+
+
+def _release_guard(fd: Optional[int]) -> None:
+    try:
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+    finally:
+        _in_process_guard.release()
+
+
+@contextmanager
+def session_guard(lock_file: Path, timeout: Optional[float] = None) -> Iterator[None]:
+    """Hold the exclusive session guard (blocking, for startup and scripts).
+
+    Args:
+        lock_file: Path to session.lock
+        timeout: Seconds to wait for other holders (default SESSION_GUARD_TIMEOUT)
+
+    Raises:
+        SessionBusyError: If the guard could not be acquired in time
+    """
+    fd = _acquire_guard(lock_file, timeout)
+    try:
+        yield
+    finally:
+        _release_guard(fd)
+
+
+@asynccontextmanager
+async def session_guard_async(lock_file: Path, timeout: Optional[float] = None) -> AsyncIterator[None]:
+    """Hold the exclusive session guard without blocking the event loop.
+
+    Args:
+        lock_file: Path to session.lock
+        timeout: Seconds to wait for other holders (default SESSION_GUARD_TIMEOUT)
+
+    Raises:
+        SessionBusyError: If the guard could not be acquired in time
+    """
+    acquiring = asyncio.get_running_loop().run_in_executor(None, _acquire_guard, lock_file, timeout)
+    try:
+        fd = await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        # Release the guard once the worker thread gets it
+        acquiring.add_done_callback(lambda f: f.exception() is None and _release_guard(f.result()))
+        raise
+    try:
+        yield
+    finally:
+        _release_guard(fd)
+
+
+# session.lock Writes
+
+def write_session_lock(lock_file: Path, lock_data: Dict[str, Any]) -> None:
+    """Atomically replace session.lock and refresh this process's provider."""
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(lock_file, lock_data)
+    get_session_provider(lock_file).invalidate()
+
+
+def clear_session_lock(lock_file: Path) -> None:
+    """Remove session.lock (no active session) and refresh the provider."""
+    try:
+        lock_file.unlink()
+    except FileNotFoundError:
+        pass
+    get_session_provider(lock_file).invalidate()
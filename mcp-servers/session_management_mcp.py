@@ -10,19 +10,25 @@ Features:
 - Human retry tracking
 - Path resolution (session → global fallback)
 - Session lock management
+- Tool bodies run on a bounded I/O pool, per-session mutations serialized
+  (see io_executor_utils)
+- Optional Prometheus metrics (see metrics_utils)
 
 State files:
 - workspace/session.lock - Active session pointer
 - workspace/sessions/{name}/session.json - Session metadata + CoW tracking
 """
+from typing import Optional
+import asyncio
 import json
 import os
 from pathlib import Path
 from datetime import datetime, timezone
 import shutil
+import functools
 import logging
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -35,7 +41,9 @@ from session_models import (
     SwitchSessionInput,
     CommitSessionInput,
     CancelSessionInput,
+    ListSessionsInput,
     ResolvePathInput,
+    ResolvePathsInput,
     RecordHumanRetryInput
 )
 
@@ -44,6 +52,7 @@ from session_utils import (
     WORKSPACE_PATH,
     SESSIONS_PATH,
     SESSION_LOCK_FILE,
+    SESSION_FORMAT_VERSION,
     _get_session_lock,
     _update_session_lock,
     _clear_session_lock,
@@ -51,15 +60,81 @@ from session_utils import (
     _load_session_data,
     _save_session_data,
     _get_active_session,
+    _get_active_overlay,
     _create_session_structure,
     _resolve_path_cow,
     _add_cow_file,
+    _discard_cow_index,
+    _migrate_sessions,
     _format_file_size,
-    _copy_workflow_states_to_global
+    install_sigterm_flush
+)
+from session_commit_utils import (
+    COMMIT_WORKERS,
+    PHASE_WORKFLOW_STATES,
+    PHASE_ARTIFACTS,
+    PHASE_RETRIES,
+    COPIED,
+    SKIPPED,
+    STATE_ABORTED,
+    STATE_INCOMPLETE,
+    RECOVERY_COMPLETED,
+    journal_path,
+    run_commit,
+    recover_commit,
+    recover_commits
+)
+from blob_store_utils import get_blob_store
+from session_lock_utils import SessionBusyError, session_guard, session_guard_async, get_session_provider
+from io_executor_utils import KeyedLocks, offloaded, serialized, run_io
+from session_overlay_utils import resolve_paths as _resolve_paths
+from metrics_utils import instrument_tools, start_metrics_exporters
+from pagination_utils import (
+    Page,
+    CursorError,
+    query_fingerprint,
+    paginate,
+    render_within_limit,
+    select_fields,
+    fit_json_page,
+    dumps_compact,
+    page_response
 )
 
 # Initialize MCP server
 mcp = FastMCP("session_management_mcp")
+instrument_tools(mcp, "session_management")
+
+
+def _session_guarded(tool):
+    """Run a tool holding the workspace session guard.
+
+    Tools that switch the active session or move session files are serialized
+    across tasks and across MCP server processes (advisory lock on
+    session.lock.guard).
+    """
+    @functools.wraps(tool)
+    async def guarded(*args, **kwargs):
+        try:
+            async with session_guard_async(SESSION_LOCK_FILE):
+                return await tool(*args, **kwargs)
+        except SessionBusyError as e:
+            return f"❌ ERROR: {str(e)}\n\n💡 Retry when the other session operation has finished"
+    return guarded
+
+
+# Tool bodies run on the I/O pool (io_executor_utils). Calls that change one
+# session's files or session.json are serialized per session name.
+_session_locks = KeyedLocks()
+
+
+def _active_session_key(*args, **kwargs) -> Optional[str]:
+    return get_session_provider(SESSION_LOCK_FILE).active_name
+
+
+def _target_session_key(params=None, *args, **kwargs) -> Optional[str]:
+    """Session named by params.name, else the active session."""
+    return getattr(params, "name", None) or _active_session_key()
 
 
 # MCP Tools (handlers remain in main file due to decorator complexity)
@@ -72,7 +147,8 @@ mcp = FastMCP("session_management_mcp")
         "idempotentHint": True
     }
 )
-async def get_active_session() -> str:
+@offloaded()
+def get_active_session() -> str:
     """Get information about currently active session.
 
     Returns:
@@ -132,7 +208,9 @@ async def get_active_session() -> str:
         "idempotentHint": False
     }
 )
-async def create_session(params: CreateSessionInput) -> str:
+@_session_guarded
+@offloaded()
+def create_session(params: CreateSessionInput) -> str:
     """Create new session with Copy-on-Write structure.
 
     Creates empty directory structure. Files are copied on-demand when first written.
@@ -166,6 +244,7 @@ async def create_session(params: CreateSessionInput) -> str:
         "created_at": datetime.now(timezone.utc).isoformat(),
         "created_by": os.environ.get("USER", "unknown"),
         "status": SessionStatus.ACTIVE.value,
+        "format_version": SESSION_FORMAT_VERSION,
         "cow_files": [],
         "changes": {
             ChangeType.MODIFIED.value: [],
@@ -213,7 +292,8 @@ async def create_session(params: CreateSessionInput) -> str:
         "idempotentHint": True
     }
 )
-async def resolve_path(params: ResolvePathInput) -> str:
+@offloaded()
+def resolve_path(params: ResolvePathInput) -> str:
     """Resolve file path with Copy-on-Write logic.
 
     Checks if file exists in active session. If yes, returns session path.
@@ -225,27 +305,64 @@ async def resolve_path(params: ResolvePathInput) -> str:
     Returns:
         JSON string with resolution result
     """
-    session = _get_active_session()
+    overlay = _get_active_overlay()
 
-    if not session:
-        # No active session - use global path
-        global_path = Path(params.path)
-        return json.dumps({
-            "resolved_path": params.path,
-            "source": "global",
-            "exists": global_path.exists(),
-            "modified_in_session": False,
-            "session_active": False
-        }, indent=2)
-
-    # Resolve with CoW
-    result = _resolve_path_cow(params.path, session["name"])
-    result["session_active"] = True
-    result["session_name"] = session["name"]
+    # Resolve with CoW (global path if no active session)
+    result = _resolve_paths(overlay, [params.path])[0]
+    result["session_active"] = overlay is not None
+    if overlay is not None:
+        result["session_name"] = overlay.name
 
     return json.dumps(result, indent=2)
 
 
+@mcp.tool(
+    name="resolve_paths",
+    annotations={
+        "title": "Resolve Paths (CoW, batch)",
+        "readOnlyHint": True,
+        "idempotentHint": True
+    }
+)
+@offloaded()
+def resolve_paths(params: ResolvePathsInput) -> str:
+    """Resolve many file paths with Copy-on-Write logic in one call.
+
+    Same result per path as resolve_path. Paths are answered from the session
+    overlay (CoW manifest and cached directory listings), so each directory
+    is checked once per call. Use this to resolve all context files of a step.
+
+    Args:
+        params: Paths to resolve (and cursor of a truncated response)
+
+    Returns:
+        Compact JSON: session_active, session_name, results (path,
+        resolved_path, source, exists, modified_in_session), total, offset,
+        count, next_cursor
+    """
+    overlay = _get_active_overlay()
+    results = [
+        {"path": path, **resolved}
+        for path, resolved in zip(params.paths, _resolve_paths(overlay, params.paths))
+    ]
+
+    try:
+        fingerprint = query_fingerprint(paths=params.paths)
+        page = paginate(results, lambda r: r["path"], len(results), params.cursor, fingerprint)
+    except CursorError as e:
+        return f"❌ ERROR: {str(e)}"
+
+    def render(p: Page) -> str:
+        return dumps_compact({
+            "session_active": overlay is not None,
+            "session_name": overlay.name if overlay else None,
+            **page_response(p, p.items, "results")
+        })
+
+    text, _ = render_within_limit(page, render)
+    return text
+
+
 @mcp.tool(
     name="record_human_retry",
     annotations={
@@ -254,7 +371,8 @@ async def resolve_path(params: ResolvePathInput) -> str:
         "idempotentHint": False
     }
 )
-async def record_human_retry(params: RecordHumanRetryInput) -> str:
+@offloaded(_session_locks, key=_active_session_key)
+def record_human_retry(params: RecordHumanRetryInput) -> str:
     """Record human retry attempt for a file.
 
     Copies current version to human-retries/ and records reason.
@@ -340,12 +458,26 @@ Checked paths:
         "idempotentHint": True
     }
 )
-async def list_sessions() -> str:
+@offloaded()
+def list_sessions(params: Optional[ListSessionsInput] = None) -> str:
     """List all sessions (active and inactive).
 
+    Sessions are ordered by creation time (most recent first) and paginated:
+    pass the returned next_cursor to get the following page.
+
+    Args:
+        params (Optional[ListSessionsInput]): Paging and output options:
+            - limit (int): Page size (default: 50)
+            - cursor (Optional[str]): next_cursor from previous page
+            - response_format (str): 'text' (table) or 'json' (compact rows)
+            - fields (Optional[List[str]]): JSON columns to return
+
     Returns:
-        Markdown-formatted table of sessions
+        Markdown-formatted table of sessions, or compact JSON page
+        {"sessions": [...], "total", "offset", "count", "next_cursor"}
     """
+    params = params or ListSessionsInput()
+
     if not SESSIONS_PATH.exists():
         return """📋 SESSIONS (0 total)
 
@@ -395,17 +527,40 @@ No sessions found.
                 "size": 0
             })
 
-    # Sort by creation time (most recent first)
+    # Sort by creation time (most recent first), name breaks ties for stable paging
+    sessions.sort(key=lambda s: s["name"])
     sessions.sort(key=lambda s: s["created"], reverse=True)
 
+    try:
+        page = paginate(
+            sessions, lambda s: s["name"], params.limit, params.cursor,
+            query_fingerprint(tool="list_sessions")
+        )
+    except CursorError as e:
+        return f"❌ ERROR: {str(e)}"
+
+    if params.response_format == 'json':
+        text, _ = fit_json_page(page, lambda items: select_fields(items, params.fields), "sessions")
+        return text
+
+    text, _ = render_within_limit(page, lambda p: _render_sessions_page(p, active_name))
+    return text
+
+
+def _render_sessions_page(page: Page, active_name: Optional[str]) -> str:
+    """Render one page of list_sessions as a markdown table."""
+    sessions = page.items
+
     # Build table
-    lines = [
-        f"📋 SESSIONS ({len(sessions)} total)",
+    lines = [f"📋 SESSIONS ({page.total} total)"]
+    if len(sessions) < page.total:
+        lines.append(f"Showing {page.start + 1}–{page.start + len(sessions)} of {page.total}")
+    lines.extend([
         "",
         "┌────────────────────────────┬──────────┬────────────┬──────────┐",
         "│ Name                       │ Status   │ Created    │ Changes  │",
         "├────────────────────────────┼──────────┼────────────┼──────────┤"
-    ]
+    ])
 
     for s in sessions:
         name_short = s["name"][:26].ljust(26)
@@ -427,6 +582,9 @@ No sessions found.
     lines.append("└────────────────────────────┴──────────┴────────────┴──────────┘")
     lines.append("")
 
+    if page.next_cursor:
+        lines.extend([f"➡️ Next page: list_sessions(cursor='{page.next_cursor}')", ""])
+
     if active_name:
         lines.extend([f"🔒 Active: {active_name}", ""])
 
@@ -454,7 +612,9 @@ No sessions found.
         "idempotentHint": True
     }
 )
-async def switch_session(params: SwitchSessionInput) -> str:
+@_session_guarded
+@offloaded()
+def switch_session(params: SwitchSessionInput) -> str:
     """Switch to different session.
 
     Args:
@@ -531,6 +691,18 @@ Error: {str(e)}
     return "\n".join(lines)
 
 
+def _cleanup_committed_session(session_name: str, session_path: Path) -> None:
+    """Remove a committed session directory and release its lock (idempotent)."""
+    _discard_cow_index(session_name)
+    if session_path.exists():
+        shutil.rmtree(session_path)
+
+    # Clear session.lock if this was active session
+    lock = _get_session_lock()
+    if lock and lock.get("active") == session_name:
+        _clear_session_lock()
+
+
 @mcp.tool(
     name="commit_session",
     annotations={
@@ -540,20 +712,34 @@ Error: {str(e)}
         "idempotentHint": False
     }
 )
-async def commit_session(params: CommitSessionInput) -> str:
+@_session_guarded
+@serialized(_session_locks, key=_target_session_key)
+async def commit_session(params: CommitSessionInput, ctx: Optional[Context] = None) -> str:
     """Commit session changes to global files (Copy CoW files to global).
 
+    The commit is transactional (see session_commit_utils): the planned
+    operations are written to a durable intent journal, files are staged next
+    to their targets, then renamed into place, and only then is the session
+    removed. A crash is finished or rolled back on the next server start (or
+    by running commit_session for the same session again).
+
+    Work runs on a bounded thread pool (MCP_COMMIT_WORKERS) outside the event
+    loop: files identical to global are skipped, the others are copied into
+    stage files. Progress is reported per file operation when the client
+    supports it.
+
     Args:
         params: Commit parameters
+        ctx: MCP request context (progress notifications)
 
     Returns:
-        Markdown-formatted commit summary
+        Markdown-formatted commit summary with per-phase timing
     """
     # Get session to commit
     if params.name:
         session_name = params.name
     else:
-        session = _get_active_session()
+        session = await run_io(_get_active_session)
         if not session:
             return """❌ ERROR: No active session
 
@@ -562,9 +748,27 @@ async def commit_session(params: CommitSessionInput) -> str:
 """
         session_name = session["name"]
 
+    # Finish (or roll back) an interrupted commit of this session first
+    journal = journal_path(WORKSPACE_PATH, session_name)
+    if journal.exists():
+        try:
+            outcome = await run_io(recover_commit, journal, _cleanup_committed_session)
+        except Exception as e:
+            return f"❌ ERROR: Interrupted commit of '{session_name}' could not be recovered: {str(e)}"
+        if outcome == RECOVERY_COMPLETED:
+            return f"""✅ SESSION COMMITTED (recovered)
+
+Session: {session_name}
+
+An interrupted commit was found and finished.
+
+🗑️ Session directory removed
+🔓 Session lock cleared
+"""
+
     # Load session data
     try:
-        session_data = _load_session_data(session_name)
+        session_data = await run_io(_load_session_data, session_name)
     except Exception as e:
         return f"❌ ERROR: Failed to load session '{session_name}': {str(e)}"
 
@@ -622,70 +826,59 @@ Session '{session_name}' has no modified files.
 
         return "\n".join(lines)
 
-    # Commit: Copy CoW files from session to global
-    copied_files = []
-    failed_files = []
-    deleted_files = []
-    archived_files = []
+    # Run the commit on worker threads so the server keeps serving other requests
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    progress = None
+    if ctx is not None:
+        loop = asyncio.get_running_loop()
 
-    for cow_file in session_data["cow_files"]:
-        file_path = cow_file["path"]
-        file_type = cow_file.get("type", ChangeType.MODIFIED.value)
-        session_file = session_path / file_path
-        global_file = Path(file_path)
+        def progress(done: int, total: int, message: str) -> None:
+            asyncio.run_coroutine_threadsafe(ctx.report_progress(done, total, message), loop)
 
-        try:
-            # Handle deleted files - archive before deleting
-            if file_type == ChangeType.DELETED.value:
-                # Archive before deleting
-                timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
-                archive_dir = WORKSPACE_PATH / "deleted-archive" / session_name / timestamp
-                archive_file = archive_dir / file_path
-                archive_file.parent.mkdir(parents=True, exist_ok=True)
-
-                if global_file.exists():
-                    shutil.copy2(global_file, archive_file)
-                    archived_files.append(file_path)
-                    global_file.unlink()
-                    deleted_files.append(file_path)
-                continue
-
-            # Create parent directory if needed
-            global_file.parent.mkdir(parents=True, exist_ok=True)
-
-            # Copy from session to global
-            if session_file.exists():
-                shutil.copy2(session_file, global_file)
-                copied_files.append(file_path)
-        except Exception as e:
-            failed_files.append((file_path, str(e)))
-
-    # Archive human retries (don't delete)
-    retries_archived = False
-    if session_data.get("human_retries"):
-        archive_dir = WORKSPACE_PATH / "retries-archive" / session_name
-        archive_dir.mkdir(parents=True, exist_ok=True)
-
-        retries_dir = session_path / "human-retries"
-        if retries_dir.exists():
-            shutil.copytree(retries_dir, archive_dir, dirs_exist_ok=True)
-            retries_archived = True
-
-    # Copy workflow states to global (Phase 4 integration)
-    workflow_states_copied, workflow_states_failed = _copy_workflow_states_to_global(session_name, session_path)
-
-    # Clean up session directory
     try:
-        shutil.rmtree(session_path)
+        result = await run_io(
+            run_commit,
+            session_path,
+            session_data["cow_files"],
+            WORKSPACE_PATH,
+            WORKSPACE_PATH / "deleted-archive" / session_name / timestamp,
+            lambda: _cleanup_committed_session(session_name, session_path),
+            Path("."),
+            COMMIT_WORKERS,
+            progress,
+            get_blob_store(WORKSPACE_PATH)
+        )
     except Exception as e:
-        # Log error but don't fail commit - session data already copied
-        logger.error(f"Failed to clean up session directory '{session_path}': {e}")
-        failed_files.append((f"session directory cleanup: {session_path}", str(e)))
+        return f"❌ ERROR: Commit of '{session_name}' failed before any file was changed: {str(e)}"
+
+    if result.state in (STATE_ABORTED, STATE_INCOMPLETE):
+        if result.state == STATE_ABORTED:
+            lines = [
+                f"❌ COMMIT ABORTED: {session_name}",
+                "",
+                "No global files were changed; the session is kept.",
+            ]
+        else:
+            lines = [
+                f"⚠️ COMMIT INCOMPLETE: {session_name}",
+                "",
+                "Some staged changes could not be applied. They are kept in the commit journal",
+                "and will be finished on next server start or by running commit_session again.",
+            ]
+        lines.append("")
+        lines.append(f"✗ Failed ({len(result.failed)}):")
+        for f, err in result.failed[:10]:
+            lines.append(f"   ✗ {f}: {err}")
+        if len(result.failed) > 10:
+            lines.append(f"   ... and {len(result.failed) - 10} more")
+        return "\n".join(lines)
 
-    # Clear session.lock if this was active session
-    lock = _get_session_lock()
-    if lock and lock.get("active") == session_name:
-        _clear_session_lock()
+    phase_seconds = result.phase_seconds
+    failed_files = result.failed
+    retries_archived = result.phase_counts.get(PHASE_RETRIES, 0) > 0
+
+    # Workflow states and run artifacts are committed with the files (Phase 4 integration)
+    workflow_states_copied = sum(result.phase_counts.get(p, 0) for p in (PHASE_WORKFLOW_STATES, PHASE_ARTIFACTS))
 
     # Build response
     lines = [
@@ -696,45 +889,54 @@ Session '{session_name}' has no modified files.
         "📁 Files copied to global:"
     ]
 
-    if copied_files:
-        for f in copied_files[:10]:
+    if result.copied:
+        for f in result.copied:
             lines.append(f"   ✓ {f}")
-        if len(copied_files) > 10:
-            lines.append(f"   ... and {len(copied_files) - 10} more")
+        if result.copied_count > len(result.copied):
+            lines.append(f"   ... and {result.copied_count - len(result.copied)} more")
     else:
         lines.append("   (none)")
 
-    if deleted_files:
+    if result.deleted:
         lines.append("")
         lines.append("🗑️ Files deleted from global:")
-        for f in deleted_files[:10]:
+        for f in result.deleted:
             lines.append(f"   ✓ {f}")
-        if len(deleted_files) > 10:
-            lines.append(f"   ... and {len(deleted_files) - 10} more")
+        if result.deleted_count > len(result.deleted):
+            lines.append(f"   ... and {result.deleted_count - len(result.deleted)} more")
 
-    if archived_files:
+    if result.deleted:
         lines.append("")
-        lines.append("📦 Deleted files archived:")
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
-        lines.append(f"   {WORKSPACE_PATH}/deleted-archive/{session_name}/{timestamp}/")
+        lines.append("📦 Deleted files archived (blob store refs):")
+        lines.append(f"   deleted-archive/{session_name}/{timestamp}/")
 
     if failed_files:
         lines.append("")
-        lines.append("⚠️ Failed to copy:")
+        lines.append("⚠️ Cleanup failed (retried on next server start):")
         for f, err in failed_files:
             lines.append(f"   ✗ {f}: {err}")
 
     if retries_archived:
         lines.append("")
-        lines.append("📦 Human retries archived:")
-        lines.append(f"   {WORKSPACE_PATH}/retries-archive/{session_name}/")
+        lines.append("📦 Human retries archived (blob store refs):")
+        lines.append(f"   retries-archive/{session_name}/")
 
     if workflow_states_copied > 0:
         lines.append("")
         lines.append("🔄 Workflow states committed:")
         lines.append(f"   • Copied: {workflow_states_copied}")
-        if workflow_states_failed > 0:
-            lines.append(f"   • Failed: {workflow_states_failed}")
+
+    lines.append("")
+    lines.append("⚡ Transfer:")
+    lines.append(
+        f"   • Copied: {result.outcomes.get(COPIED, 0)}, "
+        f"unchanged (skipped): {result.outcomes.get(SKIPPED, 0)}"
+    )
+    lines.append("")
+    lines.append(f"⏱️ Timing ({COMMIT_WORKERS} workers):")
+    for phase in ("plan", "stage", "apply", "cleanup"):
+        if phase in phase_seconds:
+            lines.append(f"   • {phase}: {phase_seconds[phase] * 1000:.0f} ms")
 
     lines.append("")
     lines.append("🗑️ Session directory removed")
@@ -754,7 +956,9 @@ Session '{session_name}' has no modified files.
         "idempotentHint": False
     }
 )
-async def cancel_session(params: CancelSessionInput) -> str:
+@_session_guarded
+@offloaded(_session_locks, key=_target_session_key)
+def cancel_session(params: CancelSessionInput) -> str:
     """Cancel session and discard all changes.
 
     Args:
@@ -798,12 +1002,16 @@ async def cancel_session(params: CancelSessionInput) -> str:
     retries_backed_up = False
     if params.backup_retries and session_data.get("human_retries"):
         timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
-        backup_dir = WORKSPACE_PATH / "retries-archive" / f"{session_name}-cancelled-{timestamp}"
-        backup_dir.mkdir(parents=True, exist_ok=True)
+        backup_dir = f"retries-archive/{session_name}-cancelled-{timestamp}"
 
+        # Retry files are stored once in the blob store, named by archive path
         retries_dir = session_path / "human-retries"
         if retries_dir.exists():
-            shutil.copytree(retries_dir, backup_dir, dirs_exist_ok=True)
+            store = get_blob_store(WORKSPACE_PATH)
+            for retry_file in sorted(retries_dir.rglob("*")):
+                if retry_file.is_file():
+                    rel = retry_file.relative_to(retries_dir).as_posix()
+                    store.add_ref(f"{backup_dir}/{rel}", store.put_file(retry_file))
             retries_backed_up = True
 
     # Count changes
@@ -812,6 +1020,7 @@ async def cancel_session(params: CancelSessionInput) -> str:
     retries = len(session_data.get("human_retries", []))
 
     # Delete session directory
+    _discard_cow_index(session_name)
     shutil.rmtree(session_path)
 
     # Clear session.lock if this was active
@@ -835,7 +1044,7 @@ async def cancel_session(params: CancelSessionInput) -> str:
     # Comment 15: merge list appends
     if retries_backed_up:
         lines.extend([
-            "📦 Human retries backed up:",
+            "📦 Human retries backed up (blob store refs):",
             f"   {backup_dir}/",
             ""
         ])
@@ -852,5 +1061,23 @@ async def cancel_session(params: CancelSessionInput) -> str:
 
 # Main entry point
 if __name__ == "__main__":
+    try:
+        with session_guard(SESSION_LOCK_FILE):
+            # Finish or roll back commits interrupted by a crash
+            for name, outcome in recover_commits(WORKSPACE_PATH, _cleanup_committed_session).items():
+                logger.info(f"Recovered interrupted commit of session '{name}': {outcome}")
+
+            # Bring existing sessions to the current session.json format
+            migrated = _migrate_sessions()
+            if migrated:
+                logger.info(f"Migrated {migrated} session(s) to session.json format v{SESSION_FORMAT_VERSION}")
+    except SessionBusyError as e:
+        # Another server is committing; recovery runs again on commit_session
+        logger.warning(f"Skipped startup recovery and migration: {e}")
+
+    # Write batched CoW tracking to session.json if the client terminates us
+    install_sigterm_flush()
+    start_metrics_exporters()
+
     # Run server with stdio transport
     mcp.run()
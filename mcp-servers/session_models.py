@@ -8,9 +8,11 @@ This module contains:
 - Input validation models for all MCP tools
 """
 
-from typing import Optional
+from typing import Optional, List, Literal
 from enum import Enum
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+
+from pagination_utils import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 
 # Enums
@@ -107,6 +109,48 @@ class CancelSessionInput(BaseModel):
     )
 
 
+# Columns of list_sessions JSON rows
+SESSION_LIST_FIELDS = ['name', 'status', 'created', 'changes', 'size']
+
+
+class ListSessionsInput(BaseModel):
+    """Input model for list_sessions tool."""
+    model_config = ConfigDict(
+        str_strip_whitespace=True,
+        validate_assignment=True,
+        extra='forbid'
+    )
+
+    limit: int = Field(
+        default=DEFAULT_PAGE_SIZE,
+        description="Maximum sessions per page",
+        ge=1,
+        le=MAX_PAGE_SIZE
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="next_cursor from the previous page (omit for first page)"
+    )
+    response_format: Literal['text', 'json'] = Field(
+        default='text',
+        description="Output format: 'text' (table) or 'json' (compact page of rows)"
+    )
+    fields: Optional[List[str]] = Field(
+        default=None,
+        description=f"JSON columns to return (default: all): {', '.join(SESSION_LIST_FIELDS)}"
+    )
+
+    @field_validator('fields')
+    @classmethod
+    def validate_fields(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        """Validate requested JSON columns."""
+        if v is not None:
+            unknown = [f for f in v if f not in SESSION_LIST_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(SESSION_LIST_FIELDS)}")
+        return v
+
+
 class ResolvePathInput(BaseModel):
     """Input model for resolve_path tool."""
     model_config = ConfigDict(
@@ -123,6 +167,36 @@ class ResolvePathInput(BaseModel):
     )
 
 
+class ResolvePathsInput(BaseModel):
+    """Input model for resolve_paths tool."""
+    model_config = ConfigDict(
+        str_strip_whitespace=True,
+        validate_assignment=True,
+        extra='forbid'
+    )
+
+    paths: List[str] = Field(
+        ...,
+        description="Relative paths to resolve in one call (e.g., all context files of a step)",
+        min_length=1,
+        max_length=MAX_PAGE_SIZE
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="next_cursor from a truncated response (same paths; omit for first page)"
+    )
+
+    @field_validator('paths')
+    @classmethod
+    def validate_paths(cls, v: List[str]) -> List[str]:
+        """Validate each path (non-empty, at most 500 characters)."""
+        paths = [p.strip() for p in v]
+        invalid = [p for p in paths if not p or len(p) > 500]
+        if invalid:
+            raise ValueError("Paths must be non-empty and at most 500 characters")
+        return paths
+
+
 class RecordHumanRetryInput(BaseModel):
     """Input model for record_human_retry tool."""
     model_config = ConfigDict(
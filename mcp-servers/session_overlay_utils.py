@@ -0,0 +1,371 @@
+"""
+Session Overlay Utilities
+
+Read view of the active session layered over the global tree, shared by the
+MCP servers for session-aware path resolution (generation state, workflow
+state, resolve_path / resolve_paths).
+
+A path resolves to the session copy when the session has one, otherwise to
+the global path. Lookups are answered from memory:
+- paths tracked in the session's CoW manifest (session.json "cow_files")
+  resolve to the session without touching the file system
+- other paths are looked up in cached directory listings; a listing is
+  revalidated with one stat of its directory (the directory mtime changes
+  whenever an entry is added or removed), so files written into the session
+  without CoW tracking are still found
+
+The active overlay is rebuilt when the active session changes (generation
+counter of session_lock_utils) and its manifest is reloaded when
+session.json changes.
+
+This module contains:
+- Constants
+- Directory listing cache
+- SessionOverlay (resolve / exists / list_dir)
+- Active overlay lookup per workspace
+"""
+
+from typing import Optional, Dict, Any, List, FrozenSet, Iterable, Tuple
+from pathlib import Path
+import json
+import os
+import stat
+import threading
+import time
+
+from session_lock_utils import get_session_provider
+from session_models import ChangeType
+
+
+# Constants
+
+SESSIONS_DIR_NAME = "sessions"
+SESSION_LOCK_NAME = "session.lock"
+SESSION_FILE_NAME = "session.json"
+
+# Listings scanned within this window of the directory's mtime are not cached:
+# an entry added in the same timestamp tick would not change the mtime.
+RACY_WINDOW_NS = 1_000_000_000
+
+# Cached directory listings (the cache is cleared when it grows past this)
+MAX_CACHED_DIRECTORIES = 4096
+
+SOURCE_SESSION = "session"
+SOURCE_GLOBAL = "global"
+
+# Signature of a file: (inode, mtime_ns, size); None if missing
+Signature = Optional[Tuple[int, int, int]]
+
+
+def _signature(path: Path) -> Signature:
+    """Return (inode, mtime_ns, size) of a file or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+# Directory Listing Cache
+
+class _DirectoryListings:
+    """Directory entry names cached by (inode, mtime_ns) of the directory."""
+
+    def __init__(self):
+        self._cache: Dict[str, Tuple[Tuple[int, int], FrozenSet[str]]] = {}
+        self._lock = threading.Lock()
+
+    def names(self, directory: Path, memo: Optional[Dict[str, Any]] = None) -> Optional[FrozenSet[str]]:
+        """Entry names of a directory (None if it doesn't exist).
+
+        Args:
+            directory: Directory to list
+            memo: Per-batch dict; each directory is validated once per batch
+
+        Returns:
+            Frozen set of entry names or None
+        """
+        key = os.path.abspath(directory)
+        if memo is not None and key in memo:
+            return memo[key]
+
+        names = self._lookup(key)
+        if memo is not None:
+            memo[key] = names
+        return names
+
+    def _lookup(self, key: str) -> Optional[FrozenSet[str]]:
+        try:
+            st = os.stat(key)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISDIR(st.st_mode):
+            with self._lock:
+                self._cache.pop(key, None)
+            return None
+
+        version = (st.st_ino, st.st_mtime_ns)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        scanned_at = time.time_ns()
+        try:
+            names = frozenset(os.listdir(key))
+        except OSError:
+            return None
+
+        if scanned_at - st.st_mtime_ns > RACY_WINDOW_NS:
+            with self._lock:
+                if len(self._cache) >= MAX_CACHED_DIRECTORIES:
+                    self._cache.clear()
+                self._cache[key] = (version, names)
+        return names
+
+    def clear(self) -> None:
+        """Drop all cached listings."""
+        with self._lock:
+            self._cache.clear()
+
+
+_listings = _DirectoryListings()
+
+
+def _normalize(rel_path: str) -> str:
+    """Normalize a relative path the way CoW manifest paths are stored."""
+    return Path(rel_path).as_posix()
+
+
+def path_exists(path: Path, memo: Optional[Dict[str, Any]] = None) -> bool:
+    """Check whether a path exists using the cached listing of its parent.
+
+    Args:
+        path: File or directory path
+        memo: Per-batch dict (see _DirectoryListings.names)
+
+    Returns:
+        True if the parent directory lists the entry
+    """
+    if not path.name:
+        return os.path.isdir(path)
+    names = _listings.names(path.parent, memo)
+    return names is not None and path.name in names
+
+
+# Session Overlay
+
+class SessionOverlay:
+    """Read view of one session over the global tree.
+
+    Session paths mirror global paths relative to a global root: the
+    repository root ('.') for acts/ and context/, the workspace directory for
+    generation-state-*.json and workflow-state/.
+    """
+
+    def __init__(self, name: str, session_path: Path):
+        """Create overlay for a session (manifest is loaded on first use).
+
+        Args:
+            name: Session name
+            session_path: Session directory (workspace/sessions/{name})
+        """
+        self.name = name
+        self.session_path = session_path
+        self._manifest: FrozenSet[str] = frozenset()
+        self._manifest_signature: Signature = None
+        self._manifest_loaded = False
+        self._lock = threading.Lock()
+
+    # Manifest
+
+    def refresh_manifest(self) -> None:
+        """Reload the CoW manifest if session.json changed since last load."""
+        session_file = self.session_path / SESSION_FILE_NAME
+        signature = _signature(session_file)
+        if self._manifest_loaded and signature == self._manifest_signature:
+            return
+
+        manifest: FrozenSet[str] = frozenset()
+        if signature is not None:
+            try:
+                with open(session_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                manifest = frozenset(
+                    _normalize(entry["path"])
+                    for entry in data.get("cow_files", [])
+                    if entry.get("path") and entry.get("type") != ChangeType.DELETED.value
+                )
+            except (OSError, ValueError, TypeError, AttributeError):
+                # Unreadable manifest: fall back to directory listings only
+                manifest = frozenset()
+
+        with self._lock:
+            self._manifest = manifest
+            self._manifest_signature = signature
+            self._manifest_loaded = True
+
+    @property
+    def manifest(self) -> FrozenSet[str]:
+        """Paths tracked as present in the session (modified or created)."""
+        if not self._manifest_loaded:
+            self.refresh_manifest()
+        return self._manifest
+
+    # Queries
+
+    def in_session(self, rel_path: str, memo: Optional[Dict[str, Any]] = None) -> bool:
+        """Check whether the session has its own copy of rel_path."""
+        if _normalize(rel_path) in self.manifest:
+            return True
+        return path_exists(self.session_path / rel_path, memo)
+
+    def resolve(
+        self,
+        rel_path: str,
+        global_root: Path = Path("."),
+        memo: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Resolve a path: session copy if present, otherwise global.
+
+        Args:
+            rel_path: Path relative to the session / global root
+            global_root: Directory the session mirrors for this path
+            memo: Per-batch dict (see resolve_many)
+
+        Returns:
+            {
+                "resolved_path": str,
+                "source": "session" | "global",
+                "exists": bool,
+                "modified_in_session": bool
+            }
+        """
+        if self.in_session(rel_path, memo):
+            return {
+                "resolved_path": str(self.session_path / rel_path),
+                "source": SOURCE_SESSION,
+                "exists": True,
+                "modified_in_session": True
+            }
+        return _resolve_global(rel_path, global_root, memo)
+
+    def resolve_many(self, rel_paths: Iterable[str], global_root: Path = Path(".")) -> List[Dict[str, Any]]:
+        """Resolve many paths validating each directory listing once."""
+        memo: Dict[str, Any] = {}
+        return [self.resolve(rel_path, global_root, memo) for rel_path in rel_paths]
+
+    def exists(self, rel_path: str, global_root: Path = Path(".")) -> bool:
+        """Check whether rel_path exists in the session or globally."""
+        return self.resolve(rel_path, global_root)["exists"]
+
+    def list_dir(self, rel_dir: str, global_root: Path = Path(".")) -> List[Dict[str, str]]:
+        """List a directory of the merged view (session entries shadow global).
+
+        Args:
+            rel_dir: Directory relative to the session / global root
+            global_root: Directory the session mirrors
+
+        Returns:
+            Entries sorted by name: {"name", "source", "resolved_path"}
+        """
+        session_dir = self.session_path / rel_dir
+        global_dir = global_root / rel_dir
+        session_names = set(_listings.names(session_dir) or ())
+
+        prefix = _normalize(rel_dir)
+        prefix = "" if prefix == "." else prefix + "/"
+        for path in self.manifest:
+            if path.startswith(prefix) and "/" not in path[len(prefix):]:
+                session_names.add(path[len(prefix):])
+
+        entries = {
+            name: {"name": name, "source": SOURCE_SESSION, "resolved_path": str(session_dir / name)}
+            for name in session_names
+        }
+        for name in _listings.names(global_dir) or ():
+            if name not in entries:
+                entries[name] = {"name": name, "source": SOURCE_GLOBAL, "resolved_path": str(global_dir / name)}
+        return [entries[name] for name in sorted(entries)]
+
+
+def _resolve_global(rel_path: str, global_root: Path, memo: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    global_path = global_root / rel_path
+    return {
+        "resolved_path": str(global_path),
+        "source": SOURCE_GLOBAL,
+        "exists": path_exists(global_path, memo),
+        "modified_in_session": False
+    }
+
+
+# Active Overlay Lookup
+
+# {absolute session.lock path: (session generation, overlay or None)}
+_active: Dict[str, Tuple[int, Optional[SessionOverlay]]] = {}
+_active_lock = threading.Lock()
+
+
+def get_active_overlay(
+    workspace_path: Path,
+    lock_file: Optional[Path] = None,
+    sessions_path: Optional[Path] = None
+) -> Optional[SessionOverlay]:
+    """Get the overlay of the active session (None if no session is active).
+
+    The active session comes from the shared session.lock provider; the
+    overlay is rebuilt when its generation changes (session switched) and its
+    manifest is refreshed when session.json changes.
+
+    Args:
+        workspace_path: Workspace directory
+        lock_file: session.lock path (default: workspace_path / session.lock)
+        sessions_path: Sessions directory (default: workspace_path / sessions)
+
+    Returns:
+        SessionOverlay or None
+    """
+    lock_file = lock_file if lock_file is not None else workspace_path / SESSION_LOCK_NAME
+    sessions_path = sessions_path if sessions_path is not None else workspace_path / SESSIONS_DIR_NAME
+    name, generation = get_session_provider(lock_file).snapshot()
+    key = os.path.abspath(lock_file)
+
+    with _active_lock:
+        cached = _active.get(key)
+        overlay = cached[1] if cached is not None and cached[0] == generation else None
+        if name is None:
+            overlay = None
+        elif overlay is None or overlay.session_path != sessions_path / name:
+            overlay = SessionOverlay(name, sessions_path / name)
+        _active[key] = (generation, overlay)
+
+    if overlay is not None:
+        overlay.refresh_manifest()
+    return overlay
+
+
+def resolve_paths(
+    overlay: Optional[SessionOverlay],
+    rel_paths: Iterable[str],
+    global_root: Path = Path(".")
+) -> List[Dict[str, Any]]:
+    """Resolve many paths against a session overlay (or global if None).
+
+    Args:
+        overlay: Active session overlay or None
+        rel_paths: Paths relative to global_root
+        global_root: Directory the session mirrors
+
+    Returns:
+        Resolution dicts in input order (see SessionOverlay.resolve)
+    """
+    if overlay is not None:
+        return overlay.resolve_many(rel_paths, global_root)
+    memo: Dict[str, Any] = {}
+    return [_resolve_global(rel_path, global_root, memo) for rel_path in rel_paths]
+
+
+def reset_overlays() -> None:
+    """Forget all active overlays and cached listings."""
+    with _active_lock:
+        _active.clear()
+    _listings.clear()
@@ -7,16 +7,29 @@ This module contains:
 - Constants (paths)
 - Session lock management
 - Session data I/O (with atomic writes)
-- CoW (Copy-on-Write) tracking
+- Copy-on-Write path resolution (session overlay)
+- CoW (Copy-on-Write) tracking index with batched session.json flushes
+- Session format migration
 - File size formatting
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 from datetime import datetime, timezone
+import atexit
 import json
+import logging
 import os
-import tempfile
+import signal
+import threading
+import time
+
+from durable_io_utils import atomic_write_json
+from session_lock_utils import get_session_provider, write_session_lock, clear_session_lock
+from session_overlay_utils import SessionOverlay, get_active_overlay, path_exists
+from session_models import ChangeType
+
+logger = logging.getLogger(__name__)
 
 
 # Constants
@@ -25,33 +38,39 @@ WORKSPACE_PATH = Path("workspace")
 SESSIONS_PATH = WORKSPACE_PATH / "sessions"
 SESSION_LOCK_FILE = WORKSPACE_PATH / "session.lock"
 
+# session.json layout version (2 = normalized CoW tracking: unique paths,
+# change lists derived from entries, stats consistent with entries)
+SESSION_FORMAT_VERSION = 2
+
+# Batched session.json flushes for CoW tracking: write after this many tracked
+# changes or once the oldest unflushed change is this old (seconds; a timer
+# flushes idle sessions).
+# MCP_SESSION_FLUSH_EVERY=1 restores a write per tracked change.
+COW_FLUSH_MAX_PENDING = max(1, int(os.environ.get("MCP_SESSION_FLUSH_EVERY", "64")))
+COW_FLUSH_MAX_DELAY = 2.0
+
+CHANGE_TYPES = [t.value for t in ChangeType]
+
 
 # Session Lock Management
 
 def _get_session_lock() -> Optional[Dict[str, Any]]:
-    """Get current session lock data.
+    """Get current session lock data (cached, revalidated by file signature).
 
     Returns:
         Session lock dict or None if no lock exists
     """
-    if not SESSION_LOCK_FILE.exists():
-        return None
-
-    try:
-        with open(SESSION_LOCK_FILE, 'r') as f:
-            return json.load(f)
-    except Exception:
-        return None
+    return get_session_provider(SESSION_LOCK_FILE).lock_data()
 
 
 def _update_session_lock(session_name: str) -> None:
     """Update session.lock with new active session.
 
+    Callers that switch sessions hold session_guard (see session_lock_utils).
+
     Args:
         session_name: Name of session to activate
     """
-    WORKSPACE_PATH.mkdir(parents=True, exist_ok=True)
-
     lock_data = {
         "active": session_name,
         "updated_at": datetime.now(timezone.utc).isoformat(),
@@ -59,14 +78,12 @@ def _update_session_lock(session_name: str) -> None:
         "user": os.environ.get("USER", "unknown")
     }
 
-    with open(SESSION_LOCK_FILE, 'w') as f:
-        json.dump(lock_data, f, indent=2)
+    write_session_lock(SESSION_LOCK_FILE, lock_data)
 
 
 def _clear_session_lock() -> None:
     """Clear session.lock (no active session)."""
-    if SESSION_LOCK_FILE.exists():
-        SESSION_LOCK_FILE.unlink()
+    clear_session_lock(SESSION_LOCK_FILE)
 
 
 # Session Path Management
@@ -98,6 +115,9 @@ def _load_session_data(name: str) -> Dict[str, Any]:
         FileNotFoundError: If session doesn't exist
         ValueError: If session.json is corrupted
     """
+    # Readers always see CoW changes that are still waiting for a batched flush
+    _flush_cow_index(name)
+
     session_path = _get_session_path(name)
     session_file = session_path / "session.json"
 
@@ -124,38 +144,33 @@ def _atomic_write_session_json(session_path: Path, data: Dict[str, Any]) -> None
         ValueError: If write fails
     """
     session_file = session_path / "session.json"
-    dir_path = session_file.parent
 
     try:
-        # Write to temp file in same directory (atomic rename requires same filesystem)
-        with tempfile.NamedTemporaryFile(
-            mode='w',
-            dir=dir_path,
-            delete=False,
-            encoding='utf-8',
-            suffix='.tmp'
-        ) as tf:
-            json.dump(data, tf, indent=2, ensure_ascii=False)
-            temp_name = tf.name
-
-        # Atomic rename (POSIX guarantees atomicity)
-        os.replace(temp_name, session_file)
+        atomic_write_json(session_file, data)
     except Exception as e:
-        # Clean up temp file if rename failed
-        if 'temp_name' in locals() and Path(temp_name).exists():
-            Path(temp_name).unlink()
         raise ValueError(f"Failed to write session.json atomically: {e}") from e
 
 
 def _save_session_data(name: str, data: Dict[str, Any]) -> None:
     """Save session.json data atomically.
 
+    CoW changes tracked since data was loaded and not flushed yet are merged
+    in, so a full save never drops them.
+
     Args:
         name: Session name
         data: Session data to save
     """
-    session_path = _get_session_path(name)
-    _atomic_write_session_json(session_path, data)
+    with _cow_lock:
+        previous = _cow_indexes.pop(name, None)
+        if previous is None or not previous.pending:
+            _atomic_write_session_json(_get_session_path(name), data)
+            return
+
+        index = CowIndex(data)
+        for path, change_type, size_bytes, at in previous.pending:
+            index.track(path, change_type, size_bytes, at)
+        _write_cow_index(name, index)
 
 
 # Session Information
@@ -229,8 +244,23 @@ def _create_session_structure(session_path: Path) -> None:
 
 # Copy-on-Write Path Resolution
 
+def _get_active_overlay() -> Optional[SessionOverlay]:
+    """Get overlay view of the active session (None if no active session).
+
+    Unlike _get_active_session, session.json is not loaded; session.lock is
+    re-read only when it changes.
+
+    Returns:
+        SessionOverlay or None if no lock or the session directory is missing
+    """
+    overlay = get_active_overlay(WORKSPACE_PATH, SESSION_LOCK_FILE, SESSIONS_PATH)
+    if overlay is None or not path_exists(overlay.session_path):
+        return None
+    return overlay
+
+
 def _resolve_path_cow(rel_path: str, session_name: str) -> Dict[str, Any]:
-    """Resolve path with Copy-on-Write logic.
+    """Resolve path with Copy-on-Write logic (via the session overlay).
 
     Args:
         rel_path: Relative path (e.g., "acts/act-1/.../scene-0101.md")
@@ -244,156 +274,329 @@ def _resolve_path_cow(rel_path: str, session_name: str) -> Dict[str, Any]:
             "modified_in_session": bool
         }
     """
-    session_path = _get_session_path(session_name)
-    session_file_path = session_path / rel_path
-    global_file_path = Path(rel_path)
+    overlay = get_active_overlay(WORKSPACE_PATH, SESSION_LOCK_FILE, SESSIONS_PATH)
+    if overlay is None or overlay.name != session_name:
+        overlay = SessionOverlay(session_name, _get_session_path(session_name))
+    return overlay.resolve(rel_path)
+
+
+# CoW Tracking
+
+class CowIndex:
+    """Keyed view of a session's CoW tracking data.
 
-    # Check if file exists in session (modified)
-    if session_file_path.exists():
+    session.json keeps the list-based layout ("cow_files" list, "changes"
+    lists, "stats"); in memory the entries are keyed by path, change lists are
+    insertion-ordered sets and stats are maintained incrementally, so tracking
+    a file is O(1) regardless of session size.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        """Build index from session data (any format version; normalizes it).
+
+        Args:
+            data: Parsed session.json (not modified)
+        """
+        self.data = {k: v for k, v in data.items() if k not in ("cow_files", "changes", "stats")}
+        self.stats = dict(data.get("stats") or {})
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.changes: Dict[str, Dict[str, None]] = {t: {} for t in CHANGE_TYPES}
+        self.size_bytes = 0
+        self.signature: Optional[Tuple[int, int]] = None  # session.json (mtime_ns, size)
+        self.pending: List[Tuple[str, str, int, str]] = []  # unflushed track() calls
+        self.pending_since = 0.0
+
+        # Duplicate paths (possible in old files) collapse into the last entry
+        for cow_file in data.get("cow_files", []):
+            path = cow_file.get("path")
+            if path is None:
+                continue
+            previous = self.entries.pop(path, None)
+            if previous is not None:
+                self.size_bytes -= previous.get("size_bytes", 0)
+            self.entries[path] = dict(cow_file)
+            self.size_bytes += cow_file.get("size_bytes", 0)
+
+        # Keep existing change list order, but derive membership from entries
+        old_changes = data.get("changes", {})
+        for change_type, paths in self.changes.items():
+            for path in old_changes.get(change_type, []):
+                entry = self.entries.get(path)
+                if entry is not None and entry.get("type", ChangeType.MODIFIED.value) == change_type:
+                    paths[path] = None
+        for path, entry in self.entries.items():
+            change_type = entry.setdefault("type", ChangeType.MODIFIED.value)
+            self.changes.setdefault(change_type, {})[path] = None
+
+    def track(self, file_path: str, change_type: str, size_bytes: int, at: str) -> bool:
+        """Record a change to a file.
+
+        Args:
+            file_path: Relative path to file
+            change_type: "modified" | "created" | "deleted"
+            size_bytes: File size (used only when the file is new to the index)
+            at: ISO timestamp of the change
+
+        Returns:
+            True if the index changed
+        """
+        entry = self.entries.get(file_path)
+        if entry is not None:
+            old_type = entry["type"]
+            if old_type == change_type:
+                return False
+            self.changes[old_type].pop(file_path, None)
+            self.changes.setdefault(change_type, {})[file_path] = None
+            entry["type"] = change_type
+            entry["updated_at"] = at
+            return True
+
+        self.entries[file_path] = {
+            "path": file_path,
+            "type": change_type,
+            "copied_at": at,
+            "size_bytes": size_bytes
+        }
+        self.changes.setdefault(change_type, {})[file_path] = None
+        self.size_bytes += size_bytes
+        return True
+
+    def to_session_data(self) -> Dict[str, Any]:
+        """Materialize session.json content (list-based layout)."""
+        stats = {
+            **self.stats,
+            "total_files_changed": len(self.entries),
+            "session_size_bytes": self.size_bytes
+        }
         return {
-            "resolved_path": str(session_file_path),
-            "source": "session",
-            "exists": True,
-            "modified_in_session": True
+            **self.data,
+            "format_version": SESSION_FORMAT_VERSION,
+            "cow_files": list(self.entries.values()),
+            "changes": {change_type: list(paths) for change_type, paths in self.changes.items()},
+            "stats": stats
         }
 
-    # File not in session, use global
-    return {
-        "resolved_path": str(global_file_path),
-        "source": "global",
-        "exists": global_file_path.exists(),
-        "modified_in_session": False
-    }
 
+# Loaded indexes: {session_name: CowIndex}
+_cow_indexes: Dict[str, CowIndex] = {}
+_cow_lock = threading.RLock()
+
+# Armed flush timers: {session_name: timer}
+_cow_flush_timers: Dict[str, threading.Timer] = {}
+
+
+def _session_file_signature(name: str) -> Optional[Tuple[int, int]]:
+    """Get (mtime_ns, size) of session.json, or None if missing."""
+    try:
+        stat = (_get_session_path(name) / "session.json").stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _get_cow_index(name: str) -> CowIndex:
+    """Get CoW index for session, reloading it if session.json changed on disk.
+
+    Unflushed changes of a stale index are re-applied to the reloaded one.
+
+    Raises:
+        FileNotFoundError: If session doesn't exist
+        ValueError: If session.json is corrupted
+    """
+    signature = _session_file_signature(name)
+    if signature is None:
+        _cow_indexes.pop(name, None)
+        raise FileNotFoundError(f"Session '{name}' not found")
+
+    index = _cow_indexes.get(name)
+    if index is not None and index.signature == signature:
+        return index
+
+    session_file = _get_session_path(name) / "session.json"
+    try:
+        with open(session_file, 'r') as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Corrupted session.json for '{name}': {e}") from e
+
+    fresh = CowIndex(data)
+    fresh.signature = signature
+    if index is not None and index.pending:
+        for path, change_type, size_bytes, at in index.pending:
+            fresh.track(path, change_type, size_bytes, at)
+        fresh.pending = index.pending
+        fresh.pending_since = index.pending_since
+    _cow_indexes[name] = fresh
+    return fresh
+
+
+def _write_cow_index(name: str, index: CowIndex) -> None:
+    """Write index to session.json and mark it clean."""
+    session_file = _get_session_path(name) / "session.json"
+    try:
+        stat = atomic_write_json(session_file, index.to_session_data())
+    except Exception as e:
+        raise ValueError(f"Failed to write session.json atomically: {e}") from e
+    index.signature = (stat.st_mtime_ns, stat.st_size)
+    index.pending = []
+    _cow_indexes[name] = index
+
+
+def _flush_cow_index(name: str) -> None:
+    """Write pending CoW changes of a session to session.json (no-op if none)."""
+    with _cow_lock:
+        index = _cow_indexes.get(name)
+        if index is None or not index.pending:
+            return
+        if not _get_session_path(name).exists():
+            # Session was removed (commit/cancel); nothing to flush into
+            _cow_indexes.pop(name, None)
+            return
+        _write_cow_index(name, _get_cow_index(name))
+
+
+def _flush_cow_index_on_timer(name: str) -> None:
+    """Timer callback: flush a session whose pending changes reached COW_FLUSH_MAX_DELAY."""
+    with _cow_lock:
+        _cow_flush_timers.pop(name, None)
+        try:
+            _flush_cow_index(name)
+        except Exception as e:
+            logger.error(f"Failed to flush CoW tracking for session '{name}': {e}")
+
+
+def _arm_cow_flush_timer(name: str) -> None:
+    """Schedule a flush of the session's pending changes (call under _cow_lock)."""
+    timer = _cow_flush_timers.get(name)
+    if timer is not None and timer.is_alive():
+        return
+    timer = threading.Timer(COW_FLUSH_MAX_DELAY, _flush_cow_index_on_timer, args=(name,))
+    timer.daemon = True
+    _cow_flush_timers[name] = timer
+    timer.start()
+
+
+def _flush_all_cow_indexes() -> None:
+    """Flush pending CoW changes of all sessions (called at exit and on SIGTERM)."""
+    for name in list(_cow_indexes):
+        try:
+            _flush_cow_index(name)
+        except Exception as e:
+            logger.error(f"Failed to flush CoW tracking for session '{name}': {e}")
+
+
+def _discard_cow_index(name: str) -> None:
+    """Forget a session's CoW index and its pending changes (before removing it)."""
+    with _cow_lock:
+        _cow_indexes.pop(name, None)
+        timer = _cow_flush_timers.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+
+
+atexit.register(_flush_all_cow_indexes)
+
+
+def install_sigterm_flush() -> None:
+    """Flush pending CoW changes when the server is terminated with SIGTERM.
+
+    atexit handlers do not run on SIGTERM. The handler flushes, restores the
+    default action and re-sends the signal, so the process still exits with
+    the usual status. Call from the main thread before mcp.run().
+    """
+    def flush_and_exit(signum: int, frame: Any) -> None:
+        _flush_all_cow_indexes()
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+    signal.signal(signal.SIGTERM, flush_and_exit)
 
-# CoW Tracking
 
 def _add_cow_file(session_name: str, file_path: str, change_type: str) -> None:
     """Add file to session CoW tracking.
 
+    The change is applied to the in-memory index and session.json is written
+    in batches (see COW_FLUSH_MAX_PENDING / COW_FLUSH_MAX_DELAY); readers of
+    session.json via _load_session_data always see pending changes.
+
     Args:
         session_name: Session name
         file_path: Relative path to file
         change_type: "modified" | "created" | "deleted"
     """
-    session_data = _load_session_data(session_name)
-    session_path = _get_session_path(session_name)
-
-    # Check if already tracked
-    existing_entry = None
-    for cow_file in session_data["cow_files"]:
-        if cow_file["path"] == file_path:
-            existing_entry = cow_file
-            break
-
-    if existing_entry:
-        # Update change_type if status changed
-        old_type = existing_entry["type"]
-        if old_type != change_type:
-            # Remove from old change list
-            if file_path in session_data["changes"][old_type]:
-                session_data["changes"][old_type].remove(file_path)
-
-            # Add to new change list
-            if file_path not in session_data["changes"][change_type]:
-                session_data["changes"][change_type].append(file_path)
-
-            # Update type in cow_files
-            existing_entry["type"] = change_type
-            existing_entry["updated_at"] = datetime.now(timezone.utc).isoformat()
-
-            _save_session_data(session_name, session_data)
-        return
-
-    # Get file size from session directory
-    session_file = session_path / file_path
-    size_bytes = os.path.getsize(session_file) if session_file.exists() else 0
+    with _cow_lock:
+        index = _get_cow_index(session_name)
 
-    # Add to cow_files
-    cow_entry = {
-        "path": file_path,
-        "type": change_type,
-        "copied_at": datetime.now(timezone.utc).isoformat(),
-        "size_bytes": size_bytes
-    }
+        size_bytes = 0
+        if file_path not in index.entries:
+            # Get file size from session directory
+            try:
+                size_bytes = os.path.getsize(_get_session_path(session_name) / file_path)
+            except OSError:
+                size_bytes = 0
 
-    session_data["cow_files"].append(cow_entry)
+        at = datetime.now(timezone.utc).isoformat()
+        if not index.track(file_path, change_type, size_bytes, at):
+            return
 
-    # Update changes list
-    if file_path not in session_data["changes"][change_type]:
-        session_data["changes"][change_type].append(file_path)
+        if not index.pending:
+            index.pending_since = time.monotonic()
+        index.pending.append((file_path, change_type, size_bytes, at))
 
-    # Update stats
-    session_data["stats"]["total_files_changed"] = len(session_data["cow_files"])
-    session_data["stats"]["session_size_bytes"] = sum(
-        f["size_bytes"] for f in session_data["cow_files"]
-    )
+        if (len(index.pending) >= COW_FLUSH_MAX_PENDING
+                or time.monotonic() - index.pending_since >= COW_FLUSH_MAX_DELAY):
+            _write_cow_index(session_name, index)
+        else:
+            _arm_cow_flush_timer(session_name)
 
-    _save_session_data(session_name, session_data)
 
+# Session Format Migration
 
-# Workflow State Management
+def _migrate_session_data(data: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """Normalize session data to SESSION_FORMAT_VERSION.
 
-def _copy_workflow_states_to_global(session_name: str, session_path: Path) -> tuple[int, int]:
-    """Copy workflow states from session to global directory on commit.
+    Removes duplicate cow_files entries, rebuilds change lists from entries and
+    recomputes stats. The result stays readable by older code.
 
     Args:
-        session_name: Session name
-        session_path: Path to session directory
+        data: Parsed session.json
 
     Returns:
-        Tuple of (copied_count, failed_count)
+        Tuple of (migrated data, True if anything changed)
     """
-    global_workflow_dir = WORKSPACE_PATH / "workflow-state"
-    global_workflow_dir.mkdir(parents=True, exist_ok=True)
-
-    session_workflow_dir = session_path / "workflow-state"
+    migrated = CowIndex(data).to_session_data()
+    return migrated, migrated != data
 
-    copied = 0
-    failed = 0
 
-    if not session_workflow_dir.exists():
-        return (copied, failed)
+def _migrate_sessions() -> int:
+    """Migrate session.json of all existing sessions to the current format.
 
-    # Copy all workflow state files
-    import shutil
-    for state_file in session_workflow_dir.glob("*.json"):
-        if state_file.name == "index.json":
-            continue  # Skip index files
+    Corrupted sessions are skipped (list_sessions reports them as crashed).
 
+    Returns:
+        Number of sessions rewritten
+    """
+    if not SESSIONS_PATH.exists():
+        return 0
+
+    migrated_count = 0
+    for session_dir in SESSIONS_PATH.iterdir():
+        session_file = session_dir / "session.json"
+        if not session_file.is_file():
+            continue
         try:
-            shutil.copy2(state_file, global_workflow_dir / state_file.name)
-            copied += 1
-        except Exception:
-            failed += 1
-
-    # Copy generation-runs artifacts
-    session_gen_runs = session_path / "generation-runs"
-    global_gen_runs = WORKSPACE_PATH / "generation-runs"
-    if session_gen_runs.exists():
-        global_gen_runs.mkdir(parents=True, exist_ok=True)
-        for run_dir in session_gen_runs.iterdir():
-            if run_dir.is_dir():
-                try:
-                    shutil.copytree(run_dir, global_gen_runs / run_dir.name, dirs_exist_ok=True)
-                    copied += 1
-                except Exception:
-                    failed += 1
-
-    # Copy planning-runs artifacts
-    session_plan_runs = session_path / "planning-runs"
-    global_plan_runs = WORKSPACE_PATH / "planning-runs"
-    if session_plan_runs.exists():
-        global_plan_runs.mkdir(parents=True, exist_ok=True)
-        for run_dir in session_plan_runs.iterdir():
-            if run_dir.is_dir():
-                try:
-                    shutil.copytree(run_dir, global_plan_runs / run_dir.name, dirs_exist_ok=True)
-                    copied += 1
-                except Exception:
-                    failed += 1
-
-    return (copied, failed)
+            with open(session_file, 'r') as f:
+                data = json.load(f)
+            if data.get("format_version") == SESSION_FORMAT_VERSION:
+                continue
+            migrated, changed = _migrate_session_data(data)
+            if changed:
+                _save_session_data(session_dir.name, migrated)
+                migrated_count += 1
+        except Exception as e:
+            logger.warning(f"Skipping migration of session '{session_dir.name}': {e}")
+
+    return migrated_count
 
 
 # Formatting
@@ -0,0 +1,214 @@
+"""
+State Journal Utilities
+
+Append-only JSON-lines event journal for generation workflow state.
+
+Each state transition is recorded as one event line:
+
+    {"seq": 12, "at": "...", "type": "step_completed", "step": "scene:gen:setup:plan",
+     "ops": [{"op": "set", "path": ["steps", "scene:gen:setup:plan"], "value": {...}},
+             {"op": "append", "path": ["errors"], "values": [...]}]}
+
+The state file itself becomes a periodic snapshot. It carries a "_journal"
+marker with the last event sequence number and journal byte offset it already
+includes, so loading reads the snapshot and replays only the journal tail.
+The journal is never truncated and doubles as the workflow audit trail.
+
+This module contains:
+- Journal path and snapshot marker helpers
+- State diff (ops) and replay
+- Event append/read
+"""
+
+from typing import Optional, Dict, List, Any, Tuple
+from pathlib import Path
+from datetime import datetime, timezone
+import json
+
+from durable_io_utils import durable_append_bytes
+
+
+# Constants
+
+JOURNAL_SUFFIX = ".events.jsonl"
+JOURNAL_META_KEY = "_journal"
+
+# Write a full snapshot after this many journaled events
+SNAPSHOT_INTERVAL = 25
+
+
+# Paths and Snapshot Marker
+
+def journal_path_for(state_path: Path) -> Path:
+    """Get journal path for a state file (generation-state-0204.events.jsonl)."""
+    return state_path.with_name(state_path.stem + JOURNAL_SUFFIX)
+
+
+def split_snapshot(raw: Dict[str, Any]) -> Tuple[Dict[str, Any], int, int]:
+    """Remove the journal marker from a loaded snapshot.
+
+    Args:
+        raw: Parsed snapshot (modified in place)
+
+    Returns:
+        Tuple of (state, seq, offset). Snapshots written before journaling
+        existed report seq 0 and offset 0.
+    """
+    marker = raw.pop(JOURNAL_META_KEY, None) or {}
+    return raw, int(marker.get("seq", 0)), int(marker.get("offset", 0))
+
+
+def with_snapshot_marker(state: Dict[str, Any], seq: int, offset: int) -> Dict[str, Any]:
+    """Return a shallow copy of state carrying the journal marker."""
+    return {**state, JOURNAL_META_KEY: {"seq": seq, "offset": offset}}
+
+
+# Diff and Replay
+
+def diff_state(old: Any, new: Any, path: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+    """Compute the ops that turn old into new.
+
+    Dicts are compared key by key, lists that only grew at the end become
+    "append" ops, everything else is replaced with "set".
+
+    Args:
+        old: Previous JSON value
+        new: New JSON value
+        path: Key path of the values (internal)
+
+    Returns:
+        List of ops (empty if equal)
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "set", "path": [*path, key], "value": value})
+            elif old[key] != value:
+                ops.extend(diff_state(old[key], value, (*path, key)))
+        for key in old:
+            if key not in new:
+                ops.append({"op": "del", "path": [*path, key]})
+        return ops
+
+    if (isinstance(old, list) and isinstance(new, list) and path
+            and len(new) > len(old) and new[:len(old)] == old):
+        return [{"op": "append", "path": list(path), "values": new[len(old):]}]
+
+    if old == new and type(old) is type(new):
+        return []
+    if not path:
+        raise ValueError("Root state must be a dict")
+    return [{"op": "set", "path": list(path), "value": new}]
+
+
+def apply_ops(state: Dict[str, Any], ops: List[Dict[str, Any]]) -> None:
+    """Apply ops produced by diff_state to state (in place).
+
+    Raises:
+        ValueError: If an op is malformed or does not match the state
+    """
+    for op in ops:
+        try:
+            *parents, key = op["path"]
+            target = state
+            for part in parents:
+                target = target[part]
+
+            if op["op"] == "set":
+                target[key] = op["value"]
+            elif op["op"] == "append":
+                target[key].extend(op["values"])
+            elif op["op"] == "del":
+                target.pop(key, None)
+            else:
+                raise ValueError(f"Unknown op '{op['op']}'")
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Cannot apply journal op {op.get('op')} {op.get('path')}: {e}") from e
+
+
+# Journal I/O
+
+def append_event(
+    journal_path: Path,
+    seq: int,
+    event_type: str,
+    ops: List[Dict[str, Any]],
+    step: Optional[str] = None,
+    durability: Optional[str] = None
+):
+    """Append one event to the journal.
+
+    Args:
+        journal_path: Journal file
+        seq: Sequence number of this event
+        event_type: Event type (e.g. 'step_started')
+        ops: State ops from diff_state
+        step: Optional step name the event refers to
+        durability: Durability level (see durable_io_utils)
+
+    Returns:
+        os.stat_result of the journal after the append
+    """
+    event = {
+        "seq": seq,
+        "at": datetime.now(timezone.utc).isoformat(),
+        "type": event_type,
+    }
+    if step:
+        event["step"] = step
+    event["ops"] = ops
+
+    line = json.dumps(event, ensure_ascii=False, separators=(',', ':')) + "\n"
+    return durable_append_bytes(journal_path, line.encode('utf-8'), durability)
+
+
+def read_events(journal_path: Path, offset: int = 0) -> List[Dict[str, Any]]:
+    """Read events from the journal starting at a byte offset.
+
+    Torn or unparseable lines (interrupted appends) are skipped.
+
+    Args:
+        journal_path: Journal file
+        offset: Byte offset to start reading from (ignored if past the end)
+
+    Returns:
+        List of events in file order (empty if journal is missing)
+    """
+    try:
+        with open(journal_path, 'rb') as f:
+            f.seek(0, 2)
+            if offset > f.tell():
+                # Journal was replaced or truncated behind the snapshot's back
+                offset = 0
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return []
+
+    events = []
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict) and "seq" in event and "ops" in event:
+            events.append(event)
+    return events
+
+
+def replay(state: Dict[str, Any], events: List[Dict[str, Any]], after_seq: int) -> int:
+    """Apply events newer than after_seq to state (in place).
+
+    Returns:
+        Sequence number of the last applied event (after_seq if none)
+    """
+    seq = after_seq
+    for event in events:
+        if event["seq"] <= seq:
+            continue
+        apply_ops(state, event["ops"])
+        seq = event["seq"]
+    return seq
@@ -0,0 +1,217 @@
+"""
+Step Analytics Utilities
+
+Step timing aggregates across generations for the get_step_timing_report
+tool of generation_state_mcp.
+
+Every state file is reduced to a small timing summary when it is indexed
+(see generation_catalog_utils): per step its status, duration and failure
+count, the failure reasons and the workflow's total duration. Workflow
+orchestration states are summarized the same way, including how long
+human checkpoints (step 3) waited for approval. Reports are computed from
+these summaries only - state files are never parsed for a report.
+
+Percentiles use linear interpolation between the closest ranks.
+
+This module contains:
+- Percentiles
+- Timing summaries of generation and workflow states
+- Report aggregation
+"""
+
+from typing import Optional, Dict, List, Any, Iterable, Tuple
+from collections import Counter
+from datetime import datetime
+import math
+
+
+# Constants
+
+PERCENTILES = (50, 90, 99)
+FAILURE_REASON_MAX_LENGTH = 120  # reasons are grouped by their (truncated) first line
+
+
+# Percentiles
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """q-th percentile (0-100) of sorted values, None if there are none."""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * q / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def distribution(values: Iterable[float]) -> Dict[str, Any]:
+    """Count, total, mean and PERCENTILES of values (seconds, rounded to 0.1)."""
+    ordered = sorted(values)
+    result: Dict[str, Any] = {"count": len(ordered), "total_seconds": round(sum(ordered), 1)}
+    result["mean"] = round(sum(ordered) / len(ordered), 1) if ordered else None
+    for q in PERCENTILES:
+        value = percentile(ordered, q)
+        result[f"p{q}"] = None if value is None else round(value, 1)
+    return result
+
+
+# State Summaries
+
+def _seconds_between(start: Optional[str], end: Optional[str]) -> Optional[float]:
+    if not start or not end:
+        return None
+    try:
+        delta = datetime.fromisoformat(end.replace('Z', '+00:00')) - \
+            datetime.fromisoformat(start.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    return max(delta.total_seconds(), 0.0)
+
+
+def _failure_reason(message: Any) -> str:
+    lines = str(message or "").strip().splitlines()
+    return (lines[0].strip() if lines else "(no reason)")[:FAILURE_REASON_MAX_LENGTH]
+
+
+def summarize_generation(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Timing summary of a generation state (stored in the catalog).
+
+    Returns:
+        Dict {steps: {step_name: [status, duration_seconds, failures]},
+        failures: [[step_name, reason], ...], total: seconds of a COMPLETED
+        workflow or None}
+    """
+    failures = Counter()
+    reasons = []
+    for error in state.get('errors') or []:
+        step = error.get('step')
+        failures[step] += 1
+        reasons.append([step, _failure_reason(error.get('message'))])
+
+    steps = {}
+    for name, step in (state.get('steps') or {}).items():
+        duration = step.get('duration_seconds')
+        if duration is None and step.get('status') == "COMPLETED":
+            duration = _seconds_between(step.get('started_at'), step.get('completed_at'))
+        steps[name] = [step.get('status'), duration, failures.get(name, 0)]
+
+    total = None
+    if state.get('workflow_status') == "COMPLETED":
+        total = (state.get('metadata') or {}).get('total_duration_seconds') or \
+            _seconds_between(state.get('started_at'), state.get('completed_at'))
+    return {"steps": steps, "failures": reasons, "total": total}
+
+
+def summarize_workflow(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Timing summary of a workflow orchestration state (stored in the catalog).
+
+    Generation workflows list steps, planning workflows phases; both are keyed
+    '{number}. {name}'. Human checkpoints record waiting_since when they start
+    waiting, so their approval wait is measured up to completed_at.
+
+    Returns:
+        Dict {type, steps: {key: [status, duration_seconds, wait_seconds]}}
+    """
+    workflow_type = state.get('workflow_type')
+    if workflow_type == "planning":
+        entries, number_key = (state.get('planning') or {}).get('phases') or [], 'phase'
+    else:
+        entries, number_key = (state.get('generation') or {}).get('steps') or [], 'step'
+
+    steps = {}
+    for entry in entries:
+        key = f"{entry.get(number_key)}. {entry.get('name', '')}".strip()
+        steps[key] = [
+            entry.get('status'),
+            _seconds_between(entry.get('started_at'), entry.get('completed_at')),
+            _seconds_between(entry.get('waiting_since'), entry.get('completed_at')),
+        ]
+    return {"type": workflow_type, "steps": steps}
+
+
+# Report
+
+def _step_sort_key(step_order: List[str], name: str) -> Tuple[int, str]:
+    return (step_order.index(name) if name in step_order else len(step_order), name)
+
+
+def _number(key: str) -> int:
+    """Step / phase number of a workflow step key ('3. Verification Plan' -> 3)."""
+    head = key.split(".", 1)[0]
+    return int(head) if head.isdigit() else 0
+
+
+def build_report(
+    generations: List[Dict[str, Any]],
+    workflows: List[Dict[str, Any]],
+    step_order: List[str],
+    top_reasons: int = 10
+) -> Dict[str, Any]:
+    """Aggregate timing summaries into a report.
+
+    Args:
+        generations: summarize_generation results
+        workflows: summarize_workflow results
+        step_order: Generation step names in workflow order
+        top_reasons: Size of the failure reason histogram
+
+    Returns:
+        Dict {generations, workflows, steps, workflow_total, failure_reasons,
+        workflow_steps, approval_waits}. Step rows carry the duration
+        distribution of completed runs, their share of all completed step
+        time, failures and retry_rate (share of runs that failed at least
+        once and were retried).
+    """
+    durations: Dict[str, List[float]] = {}
+    runs: Counter = Counter()
+    failures: Counter = Counter()
+    retried: Counter = Counter()
+    totals = []
+    reasons: Counter = Counter()
+
+    for summary in generations:
+        for name, (status, duration, failed) in summary['steps'].items():
+            runs[name] += 1
+            failures[name] += failed
+            if failed and status != "FAILED":
+                retried[name] += 1
+            if status == "COMPLETED" and duration is not None:
+                durations.setdefault(name, []).append(duration)
+        for _, reason in summary['failures']:
+            reasons[reason] += 1
+        if summary['total'] is not None:
+            totals.append(summary['total'])
+
+    all_step_time = sum(sum(values) for values in durations.values())
+    steps = []
+    for name in sorted(runs, key=lambda n: _step_sort_key(step_order, n)):
+        row = {"step": name, "runs": runs[name], **distribution(durations.get(name, []))}
+        row["share"] = round(100 * row['total_seconds'] / all_step_time, 1) if all_step_time else 0.0
+        row["failures"] = failures[name]
+        row["retry_rate"] = round(retried[name] / runs[name], 3)
+        steps.append(row)
+
+    workflow_durations: Dict[Tuple[str, str], List[float]] = {}
+    waits: Dict[Tuple[str, str], List[float]] = {}
+    for summary in workflows:
+        for key, (status, duration, wait) in summary['steps'].items():
+            group = (summary['type'] or "unknown", key)
+            if status == "completed" and duration is not None:
+                workflow_durations.setdefault(group, []).append(duration)
+            if wait is not None:
+                waits.setdefault(group, []).append(wait)
+
+    def grouped(values: Dict[Tuple[str, str], List[float]]) -> List[Dict[str, Any]]:
+        return [
+            {"workflow_type": workflow_type, "step": key, **distribution(values[(workflow_type, key)])}
+            for workflow_type, key in sorted(values, key=lambda g: (g[0], _number(g[1]), g[1]))
+        ]
+
+    return {
+        "generations": len(generations),
+        "workflows": len(workflows),
+        "steps": steps,
+        "workflow_total": distribution(totals),
+        "failure_reasons": [{"reason": reason, "count": count} for reason, count in reasons.most_common(top_reasons)],
+        "workflow_steps": grouped(workflow_durations),
+        "approval_waits": grouped(waits),
+    }
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Unit tests for delta-compressed backup chains
+
+Tests cover:
+- Line delta computation, application, encoding and composition
+- Diff opcodes taken from deltas
+- create_backup snapshot / delta chains bounded by BACKUP_CHAIN_LENGTH
+- Restore and get_backup_diff through delta chains
+- Schema migration of existing backup tables
+
+Run with: pytest test_backup_delta.py -v
+"""
+
+import pytest
+import sys
+import random
+import difflib
+import sqlite3
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import planning_state_utils
+from backup_delta_utils import (
+    Delta,
+    split_lines,
+    compute_delta,
+    apply_delta,
+    compose_deltas,
+    delta_opcodes,
+    delta_stats,
+)
+from diff_utils import diff_opcodes
+from planning_state_utils import (
+    create_backup,
+    list_backups,
+    restore_backup,
+    get_backup_diff,
+    update_entity_state,
+    calculate_version_hash,
+    close_db_connections,
+    SCHEMA_FILE,
+    SCHEMA_VERSION,
+    STORAGE_SNAPSHOT,
+    STORAGE_DELTA,
+    STORAGE_DEDUPLICATED,
+)
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Planning state and blob store in a temporary workspace."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(planning_state_utils, "WORKSPACE_PATH", workspace)
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_DB_PATH", workspace / "planning-state.db")
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_JSON_DIR", workspace / "planning-state")
+    monkeypatch.setattr(planning_state_utils, "BACKUP_CHAIN_LENGTH", 3)
+    yield workspace
+    close_db_connections()
+
+
+@pytest.fixture
+def blueprint(workspace):
+    """Scene blueprint registered in planning state."""
+    path = workspace.parent / "scene-0204-blueprint.md"
+    path.write_text(_revision(0), encoding='utf-8')
+    update_entity_state('scene', 'scene-0204', 'draft', calculate_version_hash(path), str(path))
+    return path
+
+
+def _revision(n: int) -> str:
+    """Synthetic blueprint: paragraph n is rewritten in revision n."""
+    paragraphs = [f"Абзац {i}: Алекса идёт по коридору станции.\n" for i in range(40)]
+    for k in range(1, n + 1):
+        paragraphs[(k * 7) % 40] = f"Абзац {(k * 7) % 40}, правка {k}: Алекса останавливается.\n"
+    return "# Blueprint\n\n" + "".join(paragraphs)
+
+
+def _edit(lines, rng):
+    lines = list(lines)
+    for _ in range(rng.randint(1, 5)):
+        position = rng.randint(0, len(lines))
+        action = rng.choice(["insert", "delete", "replace"])
+        if action == "insert" or not lines:
+            lines.insert(position, f"new line {rng.random()}\n")
+        elif action == "delete":
+            del lines[min(position, len(lines) - 1)]
+        else:
+            lines[min(position, len(lines) - 1)] = f"changed {rng.random()}\n"
+    return lines
+
+
+# =============================================================================
+# Tests: Deltas
+# =============================================================================
+
+def test_delta_roundtrip_and_encoding():
+    """Test that applying an encoded delta rebuilds the new version."""
+    rng = random.Random(7)
+    base = [f"line {i}\n" for i in range(50)]
+    for _ in range(50):
+        new = _edit(base, rng)
+        delta = Delta.decode(compute_delta(base, new).encode())
+        assert apply_delta(base, delta) == new
+        base = new
+
+
+def test_delta_preserves_text_without_trailing_newline():
+    """Test exact reconstruction of Cyrillic text and a missing final newline."""
+    base = split_lines("Первая строка\nВторая строка")
+    new = split_lines("Первая строка\nНовая строка\nВторая строка")
+
+    assert "".join(apply_delta(base, compute_delta(base, new))) == "Первая строка\nНовая строка\nВторая строка"
+
+
+def test_compose_matches_sequential_application():
+    """Test that composed deltas rebuild the same version as applying each."""
+    rng = random.Random(11)
+    versions = [[f"line {i}\n" for i in range(30)]]
+    for _ in range(8):
+        versions.append(_edit(versions[-1], rng))
+
+    composed = compute_delta(versions[0], versions[1])
+    for older, newer in zip(versions[1:], versions[2:]):
+        composed = compose_deltas(composed, compute_delta(older, newer))
+
+    assert apply_delta(versions[0], composed) == versions[-1]
+
+
+def test_apply_rejects_wrong_base():
+    """Test that a delta is not applied to a different base."""
+    delta = compute_delta(["a\n", "b\n"], ["a\n"])
+
+    with pytest.raises(ValueError):
+        apply_delta(["a\n"], delta)
+    with pytest.raises(ValueError):
+        Delta.decode(b'{"v": 99, "base": 0, "ops": []}')
+
+
+def test_delta_opcodes_match_diff():
+    """Test that a delta's alignment is the diff of its two versions."""
+    base = split_lines(_revision(0))
+    new = split_lines(_revision(3))
+
+    assert list(delta_opcodes(compute_delta(base, new))) == diff_opcodes(base, new)
+    assert list(delta_opcodes(compute_delta(base, base))) == [("equal", 0, len(base), 0, len(base))]
+    assert delta_stats(compute_delta(base, new)) == {"copied": 39, "inserted": 3, "deleted": 3}
+
+
+# =============================================================================
+# Tests: Backup Chains
+# =============================================================================
+
+def _backup_revisions(blueprint, count):
+    results = []
+    for n in range(count):
+        blueprint.write_text(_revision(n), encoding='utf-8')
+        results.append(create_backup('scene', 'scene-0204', str(blueprint), reason='regeneration'))
+    return results
+
+
+def test_chain_length_bounds_deltas(workspace, blueprint):
+    """Test snapshot every BACKUP_CHAIN_LENGTH + 1 versions, deltas in between."""
+    results = _backup_revisions(blueprint, 9)
+
+    assert [r['storage'] for r in results] == [
+        STORAGE_SNAPSHOT, STORAGE_DELTA, STORAGE_DELTA, STORAGE_DELTA,
+        STORAGE_SNAPSHOT, STORAGE_DELTA, STORAGE_DELTA, STORAGE_DELTA,
+        STORAGE_SNAPSHOT,
+    ]
+    assert [r['chain_depth'] for r in results] == [0, 1, 2, 3, 0, 1, 2, 3, 0]
+
+    listing = list_backups('scene', 'scene-0204')
+    assert listing['count'] == 9 and all(b['exists'] for b in listing['backups'])
+
+
+def test_identical_content_references_snapshot(workspace, blueprint):
+    """Test that re-backing up unchanged snapshot content stores nothing new."""
+    first = create_backup('scene', 'scene-0204', str(blueprint))
+    second = create_backup('scene', 'scene-0204', str(blueprint))
+
+    assert first['storage'] == STORAGE_SNAPSHOT
+    assert second['storage'] == STORAGE_DEDUPLICATED and second['deduplicated'] is True
+    assert second['backup_path'] == first['backup_path']
+
+
+def test_restore_rebuilds_every_version(workspace, blueprint):
+    """Test restore of snapshot and delta versions."""
+    results = _backup_revisions(blueprint, 6)
+
+    for n in (3, 0, 5):
+        restored = restore_backup('scene', 'scene-0204', results[n]['backup_id'])
+        assert restored['success'] is True, restored['message']
+        assert blueprint.read_text(encoding='utf-8') == _revision(n)
+
+
+def test_restore_detects_corrupted_delta(workspace, blueprint):
+    """Test that a delta rebuilding the wrong content is rejected."""
+    results = _backup_revisions(blueprint, 3)
+    conn = planning_state_utils._get_db_connection()
+    with conn:
+        conn.execute(
+            "UPDATE planning_entity_backups SET backup_file_path = ? WHERE backup_id = ?",
+            (results[1]['backup_path'], results[2]['backup_id'])
+        )
+
+    result = restore_backup('scene', 'scene-0204', results[2]['backup_id'])
+
+    assert result['success'] is False
+    assert blueprint.read_text(encoding='utf-8') == _revision(2)
+
+
+def test_diff_from_deltas_within_chain(workspace, blueprint):
+    """Test get_backup_diff composes deltas inside a chain and rebuilds across chains."""
+    results = _backup_revisions(blueprint, 6)
+
+    within = get_backup_diff(results[0]['backup_id'], results[3]['backup_id'])
+    across = get_backup_diff(results[2]['backup_id'], results[5]['backup_id'])
+    reverse = get_backup_diff(results[3]['backup_id'], results[0]['backup_id'])
+
+    assert within['success'] and within['computed_from'] == "deltas"
+    assert across['success'] and across['computed_from'] == "content"
+    assert reverse['success'] and reverse['computed_from'] == "content"
+    expected = difflib.unified_diff(
+        split_lines(_revision(0)), split_lines(_revision(3)),
+        within['diff'].split("\n")[0][4:], within['diff'].split("\n")[1][4:], lineterm=""
+    )
+    assert within['diff'] == "\n".join(line.rstrip("\n") for line in expected)
+    assert "+Абзац 21, правка 3: Алекса останавливается." in within['diff']
+    assert within['stats']['lines_added'] == within['stats']['lines_removed'] == 3
+
+
+def test_migration_adds_chain_columns(tmp_path, monkeypatch):
+    """Test that a version-1 database gains the chain columns."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    db_path = workspace / "planning-state.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_FILE.read_text(encoding='utf-8'))
+    conn.execute("PRAGMA user_version = 1")
+    conn.close()
+    monkeypatch.setattr(planning_state_utils, "WORKSPACE_PATH", workspace)
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_DB_PATH", db_path)
+
+    try:
+        migrated = planning_state_utils._init_database()
+        columns = {row[1] for row in migrated.execute("PRAGMA table_info(planning_entity_backups)")}
+        assert {"base_backup_id", "chain_depth"} <= columns
+        assert migrated.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    finally:
+        close_db_connections()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the content-addressed blob store
+
+Tests cover:
+- Deduplication, compression, integrity checks
+- Named references, reference counts and garbage collection
+- Planning backups stored as blob references (list / restore / diff)
+- Migration of legacy backups/ files and reference reconciliation
+
+Run with: pytest test_blob_store.py -v
+"""
+
+import pytest
+import sys
+import os
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import blob_store_utils
+import planning_state_utils
+from blob_store_utils import (
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    COMPRESSION_ZSTD,
+    ZSTD_AVAILABLE,
+    BlobStore,
+    content_hash,
+    blob_uri,
+    parse_blob_uri,
+)
+from planning_state_utils import (
+    create_backup,
+    list_backups,
+    restore_backup,
+    get_backup_diff,
+    update_entity_state,
+    calculate_version_hash,
+    migrate_legacy_backups,
+    sync_backup_refs,
+    close_db_connections,
+    BACKUP_REF_PREFIX,
+)
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(tmp_path / "blobs", compression=COMPRESSION_ZLIB)
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Planning state and blob store in a temporary workspace."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(planning_state_utils, "WORKSPACE_PATH", workspace)
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_DB_PATH", workspace / "planning-state.db")
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_JSON_DIR", workspace / "planning-state")
+    yield workspace
+    close_db_connections()
+
+
+@pytest.fixture
+def plan(workspace):
+    """Chapter plan file registered in planning state."""
+    plan_file = workspace.parent / "acts" / "act-1" / "chapters" / "chapter-02" / "plan.md"
+    plan_file.parent.mkdir(parents=True)
+    plan_file.write_text("# Plan\n\nversion 1\n", encoding='utf-8')
+    update_entity_state('chapter', 'chapter-02', 'draft', calculate_version_hash(plan_file), str(plan_file))
+    return plan_file
+
+
+def _age(path: Path, seconds: float) -> None:
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+# =============================================================================
+# Tests: Objects
+# =============================================================================
+
+def test_put_deduplicates_and_compresses(store):
+    """Test that identical content is stored once, compressed when it shrinks."""
+    data = b"The same paragraph again. " * 200
+
+    first = store.put_bytes(data)
+    second = store.put_bytes(data)
+
+    assert first == second == content_hash(data)
+    path, compression = store.locate(first)
+    assert compression == COMPRESSION_ZLIB and path.suffix == ".z"
+    assert path.stat().st_size < len(data)
+    assert store.get_bytes(first) == data
+    assert store.stats()["blobs"] == 1
+
+
+def test_incompressible_content_stored_as_is(store):
+    """Test that content which does not shrink is not compressed."""
+    data = os.urandom(256)
+
+    blob_hash = store.put_bytes(data)
+
+    assert store.locate(blob_hash)[1] == COMPRESSION_NONE
+    assert store.get_bytes(blob_hash) == data
+
+
+def test_corrupted_blob_detected(store):
+    """Test that content not matching its hash is rejected."""
+    blob_hash = store.put_bytes(b"original")
+    path, _ = store.locate(blob_hash)
+    path.write_bytes(b"garbage")
+
+    with pytest.raises(ValueError):
+        store.get_bytes(blob_hash)
+    with pytest.raises(FileNotFoundError):
+        store.get_bytes("0" * 64)
+
+
+@pytest.mark.skipif(ZSTD_AVAILABLE, reason="zstandard installed")
+def test_zstd_requires_zstandard(tmp_path):
+    """Test that zstd compression fails clearly without the zstandard package."""
+    with pytest.raises(ValueError):
+        BlobStore(tmp_path / "blobs", compression=COMPRESSION_ZSTD)
+
+
+def test_blob_uri_roundtrip():
+    """Test blob: URIs versus legacy file paths."""
+    assert parse_blob_uri(blob_uri("ab" * 32)) == "ab" * 32
+    assert parse_blob_uri("/book/acts/act-1/backups/plan-2025.md") is None
+
+
+# =============================================================================
+# Tests: References and GC
+# =============================================================================
+
+def test_refs_and_refcount(store):
+    """Test adding, replacing, listing and removing references."""
+    a = store.put_bytes(b"a")
+    b = store.put_bytes(b"b")
+    store.add_ref("retries-archive/s1/x.md", a)
+    store.add_ref("retries-archive/s1/y.md", a)
+    store.add_ref("deleted-archive/s1/t/z.md", b)
+
+    assert store.refcount(a) == 2
+    assert [r["ref"] for r in store.list_refs("retries-archive/")] == [
+        "retries-archive/s1/x.md", "retries-archive/s1/y.md"
+    ]
+
+    store.add_ref("retries-archive/s1/y.md", b)
+    assert store.refcount(a) == 1 and store.refcount(b) == 2
+    assert store.remove_ref("retries-archive/s1/x.md") is True
+    assert store.remove_ref("retries-archive/s1/x.md") is False
+    assert store.resolve_ref("retries-archive/s1/x.md") is None
+
+
+def test_gc_removes_only_old_unreferenced_blobs(store):
+    """Test gc grace period, dry run and referenced blobs."""
+    kept = store.put_bytes(b"referenced")
+    store.add_ref("r", kept)
+    old = store.put_bytes(b"old orphan")
+    recent = store.put_bytes(b"recent orphan")
+    for blob_hash in (kept, old):
+        _age(store.locate(blob_hash)[0], 7200)
+
+    report = store.gc(dry_run=True)
+    assert report["removed"] == 1 and report["kept_recent"] == 1
+    assert store.has(old)
+
+    report = store.gc()
+    assert report["removed"] == 1 and report["bytes_freed"] > 0
+    assert store.has(kept) and store.has(recent) and not store.has(old)
+    assert store.stats()["blobs"] == 2
+
+
+def test_put_refreshes_grace_period_of_existing_blob(store):
+    """Test that re-storing an orphaned blob protects it from a concurrent gc."""
+    blob_hash = store.put_bytes(b"content")
+    _age(store.locate(blob_hash)[0], 7200)
+
+    store.put_bytes(b"content")
+
+    assert store.gc()["removed"] == 0
+    assert store.has(blob_hash)
+
+
+def test_gc_rechecks_blob_stored_during_scan(store, monkeypatch):
+    """Test that a blob re-stored and referenced after gc scanned it survives."""
+    blob_hash = store.put_bytes(b"content")
+    _age(store.locate(blob_hash)[0], 7200)
+    real_scandir = os.scandir
+
+    def scandir_then_put(path):
+        if Path(path) == store.objects_dir:
+            return real_scandir(path)
+        entries = list(real_scandir(path))
+        for entry in entries:
+            entry.stat()  # gc sees the old mtime
+        store.put_bytes(b"content")
+        store.add_ref("r", blob_hash)
+        return iter(entries)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(blob_store_utils.os, "scandir", scandir_then_put)
+        report = store.gc()
+
+    assert report["removed"] == 0
+    assert store.get_bytes(blob_hash) == b"content"
+    assert store.stats()["blobs"] == 1
+
+
+# =============================================================================
+# Tests: Planning Backups
+# =============================================================================
+
+def test_backups_share_blobs(workspace, plan):
+    """Test that identical backups reference one blob and nothing is written next to the plan."""
+    first = create_backup('chapter', 'chapter-02', str(plan), reason='manual')
+    second = create_backup('chapter', 'chapter-02', str(plan), reason='regeneration')
+
+    assert first['success'] and second['success']
+    assert first['backup_path'] == second['backup_path'] == blob_uri(first['version_hash'])
+    assert first['deduplicated'] is False and second['deduplicated'] is True
+    assert not (plan.parent / "backups").exists()
+
+    store = blob_store_utils.get_blob_store(workspace)
+    assert store.stats()["blobs"] == 1
+    assert store.refcount(first['version_hash']) == 2
+
+    listing = list_backups('chapter', 'chapter-02')
+    assert listing['count'] == 2
+    assert all(backup['exists'] for backup in listing['backups'])
+
+
+def test_failed_ref_leaves_no_backup_row(workspace, plan, monkeypatch):
+    """Test that a backup whose reference cannot be added is rolled back."""
+    store = blob_store_utils.get_blob_store(workspace)
+
+    def fail(ref, blob_hash):
+        raise OSError("index unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(store, "add_ref", fail)
+        result = create_backup('chapter', 'chapter-02', str(plan))
+
+    assert result['success'] is False and "index unavailable" in result['message']
+    assert not planning_state_utils._get_db_connection().in_transaction
+    assert list_backups('chapter', 'chapter-02')['count'] == 0
+
+    backup = create_backup('chapter', 'chapter-02', str(plan))
+    assert store.resolve_ref(f"{BACKUP_REF_PREFIX}{backup['backup_id']}") == backup['version_hash']
+
+
+def test_restore_and_diff_read_through_store(workspace, plan):
+    """Test restore_backup and get_backup_diff with blob-backed backups."""
+    old = create_backup('chapter', 'chapter-02', str(plan))
+    plan.write_text("# Plan\n\nversion 2\n", encoding='utf-8')
+    new = create_backup('chapter', 'chapter-02', str(plan))
+
+    diff = get_backup_diff(old['backup_id'], new['backup_id'])
+    assert diff['success'] is True
+    assert "-version 1" in diff['diff'] and "+version 2" in diff['diff']
+
+    restored = restore_backup('chapter', 'chapter-02', old['backup_id'])
+    assert restored['success'] is True
+    assert restored['restored_from'] == old['backup_path']
+    assert plan.read_text(encoding='utf-8') == "# Plan\n\nversion 1\n"
+
+
+def test_migrate_legacy_backups(workspace, plan):
+    """Test moving file-based backup rows into the blob store."""
+    legacy = plan.parent / "backups" / "plan-2025-01-01-00-00-00.md"
+    legacy.parent.mkdir()
+    legacy.write_text("legacy version\n", encoding='utf-8')
+    conn = planning_state_utils._get_db_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO planning_entity_backups (entity_type, entity_id, version_hash, backup_file_path, backed_up_at, reason) "
+            "VALUES ('chapter', 'chapter-02', ?, ?, '2025-01-01T00:00:00+00:00', 'manual')",
+            (content_hash(b"legacy version\n"), str(legacy))
+        )
+    assert list_backups('chapter', 'chapter-02')['backups'][0]['exists'] is True
+
+    result = migrate_legacy_backups()
+
+    assert result == {**result, "success": True, "migrated": 1, "missing": 0}
+    assert not legacy.exists()
+    backup = list_backups('chapter', 'chapter-02')['backups'][0]
+    assert parse_blob_uri(backup['backup_file_path']) == backup['version_hash']
+    assert backup['exists'] is True
+
+
+def test_sync_backup_refs(workspace, plan):
+    """Test that missing references are restored and orphaned ones removed."""
+    backup = create_backup('chapter', 'chapter-02', str(plan))
+    store = blob_store_utils.get_blob_store(workspace)
+    store.remove_ref(f"{BACKUP_REF_PREFIX}{backup['backup_id']}")
+    store.add_ref(f"{BACKUP_REF_PREFIX}999", backup['version_hash'])
+
+    result = sync_backup_refs()
+
+    assert result['success'] and result['added'] == 1 and result['removed'] == 1
+    assert [r["ref"] for r in store.list_refs(BACKUP_REF_PREFIX)] == [f"{BACKUP_REF_PREFIX}{backup['backup_id']}"]
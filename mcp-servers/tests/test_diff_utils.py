@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the line / word diff engine
+
+Tests cover:
+- Myers diff length versus LCS, patience alignment, opcode reconstruction
+- Hunk grouping and unified rendering versus difflib
+- Word-level diff of prose and diff-stat summaries
+- get_backup_diff against the live file and hunk pagination of the tool
+
+Run with: pytest test_diff_utils.py -v
+"""
+
+import pytest
+import sys
+import random
+import difflib
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import planning_state_utils
+import generation_state_mcp as gsm
+from diff_utils import (
+    ALGORITHM_MYERS,
+    ALGORITHM_PATIENCE,
+    MODE_WORD,
+    TextDiff,
+    diff_opcodes,
+    group_opcodes,
+    word_diff,
+)
+from planning_state_utils import (
+    create_backup,
+    get_backup_diff,
+    update_entity_state,
+    calculate_version_hash,
+    close_db_connections,
+)
+from pagination_utils import render_within_limit
+from generation_state_mcp import GetBackupDiffInput, get_backup_diff_tool
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Planning state and blob store in a temporary workspace."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(planning_state_utils, "WORKSPACE_PATH", workspace)
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_DB_PATH", workspace / "planning-state.db")
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_JSON_DIR", workspace / "planning-state")
+    yield workspace
+    close_db_connections()
+
+
+@pytest.fixture
+def blueprint(workspace):
+    """Scene blueprint registered in planning state."""
+    path = workspace.parent / "scene-0301-blueprint.md"
+    path.write_text(_chapter(), encoding='utf-8')
+    update_entity_state('scene', 'scene-0301', 'draft', calculate_version_hash(path), str(path))
+    return path
+
+
+def _chapter(edits=()) -> str:
+    lines = [f"Строка {i}: Алекса проверяет шлюз.\n" for i in range(200)]
+    for n in edits:
+        lines[n] = f"Строка {n}: Алекса открывает шлюз.\n"
+    return "".join(lines)
+
+
+def _lcs_length(a, b) -> int:
+    row = [0] * (len(b) + 1)
+    for x in a:
+        previous = 0
+        for j, y in enumerate(b):
+            current = row[j + 1]
+            row[j + 1] = previous + 1 if x == y else max(row[j + 1], row[j])
+            previous = current
+    return row[-1]
+
+
+def _apply(opcodes, a, b):
+    out = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+            out.extend(a[i1:i2])
+        else:
+            out.extend(b[j1:j2])
+    return out
+
+
+# =============================================================================
+# Tests: Algorithms
+# =============================================================================
+
+def test_myers_diff_is_minimal():
+    """Test that Myers keeps a longest common subsequence of random inputs."""
+    rng = random.Random(3)
+    for _ in range(300):
+        a = [rng.choice("abcd") for _ in range(rng.randint(0, 25))]
+        b = [rng.choice("abcd") for _ in range(rng.randint(0, 25))]
+        opcodes = diff_opcodes(a, b, ALGORITHM_MYERS)
+
+        assert _apply(opcodes, a, b) == b
+        kept = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == "equal")
+        assert kept == _lcs_length(a, b)
+
+
+def test_patience_produces_valid_alignment():
+    """Test that patience opcodes cover both sides and rebuild the new version."""
+    rng = random.Random(5)
+    for _ in range(300):
+        a = [rng.choice("abcdefgh") for _ in range(rng.randint(0, 30))]
+        b = [rng.choice("abcdefgh") for _ in range(rng.randint(0, 30))]
+        opcodes = diff_opcodes(a, b, ALGORITHM_PATIENCE)
+
+        assert _apply(opcodes, a, b) == b
+        assert all(prev[2] == cur[1] and prev[4] == cur[3] for prev, cur in zip(opcodes, opcodes[1:]))
+
+
+def test_unknown_algorithm_rejected():
+    """Test that an unsupported algorithm is reported."""
+    with pytest.raises(ValueError):
+        diff_opcodes(["a"], ["b"], "histogram")
+
+
+# =============================================================================
+# Tests: Hunks and Rendering
+# =============================================================================
+
+def test_render_matches_difflib_unified_diff():
+    """Test hunk grouping and unified output against difflib."""
+    old = _chapter().splitlines(keepends=True)
+    new = _chapter(edits=(5, 6, 90, 199)).splitlines(keepends=True)
+
+    diff = TextDiff(old, new, fromfile="a", tofile="b")
+    expected = difflib.unified_diff(old, new, "a", "b", lineterm="")
+
+    assert diff.render() == "\n".join(line.rstrip("\n") for line in expected)
+    assert len(diff.groups) == len(group_opcodes(diff_opcodes(old, new), 3)) == 3
+    assert diff.stats() == {"hunks": 3, "lines_added": 4, "lines_removed": 4, "old_lines": 200, "new_lines": 200}
+
+
+def test_word_diff_marks_changed_words():
+    """Test inline word markers on Cyrillic prose."""
+    text, removed, added = word_diff("Алекса проверяет шлюз.\n", "Алекса открывает шлюз станции.\n")
+
+    assert text == "Алекса [-проверяет-]{+открывает+} шлюз{+ станции+}.\n"
+    assert (removed, added) == (1, 2)
+
+
+def test_word_mode_hunks_and_stats():
+    """Test that replaced lines render as '~' word-diff lines in word mode."""
+    old = _chapter().splitlines(keepends=True)
+    new = _chapter(edits=(10,)).splitlines(keepends=True)
+
+    diff = TextDiff(old, new, mode=MODE_WORD)
+    hunk = diff.hunk(0)
+
+    assert hunk.header == "@@ -8,7 +8,7 @@"
+    assert "~Строка 10: Алекса [-проверяет-]{+открывает+} шлюз." in hunk.lines
+    assert diff.stats()["words_removed"] == diff.stats()["words_added"] == 1
+
+
+# =============================================================================
+# Tests: Backup Diffs
+# =============================================================================
+
+def test_diff_backup_against_live_file(workspace, blueprint):
+    """Test comparing a backup with the entity's current file."""
+    backup = create_backup('scene', 'scene-0301', str(blueprint))
+    blueprint.write_text(_chapter(edits=(42,)), encoding='utf-8')
+
+    result = get_backup_diff(backup['backup_id'])
+
+    assert result['success'] is True, result['message']
+    assert result['backup2']['live'] is True
+    assert result['stats']['lines_added'] == result['stats']['lines_removed'] == 1
+    assert "+Строка 42: Алекса открывает шлюз." in result['diff']
+    assert result['diff'] == result['text_diff'].render()
+
+    unrendered = get_backup_diff(backup['backup_id'], render=False)
+    assert unrendered['diff'] is None and unrendered['text_diff'].stats() == result['stats']
+
+
+async def test_tool_pages_hunks_with_cursor(workspace, blueprint):
+    """Test that get_backup_diff pages hunks and continues from next_cursor."""
+    old = create_backup('scene', 'scene-0301', str(blueprint))
+    blueprint.write_text(_chapter(edits=range(0, 200, 20)), encoding='utf-8')
+    new = create_backup('scene', 'scene-0301', str(blueprint))
+
+    seen = []
+    cursor = None
+    for _ in range(10):
+        output = await get_backup_diff_tool(GetBackupDiffInput(
+            backup_id1=old['backup_id'], backup_id2=new['backup_id'], limit=4, cursor=cursor
+        ))
+        assert "+10 −10 lines in 10 hunks" in output
+        seen.extend(line for line in output.split("\n") if line.startswith("+Строка"))
+        cursor = output.split("cursor='")[1].split("'")[0] if "cursor='" in output else None
+        if cursor is None:
+            break
+    assert seen == [f"+Строка {n}: Алекса открывает шлюз." for n in range(0, 200, 20)]
+
+    stat = await get_backup_diff_tool(GetBackupDiffInput(backup_id1=old['backup_id'], stat_only=True))
+    assert "lines in 10 hunks" in stat and "@@" not in stat and "Live file" in stat
+
+    invalid = await get_backup_diff_tool(GetBackupDiffInput(
+        backup_id1=old['backup_id'], backup_id2=new['backup_id'], mode='word', cursor=cursor or "bogus"
+    ))
+    assert invalid.startswith("❌ ERROR")
+
+
+async def test_tool_output_stays_under_character_limit(workspace, blueprint, monkeypatch):
+    """Test that oversized pages are cut at a hunk boundary with a cursor."""
+    monkeypatch.setattr(gsm, "render_within_limit", lambda page, render: render_within_limit(page, render, 1500))
+    old = create_backup('scene', 'scene-0301', str(blueprint))
+    blueprint.write_text(_chapter(edits=range(0, 200, 20)), encoding='utf-8')
+
+    output = await get_backup_diff_tool(GetBackupDiffInput(backup_id1=old['backup_id'], limit=10))
+
+    assert len(output) <= 1500
+    assert "Hunks 1-" in output and "of 10" in output and "cursor='" in output
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared durable write layer
+
+Tests cover:
+- Atomic replacement at every durability level
+- Compact vs pretty JSON serialization
+- Temp file cleanup and file permissions
+
+Run with: pytest test_durable_io.py -v
+"""
+
+import pytest
+import os
+import sys
+import json
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from durable_io_utils import (
+    atomic_write_bytes,
+    atomic_write_json,
+    DURABILITY_LEVELS,
+)
+
+
+@pytest.mark.parametrize("durability", DURABILITY_LEVELS)
+def test_atomic_write_replaces_content(tmp_path, durability):
+    """Test that the target is replaced and no temp files are left behind."""
+    target = tmp_path / "state.json"
+    target.write_text("old", encoding='utf-8')
+
+    stat = atomic_write_json(target, {"step": "ñ"}, durability=durability)
+
+    assert json.loads(target.read_text(encoding='utf-8')) == {"step": "ñ"}
+    assert stat.st_size == target.stat().st_size
+    assert stat.st_mtime_ns == target.stat().st_mtime_ns
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_compact_json(tmp_path):
+    """Test compact serialization omits whitespace."""
+    target = tmp_path / "state.json"
+
+    atomic_write_json(target, {"a": [1, 2]}, compact=True)
+    assert target.read_text(encoding='utf-8') == '{"a":[1,2]}'
+
+    atomic_write_json(target, {"a": [1, 2]})
+    assert target.read_text(encoding='utf-8').startswith('{\n  "a"')
+
+
+def test_invalid_durability(tmp_path):
+    """Test that unknown durability levels are rejected before writing."""
+    with pytest.raises(ValueError):
+        atomic_write_bytes(tmp_path / "x", b"data", durability="paranoid")
+    assert not (tmp_path / "x").exists()
+
+
+def test_failed_write_keeps_original(tmp_path):
+    """Test that a failed rename leaves the original file and no temp file."""
+    target = tmp_path / "dir-as-target"
+    target.mkdir()
+
+    with pytest.raises(OSError):
+        atomic_write_bytes(target, b"data")
+
+    assert target.is_dir()
+    assert [p.name for p in tmp_path.iterdir()] == ["dir-as-target"]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX permissions only")
+def test_written_file_uses_umask_mode(tmp_path):
+    """Test that files are not left with mkstemp's private 0600 mode."""
+    target = tmp_path / "state.json"
+    atomic_write_json(target, {})
+
+    umask = os.umask(0)
+    os.umask(umask)
+    assert target.stat().st_mode & 0o777 == 0o666 & ~umask
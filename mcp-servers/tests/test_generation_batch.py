@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the multi-scene generation batch scheduler
+
+Tests cover:
+- Scheduling a chapter from planning_entities (plan order, blueprint paths)
+- Dispatch within the concurrency budget, slots freed by finished scenes
+- Planning blockers, follow_plan_order and priorities across batches
+- Skipping already generated scenes, progress report and cancellation
+
+Run with: pytest test_generation_batch.py -v
+"""
+
+import pytest
+import sys
+import json
+from pathlib import Path
+
+from pydantic import ValidationError
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import generation_state_mcp as gsm
+import planning_state_utils
+from generation_state_mcp import (
+    StateCache,
+    ScheduleGenerationBatchInput,
+    DispatchGenerationBatchInput,
+    GetBatchProgressInput,
+    CancelGenerationBatchInput,
+    schedule_generation_batch,
+    dispatch_generation_batch,
+    get_batch_progress,
+    cancel_generation_batch,
+    _load_state_file,
+    _save_state_file,
+)
+from planning_state_utils import (
+    update_entity_state,
+    close_db_connections,
+    STATUS_APPROVED,
+    STATUS_INVALID,
+    STATUS_REQUIRES_REVALIDATION,
+)
+from generation_catalog_utils import close_catalog_connections
+
+
+HASH = "0" * 64
+CHAPTER_02 = ["0201", "0202", "0203", "0204", "0205"]
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+def _register(entity_type, entity_id, parent_id=None, status=STATUS_APPROVED):
+    path = f"acts/act-1/chapters/chapter-02/scenes/{entity_id}-blueprint.md" if entity_type == "scene" \
+        else f"acts/{entity_id}.md"
+    update_entity_state(entity_type, entity_id, status, HASH, path, parent_id=parent_id)
+
+
+@pytest.fixture
+def book(tmp_path, monkeypatch):
+    """Planning state with act-1 / chapter-02 / scenes 0201-0205 (approved), no generations."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(gsm, 'WORKSPACE_PATH', workspace)
+    monkeypatch.setattr(gsm, 'SESSIONS_PATH', workspace / "sessions")
+    monkeypatch.setattr(gsm, 'SESSION_LOCK_FILE', workspace / "session.lock")
+    monkeypatch.setattr(gsm, '_state_cache', StateCache())
+    monkeypatch.setattr(planning_state_utils, "WORKSPACE_PATH", workspace)
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_DB_PATH", workspace / "planning-state.db")
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_JSON_DIR", workspace / "planning-state")
+
+    _register("act", "act-1")
+    _register("chapter", "chapter-02", "act-1")
+    for scene_id in reversed(CHAPTER_02):
+        _register("scene", f"scene-{scene_id}", "chapter-02")
+    yield workspace
+    close_db_connections()
+    close_catalog_connections()
+
+
+async def _schedule(**kwargs):
+    if 'scene_ids' not in kwargs:
+        kwargs['chapter_id'] = 'chapter-02'
+    result = json.loads(await schedule_generation_batch(
+        ScheduleGenerationBatchInput(response_format='json', **kwargs)
+    ))
+    return result['batch_id'], result
+
+
+async def _dispatch(**kwargs):
+    result = json.loads(await dispatch_generation_batch(DispatchGenerationBatchInput(**kwargs)))
+    return [entry['scene_id'] for entry in result['dispatched']], result
+
+
+def _finish(scene_id, status="COMPLETED"):
+    state = _load_state_file(scene_id)
+    state['workflow_status'] = status
+    _save_state_file(scene_id, state, event="generation_completed")
+
+
+async def _progress(batch_id):
+    report = json.loads(await get_batch_progress(GetBatchProgressInput(batch_id=batch_id, response_format='json')))
+    return report['batches'][0]
+
+
+# =============================================================================
+# Tests: Scheduling and Dispatch
+# =============================================================================
+
+async def test_chapter_dispatch_within_budget(book):
+    """Test that a chapter runs at most max_concurrent scenes and refills freed slots."""
+    batch_id, scheduled = await _schedule(max_concurrent=2)
+    assert [item['scene_id'] for item in scheduled['items']] == CHAPTER_02
+    assert scheduled['counts']['queued'] == 5
+
+    started, result = await _dispatch()
+    assert started == ["0201", "0202"]
+    assert result['dispatched'][0]['blueprint_path'].endswith("scene-0201-blueprint.md")
+    state = _load_state_file("0201")
+    assert state['workflow_status'] == "IN_PROGRESS" and state['metadata']['batch_id'] == batch_id
+
+    assert (await _dispatch())[0] == []
+
+    _finish("0201")
+    _finish("0202", "FAILED")
+    started, result = await _dispatch()
+    assert started == ["0203", "0204"]
+    assert (result['running'], result['queued']) == (2, 1)
+
+    progress = await _progress(batch_id)
+    assert progress['status'] == "RUNNING"
+    assert progress['counts']['completed'] == 1 and progress['counts']['failed'] == 1
+    assert progress['percent'] == 40.0
+
+
+async def test_planning_blockers_and_plan_order(book):
+    """Test that invalid planning entities block scenes and follow_plan_order serializes them."""
+    _register("scene", "scene-0203", "chapter-02", status=STATUS_REQUIRES_REVALIDATION)
+    batch_id, scheduled = await _schedule(follow_plan_order=True, max_concurrent=5)
+    blocked = {item['scene_id']: item['reason'] for item in scheduled['items'] if item['status'] == 'blocked'}
+    assert blocked == {
+        "0203": "scene-0203 is requires-revalidation",
+        "0204": "previous scene 0203 is blocked",
+        "0205": "previous scene 0204 is blocked",
+    }
+
+    assert (await _dispatch())[0] == ["0201"]
+    _finish("0201")
+    assert (await _dispatch())[0] == ["0202"]
+
+    _register("scene", "scene-0203", "chapter-02")
+    _register("chapter", "chapter-02", "act-1", status=STATUS_INVALID)
+    progress = await _progress(batch_id)
+    assert {item['reason'] for item in progress['items'] if item['status'] == 'blocked'} == \
+        {"chapter-02 is invalid"}
+
+
+async def test_priority_and_completed_scenes(book):
+    """Test that higher priority batches dispatch first and generated scenes are skipped."""
+    low_id, _ = await _schedule(scene_ids=["0205", "0204"], priority=10, max_concurrent=2)
+    await _dispatch(batch_id=low_id, limit=1)
+    _finish("0204")
+
+    high_id, scheduled = await _schedule(scene_ids=["0204", "0201"], priority=90)
+    assert {item['scene_id']: item['status'] for item in scheduled['items']} == \
+        {"0201": "queued", "0204": "completed"}
+
+    started, result = await _dispatch()
+    assert started == ["0201", "0205"]
+    assert [entry['batch_id'] for entry in result['dispatched']] == [high_id, low_id]
+
+
+async def test_regenerate_replaces_terminal_state(book):
+    """Test that regenerate=True starts a new run over a COMPLETED state."""
+    await _schedule(scene_ids=["0201"])
+    await _dispatch()
+    _finish("0201")
+
+    batch_id, scheduled = await _schedule(scene_ids=["0201"], regenerate=True)
+    assert scheduled['items'][0]['status'] == "queued"
+    await _dispatch(batch_id=batch_id)
+    state = _load_state_file("0201")
+    assert state['workflow_status'] == "IN_PROGRESS" and state['revision'] == 3
+    assert state['metadata']['batch_id'] == batch_id
+
+
+async def test_cancel_and_text_output(book):
+    """Test cancellation of queued scenes and the markdown reports."""
+    batch_id, _ = await _schedule(max_concurrent=1)
+    await _dispatch()
+
+    text = await cancel_generation_batch(CancelGenerationBatchInput(batch_id=batch_id))
+    assert "**Cancelled scenes**: 4" in text and "**Still running**: 0201" in text
+
+    report = await get_batch_progress(GetBatchProgressInput())
+    assert f"**{batch_id}** (chapter-02) - RUNNING" in report
+    assert "0202: cancelled - batch cancelled" in report
+
+    _finish("0201")
+    assert "No generation batches in progress" in await get_batch_progress(GetBatchProgressInput())
+    assert "not found" in await dispatch_generation_batch(DispatchGenerationBatchInput(batch_id="batch-x"))
+
+
+def test_input_validation():
+    """Test that exactly one of chapter_id and scene_ids is accepted."""
+    with pytest.raises(ValidationError, match="either chapter_id or scene_ids"):
+        ScheduleGenerationBatchInput()
+    with pytest.raises(ValidationError, match="either chapter_id or scene_ids"):
+        ScheduleGenerationBatchInput(chapter_id="chapter-02", scene_ids=["0201"])
+    with pytest.raises(ValidationError, match="4 digits"):
+        ScheduleGenerationBatchInput(scene_ids=["201"])
+    assert ScheduleGenerationBatchInput(scene_ids=["0201", "0201"]).scene_ids == ["0201"]
+
+
+async def test_unknown_scenes_are_rejected(book):
+    """Test that scenes missing from planning state are reported."""
+    output = await schedule_generation_batch(ScheduleGenerationBatchInput(scene_ids=["0201", "0999"]))
+    assert "Scenes not found in planning state: 0999" in output
+    assert "not found" in await schedule_generation_batch(ScheduleGenerationBatchInput(chapter_id="chapter-09"))
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Generation State MCP server helpers (FEAT-0002)
+
+Tests cover:
+- State file cache (mtime/size validation, write-through, LRU eviction)
+- Event journal (append-only transitions, replay, snapshot compaction)
+- Generation catalog (list_generations index, session shadowing, reconcile)
+
+Run with: pytest test_generation_state.py -v
+"""
+
+import pytest
+import sys
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import generation_state_mcp as gsm
+from generation_state_mcp import (
+    StateCache,
+    GetStateCacheStatsInput,
+    StartGenerationInput,
+    StartStepInput,
+    CompleteStepInput,
+    FailStepInput,
+    LogQuestionAnswerInput,
+    ListGenerationsInput,
+    FilterType,
+    VALID_STEP_NAMES,
+    get_state_cache_stats,
+    start_generation,
+    start_step,
+    complete_step,
+    fail_step,
+    log_question_answer,
+    list_generations,
+    _query_generations,
+    _load_state_file,
+    _save_state_file,
+    _initialize_state_structure,
+)
+from generation_catalog_utils import close_catalog_connections
+from state_journal_utils import (
+    diff_state,
+    apply_ops,
+    read_events,
+    JOURNAL_META_KEY,
+)
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def temp_workspace(monkeypatch):
+    """Create temporary workspace and an empty state cache."""
+    temp_dir = tempfile.mkdtemp()
+    workspace = Path(temp_dir) / "workspace"
+    workspace.mkdir(parents=True, exist_ok=True)
+
+    monkeypatch.setattr(gsm, 'WORKSPACE_PATH', workspace)
+    monkeypatch.setattr(gsm, 'SESSIONS_PATH', workspace / "sessions")
+    monkeypatch.setattr(gsm, 'SESSION_LOCK_FILE', workspace / "session.lock")
+    monkeypatch.setattr(gsm, '_state_cache', StateCache())
+
+    yield workspace
+
+    close_catalog_connections()
+    shutil.rmtree(temp_dir)
+
+
+def _new_state(scene_id: str) -> dict:
+    return _initialize_state_structure(
+        scene_id, f"acts/act-1/scenes/scene-{scene_id}-blueprint.md", "test"
+    )
+
+
+# =============================================================================
+# Tests: State Cache
+# =============================================================================
+
+def test_save_then_load_hits_cache(temp_workspace):
+    """Test write-through: a load right after save is served from cache."""
+    _save_state_file("0101", _new_state("0101"))
+
+    state = _load_state_file("0101")
+
+    assert state['scene_id'] == "0101"
+    assert gsm._state_cache.stats()['hits'] == 1
+    assert gsm._state_cache.stats()['misses'] == 0
+
+
+def test_cached_state_is_private_copy(temp_workspace):
+    """Test that mutating a loaded state does not leak into the cache."""
+    _save_state_file("0101", _new_state("0101"))
+
+    state = _load_state_file("0101")
+    state['workflow_status'] = "MUTATED"
+
+    assert _load_state_file("0101")['workflow_status'] != "MUTATED"
+
+
+def test_external_modification_invalidates_entry(temp_workspace):
+    """Test that a file rewritten outside the server is re-read."""
+    _save_state_file("0101", _new_state("0101"))
+    state_path = temp_workspace / "generation-state-0101.json"
+
+    external = json.loads(state_path.read_text(encoding='utf-8'))
+    external['workflow_status'] = "CANCELLED"
+    state_path.write_text(json.dumps(external), encoding='utf-8')
+
+    assert _load_state_file("0101")['workflow_status'] == "CANCELLED"
+    assert gsm._state_cache.stats()['misses'] == 1
+
+
+def test_deleted_file_returns_none(temp_workspace):
+    """Test that a cached entry is dropped once its file disappears."""
+    _save_state_file("0101", _new_state("0101"))
+    (temp_workspace / "generation-state-0101.json").unlink()
+
+    assert _load_state_file("0101") is None
+    assert gsm._state_cache.stats()['entries'] == 0
+
+
+def test_session_and_global_paths_are_separate_entries(temp_workspace):
+    """Test that entries are keyed by resolved path, not only scene ID."""
+    _save_state_file("0101", _new_state("0101"))
+
+    (temp_workspace / "session.lock").write_text(json.dumps({"active": "draft"}), encoding='utf-8')
+    session_state = _new_state("0102")
+    _save_state_file("0102", session_state)
+
+    assert (temp_workspace / "sessions" / "draft" / "generation-state-0102.json").exists()
+    assert _load_state_file("0101") is not None  # global file still visible
+    assert gsm._state_cache.stats()['entries'] == 2
+
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted first."""
+    cache = StateCache(max_entries=2)
+    stat = (1, 1, None)
+
+    cache.put("0001", Path("a"), stat, {"n": 1})
+    cache.put("0002", Path("b"), stat, {"n": 2})
+    cache.get("0001", Path("a"), stat)
+    cache.put("0003", Path("c"), stat, {"n": 3})
+
+    assert cache.get("0002", Path("b"), stat) is None
+    assert cache.get("0001", Path("a"), stat)[0] == {"n": 1}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_get_returns_state_and_journal():
+    """Test that a hit returns a private state copy together with its journal info."""
+    cache = StateCache()
+    stat = (1, 1, None)
+    cache.put("0001", Path("a"), stat, {"steps": {"n": 1}}, {"seq": 4, "pending": 2})
+
+    state, journal = cache.get("0001", Path("a"), stat)
+    state['steps']['n'] = 99
+    journal['seq'] = 0
+
+    assert cache.get("0001", Path("a"), stat) == ({"steps": {"n": 1}}, {"seq": 4, "pending": 2})
+    assert cache.get("0001", Path("a"), (2, 1, None)) is None
+
+
+async def test_state_cache_stats_tool(temp_workspace):
+    """Test diagnostics tool output and reset."""
+    _save_state_file("0101", _new_state("0101"))
+    _load_state_file("0101")
+    _load_state_file("0404")
+
+    stats = json.loads(await get_state_cache_stats(GetStateCacheStatsInput(response_format='json', reset=True)))
+
+    assert stats['hits'] == 1
+    assert stats['entries'] == 1
+    assert gsm._state_cache.stats()['hits'] == 0
+    assert "**Hits**: 0" in await get_state_cache_stats(GetStateCacheStatsInput())
+
+
+# =============================================================================
+# Tests: Event Journal
+# =============================================================================
+
+async def _run_steps(scene_id: str, steps) -> None:
+    await start_generation(StartGenerationInput(
+        scene_id=scene_id,
+        blueprint_path=f"acts/act-1/scenes/scene-{scene_id}-blueprint.md",
+        initiated_by="test"
+    ))
+    for step_name in steps:
+        await start_step(StartStepInput(scene_id=scene_id, step_name=step_name))
+        await complete_step(CompleteStepInput(scene_id=scene_id, step_name=step_name, duration_seconds=1.0))
+
+
+async def test_transitions_are_journaled_and_replayed(temp_workspace):
+    """Test that transitions append events and replay rebuilds the same state."""
+    await _run_steps("0101", VALID_STEP_NAMES[:3])
+    expected = _load_state_file("0101")
+
+    events = read_events(temp_workspace / "generation-state-0101.events.jsonl")
+    assert [e['type'] for e in events] == ["generation_started"] + ["step_started", "step_completed"] * 3
+    assert [e['seq'] for e in events] == list(range(1, 8))
+
+    # Snapshot still holds the initial state; replay from a cold cache
+    snapshot = json.loads((temp_workspace / "generation-state-0101.json").read_text(encoding='utf-8'))
+    assert snapshot[JOURNAL_META_KEY]['seq'] == 1
+    assert snapshot['steps'] == {}
+
+    gsm._state_cache.clear()
+    assert _load_state_file("0101") == expected
+    assert JOURNAL_META_KEY not in expected
+
+
+async def test_snapshot_compaction(temp_workspace, monkeypatch):
+    """Test that a snapshot is written every SNAPSHOT_INTERVAL events."""
+    monkeypatch.setattr(gsm, 'SNAPSHOT_INTERVAL', 4)
+    await _run_steps("0101", VALID_STEP_NAMES[:3])
+
+    snapshot = json.loads((temp_workspace / "generation-state-0101.json").read_text(encoding='utf-8'))
+    assert snapshot[JOURNAL_META_KEY]['seq'] == 5
+    assert len(snapshot['steps']) == 2
+
+    gsm._state_cache.clear()
+    assert len(_load_state_file("0101")['steps']) == 3
+
+
+async def test_question_log_appends_only_new_entry(temp_workspace):
+    """Test that growing arrays are journaled as appends, not rewrites."""
+    await _run_steps("0101", VALID_STEP_NAMES[:1])
+    for n in range(3):
+        await log_question_answer(LogQuestionAnswerInput(
+            scene_id="0101", question=f"Question {n}?", answer="Yes"
+        ))
+
+    last = read_events(temp_workspace / "generation-state-0101.events.jsonl")[-1]
+    appends = [op for op in last['ops'] if op['op'] == 'append']
+    assert last['type'] == "question_logged"
+    assert appends[0]['path'] == ['user_questions']
+    assert len(appends[0]['values']) == 1
+
+    gsm._state_cache.clear()
+    assert len(_load_state_file("0101")['user_questions']) == 3
+
+
+async def test_torn_journal_line_is_ignored(temp_workspace):
+    """Test that an interrupted append does not break loading or later appends."""
+    await _run_steps("0101", VALID_STEP_NAMES[:1])
+    journal = temp_workspace / "generation-state-0101.events.jsonl"
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('{"seq": 99, "ops": [')
+
+    gsm._state_cache.clear()
+    assert _load_state_file("0101")['steps'][VALID_STEP_NAMES[0]]['status'] == "COMPLETED"
+
+    await fail_step(FailStepInput(scene_id="0101", step_name=VALID_STEP_NAMES[1], failure_reason="boom"))
+    gsm._state_cache.clear()
+    assert _load_state_file("0101")['steps'][VALID_STEP_NAMES[1]]['status'] == "FAILED"
+
+
+def test_diff_and_apply_roundtrip():
+    """Test that diff ops turn old into new."""
+    old = {"a": 1, "steps": {"x": {"status": "PENDING"}}, "errors": [1], "gone": True}
+    new = {"a": 2, "steps": {"x": {"status": "DONE"}, "y": {}}, "errors": [1, 2], "added": [3]}
+
+    ops = diff_state(old, new)
+    apply_ops(old, ops)
+
+    assert old == new
+    assert {"op": "append", "path": ["errors"], "values": [2]} in ops
+
+
+# =============================================================================
+# Tests: Generation Catalog
+# =============================================================================
+
+def _activate_session(workspace: Path, name: str) -> None:
+    (workspace / "session.lock").write_text(json.dumps({"active": name}), encoding='utf-8')
+
+
+async def test_catalog_lists_each_scene_once_with_session_shadowing(temp_workspace):
+    """Test that a session copy of a scene shadows the global one."""
+    await _run_steps("0101", [])
+    await _run_steps("0102", [])
+
+    _activate_session(temp_workspace, "draft")
+    await _run_steps("0103", [])
+    session_copy = _load_state_file("0101")
+    session_copy['workflow_status'] = "CANCELLED"
+    session_dir = temp_workspace / "sessions" / "draft"
+    (session_dir / "generation-state-0101.json").write_text(json.dumps(session_copy), encoding='utf-8')
+
+    rows, corrupted = _query_generations(FilterType.ALL, 'scene_id')
+
+    assert corrupted == []
+    assert [(r['scene_id'], r['location'], r['workflow_status']) for r in rows] == [
+        ("0101", "draft", "CANCELLED"),
+        ("0102", "", "IN_PROGRESS"),
+        ("0103", "draft", "IN_PROGRESS"),
+    ]
+
+    # Without the session only global scenes are visible
+    (temp_workspace / "session.lock").unlink()
+    rows, _ = _query_generations(FilterType.ALL, 'scene_id')
+    assert [(r['scene_id'], r['workflow_status']) for r in rows] == [("0101", "IN_PROGRESS"), ("0102", "IN_PROGRESS")]
+
+
+async def test_catalog_does_not_reparse_unchanged_files(temp_workspace, monkeypatch):
+    """Test that listing reads only new or changed state files."""
+    for scene_id in ("0101", "0102", "0103"):
+        await _run_steps(scene_id, VALID_STEP_NAMES[:1])
+    _query_generations(FilterType.ALL, 'scene_id')
+
+    reads = []
+    original = gsm._read_state_path
+    monkeypatch.setattr(gsm, '_read_state_path', lambda *a, **kw: reads.append(a[0].name) or original(*a, **kw))
+
+    await start_step(StartStepInput(scene_id="0102", step_name=VALID_STEP_NAMES[1]))
+    rows, _ = _query_generations(FilterType.ALL, 'scene_id')
+
+    assert reads == ["generation-state-0102.json"]  # load inside start_step only
+    assert rows[1]['current_step'] == VALID_STEP_NAMES[1]
+
+
+async def test_catalog_reconciles_external_changes(temp_workspace):
+    """Test that edited, new and deleted state files are picked up lazily."""
+    await _run_steps("0101", [])
+    await _run_steps("0102", [])
+    _query_generations(FilterType.ALL, 'scene_id')
+
+    # Edit outside the server, add a pre-existing file, delete another
+    path = temp_workspace / "generation-state-0101.json"
+    edited = json.loads(path.read_text(encoding='utf-8'))
+    edited['workflow_status'] = "COMPLETED"
+    path.write_text(json.dumps(edited), encoding='utf-8')
+    (temp_workspace / "generation-state-0102.json").unlink()
+    (temp_workspace / "generation-state-0103.json").write_text(
+        json.dumps(_new_state("0103")), encoding='utf-8'
+    )
+    (temp_workspace / "generation-state-0104.json").write_text("{not json", encoding='utf-8')
+
+    rows, corrupted = _query_generations(FilterType.ALL, 'scene_id')
+
+    assert [(r['scene_id'], r['workflow_status']) for r in rows] == [
+        ("0101", "COMPLETED"), ("0103", "IN_PROGRESS")
+    ]
+    assert corrupted == ["generation-state-0104.json"]
+
+
+async def test_list_generations_filter(temp_workspace):
+    """Test list_generations tool output uses catalog filtering."""
+    await _run_steps("0101", [])
+    await _run_steps("0102", [])
+    await fail_step(FailStepInput(
+        scene_id="0102", step_name=VALID_STEP_NAMES[0], failure_reason="boom", metadata={"terminal": True}
+    ))
+    rows, _ = _query_generations(FilterType.FAILED, 'scene_id')
+    assert [r['scene_id'] for r in rows] == ["0102"]
+
+    output = await list_generations(ListGenerationsInput(filter=FilterType.COMPLETED))
+    assert "No generations matching filter" in output
+
+    output = await list_generations(ListGenerationsInput())
+    assert "(2 total)" in output
+
+
+async def test_list_generations_pages_with_cursor(temp_workspace):
+    """Test that list_generations pages through all scenes without gaps."""
+    for n in range(1, 6):
+        await _run_steps(f"010{n}", [])
+
+    seen = []
+    cursor = None
+    while True:
+        output = await list_generations(ListGenerationsInput(
+            sort_by='scene_id', limit=2, cursor=cursor, response_format='json', fields=['scene_id']
+        ))
+        page = json.loads(output)
+        assert page['total'] == 5
+        seen.extend(row['scene_id'] for row in page['generations'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == ["0101", "0102", "0103", "0104", "0105"]
+
+    text = await list_generations(ListGenerationsInput(sort_by='scene_id', limit=2))
+    assert "(5 total)" in text and "Showing 1–2 of 5" in text and "cursor='" in text
+
+    # Cursor from one sort order is rejected for another
+    first = json.loads(await list_generations(ListGenerationsInput(sort_by='scene_id', limit=2, response_format='json')))
+    output = await list_generations(ListGenerationsInput(sort_by='status', cursor=first['next_cursor']))
+    assert output.startswith("Error:") and "different filters" in output
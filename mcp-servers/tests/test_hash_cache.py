@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the persistent file hash cache
+
+Tests cover:
+- Chunked hashing versus hashlib
+- Cache hits for unchanged files, misses after changes, racily clean files
+- hash_tree over a directory (thread pool, removed files)
+- calculate_version_hash and find_stale_entities through the cache
+
+Run with: pytest test_hash_cache.py -v
+"""
+
+import pytest
+import sys
+import os
+import hashlib
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import hash_cache_utils
+import planning_state_utils
+from hash_cache_utils import HashCache, hash_file
+from planning_state_utils import (
+    calculate_version_hash,
+    find_stale_entities,
+    update_entity_state,
+    close_db_connections,
+)
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def cache(tmp_path):
+    return HashCache(tmp_path / "hash-cache.db", workers=4)
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Planning state in a temporary workspace."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(planning_state_utils, "WORKSPACE_PATH", workspace)
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_DB_PATH", workspace / "planning-state.db")
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_JSON_DIR", workspace / "planning-state")
+    yield workspace
+    close_db_connections()
+
+
+def _write(path: Path, text: str, age: float = 60) -> Path:
+    """Write a file with an mtime outside the racy window."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    past = path.stat().st_mtime - age
+    os.utime(path, (past, past))
+    return path
+
+
+def _act(root: Path, scenes: int = 20) -> Path:
+    act = root / "acts" / "act-1"
+    for n in range(scenes):
+        _write(act / "chapters" / f"chapter-{n // 5:02d}" / "scenes" / f"scene-{n:04d}-blueprint.md",
+               f"# Scene {n}\n\nАлекса {n}\n")
+    return act
+
+
+# =============================================================================
+# Tests: Hash Cache
+# =============================================================================
+
+def test_hash_file_matches_hashlib(tmp_path):
+    """Test chunked hashing of a file larger than one chunk."""
+    data = os.urandom(300_000)
+    path = tmp_path / "large.bin"
+    path.write_bytes(data)
+
+    assert hash_file(path, chunk_size=65536) == hashlib.sha256(data).hexdigest()
+
+
+def test_unchanged_file_is_not_reread(cache, tmp_path, monkeypatch):
+    """Test that a cached file with the same signature is not hashed again."""
+    path = _write(tmp_path / "plan.md", "version 1\n")
+    first = cache.hash(path)
+
+    monkeypatch.setattr(hash_cache_utils, "hash_file", lambda *args: pytest.fail("file re-read"))
+    assert cache.hash(path) == first
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_changed_file_is_rehashed(cache, tmp_path):
+    """Test that a new size or mtime invalidates the cached hash."""
+    path = _write(tmp_path / "plan.md", "version 1\n")
+    cache.hash(path)
+
+    _write(path, "version 2\n", age=30)
+
+    assert cache.hash(path) == hashlib.sha256(b"version 2\n").hexdigest()
+    assert cache.stats()["misses"] == 2
+
+
+def test_racily_clean_file_not_cached(cache, tmp_path):
+    """Test that a file modified just now is hashed but not cached."""
+    path = tmp_path / "plan.md"
+    path.write_text("fresh\n", encoding='utf-8')
+
+    assert cache.hash(path) == hashlib.sha256(b"fresh\n").hexdigest()
+    assert cache.stats()["entries"] == 0
+
+
+def test_missing_file_raises(cache, tmp_path):
+    """Test that hashing a missing file fails."""
+    with pytest.raises(FileNotFoundError):
+        cache.hash(tmp_path / "missing.md")
+
+
+def test_hash_tree_hashes_only_changed_files(cache, tmp_path):
+    """Test bulk hashing of an act directory and removal of deleted files."""
+    act = _act(tmp_path)
+    first = cache.hash_tree(act, "*.md")
+    assert len(first) == 20 and cache.stats()["misses"] == 20
+
+    changed = act / "chapters" / "chapter-01" / "scenes" / "scene-0007-blueprint.md"
+    _write(changed, "rewritten\n", age=30)
+    removed = act / "chapters" / "chapter-03" / "scenes" / "scene-0015-blueprint.md"
+    removed.unlink()
+
+    second = cache.hash_tree(act, "*.md")
+
+    assert cache.stats() == {"hits": 18, "misses": 21, "entries": 19}
+    assert second[str(changed)] == hashlib.sha256(b"rewritten\n").hexdigest()
+    assert str(removed) not in second
+    assert {k: v for k, v in first.items() if k not in (str(changed), str(removed))} == \
+        {k: v for k, v in second.items() if k != str(changed)}
+
+
+# =============================================================================
+# Tests: Planning State
+# =============================================================================
+
+def test_calculate_version_hash_uses_cache(workspace, tmp_path):
+    """Test calculate_version_hash reads through the workspace cache."""
+    path = _write(tmp_path / "plan.md", "# Plan\n")
+
+    assert calculate_version_hash(path) == calculate_version_hash(path) == hashlib.sha256(b"# Plan\n").hexdigest()
+    assert planning_state_utils._hash_cache().stats()["hits"] >= 1
+
+
+def test_find_stale_entities(workspace, tmp_path):
+    """Test detection of changed and missing entity files."""
+    act = _act(tmp_path, scenes=3)
+    scenes = sorted(act.rglob("*.md"))
+    for n, path in enumerate(scenes):
+        update_entity_state('scene', f"scene-{n:04d}", 'draft', calculate_version_hash(path), str(path))
+    _write(scenes[1], "edited\n", age=30)
+    scenes[2].unlink()
+
+    result = find_stale_entities()
+
+    assert result['success'] is True and result['checked'] == 2
+    assert [e['entity_id'] for e in result['stale']] == ["scene-0001"]
+    assert [e['entity_id'] for e in result['missing']] == ["scene-0002"]
+    assert find_stale_entities('paragraph')['success'] is False
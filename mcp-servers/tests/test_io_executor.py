@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the I/O executor layer
+
+Tests cover:
+- run_io / @offloaded (worker threads, preserved tool signature)
+- KeyedLocks (same key serialized, other keys concurrent, cleanup)
+- Concurrent mutations of one scene through the generation tools
+- Event loop staying responsive while commit_session runs
+
+Run with: pytest test_io_executor.py -v
+"""
+
+import pytest
+import sys
+import asyncio
+import inspect
+import threading
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import generation_state_mcp as gsm
+from io_executor_utils import KeyedLocks, offloaded, run_io
+from generation_state_mcp import (
+    StateCache,
+    StartGenerationInput,
+    LogQuestionAnswerInput,
+    GetGenerationStatusInput,
+    start_generation,
+    log_question_answer,
+    get_generation_status,
+    _load_state_file,
+)
+from generation_catalog_utils import close_catalog_connections
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def temp_workspace(tmp_path, monkeypatch):
+    """Generation state in a temporary workspace."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(gsm, 'WORKSPACE_PATH', workspace)
+    monkeypatch.setattr(gsm, 'SESSIONS_PATH', workspace / "sessions")
+    monkeypatch.setattr(gsm, 'SESSION_LOCK_FILE', workspace / "session.lock")
+    monkeypatch.setattr(gsm, '_state_cache', StateCache())
+    yield workspace
+    close_catalog_connections()
+
+
+async def _start(scene_id: str) -> None:
+    await start_generation(StartGenerationInput(
+        scene_id=scene_id,
+        blueprint_path=f"acts/act-1/scenes/scene-{scene_id}-blueprint.md",
+        initiated_by="test"
+    ))
+
+
+# =============================================================================
+# Tests: Executor and Locks
+# =============================================================================
+
+async def test_offloaded_runs_on_worker_thread():
+    """Test that a decorated body runs off the loop thread and keeps its signature."""
+    @offloaded()
+    def tool(params: int) -> str:
+        """Doc."""
+        return threading.current_thread().name
+
+    assert inspect.iscoroutinefunction(tool)
+    assert tool.__name__ == "tool" and tool.__doc__ == "Doc."
+    assert list(inspect.signature(tool).parameters) == ["params"]
+    assert (await tool(1)).startswith("mcp-io")
+    assert await run_io(sum, [1, 2, 3]) == 6
+
+
+async def test_keyed_locks_serialize_same_key_only():
+    """Test that holders of one key never overlap while other keys run."""
+    locks = KeyedLocks()
+    active = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    async def worker(key):
+        async with locks.hold(key):
+            active[key] += 1
+            peak[key] = max(peak[key], active[key])
+            await asyncio.sleep(0.001)
+            assert locks.locked(key)
+            active[key] -= 1
+
+    await asyncio.gather(*(worker(key) for key in "ab" * 10))
+
+    assert peak == {"a": 1, "b": 1}
+    assert len(locks) == 0
+
+
+async def test_offloaded_lock_key_serializes_threads():
+    """Test that blocking bodies with the same key do not run concurrently."""
+    locks = KeyedLocks()
+    running = []
+    overlaps = []
+
+    @offloaded(locks, key=lambda scene_id: scene_id)
+    def mutate(scene_id: str) -> None:
+        if scene_id in running:
+            overlaps.append(scene_id)
+        running.append(scene_id)
+        threading.Event().wait(0.002)
+        running.remove(scene_id)
+
+    await asyncio.gather(*(mutate(scene) for scene in ["0101", "0102"] * 8))
+
+    assert overlaps == []
+
+
+# =============================================================================
+# Tests: Tools
+# =============================================================================
+
+async def test_concurrent_scene_mutations_are_not_lost(temp_workspace):
+    """Test that concurrent load-modify-save calls on one scene all persist."""
+    await _start("0101")
+
+    await asyncio.gather(*(
+        log_question_answer(LogQuestionAnswerInput(scene_id="0101", question=f"Question {n}?", answer="Yes"))
+        for n in range(20)
+    ))
+
+    gsm._state_cache.clear()
+    assert len(_load_state_file("0101")['user_questions']) == 20
+    assert len(gsm._tool_locks) == 0
+
+
+async def test_status_served_while_commit_runs(temp_workspace, monkeypatch):
+    """Test that get_generation_status answers while commit_session is still copying."""
+    import session_management_mcp as sm
+
+    await _start("0101")
+    session_data = {
+        "name": "draft",
+        "cow_files": [{"path": "acts/act-1/plan.md", "type": "modified"}],
+        "changes": {"modified": ["acts/act-1/plan.md"], "created": [], "deleted": []},
+        "human_retries": [],
+    }
+    monkeypatch.setattr(sm, "WORKSPACE_PATH", temp_workspace)
+    monkeypatch.setattr(sm, "SESSION_LOCK_FILE", temp_workspace / "session.lock")
+    monkeypatch.setattr(sm, "_load_session_data", lambda name: session_data)
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_commit(*args, **kwargs):
+        started.set()
+        release.wait(10)
+        raise RuntimeError("stopped by test")
+
+    monkeypatch.setattr(sm, "run_commit", slow_commit)
+
+    commit = asyncio.create_task(sm.commit_session(sm.CommitSessionInput(name="draft", force=True)))
+    await run_io(started.wait, 10)
+
+    status = await asyncio.wait_for(get_generation_status(GetGenerationStatusInput(scene_id="0101")), 5)
+
+    assert "0101" in status and not commit.done()
+    release.set()
+    assert "stopped by test" in await commit
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the optional Prometheus metrics
+
+Tests cover:
+- Text exposition format (cumulative histogram buckets, label escaping)
+- Instrumented tools: calls, errors and latency per tool, unchanged
+  signatures and input schemas, nothing recorded while metrics are off
+- State bytes, SQLite statements and cache hit ratio
+- HTTP /metrics endpoint and textfile exporter
+
+Run with: pytest test_metrics.py -v
+"""
+
+import pytest
+import sys
+import inspect
+import urllib.request
+import urllib.error
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import metrics_utils
+import generation_state_mcp as gsm
+from metrics_utils import MetricsRegistry, start_http_exporter, write_textfile
+from generation_state_mcp import (
+    StateCache,
+    StartGenerationInput,
+    StartStepInput,
+    ListGenerationsInput,
+    VALID_STEP_NAMES,
+    start_generation,
+    start_step,
+    list_generations,
+)
+from generation_catalog_utils import close_catalog_connections
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Metrics enabled with a fresh registry (collectors of the real one kept)."""
+    fresh = MetricsRegistry()
+    for collector in metrics_utils.REGISTRY._collectors:
+        fresh.register_collector(collector)
+    monkeypatch.setattr(metrics_utils, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(metrics_utils, 'REGISTRY', fresh)
+    return fresh
+
+
+@pytest.fixture
+def temp_workspace(tmp_path, monkeypatch):
+    """Empty workspace for generation states."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(gsm, 'WORKSPACE_PATH', workspace)
+    monkeypatch.setattr(gsm, 'SESSIONS_PATH', workspace / "sessions")
+    monkeypatch.setattr(gsm, 'SESSION_LOCK_FILE', workspace / "session.lock")
+    monkeypatch.setattr(gsm, '_state_cache', StateCache())
+    yield workspace
+    close_catalog_connections()
+
+
+def _tool_labels(tool):
+    return {"server": "generation_state", "tool": tool}
+
+
+# =============================================================================
+# Tests: Exposition
+# =============================================================================
+
+def test_render_format():
+    """Test HELP/TYPE lines, cumulative buckets and escaped label values."""
+    registry = MetricsRegistry()
+    registry.inc("mcp_tool_calls_total", {"server": "s", "tool": 'a"b\\c'}, 2)
+    registry.observe("mcp_tool_duration_seconds", {"server": "s", "tool": "t"}, 0.003)
+    registry.observe("mcp_tool_duration_seconds", {"server": "s", "tool": "t"}, 100)
+    registry.register_collector(lambda: [("mcp_cache_hit_ratio", {"cache": "c"}, 0.75)])
+
+    text = registry.render()
+    assert "# TYPE mcp_tool_calls_total counter" in text
+    assert 'mcp_tool_calls_total{server="s",tool="a\\"b\\\\c"} 2' in text
+    assert 'mcp_tool_duration_seconds_bucket{le="0.001",server="s",tool="t"} 0' in text
+    assert 'mcp_tool_duration_seconds_bucket{le="0.005",server="s",tool="t"} 1' in text
+    assert 'mcp_tool_duration_seconds_bucket{le="60",server="s",tool="t"} 1' in text
+    assert 'mcp_tool_duration_seconds_bucket{le="+Inf",server="s",tool="t"} 2' in text
+    assert 'mcp_tool_duration_seconds_count{server="s",tool="t"} 2' in text
+    assert 'mcp_cache_hit_ratio{cache="c"} 0.75' in text
+    assert "mcp_sqlite_queries_total" not in text
+    assert text.endswith("\n")
+
+
+# =============================================================================
+# Tests: Instrumentation
+# =============================================================================
+
+async def test_tool_calls_and_errors(registry, temp_workspace):
+    """Test per-tool call, error and latency metrics of instrumented tools."""
+    await start_generation(StartGenerationInput(
+        scene_id="0101", blueprint_path="acts/act-1/scenes/scene-0101-blueprint.md"
+    ))
+    output = await start_step(StartStepInput(scene_id="0101", step_name=VALID_STEP_NAMES[2]))
+    assert output.startswith("❌ ERROR")
+
+    assert registry.value("mcp_tool_calls_total", **_tool_labels("start_generation")) == 1
+    assert registry.value("mcp_tool_errors_total", **_tool_labels("start_generation")) == 0
+    assert registry.value("mcp_tool_calls_total", **_tool_labels("start_step")) == 1
+    assert registry.value("mcp_tool_errors_total", **_tool_labels("start_step")) == 1
+    assert 'mcp_tool_duration_seconds_count{server="generation_state",tool="start_step"} 1' in registry.render()
+
+
+async def test_state_bytes_sqlite_and_cache(registry, temp_workspace):
+    """Test state bytes read/written, catalog statements and state cache ratio."""
+    await start_generation(StartGenerationInput(
+        scene_id="0101", blueprint_path="acts/act-1/scenes/scene-0101-blueprint.md"
+    ))
+    assert registry.value("mcp_state_bytes_total", direction="write") > 0
+
+    gsm._state_cache.clear()
+    assert gsm._load_state_file("0101")['scene_id'] == "0101"
+    assert registry.value("mcp_state_bytes_total", direction="read") > 0
+
+    await list_generations(ListGenerationsInput())
+    assert registry.value("mcp_sqlite_queries_total", db="catalog") > 0
+
+    text = registry.render()
+    assert 'mcp_cache_misses_total{cache="generation_state"}' in text
+    assert 'mcp_cache_hit_ratio{cache="generation_state"}' in text
+
+
+async def test_disabled_records_nothing(monkeypatch, temp_workspace):
+    """Test that tools run unmetered while metrics are off."""
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics_utils, 'METRICS_ENABLED', False)
+    monkeypatch.setattr(metrics_utils, 'REGISTRY', registry)
+    await start_generation(StartGenerationInput(
+        scene_id="0101", blueprint_path="acts/act-1/scenes/scene-0101-blueprint.md"
+    ))
+    assert registry.render() == "\n"
+
+
+async def test_tool_schema_unchanged():
+    """Test that wrapped tools keep their signature and registered input schema."""
+    assert list(inspect.signature(start_step).parameters) == ["params"]
+    assert start_step.__name__ == "start_step"
+    tools = {tool.name: tool for tool in await gsm.mcp.list_tools()}
+    assert "params" in tools["start_step"].inputSchema["properties"]
+
+
+# =============================================================================
+# Tests: Exporters
+# =============================================================================
+
+def test_http_exporter(registry):
+    """Test that /metrics serves the exposition and other paths 404."""
+    registry.inc("mcp_sqlite_queries_total", {"db": "planning"}, 3)
+    server = start_http_exporter(0, "127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert 'mcp_sqlite_queries_total{db="planning"} 3' in response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_textfile_exporter(registry, tmp_path):
+    """Test the atomic textfile write for the node_exporter collector."""
+    registry.inc("mcp_state_bytes_total", {"direction": "write"}, 42)
+    path = tmp_path / "textfile" / "mcp.prom"
+    write_textfile(path)
+    assert 'mcp_state_bytes_total{direction="write"} 42' in path.read_text(encoding="utf-8")
+    assert [p.name for p in path.parent.iterdir()] == ["mcp.prom"]
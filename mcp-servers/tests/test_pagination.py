@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Unit tests for cursor pagination shared by the listing tools
+
+Tests cover:
+- Cursor encoding/decoding and query fingerprint checks
+- Re-anchoring when the listing changes between pages
+- Fitting rendered output under the character limit
+
+Run with: pytest test_pagination.py -v
+"""
+
+import pytest
+import sys
+import json
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pagination_utils import (
+    CursorError,
+    query_fingerprint,
+    decode_cursor,
+    paginate,
+    render_within_limit,
+    select_fields,
+    fit_json_page,
+)
+
+
+def _ident(item):
+    return item
+
+
+def _walk(items, limit, fingerprint="q"):
+    """Collect all pages of items."""
+    pages, cursor = [], None
+    while True:
+        page = paginate(items, _ident, limit, cursor, fingerprint)
+        pages.append(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_all_items_once():
+    """Test that following next_cursor visits every item exactly once."""
+    items = [f"scene-{n:02d}" for n in range(7)]
+
+    pages = _walk(items, 3)
+
+    assert pages == [items[0:3], items[3:6], items[6:7]]
+
+
+def test_cursor_reanchors_after_listing_changes():
+    """Test that insertions/removals before the cursor do not skip or repeat items."""
+    items = ["a", "b", "c", "d", "e"]
+    first = paginate(items, _ident, 2, None, "q")
+
+    # Two items inserted before the last item seen
+    second = paginate(["x", "y", "a", "b", "c", "d", "e"], _ident, 2, first.next_cursor, "q")
+    # Item before the last item seen removed
+    third = paginate(["b", "c", "d", "e"], _ident, 2, first.next_cursor, "q")
+
+    assert first.items == ["a", "b"]
+    assert second.items == ["c", "d"]
+    assert third.items == ["c", "d"]
+
+
+def test_cursor_rejected_for_other_query():
+    """Test that a cursor from different filters/sort is rejected."""
+    fingerprint = query_fingerprint(filter="all", sort_by="scene_id")
+    page = paginate(["a", "b", "c"], _ident, 1, None, fingerprint)
+
+    with pytest.raises(CursorError):
+        paginate(["a", "b", "c"], _ident, 1, page.next_cursor, query_fingerprint(filter="all", sort_by="status"))
+    with pytest.raises(CursorError):
+        decode_cursor("not-a-cursor", fingerprint)
+
+
+def test_render_within_limit_shrinks_page():
+    """Test that oversized output drops trailing items and cursor continues after them."""
+    items = [f"item-{n:03d}" for n in range(100)]
+    page = paginate(items, _ident, 100, None, "q")
+
+    text, shown = render_within_limit(page, lambda p: "\n".join(p.items * 10), char_limit=2000)
+
+    assert len(text) <= 2000
+    assert 0 < len(shown.items) < 100
+    rest = paginate(items, _ident, 100, shown.next_cursor, "q")
+    assert rest.items[0] == items[len(shown.items)]
+
+
+def test_fit_json_page_selects_fields():
+    """Test compact JSON page envelope with column selection."""
+    rows = [{"id": n, "status": "ok", "blob": "x" * 50} for n in range(20)]
+    page = paginate(rows, lambda r: r["id"], 20, None, "q")
+
+    text, _ = fit_json_page(page, lambda items: select_fields(items, ["id"]), "rows", char_limit=120)
+    data = json.loads(text)
+
+    assert len(text) <= 120
+    assert data["rows"][0] == {"id": 0}
+    assert data["total"] == 20 and data["offset"] == 0
+    assert data["next_cursor"] is not None
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Unit tests for planning drift reconciliation
+
+Tests cover:
+- Planning file layout classification
+- Drifted / missing / orphaned detection against acts/
+- Applying reconciliation (hash update, invalidation, descendant cascade)
+- JSON fallback and the reconcile_planning_state tool
+
+Run with: pytest test_planning_drift.py -v
+"""
+
+import pytest
+import sys
+import os
+import json
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import planning_state_utils
+from planning_drift_utils import classify_planning_file
+from planning_state_utils import (
+    reconcile_planning_state,
+    update_entity_state,
+    get_entity_state,
+    calculate_version_hash,
+    close_db_connections,
+    STATUS_APPROVED,
+    STATUS_INVALID,
+    STATUS_REQUIRES_REVALIDATION,
+    DRIFT_REASON_MODIFIED,
+    DRIFT_REASON_ANCESTOR,
+)
+from generation_state_mcp import ReconcilePlanningStateInput, reconcile_planning_state_tool
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Planning state in a temporary workspace."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(planning_state_utils, "WORKSPACE_PATH", workspace)
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_DB_PATH", workspace / "planning-state.db")
+    monkeypatch.setattr(planning_state_utils, "PLANNING_STATE_JSON_DIR", workspace / "planning-state")
+    yield workspace
+    close_db_connections()
+
+
+@pytest.fixture
+def book(workspace):
+    """acts/ with one act, two chapters and four scenes, all registered and approved."""
+    acts = workspace.parent / "acts"
+    files = {
+        ("act", "act-1", None): acts / "act-1" / "strategic-plan.md",
+    }
+    for c in (1, 2):
+        chapter = f"chapter-0{c}"
+        files[("chapter", chapter, "act-1")] = acts / "act-1" / "chapters" / chapter / "plan.md"
+        for s in (1, 2):
+            scene = f"scene-0{c}0{s}"
+            files[("scene", scene, chapter)] = \
+                acts / "act-1" / "chapters" / chapter / "scenes" / f"{scene}-blueprint.md"
+
+    for (entity_type, entity_id, parent_id), path in files.items():
+        _write(path, f"# {entity_id}\n")
+        update_entity_state(entity_type, entity_id, STATUS_APPROVED, calculate_version_hash(path),
+                            str(path), parent_id=parent_id)
+    return acts
+
+
+def _write(path: Path, text: str) -> None:
+    """Write a file with an mtime outside the hash cache's racy window."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    past = time.time() - 60
+    os.utime(path, (past, past))
+
+
+def _status(entity_type, entity_id):
+    return get_entity_state(entity_type, entity_id)['status']
+
+
+# =============================================================================
+# Tests: Detection
+# =============================================================================
+
+def test_classify_planning_file():
+    """Test mapping of acts/ paths to entities."""
+    assert classify_planning_file("act-1/strategic-plan.md") == \
+        {"entity_type": "act", "entity_id": "act-1", "parent_id": None}
+    assert classify_planning_file("act-1/chapters/chapter-02/plan.md") == \
+        {"entity_type": "chapter", "entity_id": "chapter-02", "parent_id": "act-1"}
+    assert classify_planning_file("act-1/chapters/chapter-02/scenes/scene-0204-blueprint.md") == \
+        {"entity_type": "scene", "entity_id": "scene-0204", "parent_id": "chapter-02"}
+    assert classify_planning_file("act-1/chapters/chapter-02/content/scene-0204.md") is None
+
+
+def test_clean_book_reports_nothing(book):
+    """Test that unchanged files produce an empty report."""
+    result = reconcile_planning_state(book)
+
+    assert result['success'] is True
+    assert result['report'].clean
+    assert result['report'].checked == result['report'].files_scanned == 7
+
+
+def test_detects_drifted_missing_and_orphaned(book):
+    """Test the three kinds of drift."""
+    _write(book / "act-1" / "chapters" / "chapter-01" / "plan.md", "# edited by hand\n")
+    (book / "act-1" / "chapters" / "chapter-02" / "scenes" / "scene-0202-blueprint.md").unlink()
+    _write(book / "act-1" / "chapters" / "chapter-02" / "scenes" / "scene-0203-blueprint.md", "# new\n")
+    _write(book / "act-1" / "chapters" / "chapter-02" / "notes.md", "not a planning file\n")
+
+    report = reconcile_planning_state(book)['report']
+
+    assert [e['entity_id'] for e in report.drifted] == ["chapter-01"]
+    assert [e['entity_id'] for e in report.missing] == ["scene-0202"]
+    assert [(e['entity_type'], e['entity_id'], e['parent_id']) for e in report.orphaned] == \
+        [("scene", "scene-0203", "chapter-02")]
+    assert _status('chapter', 'chapter-01') == STATUS_APPROVED
+
+
+# =============================================================================
+# Tests: Apply
+# =============================================================================
+
+def test_apply_invalidates_drifted_subtree(book):
+    """Test that apply updates the hash and invalidates the drifted entity's descendants."""
+    plan = book / "act-1" / "chapters" / "chapter-01" / "plan.md"
+    _write(plan, "# edited by hand\n")
+    (book / "act-1" / "chapters" / "chapter-02" / "scenes" / "scene-0202-blueprint.md").unlink()
+
+    result = reconcile_planning_state(book, apply=True)
+
+    assert result['applied'] is True
+    changed = {e['entity_id']: e['new_status'] for e in result['invalidated_entities']}
+    assert changed == {
+        "chapter-01": STATUS_REQUIRES_REVALIDATION,
+        "scene-0101": STATUS_REQUIRES_REVALIDATION,
+        "scene-0102": STATUS_REQUIRES_REVALIDATION,
+        "scene-0202": STATUS_INVALID,
+    }
+    chapter = get_entity_state('chapter', 'chapter-01')
+    assert chapter['version_hash'] == calculate_version_hash(plan)
+    assert chapter['invalidation_reason'] == DRIFT_REASON_MODIFIED
+    assert get_entity_state('scene', 'scene-0101')['invalidation_reason'] == DRIFT_REASON_ANCESTOR
+    assert _status('scene', 'scene-0201') == STATUS_APPROVED
+
+    # Drift is resolved; the missing file stays reported
+    again = reconcile_planning_state(book, apply=True)
+    assert again['report'].counts() == {"drifted": 0, "missing": 1, "orphaned": 0}
+    assert again['invalidated_entities'] == []
+
+
+def test_apply_leaves_caller_transaction_open(book):
+    """Test that applying drift inside a caller's transaction neither commits nor rolls it back."""
+    _write(book / "act-1" / "chapters" / "chapter-01" / "plan.md", "# edited by hand\n")
+    report = reconcile_planning_state(book)['report']
+    conn = planning_state_utils._get_db_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("UPDATE planning_entities SET status = ? WHERE entity_id = 'act-1'", (STATUS_INVALID,))
+
+    changes = planning_state_utils._apply_drift(conn, report)
+
+    assert {c['entity_id'] for c in changes} == {"chapter-01", "scene-0101", "scene-0102"}
+    assert conn.in_transaction
+    statuses = dict(conn.execute("SELECT entity_id, status FROM planning_entities"))
+    assert statuses['act-1'] == STATUS_INVALID
+    assert statuses['scene-0102'] == STATUS_REQUIRES_REVALIDATION
+
+    conn.rollback()
+    assert _status('act', 'act-1') == STATUS_APPROVED
+    assert _status('chapter', 'chapter-01') == STATUS_APPROVED
+
+
+def test_apply_with_json_fallback(book, monkeypatch):
+    """Test reconciliation when SQLite is unavailable."""
+    planning_state_utils.sync_from_sqlite_to_json()
+    _write(book / "act-1" / "chapters" / "chapter-02" / "plan.md", "# edited by hand\n")
+    monkeypatch.setattr(planning_state_utils, "_get_db_connection", lambda: None)
+
+    result = reconcile_planning_state(book, apply=True)
+
+    assert [e['entity_id'] for e in result['report'].drifted] == ["chapter-02"]
+    assert {e['entity_id'] for e in result['invalidated_entities']} == {"chapter-02", "scene-0201", "scene-0202"}
+    json_file = planning_state_utils.PLANNING_STATE_JSON_DIR / "scenes" / "scene-0201.json"
+    assert json.loads(json_file.read_text(encoding='utf-8'))['status'] == STATUS_REQUIRES_REVALIDATION
+
+
+# =============================================================================
+# Tests: Tool
+# =============================================================================
+
+async def test_reconcile_tool_pages_findings(book):
+    """Test text and JSON output with pagination."""
+    for n in range(3, 8):
+        _write(book / "act-1" / "chapters" / "chapter-01" / "scenes" / f"scene-010{n}-blueprint.md", "# new\n")
+
+    text = await reconcile_planning_state_tool(ReconcilePlanningStateInput(acts_path=str(book), limit=2))
+    assert "**Orphaned**: 5" in text and "Showing 1–2 of 5" in text and "cursor='" in text
+
+    seen, cursor = [], None
+    while True:
+        page = json.loads(await reconcile_planning_state_tool(ReconcilePlanningStateInput(
+            acts_path=str(book), limit=2, cursor=cursor, response_format='json'
+        )))
+        assert page['summary']['orphaned'] == 5
+        seen.extend(item['entity_id'] for item in page['findings'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [f"scene-010{n}" for n in range(3, 8)]
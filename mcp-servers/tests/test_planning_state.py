@@ -8,7 +8,7 @@ Tests cover:
 - Entity CRUD operations
 - Hierarchy queries and cascade operations
 - JSON fallback mechanisms
-- Sync operations between SQLite and JSON
+- Sync operations between SQLite and JSON (incremental, conflicts)
 
 Run with: pytest test_planning_state.py -v
 """
@@ -24,6 +24,7 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import planning_state_utils
 from planning_state_utils import (
     calculate_version_hash,
     get_entity_state,
@@ -31,8 +32,15 @@ from planning_state_utils import (
     get_all_descendants,
     cascade_invalidate,
     get_children_status,
+    get_hierarchy_tree,
     sync_from_json_to_sqlite,
     sync_from_sqlite_to_json,
+    create_backup,
+    list_backups,
+    close_db_connections,
+    _init_database,
+    get_db_connection,
+    SCHEMA_VERSION,
     WORKSPACE_PATH,
     PLANNING_STATE_DB_PATH,
     PLANNING_STATE_JSON_DIR,
@@ -61,6 +69,7 @@ def temp_workspace(monkeypatch):
     yield temp_workspace_path
 
     # Cleanup
+    close_db_connections()
     shutil.rmtree(temp_dir)
 
 
@@ -266,6 +275,79 @@ def test_cascade_invalidate(temp_workspace, monkeypatch, sample_plan_file):
     assert scene2['invalidation_reason'] == 'parent_chapter_regenerated'
 
 
+
+def _build_cascade_fixture(sample_plan_file):
+    """Act with two chapters; one scene already requires revalidation."""
+    version_hash = calculate_version_hash(sample_plan_file)
+    path = str(sample_plan_file)
+
+    update_entity_state('act', 'act-1', STATUS_APPROVED, version_hash, path)
+    update_entity_state('chapter', 'chapter-01', STATUS_APPROVED, version_hash, path, parent_id='act-1')
+    update_entity_state('chapter', 'chapter-02', STATUS_DRAFT, version_hash, path, parent_id='act-1')
+    update_entity_state('scene', 'scene-0101', STATUS_APPROVED, version_hash, path, parent_id='chapter-01')
+    update_entity_state('scene', 'scene-0102', STATUS_REQUIRES_REVALIDATION, version_hash, path,
+                        parent_id='chapter-01')
+    update_entity_state('scene', 'scene-0201', STATUS_DRAFT, version_hash, path, parent_id='chapter-02')
+
+
+@pytest.mark.parametrize("use_sqlite", [True, False])
+def test_cascade_invalidate_reports_previous_status(temp_workspace, monkeypatch, sample_plan_file, use_sqlite):
+    """Test set-based invalidation of a whole act reports previous/new status per entity."""
+    if not use_sqlite:
+        monkeypatch.setattr('planning_state_utils.PLANNING_STATE_DB_PATH', Path("/invalid/path/db.sqlite"))
+    _build_cascade_fixture(sample_plan_file)
+
+    result = cascade_invalidate('act', 'act-1', 'act_regenerated')
+
+    assert result['success'] is True
+    assert result['dry_run'] is False
+    assert [(e['entity_id'], e['previous_status']) for e in result['invalidated_entities']] == [
+        ('chapter-01', STATUS_APPROVED),
+        ('chapter-02', STATUS_DRAFT),
+        ('scene-0101', STATUS_APPROVED),
+        ('scene-0201', STATUS_DRAFT),
+    ]
+    assert get_entity_state('scene', 'scene-0201')['status'] == STATUS_REQUIRES_REVALIDATION
+    assert get_entity_state('act', 'act-1')['status'] == STATUS_APPROVED
+
+    # Second run finds nothing left to invalidate
+    assert cascade_invalidate('act', 'act-1', 'act_regenerated')['invalidated_entities'] == []
+
+
+def test_cascade_invalidate_joins_caller_transaction(temp_workspace, sample_plan_file):
+    """Test that a transaction opened by the caller is neither committed nor rolled back."""
+    _build_cascade_fixture(sample_plan_file)
+    conn = _init_database()
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("UPDATE planning_entities SET status = 'invalid' WHERE entity_id = 'act-1'")
+
+    result = cascade_invalidate('chapter', 'chapter-01', 'caller_transaction', conn=conn)
+
+    assert result['success'] is True
+    assert conn.in_transaction
+    status = "SELECT status FROM planning_entities WHERE entity_id = ?"
+    assert conn.execute(status, ('scene-0101',)).fetchone()[0] == STATUS_REQUIRES_REVALIDATION
+
+    conn.rollback()
+    assert conn.execute(status, ('scene-0101',)).fetchone()[0] == STATUS_APPROVED
+    assert conn.execute(status, ('act-1',)).fetchone()[0] == STATUS_APPROVED
+
+
+@pytest.mark.parametrize("use_sqlite", [True, False])
+def test_cascade_invalidate_dry_run(temp_workspace, monkeypatch, sample_plan_file, use_sqlite):
+    """Test dry run reports the blast radius without writing."""
+    if not use_sqlite:
+        monkeypatch.setattr('planning_state_utils.PLANNING_STATE_DB_PATH', Path("/invalid/path/db.sqlite"))
+    _build_cascade_fixture(sample_plan_file)
+
+    result = cascade_invalidate('chapter', 'chapter-01', 'preview', dry_run=True)
+
+    assert result['success'] is True
+    assert result['dry_run'] is True
+    assert [e['entity_id'] for e in result['invalidated_entities']] == ['scene-0101']
+    assert get_entity_state('scene', 'scene-0101')['status'] == STATUS_APPROVED
+
+
 def test_get_children_status(temp_workspace, monkeypatch, sample_plan_file):
     """Test children status summary."""
     monkeypatch.setattr('planning_state_utils.WORKSPACE_PATH', temp_workspace)
@@ -296,6 +378,39 @@ def test_get_children_status(temp_workspace, monkeypatch, sample_plan_file):
     assert result['status_counts'][STATUS_REQUIRES_REVALIDATION] == 1
 
 
+def test_get_hierarchy_tree(temp_workspace, sample_plan_file):
+    """Test single-pass act tree loading, ordering and rendering."""
+    version_hash = calculate_version_hash(sample_plan_file)
+    path = str(sample_plan_file)
+
+    update_entity_state('act', 'act-1', STATUS_APPROVED, version_hash, path)
+    update_entity_state('chapter', 'chapter-10', STATUS_DRAFT, version_hash, path, parent_id='act-1')
+    update_entity_state('chapter', 'chapter-2', STATUS_APPROVED, version_hash, path, parent_id='act-1')
+    update_entity_state('scene', 'scene-0202', STATUS_DRAFT, version_hash, path, parent_id='chapter-2')
+    update_entity_state('scene', 'scene-0201', STATUS_APPROVED, version_hash, path, parent_id='chapter-2')
+    # Different act - must not appear
+    update_entity_state('chapter', 'chapter-99', STATUS_DRAFT, version_hash, path, parent_id='act-2')
+
+    tree = get_hierarchy_tree('act-1')
+
+    assert tree is not None
+    assert [c.entity_id for c in tree.children] == ['chapter-2', 'chapter-10']
+    assert [s.entity_id for s in tree.children[0].children] == ['scene-0201', 'scene-0202']
+    assert tree.status_counts()['scene'] == {STATUS_APPROVED: 1, STATUS_DRAFT: 1}
+
+    assert tree.render_lines() == [
+        "act-1 [approved]",
+        "├── chapter-2 [approved]",
+        "│   ├── scene-0201 [approved]",
+        "│   └── scene-0202 [draft]",
+        "└── chapter-10 [draft]",
+    ]
+    assert tree.to_dict(include_status=False)['children'][1] == {
+        "entity_type": "chapter", "entity_id": "chapter-10", "children": []
+    }
+    assert get_hierarchy_tree('act-404') is None
+
+
 # =============================================================================
 # Tests: JSON Fallback
 # =============================================================================
@@ -331,6 +446,22 @@ def test_json_fallback_update_and_get(temp_workspace, monkeypatch, sample_plan_f
     assert state['version_hash'] == version_hash
 
 
+def test_json_fallback_hierarchy_tree(temp_workspace, monkeypatch, sample_plan_file):
+    """Test that hierarchy tree is built from JSON files when SQLite unavailable."""
+    monkeypatch.setattr('planning_state_utils.PLANNING_STATE_DB_PATH', Path("/invalid/path/db.sqlite"))
+
+    version_hash = calculate_version_hash(sample_plan_file)
+    path = str(sample_plan_file)
+    update_entity_state('act', 'act-1', STATUS_DRAFT, version_hash, path)
+    update_entity_state('chapter', 'chapter-01', STATUS_DRAFT, version_hash, path, parent_id='act-1')
+    update_entity_state('scene', 'scene-0101', STATUS_DRAFT, version_hash, path, parent_id='chapter-01')
+
+    tree = get_hierarchy_tree('act-1')
+
+    assert tree is not None
+    assert sum(1 for _ in tree.iter_nodes()) == 3
+
+
 # =============================================================================
 # Tests: Sync Operations
 # =============================================================================
@@ -405,6 +536,137 @@ def test_sync_from_sqlite_to_json(temp_workspace, monkeypatch, sample_plan_file)
     assert data['status'] == STATUS_APPROVED
 
 
+def _register_scenes(plan_file, count):
+    for n in range(1, count + 1):
+        update_entity_state('scene', f'scene-02{n:02d}', STATUS_DRAFT, calculate_version_hash(plan_file),
+                            str(plan_file), parent_id='chapter-02')
+
+
+def test_sqlite_to_json_writes_only_changed_files(temp_workspace, sample_plan_file, monkeypatch):
+    """Test that a second sync skips unchanged entities without reading or writing them."""
+    _register_scenes(sample_plan_file, 5)
+    first = sync_from_sqlite_to_json()
+    assert (first['updated'], first['skipped'], first['conflicted']) == (5, 0, 0)
+
+    update_entity_state('scene', 'scene-0203', STATUS_APPROVED, calculate_version_hash(sample_plan_file),
+                        str(sample_plan_file), parent_id='chapter-02')
+    written = []
+    original = planning_state_utils.atomic_write_bytes
+    monkeypatch.setattr(planning_state_utils, "atomic_write_bytes",
+                        lambda path, data: written.append(path.name) or original(path, data))
+
+    second = sync_from_sqlite_to_json()
+
+    assert (second['updated'], second['skipped'], second['conflicted']) == (1, 4, 0)
+    assert written == ["scene-0203.json"]
+    json_file = temp_workspace / "planning-state" / "scenes" / "scene-0203.json"
+    assert json.loads(json_file.read_text(encoding='utf-8'))['status'] == STATUS_APPROVED
+
+
+def test_json_to_sqlite_is_incremental(temp_workspace, sample_plan_file):
+    """Test that only changed JSON files are upserted, and unchanged ones skipped."""
+    _register_scenes(sample_plan_file, 3)
+    sync_from_sqlite_to_json()
+    assert sync_from_json_to_sqlite()['skipped'] == 3
+
+    json_file = temp_workspace / "planning-state" / "scenes" / "scene-0202.json"
+    state = json.loads(json_file.read_text(encoding='utf-8'))
+    state.update(status=STATUS_APPROVED, updated_at="2999-01-01T00:00:00+00:00")
+    json_file.write_text(json.dumps(state), encoding='utf-8')
+
+    result = sync_from_json_to_sqlite()
+
+    assert (result['updated'], result['skipped'], result['conflicted']) == (1, 2, 0)
+    assert get_entity_state('scene', 'scene-0202')['status'] == STATUS_APPROVED
+
+
+def test_sync_reports_conflicts_by_updated_at(temp_workspace, sample_plan_file):
+    """Test that the older side of a conflicting change is kept and reported."""
+    _register_scenes(sample_plan_file, 1)
+    sync_from_sqlite_to_json()
+    json_file = temp_workspace / "planning-state" / "scenes" / "scene-0201.json"
+    state = json.loads(json_file.read_text(encoding='utf-8'))
+    state.update(status=STATUS_APPROVED, updated_at="2000-01-01T00:00:00+00:00")
+    json_file.write_text(json.dumps(state), encoding='utf-8')
+
+    # JSON is older than SQLite: not imported
+    result = sync_from_json_to_sqlite()
+    assert result['conflicted'] == 1 and result['updated'] == 0
+    assert result['conflicts'][0]['entity_id'] == 'scene-0201'
+    assert get_entity_state('scene', 'scene-0201')['status'] == STATUS_DRAFT
+
+    # JSON edited with a newer updated_at: not overwritten from SQLite
+    state['updated_at'] = "2999-01-01T00:00:00+00:00"
+    json_file.write_text(json.dumps(state), encoding='utf-8')
+    result = sync_from_sqlite_to_json()
+    assert result['conflicted'] == 1 and result['updated'] == 0
+    assert json.loads(json_file.read_text(encoding='utf-8'))['status'] == STATUS_APPROVED
+
+
+# =============================================================================
+# Tests: Connection Pool
+# =============================================================================
+
+def test_connection_is_reused(temp_workspace):
+    """Test that repeated calls return the same pooled connection."""
+    conn1 = _init_database()
+    conn2 = _init_database()
+
+    assert conn1 is conn2
+
+
+def test_leaked_transaction_is_rolled_back(temp_workspace, sample_plan_file):
+    """Test that errors and stray writes do not leave transactions on the pooled connection."""
+    version_hash = calculate_version_hash(sample_plan_file)
+    update_entity_state('act', 'act-1', STATUS_DRAFT, version_hash, str(sample_plan_file))
+
+    with pytest.raises(KeyError):
+        with get_db_connection() as conn:
+            conn.execute("UPDATE planning_entities SET status = 'invalid' WHERE entity_id = 'act-1'")
+            raise KeyError("not a database error")
+    assert not conn.in_transaction
+
+    conn.execute("UPDATE planning_entities SET status = 'invalid' WHERE entity_id = 'act-1'")
+    assert _init_database() is conn and not conn.in_transaction
+    assert get_entity_state('act', 'act-1')['status'] == STATUS_DRAFT
+
+
+def test_schema_version_and_pragmas(temp_workspace):
+    """Test that schema is tracked via user_version and WAL is enabled."""
+    conn = _init_database()
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_reconnect_after_database_deleted(temp_workspace, sample_plan_file):
+    """Test that a deleted database file is recreated with schema."""
+    version_hash = calculate_version_hash(sample_plan_file)
+    update_entity_state('act', 'act-1', STATUS_DRAFT, version_hash, str(sample_plan_file))
+
+    conn = _init_database()
+    for suffix in ("", "-wal", "-shm"):
+        db_file = Path(str(temp_workspace / "planning-state.db") + suffix)
+        if db_file.exists():
+            db_file.unlink()
+
+    assert get_entity_state('act', 'act-1') is None
+    assert _init_database() is not conn
+
+
+def test_backup_uses_pooled_connection(temp_workspace, sample_plan_file):
+    """Test that backup functions log to the shared database."""
+    result = create_backup('chapter', 'chapter-02', str(sample_plan_file), reason='manual')
+
+    assert result['success'] is True
+    assert result['backup_id'] > 0
+
+    listing = list_backups('chapter', 'chapter-02')
+    assert listing['success'] is True
+    assert listing['count'] == 1
+    assert listing['backups'][0]['exists'] is True
+
+
 # =============================================================================
 # Tests: Validation
 # =============================================================================
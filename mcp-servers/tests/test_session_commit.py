@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the transactional session commit engine
+
+Tests cover:
+- Commit planning (CoW files, deletions, workflow states, run artifacts, retries)
+- Hard link / copy / skip-identical staging and archiving
+- Abort on staging failure (global tree untouched)
+- Crash recovery at every step (discard, roll back, roll forward), idempotency
+- Archiving deleted files and retries into the blob store
+- commit_session end to end
+
+Run with: pytest test_session_commit.py -v
+"""
+
+import pytest
+import sys
+import json
+import os
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import session_commit_utils
+from blob_store_utils import BlobStore
+from session_commit_utils import (
+    OP_COPY,
+    OP_DELETE,
+    OP_ARCHIVE,
+    PHASE_FILES,
+    PHASE_WORKFLOW_STATES,
+    PHASE_ARTIFACTS,
+    PHASE_RETRIES,
+    COPIED,
+    SKIPPED,
+    DELETED,
+    ARCHIVED,
+    MARK_STAGED,
+    MARK_APPLIED,
+    STATE_COMMITTED,
+    STATE_ABORTED,
+    RECOVERY_DISCARDED,
+    RECOVERY_ROLLED_BACK,
+    RECOVERY_COMPLETED,
+    plan_commit,
+    run_commit,
+    recover_commit,
+    recover_commits,
+    journal_path,
+    stage_file,
+    _DirectoryCache,
+)
+
+
+class Crash(BaseException):
+    """Simulated process crash (not caught by the engine)."""
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def tree(tmp_path):
+    """Session directory with CoW files, workflow states, run artifacts and retries."""
+    session = tmp_path / "workspace" / "sessions" / "draft"
+    (session / "acts" / "act-1").mkdir(parents=True)
+    (session / "acts" / "act-1" / "plan.md").write_text("new plan", encoding='utf-8')
+    (session / "acts" / "act-1" / "same.md").write_text("unchanged", encoding='utf-8')
+    (session / "workflow-state").mkdir()
+    (session / "workflow-state" / "wf-1.json").write_text("{}", encoding='utf-8')
+    (session / "workflow-state" / "index.json").write_text("{}", encoding='utf-8')
+    (session / "generation-runs" / "run-1" / "step-1").mkdir(parents=True)
+    (session / "generation-runs" / "run-1" / "step-1" / "out.md").write_text("artifact", encoding='utf-8')
+    (session / "human-retries").mkdir()
+    (session / "human-retries" / "plan.md-retry-1.md").write_text("retry", encoding='utf-8')
+
+    (tmp_path / "acts" / "act-1").mkdir(parents=True)
+    (tmp_path / "acts" / "act-1" / "plan.md").write_text("old plan", encoding='utf-8')
+    (tmp_path / "acts" / "act-1" / "same.md").write_text("unchanged", encoding='utf-8')
+    (tmp_path / "acts" / "act-1" / "old.md").write_text("to delete", encoding='utf-8')
+
+    cow_files = [
+        {"path": "acts/act-1/plan.md", "type": "modified"},
+        {"path": "acts/act-1/same.md", "type": "modified"},
+        {"path": "acts/act-1/old.md", "type": "deleted"},
+        {"path": "acts/act-1/vanished.md", "type": "created"},
+    ]
+    return tmp_path, session, cow_files
+
+
+def _commit(tree, cleaned=None, **kwargs):
+    root, session, cow_files = tree
+    cleaned = cleaned if cleaned is not None else []
+    return run_commit(
+        session, cow_files, root / "workspace", root / "archive",
+        cleanup=lambda: cleaned.append(session.name),
+        global_root=root, **kwargs
+    )
+
+
+def _global(root: Path, rel: str) -> str:
+    return (root / rel).read_text(encoding='utf-8')
+
+
+def _stage_files(root: Path):
+    return list(root.rglob("*.commit-stage"))
+
+
+def _crash_on_marker(monkeypatch, marker):
+    original = session_commit_utils._mark
+
+    def mark(journal, name):
+        if name == marker:
+            raise Crash(name)
+        original(journal, name)
+
+    monkeypatch.setattr(session_commit_utils, "_mark", mark)
+
+
+def _cleanup_recorder(calls):
+    return lambda name, path: calls.append(name)
+
+
+# =============================================================================
+# Tests: Planning and Commit
+# =============================================================================
+
+def test_plan_covers_all_phases(tree):
+    """Test that the plan lists every operation (not index.json or missing CoW files)."""
+    root, session, cow_files = tree
+
+    ops = plan_commit(session, cow_files, root / "workspace", root / "archive", global_root=root)
+
+    assert [(op.kind, op.phase, op.rel_path) for op in ops] == [
+        (OP_COPY, PHASE_FILES, "acts/act-1/plan.md"),
+        (OP_COPY, PHASE_FILES, "acts/act-1/same.md"),
+        (OP_DELETE, PHASE_FILES, "acts/act-1/old.md"),
+        (OP_COPY, PHASE_WORKFLOW_STATES, "workflow-state/wf-1.json"),
+        (OP_COPY, PHASE_ARTIFACTS, "generation-runs/run-1/step-1/out.md"),
+        (OP_COPY, PHASE_RETRIES, "human-retries/plan.md-retry-1.md"),
+    ]
+
+
+def test_commit_stages_and_applies(tree):
+    """Test transfer outcomes, resulting global tree, cleanup and journal removal."""
+    root, session, _ = tree
+    cleaned, progress = [], []
+
+    result = _commit(tree, cleaned, workers=4, progress=lambda d, t, m: progress.append((d, t)))
+
+    assert result.state == STATE_COMMITTED and result.failed == []
+    assert result.outcomes == {COPIED: 4, SKIPPED: 1, DELETED: 1}
+    assert sorted(result.copied)[:2] == ["acts/act-1/plan.md", "acts/act-1/same.md"]
+    assert result.deleted == ["acts/act-1/old.md"]
+    assert _global(root, "acts/act-1/plan.md") == "new plan"
+    assert not (root / "acts" / "act-1" / "old.md").exists()
+    assert _global(root, "archive/acts/act-1/old.md") == "to delete"
+    assert (root / "workspace" / "generation-runs" / "run-1" / "step-1" / "out.md").exists()
+    assert _global(root, "workspace/retries-archive/draft/plan.md-retry-1.md") == "retry"
+    assert not (root / "workspace" / "workflow-state" / "index.json").exists()
+    assert cleaned == ["draft"]
+    assert not journal_path(root / "workspace", "draft").exists()
+    assert progress[-1] == (12, 12)
+    assert set(result.phase_seconds) == {"plan", "stage", "apply", "cleanup"}
+    assert _stage_files(root) == []
+
+
+def test_commit_archives_into_blob_store(tree):
+    """Test that deleted files and retries become blob references instead of copies."""
+    root, session, cow_files = tree
+    store = BlobStore(root / "workspace" / "blobs")
+
+    result = run_commit(
+        session, cow_files, root / "workspace", root / "workspace" / "deleted-archive" / "draft" / "t1",
+        lambda: None, global_root=root, blob_store=store
+    )
+
+    assert result.state == STATE_COMMITTED and result.failed == []
+    assert result.outcomes == {COPIED: 3, SKIPPED: 1, ARCHIVED: 1, DELETED: 1}
+    assert not (root / "acts" / "act-1" / "old.md").exists()
+    assert not (root / "workspace" / "deleted-archive").exists()
+    assert not (root / "workspace" / "retries-archive").exists()
+    assert store.get_text(store.resolve_ref("deleted-archive/draft/t1/acts/act-1/old.md")) == "to delete"
+    assert store.get_text(store.resolve_ref("retries-archive/draft/plan.md-retry-1.md")) == "retry"
+
+
+def test_recovery_archives_into_blob_store(tree, monkeypatch):
+    """Test that roll-forward recovery reopens the blob store recorded in the journal."""
+    root, session, cow_files = tree
+    store = BlobStore(root / "workspace" / "blobs")
+    ops = plan_commit(session, cow_files, root / "workspace", root / "archive", root, archive_to_store=True)
+    assert ops[-1].kind == OP_ARCHIVE
+
+    def crash(*args):
+        raise Crash("archive")
+
+    monkeypatch.setattr(session_commit_utils, "archive_to_store", crash)
+    with pytest.raises(Crash):
+        run_commit(session, cow_files, root / "workspace", root / "archive", lambda: None,
+                   global_root=root, workers=1, blob_store=store)
+    monkeypatch.undo()
+    assert (root / "acts" / "act-1" / "old.md").exists()
+
+    journal = journal_path(root / "workspace", "draft")
+    assert recover_commit(journal, _cleanup_recorder([])) == RECOVERY_COMPLETED
+    assert store.resolve_ref("retries-archive/draft/plan.md-retry-1.md") is not None
+    assert not (root / "acts" / "act-1" / "old.md").exists()
+
+
+def test_stage_is_a_private_copy(tmp_path):
+    """Test that writing the session file in place after staging leaves the stage file intact."""
+    source = tmp_path / "a.md"
+    source.write_text("content", encoding='utf-8')
+    stage = tmp_path / "global" / ".a.md.tx.commit-stage"
+
+    assert stage_file(source, stage, tmp_path / "global" / "a.md", _DirectoryCache(), sync=True) == COPIED
+    assert os.stat(source).st_ino != os.stat(stage).st_ino
+
+    with open(source, 'r+', encoding='utf-8') as f:
+        f.write("CHANGED")
+    assert stage.read_text(encoding='utf-8') == "content"
+
+
+def test_staging_failure_aborts_without_changes(tree, monkeypatch):
+    """Test that a staging error rolls back and leaves global files and session intact."""
+    root, session, _ = tree
+    original = session_commit_utils.stage_file
+
+    def flaky(source, stage, target, dirs, sync):
+        if target.name == "out.md":
+            raise PermissionError("denied")
+        return original(source, stage, target, dirs, sync)
+
+    monkeypatch.setattr(session_commit_utils, "stage_file", flaky)
+    cleaned = []
+    result = _commit(tree, cleaned, workers=2)
+
+    assert result.state == STATE_ABORTED
+    assert result.failed == [("generation-runs/run-1/step-1/out.md", "denied")]
+    assert _global(root, "acts/act-1/plan.md") == "old plan"
+    assert (root / "acts" / "act-1" / "old.md").exists()
+    assert _stage_files(root) == []
+    assert cleaned == [] and session.exists()
+    assert not journal_path(root / "workspace", "draft").exists()
+
+
+# =============================================================================
+# Tests: Crash Recovery
+# =============================================================================
+
+def test_recovery_discards_torn_journal(tree):
+    """Test that a journal without the planned marker is dropped."""
+    root, _, _ = tree
+    journal = journal_path(root / "workspace", "draft")
+    journal.parent.mkdir(parents=True)
+    journal.write_text('{"rec":"begin","txid":"t","session":"draft","session_path":"x"}\n{"rec":"op","ki', encoding='utf-8')
+
+    assert recover_commit(journal, _cleanup_recorder([])) == RECOVERY_DISCARDED
+    assert not journal.exists()
+
+
+def test_recovery_rolls_back_before_staged_marker(tree, monkeypatch):
+    """Test crash during staging: stage files removed, global tree and session untouched."""
+    root, session, _ = tree
+    _crash_on_marker(monkeypatch, MARK_STAGED)
+
+    with pytest.raises(Crash):
+        _commit(tree)
+    assert _stage_files(root)
+
+    calls = []
+    outcomes = recover_commits(root / "workspace", _cleanup_recorder(calls))
+
+    assert outcomes == {"draft": RECOVERY_ROLLED_BACK}
+    assert _stage_files(root) == []
+    assert _global(root, "acts/act-1/plan.md") == "old plan"
+    assert calls == [] and session.exists()
+
+
+def test_recovery_rolls_forward_after_staged_marker(tree, monkeypatch):
+    """Test crash in the middle of applying: recovery finishes the commit, twice safely."""
+    root, session, _ = tree
+    real_replace = os.replace
+    applied = []
+
+    def crashing_replace(src, dst):
+        if str(src).endswith(".commit-stage") and len(applied) == 1:
+            raise Crash("mid-apply")
+        applied.append(dst)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", crashing_replace)
+    with pytest.raises(Crash):
+        _commit(tree, workers=1)
+    monkeypatch.setattr(os, "replace", real_replace)
+
+    assert _global(root, "acts/act-1/plan.md") == "new plan"
+    assert not (root / "workspace" / "workflow-state" / "wf-1.json").exists()
+
+    calls = []
+    journal = journal_path(root / "workspace", "draft")
+    assert recover_commit(journal, _cleanup_recorder(calls)) == RECOVERY_COMPLETED
+    assert (root / "workspace" / "workflow-state" / "wf-1.json").exists()
+    assert _global(root, "archive/acts/act-1/old.md") == "to delete"
+    assert _stage_files(root) == []
+    assert calls == ["draft"] and not journal.exists()
+    assert recover_commits(root / "workspace", _cleanup_recorder(calls)) == {}
+
+
+def test_recovery_after_applied_only_cleans_up(tree, monkeypatch):
+    """Test crash between applying and cleanup."""
+    root, _, _ = tree
+    original = session_commit_utils._remove_journal
+    monkeypatch.setattr(session_commit_utils, "_remove_journal", lambda j: (_ for _ in ()).throw(Crash("cleanup")))
+
+    with pytest.raises(Crash):
+        _commit(tree)
+    monkeypatch.setattr(session_commit_utils, "_remove_journal", original)
+
+    journal = journal_path(root / "workspace", "draft")
+    assert MARK_APPLIED in session_commit_utils.read_journal_state(journal)[1]
+    calls = []
+    assert recover_commit(journal, _cleanup_recorder(calls)) == RECOVERY_COMPLETED
+    assert calls == ["draft"]
+
+
+# =============================================================================
+# Tests: commit_session
+# =============================================================================
+
+@pytest.fixture
+def server(tree, monkeypatch):
+    """session_management_mcp pointed at the tree (cwd = global root)."""
+    import session_utils
+    import session_management_mcp as sm
+
+    root, session, cow_files = tree
+    monkeypatch.chdir(root)
+    for module in (sm, session_utils):
+        monkeypatch.setattr(module, "WORKSPACE_PATH", Path("workspace"))
+        monkeypatch.setattr(module, "SESSIONS_PATH", Path("workspace") / "sessions")
+        monkeypatch.setattr(module, "SESSION_LOCK_FILE", Path("workspace") / "session.lock")
+    monkeypatch.setattr(session_utils, "_cow_indexes", {})
+    (session / "session.json").write_text(json.dumps({
+        "name": "draft",
+        "cow_files": cow_files,
+        "changes": {"modified": ["acts/act-1/plan.md", "acts/act-1/same.md"], "created": [], "deleted": ["acts/act-1/old.md"]},
+        "human_retries": [{"file": "acts/act-1/plan.md", "retry_number": 1, "reason": "tone"}],
+        "stats": {"total_files_changed": 3, "session_size_bytes": 0}
+    }), encoding='utf-8')
+    (root / "workspace" / "session.lock").write_text(json.dumps({"active": "draft"}), encoding='utf-8')
+    return sm
+
+
+async def test_commit_session_end_to_end(tree, server):
+    """Test commit_session output, global tree and session cleanup."""
+    root, session, _ = tree
+
+    output = await server.commit_session(server.CommitSessionInput(name="draft", force=True))
+
+    assert "✅ SESSION COMMITTED" in output
+    assert "Copied: 3, unchanged (skipped): 1" in output
+    assert "📦 Human retries archived (blob store refs)" in output
+    assert "⏱️ Timing" in output and "apply:" in output
+    assert not session.exists()
+    assert not (root / "workspace" / "session.lock").exists()
+    assert _global(root, "acts/act-1/plan.md") == "new plan"
+    store = BlobStore(root / "workspace" / "blobs")
+    refs = [entry["ref"] for entry in store.list_refs("deleted-archive/draft/")]
+    assert len(refs) == 1 and refs[0].endswith("/acts/act-1/old.md")
+    assert store.get_text(store.resolve_ref(refs[0])) == "to delete"
+    assert not (root / "workspace" / "deleted-archive").exists()
+
+
+async def test_commit_session_finishes_interrupted_commit(tree, server, monkeypatch):
+    """Test that re-running commit_session recovers a crashed commit."""
+    root, session, _ = tree
+    _crash_on_marker(monkeypatch, MARK_APPLIED)
+    with pytest.raises(Crash):
+        await server.commit_session(server.CommitSessionInput(name="draft", force=True))
+    monkeypatch.undo()
+    monkeypatch.chdir(root)
+
+    output = await server.commit_session(server.CommitSessionInput(name="draft", force=True))
+
+    assert "recovered" in output
+    assert not session.exists()
+    assert _global(root, "acts/act-1/plan.md") == "new plan"
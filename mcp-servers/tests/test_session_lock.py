@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared session.lock provider and session guard
+
+Tests cover:
+- Cached lock contents and revalidation (signature, poll interval)
+- Session generation counter and dependent cache invalidation
+- Advisory session guard across processes and across tasks
+
+Run with: pytest test_session_lock.py -v
+"""
+
+import pytest
+import sys
+import json
+import asyncio
+import subprocess
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import session_lock_utils
+from session_lock_utils import (
+    FLOCK_AVAILABLE,
+    ActiveSessionProvider,
+    SessionBusyError,
+    get_session_provider,
+    guard_path,
+    session_guard,
+    session_guard_async,
+    write_session_lock,
+    clear_session_lock,
+)
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def lock_file(tmp_path):
+    return tmp_path / "workspace" / "session.lock"
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Count session.lock parses."""
+    calls = []
+    real = session_lock_utils._read_lock
+
+    def counting(path):
+        calls.append(path)
+        return real(path)
+
+    monkeypatch.setattr(session_lock_utils, "_read_lock", counting)
+    return calls
+
+
+def _hold_guard_in_subprocess(lock_file: Path):
+    """Start a process that holds the guard until its stdin is closed."""
+    code = (
+        "import fcntl, os, sys\n"
+        f"fd = os.open({str(guard_path(lock_file))!r}, os.O_RDWR | os.O_CREAT)\n"
+        "fcntl.flock(fd, fcntl.LOCK_EX)\n"
+        "print('locked', flush=True)\n"
+        "sys.stdin.read()\n"
+    )
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    proc = subprocess.Popen([sys.executable, "-c", code], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    assert proc.stdout.readline().strip() == "locked"
+    return proc
+
+
+def _release(proc):
+    proc.stdin.close()
+    proc.wait(timeout=10)
+
+
+# =============================================================================
+# Tests: Provider
+# =============================================================================
+
+def test_lock_parsed_only_when_changed(lock_file, reads):
+    """Test that repeated lookups reuse the cached lock contents."""
+    provider = ActiveSessionProvider(lock_file)
+    assert provider.active_name is None
+
+    write_session_lock(lock_file, {"active": "draft"})
+    provider.invalidate()
+    for _ in range(5):
+        assert provider.active_name == "draft"
+    assert len(reads) == 1
+
+    assert provider.lock_data() == {"active": "draft"}
+    assert len(reads) == 1
+
+
+def test_generation_changes_only_on_session_switch(lock_file):
+    """Test the session-switch generation counter."""
+    provider = get_session_provider(lock_file)
+    write_session_lock(lock_file, {"active": "draft"})
+    first = provider.generation
+
+    write_session_lock(lock_file, {"active": "draft", "updated_at": "later"})
+    assert provider.generation == first
+
+    write_session_lock(lock_file, {"active": "other"})
+    assert provider.snapshot() == ("other", first + 1)
+
+    clear_session_lock(lock_file)
+    assert provider.snapshot() == (None, first + 2)
+    assert provider.last_generation == first + 2
+
+
+def test_poll_interval_delays_revalidation(lock_file):
+    """Test that with a poll interval, external changes are seen after invalidate/interval."""
+    write_session_lock(lock_file, {"active": "draft"})
+    provider = ActiveSessionProvider(lock_file, poll_interval=3600)
+    assert provider.active_name == "draft"
+
+    lock_file.write_text(json.dumps({"active": "other"}), encoding='utf-8')
+    assert provider.active_name == "draft"
+
+    provider.invalidate()
+    assert provider.active_name == "other"
+
+
+def test_corrupted_lock_means_no_session(lock_file):
+    """Test that an unreadable lock is treated as no active session."""
+    lock_file.parent.mkdir(parents=True)
+    lock_file.write_text("{not json", encoding='utf-8')
+    assert ActiveSessionProvider(lock_file).lock_data() is None
+
+
+def test_state_cache_drops_session_entries_on_switch(tmp_path, monkeypatch):
+    """Test that the generation state cache forgets session states after a switch."""
+    import generation_state_mcp as gsm
+
+    workspace = tmp_path / "workspace"
+    monkeypatch.setattr(gsm, "WORKSPACE_PATH", workspace)
+    monkeypatch.setattr(gsm, "SESSIONS_PATH", workspace / "sessions")
+    monkeypatch.setattr(gsm, "SESSION_LOCK_FILE", workspace / "session.lock")
+    monkeypatch.setattr(gsm, "_state_cache", gsm.StateCache())
+    write_session_lock(workspace / "session.lock", {"active": "draft"})
+
+    gsm._get_active_session()
+    gsm._state_cache.put("0101", workspace / "sessions" / "draft" / "generation-state-0101.json", (1,), {})
+    gsm._state_cache.put("0102", workspace / "generation-state-0102.json", (1,), {})
+
+    gsm._get_active_session()
+    assert gsm._state_cache.stats()["entries"] == 2
+
+    write_session_lock(workspace / "session.lock", {"active": "other"})
+    assert gsm._get_active_session() == "other"
+    assert gsm._state_cache.stats()["entries"] == 1
+
+
+# =============================================================================
+# Tests: Session Guard
+# =============================================================================
+
+@pytest.mark.skipif(not FLOCK_AVAILABLE, reason="flock not available")
+def test_guard_excludes_other_process(lock_file):
+    """Test that the guard waits for another process and times out."""
+    proc = _hold_guard_in_subprocess(lock_file)
+    try:
+        with pytest.raises(SessionBusyError):
+            with session_guard(lock_file, timeout=0.2):
+                pass
+    finally:
+        _release(proc)
+
+    with session_guard(lock_file, timeout=5):
+        pass
+
+
+async def test_async_guard_serializes_tasks(lock_file):
+    """Test that guarded sections of concurrent tasks do not overlap."""
+    events = []
+
+    async def worker(n):
+        async with session_guard_async(lock_file, timeout=5):
+            events.append(("start", n))
+            await asyncio.sleep(0.02)
+            events.append(("end", n))
+
+    await asyncio.gather(*(worker(n) for n in range(4)))
+
+    assert len(events) == 8
+    for i in range(0, 8, 2):
+        assert events[i][0] == "start" and events[i + 1] == ("end", events[i][1])
+
+
+@pytest.mark.skipif(not FLOCK_AVAILABLE, reason="flock not available")
+async def test_switch_session_reports_busy(tmp_path, monkeypatch):
+    """Test that session tools report a busy guard instead of racing."""
+    import session_utils
+    import session_management_mcp as sm
+
+    workspace = tmp_path / "workspace"
+    for module in (sm, session_utils):
+        monkeypatch.setattr(module, "WORKSPACE_PATH", workspace)
+        monkeypatch.setattr(module, "SESSIONS_PATH", workspace / "sessions")
+        monkeypatch.setattr(module, "SESSION_LOCK_FILE", workspace / "session.lock")
+    monkeypatch.setattr(session_lock_utils, "SESSION_GUARD_TIMEOUT", 0.2)
+
+    proc = _hold_guard_in_subprocess(workspace / "session.lock")
+    try:
+        output = await sm.switch_session(sm.SwitchSessionInput(name="draft"))
+    finally:
+        _release(proc)
+
+    assert output.startswith("❌ ERROR: Another process holds session.lock.guard")
+    assert not (workspace / "session.lock").exists()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the session overlay view
+
+Tests cover:
+- Resolution from the CoW manifest and from cached directory listings
+- Listing cache revalidation (new files, racy listings)
+- Invalidation on session.lock and session.json changes
+- Merged directory listings
+- Session-aware state paths and the resolve_paths tool
+
+Run with: pytest test_session_overlay.py -v
+"""
+
+import pytest
+import sys
+import json
+import os
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import session_overlay_utils
+from session_overlay_utils import (
+    SOURCE_SESSION,
+    SOURCE_GLOBAL,
+    get_active_overlay,
+    resolve_paths,
+    reset_overlays,
+)
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    """Global tree + workspace with active session 'draft' (cwd = tmp_path)."""
+    monkeypatch.chdir(tmp_path)
+    reset_overlays()
+    workspace = Path("workspace")
+    session = workspace / "sessions" / "draft"
+    (session / "acts" / "act-1").mkdir(parents=True)
+    (session / "workflow-state").mkdir()
+    Path("acts/act-1").mkdir(parents=True)
+    Path("acts/act-1/plan.md").write_text("global plan", encoding='utf-8')
+    Path("acts/act-1/outline.md").write_text("global outline", encoding='utf-8')
+    (session / "acts" / "act-1" / "plan.md").write_text("session plan", encoding='utf-8')
+    _write_manifest(session, ["acts/act-1/plan.md"])
+    _activate(workspace, "draft")
+    yield workspace, session
+    reset_overlays()
+
+
+def _write_manifest(session: Path, paths, deleted=()):
+    cow_files = [{"path": p, "type": "modified"} for p in paths]
+    cow_files += [{"path": p, "type": "deleted"} for p in deleted]
+    (session / "session.json").write_text(json.dumps({"name": session.name, "cow_files": cow_files}), encoding='utf-8')
+
+
+def _activate(workspace: Path, name):
+    lock = workspace / "session.lock"
+    tmp = workspace / "session.lock.tmp"
+    tmp.write_text(json.dumps({"active": name}), encoding='utf-8')
+    os.replace(tmp, lock)
+
+
+def _age(*dirs):
+    """Move directory mtimes out of the racy window so listings are cached."""
+    old = time.time() - 10
+    for d in dirs:
+        os.utime(d, (old, old))
+
+
+def _count_listdir(monkeypatch):
+    calls = []
+    real = os.listdir
+
+    def listdir(path):
+        calls.append(path)
+        return real(path)
+
+    monkeypatch.setattr(session_overlay_utils.os, "listdir", listdir)
+    return calls
+
+
+# =============================================================================
+# Tests: Resolution
+# =============================================================================
+
+def test_resolve_session_global_and_missing(tree):
+    """Test session copy, global fallback and missing files."""
+    workspace, session = tree
+    overlay = get_active_overlay(workspace)
+
+    plan, outline, missing = overlay.resolve_many(
+        ["acts/act-1/plan.md", "acts/act-1/outline.md", "acts/act-1/none.md"]
+    )
+
+    assert plan == {
+        "resolved_path": str(session / "acts/act-1/plan.md"),
+        "source": SOURCE_SESSION,
+        "exists": True,
+        "modified_in_session": True
+    }
+    assert (outline["source"], outline["exists"]) == (SOURCE_GLOBAL, True)
+    assert outline["resolved_path"] == "acts/act-1/outline.md"
+    assert (missing["source"], missing["exists"]) == (SOURCE_GLOBAL, False)
+
+
+def test_manifest_paths_need_no_listing(tree, monkeypatch):
+    """Test that manifest-tracked paths resolve without touching the file system."""
+    workspace, _ = tree
+    overlay = get_active_overlay(workspace)
+    calls = _count_listdir(monkeypatch)
+    monkeypatch.setattr(session_overlay_utils.os, "stat", lambda *a: pytest.fail("stat called"))
+
+    assert overlay.resolve("./acts/act-1/plan.md")["source"] == SOURCE_SESSION
+    assert calls == []
+
+
+def test_untracked_session_file_seen_after_listing_cached(tree, monkeypatch):
+    """Test that cached listings are reused and revalidated by directory mtime."""
+    workspace, session = tree
+    session_dir = session / "acts" / "act-1"
+    _age(session_dir, "acts/act-1")
+    overlay = get_active_overlay(workspace)
+    calls = _count_listdir(monkeypatch)
+
+    assert overlay.resolve("acts/act-1/outline.md")["source"] == SOURCE_GLOBAL
+    assert overlay.resolve("acts/act-1/outline.md")["source"] == SOURCE_GLOBAL
+    assert len(calls) == 2  # session dir + global dir, listed once each
+
+    (session_dir / "outline.md").write_text("session outline", encoding='utf-8')
+    assert overlay.resolve("acts/act-1/outline.md")["source"] == SOURCE_SESSION
+
+
+def test_racy_listing_is_not_cached(tree, monkeypatch):
+    """Test that a listing scanned right after a directory change is rescanned."""
+    workspace, session = tree
+    overlay = get_active_overlay(workspace)
+    calls = _count_listdir(monkeypatch)
+
+    overlay.resolve("acts/act-1/outline.md")
+    overlay.resolve("acts/act-1/outline.md")
+
+    assert len(calls) == 4
+
+
+def test_batch_validates_each_directory_once(tree, monkeypatch):
+    """Test that resolve_many lists each directory once per call."""
+    workspace, _ = tree
+    overlay = get_active_overlay(workspace)
+    calls = _count_listdir(monkeypatch)
+
+    overlay.resolve_many([f"acts/act-1/file-{n}.md" for n in range(50)])
+
+    assert len(calls) == 2
+
+
+# =============================================================================
+# Tests: Invalidation
+# =============================================================================
+
+def test_lock_change_switches_overlay(tree):
+    """Test that overlays follow session.lock (switch and clear)."""
+    workspace, _ = tree
+    first = get_active_overlay(workspace)
+    assert get_active_overlay(workspace) is first
+
+    (workspace / "sessions" / "other").mkdir()
+    _activate(workspace, "other")
+    assert get_active_overlay(workspace).name == "other"
+
+    _activate(workspace, "draft")
+    assert get_active_overlay(workspace).name == "draft"
+
+    (workspace / "session.lock").unlink()
+    assert get_active_overlay(workspace) is None
+    assert resolve_paths(None, ["acts/act-1/plan.md"])[0]["source"] == SOURCE_GLOBAL
+
+
+def test_manifest_reloaded_on_change(tree):
+    """Test that manifest changes (including deletions) are picked up."""
+    workspace, session = tree
+    overlay = get_active_overlay(workspace)
+    assert overlay.manifest == {"acts/act-1/plan.md"}
+
+    _write_manifest(session, ["acts/act-1/plan.md", "acts/act-1/new.md"], deleted=["acts/act-1/old.md"])
+    assert get_active_overlay(workspace).manifest == {"acts/act-1/plan.md", "acts/act-1/new.md"}
+
+
+def test_list_dir_merges_session_over_global(tree):
+    """Test merged listings: session entries shadow global ones."""
+    workspace, session = tree
+    _write_manifest(session, ["acts/act-1/plan.md", "acts/act-1/tracked.md"])
+    overlay = get_active_overlay(workspace)
+
+    entries = {e["name"]: e["source"] for e in overlay.list_dir("acts/act-1")}
+
+    assert entries == {"plan.md": SOURCE_SESSION, "tracked.md": SOURCE_SESSION, "outline.md": SOURCE_GLOBAL}
+
+
+# =============================================================================
+# Tests: Integration
+# =============================================================================
+
+def test_state_paths_follow_overlay(tree, monkeypatch):
+    """Test generation and workflow state path resolution through the overlay."""
+    import generation_state_mcp as gsm
+    import workflow_utils
+
+    workspace, session = tree
+    monkeypatch.setattr(gsm, "WORKSPACE_PATH", workspace)
+    monkeypatch.setattr(gsm, "SESSIONS_PATH", workspace / "sessions")
+    monkeypatch.setattr(gsm, "SESSION_LOCK_FILE", workspace / "session.lock")
+    monkeypatch.setattr(workflow_utils, "WORKSPACE_PATH", workspace)
+    monkeypatch.setattr(workflow_utils, "SESSIONS_PATH", workspace / "sessions")
+    monkeypatch.setattr(workflow_utils, "GLOBAL_WORKFLOW_STATE_DIR", workspace / "workflow-state")
+
+    (workspace / "generation-state-0101.json").write_text("{}", encoding='utf-8')
+    assert gsm._get_state_file_path("0101") == workspace / "generation-state-0101.json"
+    assert gsm._get_state_file_path("0102") == session / "generation-state-0102.json"
+    (session / "generation-state-0101.json").write_text("{}", encoding='utf-8')
+    assert gsm._get_state_file_path("0101") == session / "generation-state-0101.json"
+
+    assert workflow_utils._get_workflow_state_path("wf-1") == workspace / "workflow-state" / "wf-1.json"
+    (session / "workflow-state" / "wf-1.json").write_text("{}", encoding='utf-8')
+    assert workflow_utils._get_workflow_state_path("wf-1") == session / "workflow-state" / "wf-1.json"
+
+
+async def test_resolve_paths_tool(tree, monkeypatch):
+    """Test resolve_paths output and continuation of truncated responses."""
+    import session_utils
+    import session_management_mcp as sm
+
+    workspace, session = tree
+    for module in (sm, session_utils):
+        monkeypatch.setattr(module, "WORKSPACE_PATH", workspace)
+        monkeypatch.setattr(module, "SESSIONS_PATH", workspace / "sessions")
+        monkeypatch.setattr(module, "SESSION_LOCK_FILE", workspace / "session.lock")
+
+    result = json.loads(await sm.resolve_paths(sm.ResolvePathsInput(paths=["acts/act-1/plan.md", "acts/act-1/outline.md"])))
+    assert result["session_active"] and result["session_name"] == "draft"
+    assert [(r["path"], r["source"]) for r in result["results"]] == [
+        ("acts/act-1/plan.md", SOURCE_SESSION), ("acts/act-1/outline.md", SOURCE_GLOBAL)
+    ]
+    assert result["next_cursor"] is None
+
+    paths = [f"acts/act-1/{'x' * 400}-{n}.md" for n in range(100)]
+    params = sm.ResolvePathsInput(paths=paths)
+    seen = []
+    while True:
+        page = json.loads(await sm.resolve_paths(params))
+        seen += [r["path"] for r in page["results"]]
+        if not page["next_cursor"]:
+            break
+        params = sm.ResolvePathsInput(paths=paths, cursor=page["next_cursor"])
+    assert seen == paths
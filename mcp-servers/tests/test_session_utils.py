@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Unit tests for session management utilities
+
+Tests cover:
+- Keyed CoW tracking index (change lists, incremental stats)
+- Batched session.json flushes (count, idle timer, SIGTERM) and read-your-writes
+- Migration of existing session.json files
+
+Run with: pytest test_session_utils.py -v
+"""
+
+import pytest
+import sys
+import json
+import signal
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import session_utils
+from session_utils import (
+    CowIndex,
+    SESSION_FORMAT_VERSION,
+    _add_cow_file,
+    _load_session_data,
+    _save_session_data,
+    _flush_cow_index,
+    _discard_cow_index,
+    _migrate_session_data,
+    _migrate_sessions,
+)
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+def _legacy_session(name: str) -> dict:
+    return {
+        "name": name,
+        "status": "ACTIVE",
+        "cow_files": [],
+        "changes": {"modified": [], "created": [], "deleted": []},
+        "human_retries": [],
+        "stats": {"total_files_changed": 0, "session_size_bytes": 0}
+    }
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    """Temporary sessions directory with one session named 'draft'."""
+    sessions_path = tmp_path / "sessions"
+    monkeypatch.setattr(session_utils, 'SESSIONS_PATH', sessions_path)
+    monkeypatch.setattr(session_utils, '_cow_indexes', {})
+    monkeypatch.setattr(session_utils, '_cow_flush_timers', {})
+    (sessions_path / "draft").mkdir(parents=True)
+    (sessions_path / "draft" / "session.json").write_text(
+        json.dumps(_legacy_session("draft")), encoding='utf-8'
+    )
+    return sessions_path
+
+
+def _on_disk(sessions_path: Path, name: str = "draft") -> dict:
+    return json.loads((sessions_path / name / "session.json").read_text(encoding='utf-8'))
+
+
+# =============================================================================
+# Tests: CoW Tracking
+# =============================================================================
+
+def test_track_updates_change_lists_and_stats(sessions):
+    """Test new files, type changes and repeated tracking."""
+    (sessions / "draft" / "acts").mkdir()
+    (sessions / "draft" / "acts" / "a.md").write_text("12345", encoding='utf-8')
+
+    _add_cow_file("draft", "acts/a.md", "created")
+    _add_cow_file("draft", "acts/b.md", "modified")
+    _add_cow_file("draft", "acts/a.md", "modified")
+    _add_cow_file("draft", "acts/a.md", "modified")
+
+    data = _load_session_data("draft")
+    assert [f["path"] for f in data["cow_files"]] == ["acts/a.md", "acts/b.md"]
+    assert data["changes"] == {"modified": ["acts/b.md", "acts/a.md"], "created": [], "deleted": []}
+    assert data["stats"] == {"total_files_changed": 2, "session_size_bytes": 5}
+    assert data["cow_files"][0]["type"] == "modified" and "updated_at" in data["cow_files"][0]
+
+
+def test_flush_is_batched(sessions, monkeypatch):
+    """Test that session.json is written once per batch, and readers see pending changes."""
+    monkeypatch.setattr(session_utils, 'COW_FLUSH_MAX_PENDING', 10)
+    writes = []
+    original = session_utils.atomic_write_json
+    monkeypatch.setattr(session_utils, 'atomic_write_json', lambda *a, **kw: writes.append(a[0]) or original(*a, **kw))
+
+    for n in range(25):
+        _add_cow_file("draft", f"acts/{n}.md", "modified")
+
+    assert len(writes) == 2
+    assert _on_disk(sessions)["stats"]["total_files_changed"] == 20
+
+    # Reading flushes the remaining changes
+    assert _load_session_data("draft")["stats"]["total_files_changed"] == 25
+    assert _on_disk(sessions)["stats"]["total_files_changed"] == 25
+
+
+def test_idle_session_is_flushed_after_delay(sessions, monkeypatch):
+    """Test that pending changes of an idle session reach disk after COW_FLUSH_MAX_DELAY."""
+    monkeypatch.setattr(session_utils, 'COW_FLUSH_MAX_DELAY', 0.05)
+    _add_cow_file("draft", "acts/a.md", "modified")
+    assert _on_disk(sessions)["stats"]["total_files_changed"] == 0
+
+    deadline = time.monotonic() + 5
+    while _on_disk(sessions)["stats"]["total_files_changed"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert _on_disk(sessions)["changes"]["modified"] == ["acts/a.md"]
+    assert session_utils._cow_indexes["draft"].pending == []
+
+
+def test_sigterm_flushes_pending_changes(sessions, monkeypatch):
+    """Test that the SIGTERM handler flushes before re-sending the signal."""
+    handlers = {}
+    monkeypatch.setattr(session_utils.signal, 'signal', lambda signum, handler: handlers.setdefault(signum, handler))
+    kills = []
+    monkeypatch.setattr(session_utils.os, 'kill', lambda pid, signum: kills.append(signum))
+
+    session_utils.install_sigterm_flush()
+    _add_cow_file("draft", "acts/a.md", "modified")
+    handlers[signal.SIGTERM](signal.SIGTERM, None)
+
+    assert _on_disk(sessions)["changes"]["modified"] == ["acts/a.md"]
+    assert kills == [signal.SIGTERM]
+
+
+def test_full_save_keeps_pending_changes(sessions):
+    """Test that saving stale session data does not drop unflushed tracking."""
+    data = _load_session_data("draft")
+    _add_cow_file("draft", "acts/a.md", "created")
+
+    data["human_retries"].append({"file": "acts/a.md", "retry_number": 1})
+    _save_session_data("draft", data)
+
+    saved = _on_disk(sessions)
+    assert saved["human_retries"] == [{"file": "acts/a.md", "retry_number": 1}]
+    assert saved["changes"]["created"] == ["acts/a.md"]
+
+
+def test_external_change_is_reloaded(sessions):
+    """Test that pending changes are replayed onto a session.json changed on disk."""
+    _add_cow_file("draft", "acts/a.md", "modified")
+    _flush_cow_index("draft")
+    _add_cow_file("draft", "acts/b.md", "modified")
+
+    external = _on_disk(sessions)
+    external["description"] = "edited by another process"
+    (sessions / "draft" / "session.json").write_text(json.dumps(external), encoding='utf-8')
+
+    _add_cow_file("draft", "acts/c.md", "deleted")
+    data = _load_session_data("draft")
+
+    assert data["description"] == "edited by another process"
+    assert [f["path"] for f in data["cow_files"]] == ["acts/a.md", "acts/b.md", "acts/c.md"]
+
+
+def test_discarded_session_is_not_recreated(sessions):
+    """Test that pending changes of a removed session are dropped."""
+    _add_cow_file("draft", "acts/a.md", "modified")
+    _discard_cow_index("draft")
+    session_utils._flush_all_cow_indexes()
+
+    assert _on_disk(sessions)["cow_files"] == []
+
+
+# =============================================================================
+# Tests: Migration
+# =============================================================================
+
+def test_migrate_legacy_session_data():
+    """Test normalization of duplicated / inconsistent legacy tracking data."""
+    legacy = _legacy_session("old")
+    legacy["cow_files"] = [
+        {"path": "a.md", "type": "modified", "copied_at": "t1", "size_bytes": 10},
+        {"path": "b.md", "type": "created", "copied_at": "t2", "size_bytes": 5},
+        {"path": "a.md", "type": "deleted", "copied_at": "t3", "size_bytes": 7},
+    ]
+    legacy["changes"] = {"modified": ["a.md"], "created": ["b.md"], "deleted": ["a.md"]}
+    legacy["stats"] = {"total_files_changed": 3, "session_size_bytes": 22, "custom": 1}
+
+    migrated, changed = _migrate_session_data(legacy)
+
+    assert changed
+    assert migrated["format_version"] == SESSION_FORMAT_VERSION
+    assert [f["path"] for f in migrated["cow_files"]] == ["b.md", "a.md"]
+    assert migrated["changes"] == {"modified": [], "created": ["b.md"], "deleted": ["a.md"]}
+    assert migrated["stats"] == {"total_files_changed": 2, "session_size_bytes": 12, "custom": 1}
+    assert _migrate_session_data(migrated) == (migrated, False)
+
+
+def test_migrate_sessions_rewrites_old_files(sessions):
+    """Test startup migration of all sessions; corrupted ones are skipped."""
+    (sessions / "broken").mkdir()
+    (sessions / "broken" / "session.json").write_text("{not json", encoding='utf-8')
+
+    assert _migrate_sessions() == 1
+    assert _on_disk(sessions)["format_version"] == SESSION_FORMAT_VERSION
+    assert _migrate_sessions() == 0
+
+
+def test_index_roundtrip_preserves_other_keys():
+    """Test that CowIndex keeps unrelated session keys untouched."""
+    data = _legacy_session("x")
+    data["description"] = "desc"
+
+    out = CowIndex(data).to_session_data()
+
+    assert out["description"] == "desc" and out["human_retries"] == []
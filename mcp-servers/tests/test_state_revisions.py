@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Unit tests for generation state revisions (optimistic concurrency)
+
+Tests cover:
+- Revision counter and compare-and-swap saves
+- Cross-thread file lock (reentrancy, timeout)
+- Merge-and-retry of concurrent tool calls (no lost updates, 50 writers)
+- Writers in several processes
+- Pessimistic fallback after exhausted retries
+
+Run with: pytest test_state_revisions.py -v
+"""
+
+import pytest
+import sys
+import inspect
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import generation_state_mcp as gsm
+from file_lock_utils import file_lock, FileLockTimeout
+from generation_state_mcp import (
+    StateCache,
+    StateConflictError,
+    StartGenerationInput,
+    StartStepInput,
+    CompleteStepInput,
+    FailStepInput,
+    LogQuestionAnswerInput,
+    GetGenerationStatusInput,
+    VALID_STEP_NAMES,
+    _load_state_file,
+    _save_state_file,
+)
+from generation_catalog_utils import close_catalog_connections
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+def _use_workspace(workspace: Path) -> None:
+    gsm.WORKSPACE_PATH = workspace
+    gsm.SESSIONS_PATH = workspace / "sessions"
+    gsm.SESSION_LOCK_FILE = workspace / "session.lock"
+    gsm._state_cache = StateCache()
+
+
+@pytest.fixture
+def temp_workspace(tmp_path, monkeypatch):
+    """Generation state in a temporary workspace."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    for name in ('WORKSPACE_PATH', 'SESSIONS_PATH', 'SESSION_LOCK_FILE', '_state_cache'):
+        monkeypatch.setattr(gsm, name, getattr(gsm, name))
+    _use_workspace(workspace)
+    yield workspace
+    close_catalog_connections()
+
+
+def _sync(tool):
+    """Blocking body of a tool (with revision retry, without executor and asyncio lock)."""
+    return inspect.unwrap(tool, stop=lambda f: not inspect.iscoroutinefunction(f))
+
+
+def _started(scene_id: str = "0101") -> None:
+    _sync(gsm.start_generation)(StartGenerationInput(
+        scene_id=scene_id, blueprint_path=f"acts/act-1/scenes/scene-{scene_id}-blueprint.md", initiated_by="test"
+    ))
+    _sync(gsm.start_step)(StartStepInput(scene_id=scene_id, step_name=VALID_STEP_NAMES[0]))
+
+
+def _writer(n: int) -> str:
+    if n % 2:
+        return _sync(gsm.log_question_answer)(LogQuestionAnswerInput(
+            scene_id="0101", question=f"Question {n}?", answer="Yes"
+        ))
+    return _sync(gsm.fail_step)(FailStepInput(
+        scene_id="0101", step_name=VALID_STEP_NAMES[n % len(VALID_STEP_NAMES)], failure_reason=f"Error {n}"
+    ))
+
+
+def _write_from_process(workspace: str, first: int, count: int) -> None:
+    """Process entry point: count concurrent writers on scene 0101."""
+    _use_workspace(Path(workspace))
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        list(executor.map(_writer, range(first, first + count)))
+
+
+# =============================================================================
+# Tests: Revisions and Lock
+# =============================================================================
+
+async def test_revision_increments_and_stale_save_conflicts(temp_workspace):
+    """Test that each save bumps the revision and a stale copy cannot be saved."""
+    _started()
+    state = _load_state_file("0101")
+    assert state['revision'] == 2
+
+    stale = _load_state_file("0101")
+    state['errors'].append({"message": "first"})
+    _save_state_file("0101", state)
+    assert state['revision'] == 3
+
+    stale['errors'].append({"message": "lost"})
+    with pytest.raises(StateConflictError) as conflict:
+        _save_state_file("0101", stale)
+    assert (conflict.value.expected, conflict.value.current) == (2, 3)
+
+    gsm._state_cache.clear()
+    assert [e['message'] for e in _load_state_file("0101")['errors']] == ["first"]
+    assert "**Revision**: 3" in await gsm.get_generation_status(GetGenerationStatusInput(scene_id="0101"))
+
+
+def test_file_lock_is_reentrant_and_exclusive(tmp_path):
+    """Test that the owner can re-enter and another thread times out."""
+    lock_path = tmp_path / "generation-state-0101.lock"
+    result = []
+
+    def contender():
+        try:
+            with file_lock(lock_path, timeout=0.05):
+                result.append("acquired")
+        except FileLockTimeout:
+            result.append("timeout")
+
+    with file_lock(lock_path):
+        with file_lock(lock_path):
+            thread = threading.Thread(target=contender)
+            thread.start()
+            thread.join()
+
+    assert result == ["timeout"]
+    contender()
+    assert result == ["timeout", "acquired"]
+
+
+# =============================================================================
+# Tests: Concurrent Writers
+# =============================================================================
+
+def test_fifty_concurrent_writers_lose_nothing(temp_workspace):
+    """Test that 50 threads appending Q&A and errors all persist."""
+    _started()
+
+    with ThreadPoolExecutor(max_workers=50) as executor:
+        outputs = list(executor.map(_writer, range(50)))
+
+    assert not [o for o in outputs if "ERROR" in o]
+    gsm._state_cache.clear()
+    state = _load_state_file("0101")
+    assert len(state['user_questions']) == 25
+    assert len(state['errors']) == 25
+    assert state['revision'] == 52
+
+
+def test_concurrent_transition_is_revalidated(temp_workspace):
+    """Test that a losing complete_step sees the winner's result instead of overwriting it."""
+    _started()
+    params = CompleteStepInput(scene_id="0101", step_name=VALID_STEP_NAMES[0], duration_seconds=1.0)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        outputs = list(executor.map(lambda _: _sync(gsm.complete_step)(params), range(8)))
+
+    assert sum("✅ STEP COMPLETED" in o for o in outputs) == 1
+    assert sum("already COMPLETED" in o for o in outputs) == 7
+    assert _load_state_file("0101")['revision'] == 3
+
+
+def test_writers_in_several_processes(temp_workspace):
+    """Test 2 processes x 25 threads writing one scene through the lock file."""
+    _started()
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_write_from_process, args=(str(temp_workspace), n * 25, 25))
+        for n in range(2)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    gsm._state_cache.clear()
+    state = _load_state_file("0101")
+    assert len(state['user_questions']) == 25
+    assert len(state['errors']) == 25
+    assert state['revision'] == 52
+
+
+def test_pessimistic_fallback(temp_workspace, monkeypatch):
+    """Test that writers still succeed when no optimistic attempt is allowed."""
+    monkeypatch.setattr(gsm, "STATE_CAS_RETRIES", 0)
+    _started()
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(_writer, range(1, 20, 2)))
+
+    assert len(_load_state_file("0101")['user_questions']) == 10
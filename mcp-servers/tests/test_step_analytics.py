@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Unit tests for step timing analytics
+
+Tests cover:
+- Percentiles and timing summaries of generation / workflow states
+- get_step_timing_report over the catalog (durations, retry rates,
+  failure reasons, approval waits, since filter)
+- Reports served from the index without re-reading unchanged states
+- Migration of catalogs created before the timings column
+
+Run with: pytest test_step_analytics.py -v
+"""
+
+import pytest
+import sys
+import json
+import sqlite3
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import generation_state_mcp as gsm
+import workflow_utils
+import workflow_orchestration_mcp
+from generation_state_mcp import (
+    StateCache,
+    StartGenerationInput,
+    StartStepInput,
+    CompleteStepInput,
+    FailStepInput,
+    RetryStepInput,
+    GetStepTimingReportInput,
+    VALID_STEP_NAMES,
+    start_generation,
+    start_step,
+    complete_step,
+    fail_step,
+    retry_step,
+    get_step_timing_report,
+)
+from generation_catalog_utils import close_catalog_connections, query_timings
+from step_analytics_utils import percentile, summarize_generation, summarize_workflow
+
+
+STEP_1, STEP_2 = VALID_STEP_NAMES[:2]
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def temp_workspace(tmp_path, monkeypatch):
+    """Empty workspace for generation and workflow states."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(gsm, 'WORKSPACE_PATH', workspace)
+    monkeypatch.setattr(gsm, 'SESSIONS_PATH', workspace / "sessions")
+    monkeypatch.setattr(gsm, 'SESSION_LOCK_FILE', workspace / "session.lock")
+    monkeypatch.setattr(gsm, '_state_cache', StateCache())
+    yield workspace
+    close_catalog_connections()
+
+
+async def _generation(scene_id, durations, failures=()):
+    """Run the first steps of a generation with the given durations and failure reasons on step 1."""
+    await start_generation(StartGenerationInput(
+        scene_id=scene_id, blueprint_path=f"acts/act-1/scenes/scene-{scene_id}-blueprint.md"
+    ))
+    await start_step(StartStepInput(scene_id=scene_id, step_name=STEP_1))
+    for reason in failures:
+        await fail_step(FailStepInput(scene_id=scene_id, step_name=STEP_1, failure_reason=reason))
+        await retry_step(RetryStepInput(scene_id=scene_id, step_name=STEP_1))
+        await start_step(StartStepInput(scene_id=scene_id, step_name=STEP_1))
+    for step_name, duration in zip(VALID_STEP_NAMES, durations):
+        if step_name != STEP_1:
+            await start_step(StartStepInput(scene_id=scene_id, step_name=step_name))
+        await complete_step(CompleteStepInput(scene_id=scene_id, step_name=step_name, duration_seconds=duration))
+
+
+def _workflow_state(workspace, workflow_id, created_at, wait_start, approved_at):
+    state = {
+        "workflow_id": workflow_id,
+        "workflow_type": "generation",
+        "status": "in_progress",
+        "created_at": created_at,
+        "generation": {"current_step": 4, "steps": [
+            {"step": 3, "name": "Verification Plan", "status": "completed",
+             "started_at": "2026-10-01T10:00:00+00:00", "waiting_since": wait_start, "completed_at": approved_at},
+            {"step": 4, "name": "Generation", "status": "in_progress", "started_at": approved_at},
+        ]},
+    }
+    path = workspace / "workflow-state" / f"{workflow_id}.json"
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(json.dumps(state))
+
+
+async def _report(**kwargs):
+    return json.loads(await get_step_timing_report(GetStepTimingReportInput(response_format='json', **kwargs)))
+
+
+# =============================================================================
+# Tests: Summaries
+# =============================================================================
+
+def test_percentile_interpolates():
+    """Test linear interpolation between closest ranks."""
+    assert percentile([], 50) is None
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([10.0, 20.0], 90) == pytest.approx(19.0)
+
+
+def test_summaries():
+    """Test reduction of generation and workflow states to timing summaries."""
+    summary = summarize_generation({
+        "workflow_status": "COMPLETED",
+        "metadata": {"total_duration_seconds": 300},
+        "steps": {
+            STEP_1: {"status": "COMPLETED", "duration_seconds": 12.0},
+            STEP_2: {"status": "COMPLETED", "started_at": "2026-10-01T10:00:00Z",
+                     "completed_at": "2026-10-01T10:01:30Z"},
+        },
+        "errors": [{"step": STEP_1, "message": "Missing constraint\nDetails..."}],
+    })
+    assert summary == {
+        "steps": {STEP_1: ["COMPLETED", 12.0, 1], STEP_2: ["COMPLETED", 90.0, 0]},
+        "failures": [[STEP_1, "Missing constraint"]],
+        "total": 300,
+    }
+
+    workflow = summarize_workflow({"workflow_type": "generation", "generation": {"steps": [
+        {"step": 3, "name": "Verification Plan", "status": "waiting_approval",
+         "started_at": "2026-10-01T10:00:00Z", "waiting_since": "2026-10-01T10:05:00Z"},
+    ]}})
+    assert workflow == {"type": "generation", "steps": {"3. Verification Plan": ["waiting_approval", None, None]}}
+
+
+# =============================================================================
+# Tests: Report
+# =============================================================================
+
+async def test_report_aggregates_generations_and_workflows(temp_workspace):
+    """Test percentiles, retry rate, failure histogram and approval waits."""
+    await _generation("0101", [10, 100])
+    await _generation("0102", [20, 200], failures=["Blueprint missing", "Blueprint missing"])
+    await _generation("0103", [30], failures=["Timeout"])
+    _workflow_state(temp_workspace, "gen-0101", "2026-10-01T09:00:00+00:00",
+                    "2026-10-01T10:05:00+00:00", "2026-10-01T10:35:00+00:00")
+    _workflow_state(temp_workspace, "gen-0102", "2026-10-02T09:00:00+00:00",
+                    "2026-10-02T10:05:00+00:00", "2026-10-02T11:05:00+00:00")
+
+    report = await _report()
+
+    assert (report['generations'], report['workflows']) == (3, 2)
+    first, second = report['steps']
+    assert first['step'] == STEP_1
+    assert (first['runs'], first['p50'], first['p90'], first['p99']) == (3, 20.0, 28.0, 29.8)
+    assert (first['failures'], first['retry_rate']) == (3, 0.667)
+    assert (second['count'], second['total_seconds'], second['share']) == (2, 300.0, 83.3)
+    assert report['failure_reasons'] == [{"reason": "Blueprint missing", "count": 2},
+                                         {"reason": "Timeout", "count": 1}]
+    assert report['approval_waits'] == [{
+        "workflow_type": "generation", "step": "3. Verification Plan", "count": 2, "total_seconds": 5400.0,
+        "mean": 2700.0, "p50": 2700.0, "p90": 3420.0, "p99": 3582.0,
+    }]
+
+    recent = await _report(since="2026-10-02")
+    assert recent['workflows'] == 1 and recent['generations'] == 3
+
+    text = await get_step_timing_report(GetStepTimingReportInput())
+    assert "⏱️ STEP TIMING REPORT (3 generations, 2 workflows)" in text
+    assert f"| {STEP_1} | 3 | 3 | 20s | 28s | 29s | 1m 0s | 16.7% | 3 | 66.7% |" in text
+    assert "| generation | 3. Verification Plan | 2 | 45m 0s |" in text
+    assert "2× Blueprint missing" in text
+
+
+async def test_report_uses_index_not_state_files(temp_workspace, monkeypatch):
+    """Test that unchanged states are not re-read and no directory glob is used."""
+    await _generation("0101", [10])
+    await _report()
+
+    reads = []
+    original = gsm._read_state_path
+    monkeypatch.setattr(gsm, '_read_state_path', lambda *a, **kw: reads.append(a) or original(*a, **kw))
+    monkeypatch.setattr(gsm, '_list_state_files', lambda: pytest.fail("state files globbed"))
+    gsm._state_cache.clear()
+
+    assert (await _report())['steps'][0]['count'] == 1
+    assert reads == []
+
+    await start_step(StartStepInput(scene_id="0101", step_name=STEP_2))
+    assert [step['step'] for step in (await _report())['steps']] == [STEP_1, STEP_2]
+
+
+async def test_catalog_without_timings_is_migrated(temp_workspace):
+    """Test that rows indexed before the timings column are re-read."""
+    await _generation("0101", [10])
+    close_catalog_connections()
+    db_path = temp_workspace / "generation-catalog.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript("""
+        ALTER TABLE generation_catalog RENAME TO old;
+        CREATE TABLE generation_catalog (
+            location TEXT NOT NULL, scene_id TEXT NOT NULL, status TEXT, current_step TEXT,
+            started_at TEXT, updated_at TEXT, signature TEXT NOT NULL, PRIMARY KEY (location, scene_id)
+        );
+        INSERT INTO generation_catalog
+            SELECT location, scene_id, status, current_step, started_at, updated_at, signature FROM old;
+        DROP TABLE old;
+    """)
+    conn.close()
+
+    assert query_timings(db_path, None) == ([], [])
+    assert (await _report())['steps'][0]['p50'] == 10.0
+
+
+def test_waiting_approval_is_timestamped(tmp_path, monkeypatch):
+    """Test that update_workflow_state records when a checkpoint starts waiting."""
+    monkeypatch.setattr(workflow_utils, 'WORKSPACE_PATH', tmp_path)
+    monkeypatch.setattr(workflow_utils, 'GLOBAL_WORKFLOW_STATE_DIR', tmp_path / "workflow-state")
+    monkeypatch.setattr(workflow_utils, 'SESSIONS_PATH', tmp_path / "sessions")
+    _workflow_state(tmp_path, "gen-0101", "2026-10-01T09:00:00+00:00", None, None)
+
+    result = workflow_orchestration_mcp.update_workflow_state("gen-0101", step=4, status="waiting_approval")
+    assert result['success'] is True
+
+    state = json.loads((tmp_path / "workflow-state" / "gen-0101.json").read_text())
+    assert state['generation']['steps'][1]['waiting_since']
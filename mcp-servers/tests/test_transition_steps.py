@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the transition_steps batch tool
+
+Tests cover:
+- Complete + start in one call (one journal event, one revision)
+- All-or-nothing: a failing operation leaves the state untouched
+- fail / retry / log_question / set_artifacts operations
+- Input validation and text output
+
+Run with: pytest test_transition_steps.py -v
+"""
+
+import pytest
+import sys
+import json
+from pathlib import Path
+
+from pydantic import ValidationError
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import generation_state_mcp as gsm
+from generation_state_mcp import (
+    StateCache,
+    StartGenerationInput,
+    StartStepInput,
+    StepOperation,
+    TransitionStepsInput,
+    VALID_STEP_NAMES,
+    start_generation,
+    start_step,
+    transition_steps,
+    _load_state_file,
+)
+from generation_catalog_utils import close_catalog_connections
+from state_journal_utils import read_events
+
+
+STEP_1, STEP_2 = VALID_STEP_NAMES[:2]
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+async def scene(tmp_path, monkeypatch):
+    """Scene 0101 with its first step IN_PROGRESS."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(gsm, 'WORKSPACE_PATH', workspace)
+    monkeypatch.setattr(gsm, 'SESSIONS_PATH', workspace / "sessions")
+    monkeypatch.setattr(gsm, 'SESSION_LOCK_FILE', workspace / "session.lock")
+    monkeypatch.setattr(gsm, '_state_cache', StateCache())
+
+    await start_generation(StartGenerationInput(
+        scene_id="0101", blueprint_path="acts/act-1/scenes/scene-0101-blueprint.md", initiated_by="test"
+    ))
+    await start_step(StartStepInput(scene_id="0101", step_name=STEP_1))
+    yield workspace / "generation-state-0101.events.jsonl"
+    close_catalog_connections()
+
+
+async def _transition(*operations, response_format='json'):
+    output = await transition_steps(TransitionStepsInput(
+        scene_id="0101", operations=list(operations), response_format=response_format
+    ))
+    return json.loads(output) if response_format == 'json' else output
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+async def test_complete_and_start_in_one_save(scene):
+    """Test that complete N + start N+1 is one journal event and one revision."""
+    events_before = len(read_events(scene))
+
+    result = await _transition(
+        {"op": "complete", "step_name": STEP_1, "duration_seconds": 12.5, "artifacts": {"files": "a.json"}},
+        {"op": "start", "step_name": STEP_2},
+    )
+
+    assert result == {
+        "scene_id": "0101", "ok": True, "revision": 3, "workflow_status": "IN_PROGRESS",
+        "current_step": STEP_2, "next_step": None,
+        "results": [{"op": "complete", "step": STEP_1, "result": "completed"},
+                    {"op": "start", "step": STEP_2, "result": "started"}],
+    }
+    events = read_events(scene)
+    assert len(events) == events_before + 1 and events[-1]['type'] == "steps_transitioned"
+    state = _load_state_file("0101")
+    assert state['steps'][STEP_1]['duration_seconds'] == 12.5
+    assert state['artifacts']['files'] == "a.json"
+
+
+async def test_failing_operation_applies_nothing(scene):
+    """Test that an invalid operation rolls back the whole batch."""
+    before = _load_state_file("0101")
+
+    result = await _transition(
+        {"op": "complete", "step_name": STEP_1, "duration_seconds": 1},
+        {"op": "log_question", "question": "Tone?", "answer": "Dry"},
+        {"op": "start", "step_name": STEP_1},
+    )
+
+    assert result == {"scene_id": "0101", "ok": False, "failed_op": 2, "op": "start",
+                      "error": "Step order violation"}
+    assert _load_state_file("0101") == before
+
+
+async def test_fail_retry_and_bookkeeping_operations(scene):
+    """Test fail → retry → start plus Q&A and artifacts in one batch."""
+    result = await _transition(
+        {"op": "fail", "step_name": STEP_1, "failure_reason": "validator rejected"},
+        {"op": "retry", "step_name": STEP_1, "metadata": {"attempt_number": 2}},
+        {"op": "log_question", "question": "Keep the dock scene?", "answer": "Yes"},
+        {"op": "set_artifacts", "artifacts": {"draft": "draft-2.md"}},
+        {"op": "start", "step_name": STEP_1},
+        {"op": "complete", "step_name": STEP_1, "duration_seconds": 3},
+        {"op": "complete", "step_name": STEP_1, "duration_seconds": 3},
+    )
+
+    assert [r['result'] for r in result['results']] == \
+        ["failed", "pending", "logged", "set", "started", "completed", "unchanged"]
+    assert result['next_step'] == STEP_2
+    state = _load_state_file("0101")
+    assert state['errors'][-1]['message'] == "validator rejected"
+    assert state['user_questions'][-1]['answer'] == "Yes"
+    assert state['artifacts']['draft'] == "draft-2.md"
+
+
+def test_operation_validation():
+    """Test required fields per operation and step name validation."""
+    with pytest.raises(ValidationError, match="requires: duration_seconds"):
+        StepOperation(op="complete", step_name=STEP_1)
+    with pytest.raises(ValidationError, match="Invalid step_name"):
+        StepOperation(op="start", step_name="scene:gen:unknown")
+    with pytest.raises(ValidationError):
+        TransitionStepsInput(scene_id="0101", operations=[])
+
+
+async def test_text_output(scene):
+    """Test the markdown rendering of a batch and of a failure."""
+    text = await _transition(
+        {"op": "complete", "step_name": STEP_1, "duration_seconds": 1},
+        response_format='text',
+    )
+    assert "✅ TRANSITIONS APPLIED: Scene 0101 (1 operations)" in text
+    assert f"**Next step**: {STEP_2}" in text
+
+    failure = await _transition({"op": "retry", "step_name": STEP_1}, response_format='text')
+    assert "not FAILED" in failure and "no operation was applied" in failure
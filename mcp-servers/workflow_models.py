@@ -9,10 +9,12 @@ This module contains:
 - Input validation models for all MCP tools
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from enum import Enum
 from pydantic import BaseModel, Field, ConfigDict
 
+from pagination_utils import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
 
 # Enums
 
@@ -304,6 +306,20 @@ class ListWorkflowsInput(BaseModel):
         default=None,
         description="Filter by session name"
     )
+    limit: int = Field(
+        default=DEFAULT_PAGE_SIZE,
+        description="Maximum workflows per page",
+        ge=1,
+        le=MAX_PAGE_SIZE
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="next_cursor from the previous page (omit for first page)"
+    )
+    fields: Optional[List[str]] = Field(
+        default=None,
+        description="Columns to return (default: all)"
+    )
 
 
 class ResumeWorkflowInput(BaseModel):
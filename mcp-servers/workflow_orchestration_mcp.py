@@ -11,6 +11,7 @@ Features:
 - Recovery/resume after failures
 - Integration with session management
 - Parallel execution tracking
+- Optional Prometheus metrics (see metrics_utils)
 
 Tools:
 - get_workflow_status: Get current workflow state
@@ -25,6 +26,8 @@ Tools:
 
 from typing import Dict, Any, List, Optional
 from pathlib import Path
+from datetime import datetime, timezone
+import json
 
 from mcp.server.fastmcp import FastMCP
 
@@ -57,10 +60,25 @@ from workflow_utils import (
     _get_step_definition,
     _calculate_progress
 )
+from pagination_utils import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    CursorError,
+    query_fingerprint,
+    paginate,
+    select_fields,
+    fit_json_page
+)
+from metrics_utils import instrument_tools, start_metrics_exporters
+
+
+# Columns of list_workflows rows
+WORKFLOW_LIST_FIELDS = ["workflow_id", "workflow_type", "status", "progress_percentage", "created_at", "updated_at"]
 
 
 # Initialize FastMCP server
 mcp = FastMCP("workflow-orchestration")
+instrument_tools(mcp, "workflow_orchestration")
 
 
 # MCP Tools
@@ -441,6 +459,9 @@ def update_workflow_state(
 
                 if status == "in_progress" and not step_data.get("started_at"):
                     step_data["started_at"] = datetime.now(timezone.utc).isoformat()
+                elif status == "waiting_approval" and not step_data.get("waiting_since"):
+                    # Start of the human approval wait (see get_step_timing_report)
+                    step_data["waiting_since"] = datetime.now(timezone.utc).isoformat()
                 elif status == "completed":
                     step_data["completed_at"] = datetime.now(timezone.utc).isoformat()
 
@@ -476,93 +497,107 @@ def update_workflow_state(
 def list_workflows(
     status: Optional[str] = None,
     workflow_type: Optional[str] = None,
-    session_name: Optional[str] = None
+    session_name: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """List all workflows (optionally filter by status).
 
-    Returns list of workflows matching filter criteria.
+    Returns one page of workflows matching filter criteria, most recently
+    updated first. A workflow present in the session directory shadows the
+    global copy with the same workflow_id.
 
     Args:
         status: Filter by status
         workflow_type: Filter by workflow type
         session_name: Filter by session name
+        limit: Page size (1-500, default 50)
+        cursor: next_cursor from the previous page (omit for first page)
+        fields: Columns to return (default: all)
 
     Returns:
         {
             "workflows": list[dict],
-            "total": int
+            "total": int,
+            "offset": int,
+            "count": int,
+            "next_cursor": str | None
         }
     """
     try:
-        workflows = []
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return {"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}
+        if fields:
+            unknown = [f for f in fields if f not in WORKFLOW_LIST_FIELDS]
+            if unknown:
+                return {"error": f"Unknown fields: {unknown}. Allowed: {WORKFLOW_LIST_FIELDS}"}
+
+        state_dirs = []
 
         # Check session directory first
         active_session = _get_active_session()
-        if active_session or session_name:
-            target_session = session_name or active_session
-            session_state_dir = SESSIONS_PATH / target_session / "workflow-state"
-
-            if session_state_dir.exists():
-                for state_file in session_state_dir.glob("*.json"):
-                    if state_file.name == "index.json":
-                        continue
-
-                    try:
-                        with open(state_file, 'r') as f:
-                            state = json.load(f)
-
-                        # Apply filters
-                        if status and state.get("status") != status:
-                            continue
-                        if workflow_type and state.get("workflow_type") != workflow_type:
-                            continue
-
-                        workflows.append({
-                            "workflow_id": state.get("workflow_id"),
-                            "workflow_type": state.get("workflow_type"),
-                            "status": state.get("status"),
-                            "progress_percentage": _calculate_progress(state),
-                            "created_at": state.get("created_at"),
-                            "updated_at": state.get("updated_at"),
-                        })
-                    except Exception:
-                        continue
+        target_session = session_name or active_session
+        if target_session:
+            state_dirs.append(SESSIONS_PATH / target_session / "workflow-state")
 
         # Check global directory if no session filter
         if not session_name:
-            global_state_dir = GLOBAL_WORKFLOW_STATE_DIR
-
-            if global_state_dir.exists():
-                for state_file in global_state_dir.glob("*.json"):
-                    if state_file.name == "index.json":
-                        continue
-
-                    try:
-                        with open(state_file, 'r') as f:
-                            state = json.load(f)
-
-                        # Apply filters
-                        if status and state.get("status") != status:
-                            continue
-                        if workflow_type and state.get("workflow_type") != workflow_type:
-                            continue
-
-                        workflows.append({
-                            "workflow_id": state.get("workflow_id"),
-                            "workflow_type": state.get("workflow_type"),
-                            "status": state.get("status"),
-                            "progress_percentage": _calculate_progress(state),
-                            "created_at": state.get("created_at"),
-                            "updated_at": state.get("updated_at"),
-                        })
-                    except Exception:
-                        continue
-
-        return {
-            "workflows": workflows,
-            "total": len(workflows),
-        }
+            state_dirs.append(GLOBAL_WORKFLOW_STATE_DIR)
 
+        workflows = []
+        seen = set()
+        for state_dir in state_dirs:
+            if not state_dir.exists():
+                continue
+
+            for state_file in state_dir.glob("*.json"):
+                if state_file.name == "index.json":
+                    continue
+
+                try:
+                    with open(state_file, 'r') as f:
+                        state = json.load(f)
+                except Exception:
+                    continue
+
+                workflow_id = state.get("workflow_id")
+                if workflow_id in seen:
+                    continue
+                seen.add(workflow_id)
+
+                # Apply filters
+                if status and state.get("status") != status:
+                    continue
+                if workflow_type and state.get("workflow_type") != workflow_type:
+                    continue
+
+                workflows.append({
+                    "workflow_id": workflow_id,
+                    "workflow_type": state.get("workflow_type"),
+                    "status": state.get("status"),
+                    "progress_percentage": _calculate_progress(state),
+                    "created_at": state.get("created_at"),
+                    "updated_at": state.get("updated_at"),
+                })
+
+        # Stable order: most recently updated first, workflow_id breaks ties
+        workflows.sort(key=lambda w: str(w["workflow_id"]))
+        workflows.sort(key=lambda w: w["updated_at"] or "", reverse=True)
+
+        fingerprint = query_fingerprint(
+            tool="list_workflows",
+            status=status,
+            workflow_type=workflow_type,
+            session=target_session,
+            global_dir=not session_name
+        )
+        page = paginate(workflows, lambda w: w["workflow_id"], limit, cursor, fingerprint)
+        text, _ = fit_json_page(page, lambda items: select_fields(items, fields), "workflows")
+        return json.loads(text)
+
+    except CursorError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": f"Failed to list workflows: {e}"}
 
@@ -691,4 +726,5 @@ def cancel_workflow(
 
 
 if __name__ == "__main__":
+    start_metrics_exporters()
     mcp.run()
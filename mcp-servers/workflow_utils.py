@@ -16,6 +16,9 @@ from pathlib import Path
 from datetime import datetime, timezone
 import json
 
+from durable_io_utils import atomic_write_json, COMPACT_STATE_JSON
+from metrics_utils import record_state_bytes
+from session_overlay_utils import get_active_overlay
 from workflow_models import GENERATION_STEPS
 
 
@@ -29,27 +32,19 @@ SESSIONS_PATH = WORKSPACE_PATH / "sessions"
 # Helper Functions
 
 def _get_active_session() -> Optional[str]:
-    """Get active session name from session.lock.
+    """Get active session name from session.lock (cached session overlay).
 
     Returns:
         Session name or None if no active session
     """
-    session_lock = WORKSPACE_PATH / "session.lock"
-    if not session_lock.exists():
-        return None
-
-    try:
-        with open(session_lock, 'r') as f:
-            lock_data = json.load(f)
-        return lock_data.get("active")
-    except Exception:
-        return None
+    overlay = get_active_overlay(WORKSPACE_PATH, sessions_path=SESSIONS_PATH)
+    return overlay.name if overlay else None
 
 
 def _get_workflow_state_path(workflow_id: str) -> Path:
     """Get path to workflow state file.
 
-    Checks session directory first, then global.
+    Checks session directory first, then global (via the session overlay).
 
     Args:
         workflow_id: Workflow ID
@@ -57,12 +52,12 @@ def _get_workflow_state_path(workflow_id: str) -> Path:
     Returns:
         Path to workflow state JSON file
     """
+    rel_path = f"{GLOBAL_WORKFLOW_STATE_DIR.name}/{workflow_id}.json"
+
     # Check if running in session
-    session_name = _get_active_session()
-    if session_name:
-        session_state_path = SESSIONS_PATH / session_name / "workflow-state" / f"{workflow_id}.json"
-        if session_state_path.exists():
-            return session_state_path
+    overlay = get_active_overlay(WORKSPACE_PATH, sessions_path=SESSIONS_PATH)
+    if overlay is not None and overlay.in_session(rel_path):
+        return overlay.session_path / rel_path
 
     # Fall back to global
     return GLOBAL_WORKFLOW_STATE_DIR / f"{workflow_id}.json"
@@ -86,15 +81,16 @@ def _load_workflow_state(workflow_id: str) -> Dict[str, Any]:
     if not state_path.exists():
         raise FileNotFoundError(f"Workflow '{workflow_id}' not found")
 
+    data = state_path.read_bytes()
+    record_state_bytes("read", len(data))
     try:
-        with open(state_path, 'r') as f:
-            return json.load(f)
+        return json.loads(data)
     except json.JSONDecodeError as e:
         raise ValueError(f"Corrupted workflow state for '{workflow_id}': {e}") from e
 
 
 def _save_workflow_state(workflow_id: str, state: Dict[str, Any]) -> None:
-    """Save workflow state to file.
+    """Save workflow state to file (atomic write).
 
     Args:
         workflow_id: Workflow ID
@@ -106,8 +102,7 @@ def _save_workflow_state(workflow_id: str, state: Dict[str, Any]) -> None:
     # Update timestamp
     state["updated_at"] = datetime.now(timezone.utc).isoformat()
 
-    with open(state_path, 'w') as f:
-        json.dump(state, f, indent=2)
+    atomic_write_json(state_path, state, compact=COMPACT_STATE_JSON)
 
 
 def _get_step_definition(workflow_type: str, step: int) -> Optional[Dict[str, Any]]: